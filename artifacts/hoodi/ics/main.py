@@ -1,6 +1,12 @@
 import json
+import sys
+from pathlib import Path
+
 from web3 import Web3
 
+sys.path.append(str(Path(__file__).parents[3] / "ics-assessment"))
+from common import multicall, rpc_cache  # noqa: E402
+
 PROVIDER_URL_HOODI = "http://localhost:8545"  # Replace with your actual Web3 provider URL
 CONTRACT_ADDRESS_HOODI = '0x79CEf36D84743222f37765204Bec41E92a93E59d'
 
@@ -26,15 +32,20 @@ def main():
 
     print(f"Total Extra Addresses: {len(extra_addresses)}")
 
-    w3 = Web3(Web3.HTTPProvider(PROVIDER_URL_HOODI))
+    w3 = Web3(rpc_cache.CachedProvider(Web3.HTTPProvider(PROVIDER_URL_HOODI)))
     contract = w3.eth.contract(address=CONTRACT_ADDRESS_HOODI, abi=CSM_ABI, decode_tuples=True)
 
     final_addresses = []
 
+    # Every operator needed below is read in batched calls at the reference block
+    first_associated = [associated_ids[0] for associated_ids in associated_operators.values()]
+    node_operators = multicall.get_node_operators(
+        w3, contract, [int(no_id) for no_id in [*non_sybil, *first_associated]], REFERENCE_BLOCK_HOODI
+    )
+
     def extract_address(operator_id):
         """Extracts the address from the node operator based on permissions."""
-        node_operator = contract.functions.getNodeOperator(int(operator_id)).call(block_identifier=REFERENCE_BLOCK_HOODI)
-        return node_operator.managerAddress if node_operator.extendedManagerPermissions else node_operator.rewardAddress
+        return multicall.node_operator_address(node_operators[int(operator_id)])
 
     # Just take addresses from non-sybil operators
     for no_id in non_sybil:
@@ -0,0 +1,96 @@
+# Python port of compose.js, same output files without Node.js
+#
+#     python compose.py
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parents[3] / "ics-assessment"))
+from common import merkle  # noqa: E402
+
+CSV_FILES = [
+    "sources/galxe-lido-point-holders.csv",
+    "sources/lido-dappnode-buyers.csv",
+    "sources/obol-techne-credentials-base.csv",
+    "sources/obol-techne-credentials-bronze.csv",
+    "sources/obol-techne-credentials-silver.csv",
+    "sources/rated-solo-stakers.csv",
+    "sources/stake-cat-gnosischain-solo-stakers.csv",
+    "sources/stake-cat-rocketpool-solo-stakers.csv",
+    "sources/stake-cat-solo-stakers-B.csv",
+]
+
+PERFORMERS_CSV_FILES = [
+    "sources/csm-testnet-good-performers.csv",
+]
+
+ALL_CSV_FILES = CSV_FILES + PERFORMERS_CSV_FILES
+
+CSV_FILES_TO_EXCLUDE = [
+    "sources/exclude/ever-slashed.csv",
+    "sources/exclude/pro-node-operators.csv",
+    "sources/exclude/csm-testnet-bad-performers.csv",
+    "sources/exclude/rated-solo-wc-addresses.csv",
+    "sources/exclude/rocketpool-solo-stakers-deposit-addresses.csv",
+]
+
+
+def build_csv_content(addresses: dict) -> str:
+    header = ["address"] + [file.split("/")[-1].split(".")[0] for file in ALL_CSV_FILES]
+    lines = [",".join(header)]
+    for address, sources in addresses.items():
+        lines.append(f"{address},{','.join('X' if file in sources else '' for file in ALL_CSV_FILES)}")
+    return "\n".join(lines) + "\n"
+
+
+def build_exclusion_csv_content(addresses: dict, exclude_addresses: dict, good_performers: dict) -> str:
+    lines = ["address,exclusion_reason,sources"]
+    for address, reasons in exclude_addresses.items():
+        if address in addresses and address not in good_performers:
+            lines.append(f"{address},{';'.join(reasons)},{';'.join(addresses[address])}")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    all_addresses = merkle.read_csv_files(CSV_FILES)
+    exclude_addresses = merkle.read_csv_files(CSV_FILES_TO_EXCLUDE)
+
+    addresses = {a: list(sources) for a, sources in all_addresses.items() if a not in exclude_addresses}
+    good_performers = merkle.read_csv_files(PERFORMERS_CSV_FILES)
+    for address, sources in good_performers.items():
+        addresses.setdefault(address, []).extend(sources)
+
+    print("Total addresses:", len(all_addresses))
+    print("Total excluded:", len(exclude_addresses))
+
+    # The published tree was dumped by an older @openzeppelin/merkle-tree
+    tree = merkle.compose(list(addresses), dump_keys=merkle.LEGACY_DUMP_KEYS)
+    print("Merkle Root:", tree.root)
+
+    with open("sources.csv", "w") as f:
+        f.write(build_csv_content(addresses))
+    # we do not report as excluded addresses that are in good performers list
+    with open("exclusions.csv", "w") as f:
+        f.write(build_exclusion_csv_content(all_addresses, exclude_addresses, good_performers))
+    print("Merkle tree and proofs have been written to files.")
+
+    stats = {source: {"total": 0, "unique": 0, "duplicate": 0} for source in ALL_CSV_FILES}
+    for sources in addresses.values():
+        if len(sources) > 1:
+            for source in sources:
+                stats[source]["total"] += 1
+                stats[source]["duplicate"] += 1
+            continue
+        stats[sources[0]]["total"] += 1
+        stats[sources[0]]["unique"] += 1
+
+    print("Unique addresses for each source:")
+    for source, counts in stats.items():
+        print(source + ":")
+        for key, value in counts.items():
+            print(f"  {key}:", value)
+    print("\nTotal unique addresses:", len(addresses))
+
+
+if __name__ == "__main__":
+    main()
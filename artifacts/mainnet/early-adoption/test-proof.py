@@ -1,42 +1,60 @@
-import json
-import http.client
+import argparse
 import os
-import urllib.parse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parents[3] / "ics-assessment"))
+from common import proof_check  # noqa: E402
 
 EA_ADDRESS = "0x3D5148ad93e2ae5DedD1f7A8B3C19E7F67F90c0E"
 
 
 def main():
-    proofs = json.load(open("merkle-proofs.json"))
-    rpc_url = urllib.parse.urlparse(os.getenv("RPC_URL"))
-    host, port = rpc_url.hostname, rpc_url.port
-    addr_length = len(proofs.keys())
-    current = 0
-    if rpc_url.scheme == "https":
-        conn = http.client.HTTPSConnection(host, port)
-    else:
-        conn = http.client.HTTPConnection(host, port)
-    for addr, proof in proofs.items():
-        headers = {'Content-type': 'application/json'}
-        payload = json.dumps({
-            "jsonrpc": "2.0",
-            "method": "eth_call",
-            "params": [{
-                "to": EA_ADDRESS,
-                "value": "0x0",
-                "data": '0xe3486434' + addr[2:].zfill(64) + "0000000000000000000000000000000000000000000000000000000000000040" + hex(len(proof))[2:].zfill(64) +
-                "".join([p[2:] for p in proof])
-            }, "latest"],
-            "id": 1
-        })
-        conn.request("POST", rpc_url.path, payload, headers)
-        response = conn.getresponse()
-        data = response.read().decode()
-        assert data.endswith('01"}'), f"🚨 Check failed. Address: {addr}, Data: {data}"
-        current += 1
-        if current % 1000 == 0:
-            print(f"Processed {current} of {addr_length} addresses ⏳")
-    conn.close()
+    parser = argparse.ArgumentParser(description="Check every proof of merkle-proofs.json")
+    parser.add_argument("--onchain", action="store_true", help="also call verifyProof of the gate through RPC_URL")
+    parser.add_argument("--contract", default=EA_ADDRESS, help="contract with verifyProof(address,bytes32[])")
+    parser.add_argument("--block", type=int, help="block of the on-chain check (current block by default)")
+    parser.add_argument("--processes", type=int, help="offline verifier processes (all CPUs by default)")
+    parser.add_argument("--connections", type=int, default=proof_check.DEFAULT_CONNECTIONS)
+    parser.add_argument("--batch-size", type=int, default=proof_check.DEFAULT_RPC_BATCH_SIZE)
+    args = parser.parse_args()
+
+    printed = {"at": 0}
+
+    def progress(checked):
+        if checked // 1000 > printed["at"] // 1000:
+            print(f"Processed {checked} addresses ⏳")
+        printed["at"] = checked
+
+    report = proof_check.verify_offline(
+        Path("merkle-tree.json"), Path("merkle-proofs.json"), processes=args.processes, progress=progress
+    )
+    print(f"Offline: {report.checked} proofs checked against the root of merkle-tree.json")
+    checks = [("offline", report)]
+
+    if args.onchain:
+        printed["at"] = 0
+        report = proof_check.verify_onchain(
+            os.getenv("RPC_URL"),
+            args.contract,
+            Path("merkle-proofs.json"),
+            block_identifier=args.block,
+            batch_size=args.batch_size,
+            connections=args.connections,
+            progress=progress,
+        )
+        print(f"On-chain: {report.checked} proofs checked with {args.contract}")
+        checks.append(("on-chain", report))
+
+    for name, report in checks:
+        for address in report.failed:
+            print(f"🚨 {name} check failed. Address: {address}")
+        for address in report.missing:
+            print(f"🚨 No proof for {address}")
+        for address in report.unknown:
+            print(f"🚨 Proof of {address} which is not in the tree")
+    if not all(report.ok for _, report in checks):
+        sys.exit(1)
     print("All checks passed ✅")
 
 
@@ -1,7 +1,9 @@
 import json
-import time
+import sys
+from pathlib import Path
 
-import requests
+sys.path.append(str(Path(__file__).parents[3] / "ics-assessment"))
+from common import perf_frames, perf_report  # noqa: E402
 
 with open("sources/ea.json", "r") as file:
     EA_NOS = json.load(file)
@@ -11,35 +13,20 @@ PERFORMANCE_REPORTS = [
     "Qmemm9gD2fQgwNziBsf9mAaveNXJ3eJvHpqBTWKoLdUXXV"  # 06/2025
 ]
 
-def request_performance_report(report_file, retries=3, delay=2):
-    url = f"https://ipfs.io/ipfs/{report_file}"
-    for attempt in range(retries):
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            return response.json()
-        except (requests.HTTPError, requests.JSONDecodeError) as e:
-            print(f"Error fetching report {report_file}: {e}")
-            if attempt < retries - 1:
-                time.sleep(delay)
-                continue
-            raise e
-    raise Exception(f"Failed to fetch report {report_file}")
+def request_performance_report(report_file, operator_ids=None, retries=3, delay=2):
+    return perf_report.load(report_file, operator_ids, retries=retries, delay=delay)
 
 def process_bad_performers():
     bad_performance_counts = {}
 
     for report_file in PERFORMANCE_REPORTS:
-        report = request_performance_report(report_file)
-        threshold = report["threshold"]
+        report = request_performance_report(report_file, [str(no_id) for no_id in EA_NOS])
+        frame = perf_frames.from_report(report)
+        failing = frame.any_failing(frame.meets_threshold())
         for no_id in EA_NOS:
-            if str(no_id) in report["operators"].keys():
-                validators = report["operators"][str(no_id)]["validators"]
-                for validator in validators:
-                    performance = validators[validator]["perf"]["included"] / validators[validator]["perf"]["assigned"]
-                    if performance < threshold:
-                        inc_or_add(bad_performance_counts, no_id, 1)
-                        break
+            position = frame.position(str(no_id))
+            if position is not None and failing[position]:
+                inc_or_add(bad_performance_counts, no_id, 1)
 
     bad_performing_nos = []
 
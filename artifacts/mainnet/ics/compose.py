@@ -0,0 +1,26 @@
+# Python port of compose.js, same output files without Node.js
+#
+#     python compose.py
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parents[3] / "ics-assessment"))
+from common import merkle  # noqa: E402
+
+CSV_FILES = [
+    "ics.csv",
+]
+
+
+def main():
+    addresses = merkle.read_csv_files(CSV_FILES)
+    print("Total addresses:", len(addresses))
+
+    tree = merkle.compose(list(addresses))
+    print("Merkle Root:", tree.root)
+    print("Merkle tree and proofs have been written to files.")
+
+
+if __name__ == "__main__":
+    main()
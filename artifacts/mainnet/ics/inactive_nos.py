@@ -1,6 +1,12 @@
 import json
+import sys
+from pathlib import Path
+
 from web3 import Web3
 
+sys.path.append(str(Path(__file__).parents[3] / "ics-assessment"))
+from common import multicall, rpc_cache  # noqa: E402
+
 WEB3_PROVIDER = "http://localhost:8545"  # Replace with your actual Web3 provider URL
 CSM_ADDRESS = "0xdA7dE2ECdDfccC6c3AF10108Db212ACBBf9EA83F"
 REFERENCE_BLOCK = 22845716
@@ -12,13 +18,13 @@ with open("sources/ea.json", "r") as file:
     EA_NOS = json.load(file)
 
 def get_inactive_nos(reference_block):
-    web3 = Web3(Web3.HTTPProvider(WEB3_PROVIDER))
+    web3 = Web3(rpc_cache.CachedProvider(Web3.HTTPProvider(WEB3_PROVIDER)))
     csm = web3.eth.contract(address=CSM_ADDRESS, abi=CSM_ABI, decode_tuples=True)
 
     inactive_ea_nos = []
 
-    for no_id in EA_NOS:
-        operator = csm.functions.getNodeOperator(no_id).call(block_identifier=reference_block)
+    operators = multicall.get_node_operators(web3, csm, EA_NOS, reference_block)
+    for no_id, operator in operators.items():
         deposited = operator.totalDepositedKeys
         depositable = operator.depositableValidatorsCount
         exited = operator.totalExitedKeys
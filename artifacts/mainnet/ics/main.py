@@ -1,6 +1,12 @@
 import json
+import sys
+from pathlib import Path
+
 from web3 import Web3
 
+sys.path.append(str(Path(__file__).parents[3] / "ics-assessment"))
+from common import multicall, rpc_cache  # noqa: E402
+
 PROVIDER_URL_MAINNET = "http://localhost:8545"  # Replace with your actual Web3 provider URL
 CONTRACT_ADDRESS_MAINNET = '0xdA7dE2ECdDfccC6c3AF10108Db212ACBBf9EA83F'
 
@@ -35,13 +41,13 @@ def main():
     filtered_nos = ea_nos - exclude
     print(f"Filtered Node Operators (excluding {len(exclude)}): {len(filtered_nos)}")
 
-    w3 = Web3(Web3.HTTPProvider(PROVIDER_URL_MAINNET))
+    w3 = Web3(rpc_cache.CachedProvider(Web3.HTTPProvider(PROVIDER_URL_MAINNET)))
     contract = w3.eth.contract(address=CONTRACT_ADDRESS_MAINNET, abi=CSM_ABI, decode_tuples=True)
 
     final_addresses = []
-    for no_id in filtered_nos:
-        node_operator = contract.functions.getNodeOperator(no_id).call(block_identifier=REFERENCE_BLOCK_MAINNET)
-        no_address = node_operator.managerAddress if node_operator.extendedManagerPermissions else node_operator.rewardAddress
+    node_operators = multicall.get_node_operators(w3, contract, filtered_nos, REFERENCE_BLOCK_MAINNET)
+    for no_id, node_operator in node_operators.items():
+        no_address = multicall.node_operator_address(node_operator)
         final_addresses.append(no_address)
         print(f"Node Operator ID: {no_id}, Address: {no_address}")
 
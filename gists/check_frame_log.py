@@ -1,22 +1,36 @@
 #!/usr/bin/env python
 
-from collections import defaultdict
 import json
 
+import numpy as np
+
 with open("log.json", mode="r") as f:
   log = json.load(f)
 
-shares_of_op = defaultdict(int)
-for op_id, op in log["operators"].items():
+# One row per validator, `owner` is the position of its operator in `op_ids`
+op_ids = list(log["operators"])
+owner, assigned, included, slashed = [], [], [], []
+for i, op in enumerate(log["operators"].values()):
   for v in op["validators"].values():
-      perf = v["perf"]["included"] / v["perf"]["assigned"]
-      if not v["slashed"] and perf > log["threshold"]:
-          shares_of_op[op_id] += v["perf"]["assigned"]
+      owner.append(i)
+      assigned.append(v["perf"]["assigned"])
+      included.append(v["perf"]["included"])
+      slashed.append(v["slashed"])
+
+owner = np.array(owner, dtype=np.int64)
+assigned = np.array(assigned, dtype=np.int64)
+included = np.array(included, dtype=np.int64)
+slashed = np.array(slashed, dtype=bool)
+
+counted = ~slashed & (included / assigned > log["threshold"])
+shares_of_op = np.zeros(len(op_ids), dtype=np.int64)
+np.add.at(shares_of_op, owner[counted], assigned[counted])
 
-total_shares = sum(shares_of_op.values())
-for op_id, op_share in shares_of_op.items():
-  expected = log["distributable"] * op_share // total_shares
-  actual = log["operators"][op_id]["distributed"]
-  diff = actual - expected
-  if diff != 0:
-      print(f"[{op_id}]\t{actual} != {expected}, {diff=}")
+# Rewards don't fit into int64, keep the split exact with Python ints
+shares_of_op = shares_of_op.astype(object)
+total_shares = shares_of_op.sum()
+expected = log["distributable"] * shares_of_op // total_shares
+actual = np.array([op["distributed"] for op in log["operators"].values()], dtype=object)
+for i in np.flatnonzero((shares_of_op > 0) & (actual != expected)):
+  diff = actual[i] - expected[i]
+  print(f"[{op_ids[i]}]\t{actual[i]} != {expected[i]}, {diff=}")
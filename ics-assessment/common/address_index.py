@@ -0,0 +1,191 @@
+# Compiled address index over all local ICS source lists
+#
+# Build once after updating any of the CSV sources:
+#     python -m common.address_index
+#
+# The index is a single binary file with every address from `SOURCES` stored as a sorted
+# array of 20-byte keys plus a parallel array of uint32 bitmasks (bit N = N-th source).
+# It is memory-mapped on load, so lookups are a binary search without any CSV parsing.
+
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+from bisect import bisect_left
+from functools import cache
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent.resolve()
+INDEX_FILE = ROOT / "address_index.bin"
+
+# Order defines the bit of each source; append new sources at the end
+SOURCES = [
+    "experience/eth-staker-solo-stakers.csv",
+    "experience/stake-cat-solo-B.csv",
+    "experience/stake-cat-gnosischain.csv",
+    "experience/stake-cat-rocketpool-solo-stakers.csv",
+    "experience/obol-techne-credentials-base.csv",
+    "experience/obol-techne-credentials-bronze.csv",
+    "experience/obol-techne-credentials-silver.csv",
+    "experience/ssv-verified-operators.csv",
+    "experience/sdvtm-mainnet.csv",
+    "experience/sdvtm-testnet.csv",
+    "humanity/circle_group_members.csv",
+    "engagement/aragon_voters.csv",
+    "engagement/protocol_guild.csv",
+]
+
+MAGIC = b"ICSADDR1"
+HEADER = struct.Struct("<8sII")  # magic, records count, sources json length
+KEY_SIZE = 20
+MASK_SIZE = 4
+MAX_SOURCES = MASK_SIZE * 8
+
+
+def address_to_key(address: str) -> bytes | None:
+    """The 20-byte key of a 0x-prefixed hex address, or None if it isn't one."""
+    address = address.strip().lower()
+    if len(address) != 42 or not address.startswith("0x"):
+        return None
+    try:
+        return bytes.fromhex(address[2:])
+    except ValueError:
+        return None
+
+
+def _read_addresses(csv_path: Path):
+    """
+    Yields keys from the first column of the CSV. Header rows and anything that is not
+    an address are skipped.
+    """
+    with open(csv_path, "r") as f:
+        for row in csv.reader(f):
+            if row and (key := address_to_key(row[0])) is not None:
+                yield key
+
+
+def build_index(sources: list[str] = SOURCES, root: Path = ROOT, out: Path = INDEX_FILE) -> int:
+    """
+    Compiles all `sources` (paths relative to `root`) into the binary index at `out`.
+    Returns the number of unique addresses written.
+    """
+    if len(sources) > MAX_SOURCES:
+        raise ValueError(f"Too many sources for a {MAX_SOURCES}-bit mask: {len(sources)}")
+
+    masks: dict[bytes, int] = {}
+    meta = []
+    for bit, rel_path in enumerate(sources):
+        path = root / rel_path
+        stat = path.stat()
+        meta.append({"path": rel_path, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size})
+        for key in _read_addresses(path):
+            masks[key] = masks.get(key, 0) | (1 << bit)
+
+    keys = sorted(masks)
+    sources_json = json.dumps(meta).encode()
+    header = HEADER.pack(MAGIC, len(keys), len(sources_json)) + sources_json
+    header += b"\0" * (-len(header) % 8)
+
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(b"".join(keys))
+        f.write(b"".join(masks[k].to_bytes(MASK_SIZE, "little") for k in keys))
+    os.replace(tmp, out)
+    return len(keys)
+
+
+class _Keys:
+    """Sequence view over the sorted keys region, suitable for `bisect`."""
+
+    def __init__(self, buf: memoryview, count: int):
+        self._buf = buf
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i: int) -> bytes:
+        return self._buf[i * KEY_SIZE:(i + 1) * KEY_SIZE].tobytes()
+
+
+class AddressIndex:
+    def __init__(self, path: Path = INDEX_FILE, root: Path = ROOT):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, sources_len = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an address index")
+        offset = HEADER.size
+        meta = json.loads(self._mm[offset:offset + sources_len])
+        offset += sources_len
+        offset += -offset % 8
+
+        self.count = count
+        buf = memoryview(self._mm)
+        self._keys = _Keys(buf[offset:offset + count * KEY_SIZE], count)
+        offset += count * KEY_SIZE
+        self._masks = buf[offset:offset + count * MASK_SIZE]
+
+        # Sources changed after the build are left out, so callers fall back to the CSV
+        self._bits: dict[Path, int] = {}
+        for bit, source in enumerate(meta):
+            path = (root / source["path"]).resolve()
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime_ns != source["mtime_ns"] or stat.st_size != source["size"]:
+                print(f"    ⚠️ {source['path']} changed since the address index was built, reading the CSV instead")
+                continue
+            self._bits[path] = bit
+
+    def source_bit(self, csv_path: Path) -> int | None:
+        return self._bits.get(Path(csv_path).resolve())
+
+    def mask(self, address: str) -> int:
+        key = address_to_key(address)
+        if key is None:
+            return 0
+        i = bisect_left(self._keys, key)
+        if i < self.count and self._keys[i] == key:
+            return int.from_bytes(self._masks[i * MASK_SIZE:(i + 1) * MASK_SIZE], "little")
+        return 0
+
+    def find(self, addresses: set[str], bit: int) -> str | None:
+        """
+        Returns the first address from `addresses` present in the source with the given bit.
+        """
+        for address in sorted(addresses):
+            if self.mask(address) & (1 << bit):
+                return address
+        return None
+
+
+@cache
+def default_index() -> AddressIndex | None:
+    if not INDEX_FILE.exists():
+        return None
+    return AddressIndex(INDEX_FILE)
+
+
+def lookup(addresses: set[str], csv_path: Path) -> tuple[bool, str | None]:
+    """
+    Looks up `addresses` in the compiled copy of `csv_path`.
+    Returns (indexed, match); when `indexed` is False the caller should read the CSV itself.
+    """
+    index = default_index()
+    if index is None:
+        return False, None
+    bit = index.source_bit(csv_path)
+    if bit is None:
+        return False, None
+    return True, index.find(addresses, bit)
+
+
+if __name__ == "__main__":
+    out = Path(sys.argv[1]) if len(sys.argv) > 1 else INDEX_FILE
+    total = build_index(out=out)
+    print(f"Wrote {total} addresses from {len(SOURCES)} sources to {out}")
@@ -0,0 +1,343 @@
+# CSM bond curves evaluated for many operators at once
+#
+# Same integer math as CSBondCurve: a curve is a list of intervals starting at
+# `minKeysCount` keys, each next key in an interval costing `trend` more bond. Bond for
+# keys and keys for bond are evaluated for whole arrays of operators with NumPy, each on
+# the curve of its operator. Amounts are divided by the greatest common divisor of all
+# curve amounts first, so evaluations run on small exact int64 values and fall back to
+# exact Python int (object) arrays only where those could overflow.
+#
+# Curves come from a deploy script or from an on-chain snapshot, which also holds the keys
+# and bond of every operator for checks like `getUnbondedKeysCount`:
+#     python -m common.bond_curve curves script/DeployMainnet.s.sol --keys 1 2 10 100
+#     python -m common.bond_curve snapshot --rpc URL --accounting 0x... --module 0x... --out snapshot.json
+#     python -m common.bond_curve unbonded snapshot.json [--penalty 0.5]
+
+import argparse
+import math
+import re
+from dataclasses import dataclass
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+from web3 import Web3
+
+from common import multicall, store
+
+MIN_CURVE_LENGTH = 1
+MAX_CURVE_LENGTH = 100
+# Added to the bond by CSAccounting to account for stETH rounding
+STETH_ROUNDING_WEI = 10
+INT64_MAX = np.iinfo(np.int64).max
+UNITS = {"ether": 10**18, "gwei": 10**9, "wei": 1}
+
+_INTERVAL = re.compile(r"config\.(\w*BondCurve)\.push\(\s*\[\s*(\d+)\s*,\s*([\d.]+)\s*(ether|gwei|wei)?\s*\]\s*\)")
+
+ACCOUNTING_ABI = [
+    {"inputs": [], "name": "getCurvesCount", "outputs": [{"name": "", "type": "uint256"}], "stateMutability": "view", "type": "function"},
+    {
+        "inputs": [{"name": "curveId", "type": "uint256"}],
+        "name": "getCurveInfo",
+        "outputs": [{
+            "components": [{
+                "components": [
+                    {"name": "minKeysCount", "type": "uint256"},
+                    {"name": "minBond", "type": "uint256"},
+                    {"name": "trend", "type": "uint256"},
+                ],
+                "internalType": "struct ICSBondCurve.BondCurveInterval[]",
+                "name": "intervals",
+                "type": "tuple[]",
+            }],
+            "internalType": "struct ICSBondCurve.BondCurve",
+            "name": "",
+            "type": "tuple",
+        }],
+        "stateMutability": "view",
+        "type": "function",
+    },
+    {"inputs": [{"name": "nodeOperatorId", "type": "uint256"}], "name": "getBondCurveId", "outputs": [{"name": "", "type": "uint256"}], "stateMutability": "view", "type": "function"},
+    {"inputs": [{"name": "nodeOperatorId", "type": "uint256"}], "name": "getBond", "outputs": [{"name": "", "type": "uint256"}], "stateMutability": "view", "type": "function"},
+    {"inputs": [{"name": "nodeOperatorId", "type": "uint256"}], "name": "getActualLockedBond", "outputs": [{"name": "", "type": "uint256"}], "stateMutability": "view", "type": "function"},
+]
+MODULE_ABI = [
+    {"inputs": [], "name": "getNodeOperatorsCount", "outputs": [{"name": "", "type": "uint256"}], "stateMutability": "view", "type": "function"},
+    {"inputs": [{"name": "nodeOperatorId", "type": "uint256"}], "name": "getNodeOperatorNonWithdrawnKeys", "outputs": [{"name": "", "type": "uint256"}], "stateMutability": "view", "type": "function"},
+]
+
+
+@dataclass(frozen=True)
+class BondCurve:
+    # Per interval, as stored by CSBondCurve
+    min_keys_count: tuple[int, ...]
+    min_bond: tuple[int, ...]
+    trend: tuple[int, ...]
+
+    @classmethod
+    def from_intervals(cls, intervals: list[tuple[int, int]]) -> "BondCurve":
+        """Curve of (minKeysCount, trend) inputs, checked and completed like `_addBondCurve`."""
+        if not MIN_CURVE_LENGTH <= len(intervals) <= MAX_CURVE_LENGTH:
+            raise ValueError(f"Invalid bond curve length: {len(intervals)}")
+        if intervals[0][0] != 1:
+            raise ValueError("The first interval must start at 1 key")
+        for i, (min_keys_count, trend) in enumerate(intervals):
+            if trend == 0 or (i and min_keys_count <= intervals[i - 1][0]):
+                raise ValueError(f"Invalid bond curve interval {i}: {(min_keys_count, trend)}")
+        min_bond = [intervals[0][1]]
+        for (prev_keys, prev_trend), (min_keys_count, trend) in zip(intervals, intervals[1:]):
+            min_bond.append(trend + min_bond[-1] + (min_keys_count - prev_keys - 1) * prev_trend)
+        return cls(tuple(k for k, _ in intervals), tuple(min_bond), tuple(t for _, t in intervals))
+
+    @classmethod
+    def from_info(cls, intervals: list) -> "BondCurve":
+        """Curve of (minKeysCount, minBond, trend) intervals as returned by `getCurveInfo`."""
+        return cls(*(tuple(int(i[field]) for i in intervals) for field in range(3)))
+
+    def __len__(self) -> int:
+        return len(self.trend)
+
+    def bond_for_keys(self, keys: int) -> int:
+        """CSBondCurve._getBondAmountByKeysCount"""
+        if keys == 0:
+            return 0
+        i = sum(1 for k in self.min_keys_count[1:] if keys >= k)
+        return self.min_bond[i] + (keys - self.min_keys_count[i]) * self.trend[i]
+
+    def keys_for_bond(self, amount: int) -> int:
+        """CSBondCurve._getKeysCountByBondAmount"""
+        if amount < self.min_bond[0]:
+            return 0
+        i = sum(1 for b in self.min_bond[1:] if amount >= b)
+        if i < len(self) - 1 and amount > self.min_bond[i + 1] - self.trend[i + 1]:
+            return self.min_keys_count[i + 1] - 1
+        return self.min_keys_count[i] + (amount - self.min_bond[i]) // self.trend[i]
+
+
+def _exact(values: np.ndarray, bound: int) -> np.ndarray:
+    """int64 `values` if `bound` fits into int64, exact Python ints otherwise."""
+    return values.astype(np.int64) if bound <= INT64_MAX else values.astype(object)
+
+
+class CurveSet:
+    """
+    Curves indexed by curve ID, packed into (curves, intervals) arrays with amounts in
+    `unit` wei. Intervals past the end of a shorter curve are masked out.
+    """
+
+    def __init__(self, curves: list[BondCurve]):
+        if not curves:
+            raise ValueError("Expected at least one curve")
+        self.curves = list(curves)
+        self.unit = math.gcd(*(v for c in curves for v in c.min_bond + c.trend))
+        self.lengths = np.array([len(c) for c in curves], dtype=np.int64)
+        self._largest = max(v for c in curves for v in c.min_bond + c.trend) // self.unit
+        self._max_trend = max(max(c.trend) for c in curves) // self.unit
+
+        def packed(rows):
+            width = int(self.lengths.max())
+            return _exact(np.array([[*row, *[0] * (width - len(row))] for row in rows], dtype=object), self._largest)
+
+        self.min_keys_count = packed([c.min_keys_count for c in curves])
+        self.min_bond = packed([[b // self.unit for b in c.min_bond] for c in curves])
+        self.trend = packed([[t // self.unit for t in c.trend] for c in curves])
+
+    def __len__(self) -> int:
+        return len(self.curves)
+
+    def _interval(self, thresholds: np.ndarray, values: np.ndarray, curve_ids: np.ndarray) -> np.ndarray:
+        """Index of the last interval of each curve starting at or below the value, like the binary searches."""
+        valid = np.arange(thresholds.shape[1]) < self.lengths[curve_ids][:, None]
+        return np.maximum(((thresholds <= values[:, None]) & valid).sum(axis=1) - 1, 0)
+
+    def bond_for_keys(self, keys: np.ndarray, curve_ids: np.ndarray) -> np.ndarray:
+        """`getBondAmountByKeysCount` of every (keys, curve ID) pair, in wei."""
+        keys = np.asarray(keys, dtype=np.int64)
+        curve_ids = np.asarray(curve_ids, dtype=np.int64)
+        rows = np.arange(len(keys))
+        min_keys_count = self.min_keys_count[curve_ids]
+        interval = self._interval(min_keys_count, keys, curve_ids)
+
+        largest = self._largest + int(keys.max(initial=0)) * self._max_trend
+        min_bond = _exact(self.min_bond[curve_ids, interval], largest)
+        trend = _exact(self.trend[curve_ids, interval], largest)
+        extra_keys = _exact(keys - min_keys_count[rows, interval], largest)
+        scaled = min_bond + extra_keys * trend
+        scaled[keys == 0] = 0
+        return _exact(scaled, largest * self.unit) * self.unit
+
+    def keys_for_bond(self, amounts: np.ndarray, curve_ids: np.ndarray) -> np.ndarray:
+        """`getKeysCountByBondAmount` of every (amount in wei, curve ID) pair."""
+        amounts = np.asarray(amounts)
+        if amounts.dtype != object and amounts.dtype.kind not in "iu":
+            raise ValueError(f"Expected integer amounts, got {amounts.dtype}")
+        curve_ids = np.asarray(curve_ids, dtype=np.int64)
+        rows = np.arange(len(amounts))
+        amounts = amounts.astype(object)
+        quotients, remainders = amounts // self.unit, amounts % self.unit
+        largest = max(int(quotients.max(initial=0)), self._largest)
+        quotients = _exact(quotients, largest)
+        min_bond = _exact(self.min_bond[curve_ids], largest)
+        trend = _exact(self.trend[curve_ids], largest)
+        min_keys_count = self.min_keys_count[curve_ids]
+
+        # amount >= minBond * unit exactly when amount // unit >= minBond
+        interval = self._interval(min_bond, quotients, curve_ids)
+        after = np.minimum(interval + 1, self.lengths[curve_ids] - 1)
+        # Between intervals: amount > k * unit when above k units, or at k units with a remainder
+        gap_start = min_bond[rows, after] - trend[rows, after]
+        in_gap = (interval < self.lengths[curve_ids] - 1) & (
+            (quotients > gap_start) | ((quotients == gap_start) & (remainders > 0))
+        )
+        below_first = quotients < min_bond[:, 0]
+        # Extra keys of the interval, clamped where the amount is below the first one
+        extra_keys = np.where(below_first, 0, quotients - min_bond[rows, interval]) // trend[rows, interval]
+        keys = np.where(in_gap, min_keys_count[rows, after] - 1, min_keys_count[rows, interval] + extra_keys)
+        keys[below_first] = 0
+        return keys.astype(np.int64)
+
+    def required_bond(self, keys: np.ndarray, curve_ids: np.ndarray, locked: np.ndarray) -> np.ndarray:
+        """CSAccounting._getRequiredBond with no additional keys, in wei."""
+        return self.bond_for_keys(keys, curve_ids).astype(object) + np.asarray(locked, dtype=object)
+
+    def unbonded_keys(
+        self, keys: np.ndarray, curve_ids: np.ndarray, bond: np.ndarray, locked: np.ndarray | None = None
+    ) -> np.ndarray:
+        """
+        CSAccounting._getUnbondedKeysCount: keys not covered by the bond, less the locked
+        bond when `locked` is given.
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        bond = np.asarray(bond, dtype=object)
+        over_locked = np.zeros(len(keys), dtype=bool)
+        if locked is not None:
+            locked = np.asarray(locked, dtype=object)
+            over_locked = locked > bond
+            bond = np.where(over_locked, 0, bond - locked)
+        bonded = self.keys_for_bond(bond + STETH_ROUNDING_WEI, curve_ids)
+        return np.where(over_locked, keys, np.maximum(keys - bonded, 0))
+
+
+def parse_amount(value: str, unit: str = "ether") -> int:
+    """Exact wei of a decimal amount in `unit`, like Solidity `2.4 ether`."""
+    wei = Decimal(value) * UNITS[unit]
+    if wei != wei.to_integral_value():
+        raise ValueError(f"{value} {unit} is not a whole number of wei")
+    return int(wei)
+
+
+def curves_from_deploy_script(path: Path) -> dict[str, BondCurve]:
+    """Curves pushed into the config of a deploy script, e.g. `defaultBondCurve`, by name."""
+    intervals: dict[str, list[tuple[int, int]]] = {}
+    for name, min_keys_count, amount, unit in _INTERVAL.findall(Path(path).read_text()):
+        intervals.setdefault(name, []).append((int(min_keys_count), parse_amount(amount, unit or "wei")))
+    return {name: BondCurve.from_intervals(items) for name, items in intervals.items()}
+
+
+@dataclass
+class Snapshot:
+    block: int
+    curves: list[BondCurve]
+    # Per operator, indexed by node operator ID
+    curve_ids: np.ndarray
+    keys: np.ndarray
+    bond: np.ndarray
+    locked: np.ndarray
+
+    def to_dict(self) -> dict:
+        return {
+            "block": self.block,
+            "curves": [
+                [list(c.min_keys_count), [store.amount(b) for b in c.min_bond], [store.amount(t) for t in c.trend]]
+                for c in self.curves
+            ],
+            "operators": [
+                [int(c), int(k), store.amount(b), store.amount(lock)]
+                for c, k, b, lock in zip(self.curve_ids, self.keys, self.bond, self.locked)
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Snapshot":
+        curves = [BondCurve(tuple(k), tuple(int(b) for b in bonds), tuple(int(t) for t in trends)) for k, bonds, trends in data["curves"]]
+        operators = data["operators"]
+        return cls(
+            block=data["block"],
+            curves=curves,
+            curve_ids=np.array([o[0] for o in operators], dtype=np.int64),
+            keys=np.array([o[1] for o in operators], dtype=np.int64),
+            bond=np.array([int(o[2]) for o in operators], dtype=object),
+            locked=np.array([int(o[3]) for o in operators], dtype=object),
+        )
+
+
+def fetch_snapshot(w3: Web3, accounting_address: str, module_address: str, block_identifier: int) -> Snapshot:
+    """Curves and the bond state of every operator at the pinned block, read in batches."""
+    accounting = w3.eth.contract(address=Web3.to_checksum_address(accounting_address), abi=ACCOUNTING_ABI, decode_tuples=True)
+    module = w3.eth.contract(address=Web3.to_checksum_address(module_address), abi=MODULE_ABI, decode_tuples=True)
+    curves_count = accounting.functions.getCurvesCount().call(block_identifier=block_identifier)
+    operators_count = module.functions.getNodeOperatorsCount().call(block_identifier=block_identifier)
+
+    infos = multicall.call_many(w3, [accounting.functions.getCurveInfo(i) for i in range(curves_count)], block_identifier)
+    columns = [
+        multicall.call_many(w3, [fn(i) for i in range(operators_count)], block_identifier)
+        for fn in (
+            accounting.functions.getBondCurveId,
+            module.functions.getNodeOperatorNonWithdrawnKeys,
+            accounting.functions.getBond,
+            accounting.functions.getActualLockedBond,
+        )
+    ]
+    return Snapshot(
+        block=block_identifier,
+        curves=[BondCurve.from_info(info.intervals) for info in infos],
+        curve_ids=np.array(columns[0], dtype=np.int64),
+        keys=np.array(columns[1], dtype=np.int64),
+        bond=np.array(columns[2], dtype=object),
+        locked=np.array(columns[3], dtype=object),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate CSM bond curves")
+    commands = parser.add_subparsers(dest="command", required=True)
+    curves = commands.add_parser("curves", help="bond for keys on the curves of a deploy script")
+    curves.add_argument("script", type=Path)
+    curves.add_argument("--keys", type=int, nargs="+", default=[1, 2, 10, 100])
+    snapshot = commands.add_parser("snapshot", help="read curves and operators' bond state on-chain")
+    snapshot.add_argument("--rpc", required=True)
+    snapshot.add_argument("--accounting", required=True, help="CSAccounting address")
+    snapshot.add_argument("--module", required=True, help="CSModule address")
+    snapshot.add_argument("--block", type=int, help="block to read at (current block by default)")
+    snapshot.add_argument("--out", type=Path, required=True)
+    unbonded = commands.add_parser("unbonded", help="operators with unbonded keys, optionally after a penalty")
+    unbonded.add_argument("snapshot", type=Path)
+    unbonded.add_argument("--penalty", default="0", help="ETH taken from the bond of every operator")
+    args = parser.parse_args()
+
+    if args.command == "curves":
+        keys = np.array(args.keys, dtype=np.int64)
+        for name, curve in curves_from_deploy_script(args.script).items():
+            bonds = CurveSet([curve]).bond_for_keys(keys, np.zeros(len(keys), dtype=np.int64))
+            print(f"{name}: " + ", ".join(f"{k} keys {Web3.from_wei(int(b), 'ether')} ETH" for k, b in zip(args.keys, bonds)))
+    elif args.command == "snapshot":
+        w3 = Web3(Web3.HTTPProvider(args.rpc))
+        block = args.block if args.block is not None else w3.eth.block_number
+        data = fetch_snapshot(w3, args.accounting, args.module, block)
+        store.save(args.out, data.to_dict())
+        print(f"Saved {len(data.curves)} curves and {len(data.keys)} operators at block {block} to {args.out}")
+    else:
+        loaded = store.load(args.snapshot)
+        if loaded is None:
+            parser.error(f"No snapshot at {args.snapshot}")
+        data = Snapshot.from_dict(loaded[1])
+        penalty = parse_amount(args.penalty)
+        bond = np.maximum(data.bond - penalty, 0)
+        unbonded_keys = CurveSet(data.curves).unbonded_keys(data.keys, data.curve_ids, bond, data.locked)
+        for no_id in np.flatnonzero(unbonded_keys).tolist():
+            print(f"[{no_id}] curve {data.curve_ids[no_id]}: {unbonded_keys[no_id]} of {data.keys[no_id]} keys unbonded")
+        print(f"{np.count_nonzero(unbonded_keys)} of {len(data.keys)} operators under-bonded at block {data.block}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,573 @@
+# CSM deposit queue simulator
+#
+# Same queues as QueueLib in CSModule: one queue of batches (node operator ID, keys) per
+# priority, stored at increasing indices with the index of the next batch, consumed from
+# priority 0 to QUEUE_LOWEST_PRIORITY by `obtainDepositData` and pruned by
+# `cleanDepositQueue`. Batches are kept in NumPy arrays indexed like the contract
+# storage, so a replay ends with the same head, tail and items as `depositQueuePointers`
+# and `depositQueueItem` return.
+#
+# The simulator starts from an on-chain snapshot, replays BatchEnqueued,
+# DepositableSigningKeysCountChanged and DepositedSigningKeysCountChanged events (a deposit
+# transaction becomes one `obtainDepositData` call) and `cleanDepositQueue` calls. Those
+# emit no events and are found with `trace_filter`; on nodes without traces they have to
+# be passed as transactions. A replay is compared with the chain at its last block unless
+# `--no-verify` is given. `project` then computes in one vectorized pass after how many
+# deposits every queued batch is reached:
+#     python -m common.deposit_queue snapshot --rpc URL --module 0x... --out queue.json [--block N]
+#     python -m common.deposit_queue replay queue.json --rpc URL --to-block N [--clean-tx 0x...] --out replayed.json
+#     python -m common.deposit_queue project queue.json --rate 1200 [--output projection.csv]
+
+import argparse
+import csv
+from dataclasses import dataclass
+from itertools import groupby
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+from web3 import Web3
+
+from common import log_scanner, multicall, store
+
+# Batch packing of QueueLib: noId in the top 64 bits, keys in the next 64, next in the low 128
+NO_ID_SHIFT = 192
+KEYS_SHIFT = 128
+UINT64_MASK = 2**64 - 1
+UINT128_MASK = 2**128 - 1
+INITIAL_CAPACITY = 1024
+# cleanDepositQueue(uint256), which emits no events: clean calls are read from traces
+CLEAN_DEPOSIT_QUEUE_SELECTOR = "0x735dfa28"
+TRACE_CHUNK_SIZE = 10_000
+
+BATCH_ENQUEUED = log_scanner.topic("BatchEnqueued(uint256,uint256,uint256)")
+DEPOSITABLE_CHANGED = log_scanner.topic("DepositableSigningKeysCountChanged(uint256,uint256)")
+DEPOSITED_CHANGED = log_scanner.topic("DepositedSigningKeysCountChanged(uint256,uint256)")
+
+_NODE_OPERATOR = [
+    ("uint32", "totalAddedKeys"), ("uint32", "totalWithdrawnKeys"), ("uint32", "totalDepositedKeys"),
+    ("uint32", "totalVettedKeys"), ("uint32", "stuckValidatorsCount"), ("uint32", "depositableValidatorsCount"),
+    ("uint32", "targetLimit"), ("uint8", "targetLimitMode"), ("uint32", "totalExitedKeys"),
+    ("uint32", "enqueuedCount"), ("address", "managerAddress"), ("address", "proposedManagerAddress"),
+    ("address", "rewardAddress"), ("address", "proposedRewardAddress"), ("bool", "extendedManagerPermissions"),
+    ("bool", "usedPriorityQueue"),
+]
+MODULE_ABI = [
+    {"inputs": [], "name": "QUEUE_LOWEST_PRIORITY", "outputs": [{"name": "", "type": "uint256"}], "stateMutability": "view", "type": "function"},
+    {"inputs": [], "name": "getNodeOperatorsCount", "outputs": [{"name": "", "type": "uint256"}], "stateMutability": "view", "type": "function"},
+    {
+        "inputs": [{"name": "queuePriority", "type": "uint256"}],
+        "name": "depositQueuePointers",
+        "outputs": [{"name": "head", "type": "uint128"}, {"name": "tail", "type": "uint128"}],
+        "stateMutability": "view",
+        "type": "function",
+    },
+    {
+        "inputs": [{"name": "queuePriority", "type": "uint256"}, {"name": "index", "type": "uint128"}],
+        "name": "depositQueueItem",
+        "outputs": [{"name": "", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function",
+    },
+    {
+        "inputs": [{"name": "nodeOperatorId", "type": "uint256"}],
+        "name": "getNodeOperator",
+        "outputs": [{
+            "components": [{"name": name, "type": t} for t, name in _NODE_OPERATOR],
+            "internalType": "struct NodeOperator",
+            "name": "",
+            "type": "tuple",
+        }],
+        "stateMutability": "view",
+        "type": "function",
+    },
+]
+
+
+class NotEnoughKeys(Exception):
+    pass
+
+
+def decode_batch(value: int) -> tuple[int, int, int]:
+    """(noId, keys, next) of a packed Batch."""
+    return value >> NO_ID_SHIFT, (value >> KEYS_SHIFT) & UINT64_MASK, value & UINT128_MASK
+
+
+def encode_batch(no_id: int, keys: int, next_index: int) -> int:
+    return (no_id << NO_ID_SHIFT) | (keys << KEYS_SHIFT) | next_index
+
+
+class BatchQueue:
+    """
+    QueueLib.Queue: the batch at storage index i is (no_id[i], keys[i], next[i]). Every
+    index below `tail` holds a batch, so an index is nil exactly when it is >= `tail`.
+    """
+
+    def __init__(self, head: int = 0, tail: int = 0):
+        self.head = head
+        self.tail = tail
+        capacity = max(INITIAL_CAPACITY, tail)
+        self.no_id = np.zeros(capacity, dtype=np.int64)
+        self.keys = np.zeros(capacity, dtype=np.int64)
+        self.next = np.zeros(capacity, dtype=np.int64)
+
+    def _grow(self, size: int):
+        if size > len(self.no_id):
+            capacity = max(size, 2 * len(self.no_id))
+            for name in ("no_id", "keys", "next"):
+                grown = np.zeros(capacity, dtype=np.int64)
+                grown[:self.tail] = getattr(self, name)[:self.tail]
+                setattr(self, name, grown)
+
+    def enqueue(self, no_id: int, keys: int):
+        self._grow(self.tail + 1)
+        self.no_id[self.tail] = no_id
+        self.keys[self.tail] = keys
+        self.next[self.tail] = self.tail + 1
+        self.tail += 1
+
+    def is_nil(self, index: int) -> bool:
+        return index >= self.tail
+
+    def dequeue(self) -> int:
+        if self.is_nil(self.head):
+            raise ValueError("QueueIsEmpty")
+        index = self.head
+        self.head = int(self.next[index])
+        return index
+
+    def indices(self) -> np.ndarray:
+        """Storage indices of the batches in queue order."""
+        order = []
+        nxt = self.next[:self.tail].tolist()
+        index = self.head
+        while index < self.tail:
+            order.append(index)
+            index = nxt[index]
+        return np.array(order, dtype=np.int64)
+
+    def item(self, index: int) -> int:
+        """`depositQueueItem` of an index, 0 (nil) at and past the tail."""
+        if self.is_nil(index):
+            return 0
+        return encode_batch(int(self.no_id[index]), int(self.keys[index]), int(self.next[index]))
+
+    def clean(self, operators: "Operators", max_items: int, lookup: dict[int, int]) -> tuple[int, int, int, bool]:
+        """QueueLib.clean: (removed, lastRemovedAtDepth, visited, reachedOutOfQueue)."""
+        if max_items == 0:
+            raise ValueError("QueueLookupNoLimit")
+        removed = last_removed_at_depth = visited = 0
+        index_of_prev = None
+        current = self.head
+        while visited < max_items:
+            if self.is_nil(current):
+                return removed, last_removed_at_depth, visited, True
+            visited += 1
+            no_id, keys, following = int(self.no_id[current]), int(self.keys[current]), int(self.next[current])
+            if lookup.get(no_id, 0) >= operators.depositable[no_id]:
+                if current == self.head:
+                    self.dequeue()
+                else:
+                    self.next[index_of_prev] = following
+                operators.enqueued[no_id] -= keys
+                last_removed_at_depth = visited
+                removed += 1
+            else:
+                lookup[no_id] = lookup.get(no_id, 0) + keys
+                index_of_prev = current
+            current = following
+        return removed, last_removed_at_depth, visited, False
+
+    def to_dict(self) -> dict:
+        indices = self.indices()
+        return {
+            "head": self.head,
+            "tail": self.tail,
+            "items": [[int(i), int(self.no_id[i]), int(self.keys[i]), int(self.next[i])] for i in indices],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BatchQueue":
+        queue = cls(data["head"], data["tail"])
+        for index, no_id, keys, following in data["items"]:
+            queue.no_id[index], queue.keys[index], queue.next[index] = no_id, keys, following
+        # Batches unlinked before the snapshot aren't stored; they are never reached again
+        return queue
+
+
+@dataclass
+class Operators:
+    # Indexed by node operator ID
+    depositable: np.ndarray
+    enqueued: np.ndarray
+    total_deposited: np.ndarray
+
+    @classmethod
+    def empty(cls, count: int = 0) -> "Operators":
+        return cls(*(np.zeros(count, dtype=np.int64) for _ in range(3)))
+
+    def grow(self, size: int):
+        if size > len(self.depositable):
+            for name in ("depositable", "enqueued", "total_deposited"):
+                grown = np.zeros(max(size, 2 * len(self.depositable)), dtype=np.int64)
+                grown[:len(getattr(self, name))] = getattr(self, name)
+                setattr(self, name, grown)
+
+
+@dataclass
+class Projection:
+    # Per queued batch, in consumption order
+    priority: np.ndarray
+    index: np.ndarray
+    no_id: np.ndarray
+    keys: np.ndarray
+    # Keys of the batch that will be deposited, and deposits made before its first one
+    deposited: np.ndarray
+    deposits_before: np.ndarray
+
+    @property
+    def total(self) -> int:
+        return int(self.deposited.sum())
+
+    def by_operator(self) -> dict[int, tuple[int, int, int]]:
+        """Per operator with keys to deposit: (keys, deposits before its first, before its last)."""
+        mask = self.deposited > 0
+        no_ids, first = np.unique(self.no_id[mask], return_index=True)
+        keys = np.bincount(self.no_id[mask], weights=self.deposited[mask]).astype(np.int64)
+        last_end = np.zeros(len(keys), dtype=np.int64)
+        np.maximum.at(last_end, self.no_id[mask], self.deposits_before[mask] + self.deposited[mask])
+        starts = self.deposits_before[mask][first]
+        return {int(n): (int(keys[n]), int(s), int(last_end[n]) - 1) for n, s in zip(no_ids, starts)}
+
+
+class DepositQueue:
+    def __init__(self, lowest_priority: int, operators: Operators | None = None):
+        self.lowest_priority = lowest_priority
+        self.queues = [BatchQueue() for _ in range(lowest_priority + 1)]
+        self.operators = operators or Operators.empty()
+
+    def enqueue(self, priority: int, no_id: int, count: int):
+        """CSModule._enqueueNodeOperatorKeys(nodeOperatorId, queuePriority, count)"""
+        self.operators.grow(no_id + 1)
+        self.operators.enqueued[no_id] += count
+        self.queues[priority].enqueue(no_id, count)
+
+    def set_depositable(self, no_id: int, count: int):
+        self.operators.grow(no_id + 1)
+        self.operators.depositable[no_id] = count
+
+    def obtain_deposit_data(self, deposits_count: int) -> list[tuple[int, int]]:
+        """
+        CSModule.obtainDepositData: consumes the queues and returns the (noId, keys) loaded,
+        in order. Raises NotEnoughKeys where the contract reverts; the state is consumed by
+        then, so check `project().total` first to try counts that may not fit.
+        """
+        if deposits_count == 0:
+            return []
+        ops = self.operators
+        loaded = []
+        left = deposits_count
+        for queue in self.queues:
+            while left and not queue.is_nil(queue.head):
+                head = queue.head
+                no_id, in_batch = int(queue.no_id[head]), int(queue.keys[head])
+                count = min(int(ops.depositable[no_id]), in_batch, left)
+                if left > count or count == in_batch:
+                    ops.enqueued[no_id] -= in_batch
+                    queue.dequeue()
+                else:
+                    ops.enqueued[no_id] -= count
+                    queue.keys[head] = in_batch - count
+                if count == 0:
+                    continue
+                ops.total_deposited[no_id] += count
+                ops.depositable[no_id] -= count
+                loaded.append((no_id, count))
+                left -= count
+            if not left:
+                break
+        if left:
+            raise NotEnoughKeys(f"Loaded {deposits_count - left} of {deposits_count} keys")
+        return loaded
+
+    def clean(self, max_items: int) -> tuple[int, int]:
+        """CSModule.cleanDepositQueue: (removed, lastRemovedAtDepth)."""
+        removed = last_removed_at_depth = total_visited = 0
+        if max_items == 0:
+            return 0, 0
+        lookup: dict[int, int] = {}
+        for queue in self.queues:
+            removed_here, depth, visited, reached_out = queue.clean(self.operators, max_items, lookup)
+            if removed_here:
+                last_removed_at_depth = total_visited + depth
+                removed += removed_here
+            if not reached_out:
+                break
+            total_visited += visited
+            max_items -= visited
+        return removed, last_removed_at_depth
+
+    def project(self) -> Projection:
+        """
+        Where every queued batch ends up if deposits keep coming and nothing else changes:
+        each batch yields its keys up to what its operator still has depositable after its
+        earlier batches, in priority then queue order.
+        """
+        per_queue = [q.indices() for q in self.queues]
+        priority = np.concatenate([np.full(len(ix), p, dtype=np.int64) for p, ix in enumerate(per_queue)])
+        index = np.concatenate(per_queue)
+        no_id = np.concatenate([q.no_id[ix] for q, ix in zip(self.queues, per_queue)])
+        keys = np.concatenate([q.keys[ix] for q, ix in zip(self.queues, per_queue)])
+
+        # Keys of the same operator queued before each batch: running sum within operator groups
+        order = np.argsort(no_id, kind="stable")
+        running = np.cumsum(keys[order])
+        starts = np.r_[0, np.flatnonzero(np.diff(no_id[order])) + 1]
+        group_offset = np.repeat(running[starts] - keys[order][starts], np.diff(np.r_[starts, len(order)]))
+        before = np.empty_like(keys)
+        before[order] = running - keys[order] - group_offset
+
+        self.operators.grow(int(no_id.max(initial=-1)) + 1)
+        deposited = np.clip(self.operators.depositable[no_id] - before, 0, keys)
+        deposits_before = np.cumsum(deposited) - deposited
+        return Projection(priority, index, no_id, keys, deposited, deposits_before)
+
+    def replay(self, actions: Iterable[tuple]):
+        """
+        Applies ("enqueue", priority, noId, count), ("depositable", noId, count),
+        ("deposit", {noId: totalDepositedKeys}) and ("clean", maxItems) actions in order. A
+        deposit obtains as many keys as the totals add, then has to end on those totals.
+        """
+        for action in actions:
+            kind = action[0]
+            if kind == "enqueue":
+                self.enqueue(*action[1:])
+            elif kind == "depositable":
+                self.set_depositable(*action[1:])
+            elif kind == "clean":
+                self.clean(action[1])
+            elif kind == "deposit":
+                totals = action[1]
+                self.operators.grow(max(totals) + 1)
+                deposited = self.operators.total_deposited
+                self.obtain_deposit_data(sum(total - int(deposited[no_id]) for no_id, total in totals.items()))
+                for no_id, total in totals.items():
+                    if self.operators.total_deposited[no_id] != total:
+                        raise ValueError(
+                            f"Replay diverged: operator {no_id} has {self.operators.total_deposited[no_id]} "
+                            f"deposited keys instead of {total}"
+                        )
+            else:
+                raise ValueError(f"Unknown action {kind}")
+
+    def to_dict(self) -> dict:
+        ops = self.operators
+        return {
+            "lowestPriority": self.lowest_priority,
+            "queues": [q.to_dict() for q in self.queues],
+            "operators": [
+                [int(d), int(e), int(t)] for d, e, t in zip(ops.depositable, ops.enqueued, ops.total_deposited)
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DepositQueue":
+        operators = np.array(data["operators"], dtype=np.int64).reshape(-1, 3)
+        sim = cls(data["lowestPriority"], Operators(*(operators[:, i].copy() for i in range(3))))
+        sim.queues = [BatchQueue.from_dict(q) for q in data["queues"]]
+        return sim
+
+
+def _uint(word) -> int:
+    return int.from_bytes(bytes(word), "big")
+
+
+def _event(log) -> tuple[int, int, int, str, tuple]:
+    """(block, transaction index, log index, topic, arguments) of a raw module log."""
+    topic0 = Web3.to_hex(log["topics"][0])
+    indexed = tuple(_uint(t) for t in log["topics"][1:])
+    args = indexed + (_uint(log["data"][:32]),)
+    return log["blockNumber"], log["transactionIndex"], log["logIndex"], topic0, args
+
+
+def actions_from_events(events: Iterable[tuple], clean_calls: Iterable[tuple[int, int, int]] = ()) -> Iterator[tuple]:
+    """
+    Replay actions of decoded module events and of (block, transaction index, maxItems)
+    `cleanDepositQueue` calls, in chain order. The DepositedSigningKeysCountChanged events
+    of a transaction become one deposit up to the totals they end with; the depositable
+    counts emitted after them are the ones the deposit leaves, so setting them is a no-op.
+    """
+    cleans = [(block, tx, -1, "clean", (max_items,)) for block, tx, max_items in clean_calls]
+    ordered = sorted([*events, *cleans], key=lambda e: e[:3])
+    for _, tx_events in groupby(ordered, key=lambda e: e[:2]):
+        tx_events = list(tx_events)
+        totals = {args[0]: args[1] for *_, topic0, args in tx_events if topic0 == DEPOSITED_CHANGED}
+        for *_, topic0, args in tx_events:
+            if topic0 == BATCH_ENQUEUED:
+                yield "enqueue", args[0], args[1], args[2]
+            elif topic0 == DEPOSITABLE_CHANGED:
+                yield "depositable", args[0], args[1]
+            elif topic0 == DEPOSITED_CHANGED and totals:
+                yield "deposit", totals
+                totals = {}
+            elif topic0 == "clean":
+                yield "clean", args[0]
+
+
+def clean_call(w3: Web3, tx_hash: str) -> tuple[int, int, int]:
+    """(block, transaction index, maxItems) of a `cleanDepositQueue` transaction."""
+    tx = w3.eth.get_transaction(tx_hash)
+    data = Web3.to_hex(tx["input"])
+    if not data.startswith(CLEAN_DEPOSIT_QUEUE_SELECTOR):
+        raise ValueError(f"{tx_hash} is not a cleanDepositQueue call")
+    return tx["blockNumber"], tx["transactionIndex"], int(data[10:74], 16)
+
+
+def find_clean_calls(w3: Web3, module_address: str, from_block: int, to_block: int, chunk_size: int = TRACE_CHUNK_SIZE) -> list[tuple[int, int, int]]:
+    """
+    (block, transaction index, maxItems) of every successful `cleanDepositQueue` call to
+    the module in the range, sent directly or from another contract, from `trace_filter`.
+    Raises ValueError if the node doesn't serve traces.
+    """
+    module = module_address.lower()
+    calls = []
+    for start in range(from_block, to_block + 1, chunk_size):
+        end = min(start + chunk_size - 1, to_block)
+        response = w3.provider.make_request("trace_filter", [{
+            "fromBlock": hex(start), "toBlock": hex(end), "toAddress": [Web3.to_checksum_address(module_address)],
+        }])
+        if "error" in response:
+            raise ValueError(f"trace_filter failed: {response['error']}")
+        for trace in response["result"]:
+            action = trace.get("action", {})
+            # The proxy frame: the delegatecall to the implementation has another `to`
+            if trace.get("type") != "call" or trace.get("error") or action.get("callType") != "call":
+                continue
+            data = action.get("input", "")
+            if action.get("to", "").lower() == module and data.startswith(CLEAN_DEPOSIT_QUEUE_SELECTOR):
+                calls.append((trace["blockNumber"], trace["transactionPosition"], int(data[10:74], 16)))
+    return calls
+
+
+def fetch_snapshot(w3: Web3, module_address: str, block_identifier: int) -> DepositQueue:
+    """Queues and operator counters of the module at the pinned block."""
+    module = w3.eth.contract(address=Web3.to_checksum_address(module_address), abi=MODULE_ABI, decode_tuples=True)
+    lowest = module.functions.QUEUE_LOWEST_PRIORITY().call(block_identifier=block_identifier)
+    count = module.functions.getNodeOperatorsCount().call(block_identifier=block_identifier)
+    node_operators = multicall.get_node_operators(w3, module, range(count), block_identifier)
+    operators = Operators(*(
+        np.array([getattr(node_operators[i], name) for i in range(count)], dtype=np.int64)
+        for name in ("depositableValidatorsCount", "enqueuedCount", "totalDepositedKeys")
+    ))
+    sim = DepositQueue(lowest, operators)
+    pointers = multicall.call_many(w3, [module.functions.depositQueuePointers(p) for p in range(lowest + 1)], block_identifier)
+    for priority, (head, tail) in enumerate(pointers):
+        queue = BatchQueue(head, tail)
+        # Items between head and tail, unlinked ones included; walking `next` skips those
+        items = multicall.call_many(w3, [module.functions.depositQueueItem(priority, i) for i in range(head, tail)], block_identifier)
+        for index, value in zip(range(head, tail), items):
+            queue.no_id[index], queue.keys[index], queue.next[index] = decode_batch(value)
+        sim.queues[priority] = queue
+    return sim
+
+
+def fetch_events(w3: Web3, module_address: str, from_block: int, to_block: int, checkpoint: Path | None = None) -> Iterator[tuple]:
+    return log_scanner.scan_logs(
+        w3,
+        {"address": Web3.to_checksum_address(module_address), "topics": [[BATCH_ENQUEUED, DEPOSITABLE_CHANGED, DEPOSITED_CHANGED]]},
+        from_block,
+        to_block,
+        decode=_event,
+        checkpoint=checkpoint,
+    )
+
+
+def compare(sim: DepositQueue, onchain: DepositQueue) -> list[str]:
+    """Differences between two queue states, empty when they match."""
+    diffs = []
+    for priority, (a, b) in enumerate(zip(sim.queues, onchain.queues)):
+        if (a.head, a.tail) != (b.head, b.tail):
+            diffs.append(f"queue {priority}: pointers {(a.head, a.tail)} != {(b.head, b.tail)}")
+        elif a.to_dict() != b.to_dict():
+            diffs.append(f"queue {priority}: items differ")
+    for name in ("depositable", "enqueued", "total_deposited"):
+        ours, theirs = getattr(sim.operators, name), getattr(onchain.operators, name)
+        size = max(len(ours), len(theirs))
+        ours, theirs = np.pad(ours, (0, size - len(ours))), np.pad(theirs, (0, size - len(theirs)))
+        for no_id in np.flatnonzero(ours != theirs).tolist():
+            diffs.append(f"operator {no_id}: {name} {ours[no_id]} != {theirs[no_id]}")
+    return diffs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the CSM deposit queues")
+    commands = parser.add_subparsers(dest="command", required=True)
+    snapshot = commands.add_parser("snapshot", help="read the queues and operators at a block")
+    snapshot.add_argument("--rpc", required=True)
+    snapshot.add_argument("--module", required=True, help="CSModule address")
+    snapshot.add_argument("--block", type=int, help="current block by default")
+    snapshot.add_argument("--out", type=Path, required=True)
+    replay = commands.add_parser("replay", help="replay the module's events since a snapshot")
+    replay.add_argument("state", type=Path)
+    replay.add_argument("--rpc", required=True)
+    replay.add_argument("--module", required=True, help="CSModule address")
+    replay.add_argument("--to-block", type=int, required=True)
+    replay.add_argument("--clean-tx", nargs="*", default=[], help="cleanDepositQueue transactions, if the node has no traces")
+    replay.add_argument("--checkpoint", type=Path, help="log scan checkpoint")
+    replay.add_argument("--verify", action=argparse.BooleanOptionalAction, default=True,
+                        help="compare the result with the chain at --to-block")
+    replay.add_argument("--out", type=Path, required=True)
+    project = commands.add_parser("project", help="deposits until every queued batch is reached")
+    project.add_argument("state", type=Path)
+    project.add_argument("--rate", type=float, help="deposits per day, to print days instead of deposits")
+    project.add_argument("--output", type=Path, help="write per-batch results as CSV")
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        w3 = Web3(Web3.HTTPProvider(args.rpc))
+        block = args.block if args.block is not None else w3.eth.block_number
+        sim = fetch_snapshot(w3, args.module, block)
+        store.save(args.out, {"block": block, **sim.to_dict()})
+        print(f"Saved {sum(len(q.indices()) for q in sim.queues)} batches at block {block} to {args.out}")
+        return
+
+    loaded = store.load(args.state)
+    if loaded is None:
+        parser.error(f"No queue state at {args.state}")
+    data = loaded[1]
+    sim = DepositQueue.from_dict(data)
+
+    if args.command == "replay":
+        w3 = Web3(Web3.HTTPProvider(args.rpc))
+        events = fetch_events(w3, args.module, data["block"] + 1, args.to_block, args.checkpoint)
+        cleans = {call[:2]: call for call in (clean_call(w3, tx) for tx in args.clean_tx)}
+        try:
+            cleans.update((call[:2], call) for call in find_clean_calls(w3, args.module, data["block"] + 1, args.to_block))
+        except ValueError as e:
+            print(f"⚠️ {e}: only the --clean-tx calls are replayed")
+        sim.replay(actions_from_events(events, cleans.values()))
+        store.save(args.out, {"block": args.to_block, **sim.to_dict()})
+        print(f"Replayed up to block {args.to_block} into {args.out}")
+        if args.verify:
+            diffs = compare(sim, fetch_snapshot(w3, args.module, args.to_block))
+            for diff in diffs:
+                print(f"🚨 {diff}")
+            if diffs:
+                raise SystemExit(1)
+            print("Queues match the chain ✅")
+        return
+
+    projection = sim.project()
+    unit, scale = ("days", 1 / args.rate) if args.rate else ("deposits", 1)
+    print(f"{projection.total} keys to deposit from {len(projection.keys)} batches at block {data['block']}")
+    for no_id, (keys, first, last) in sorted(projection.by_operator().items()):
+        print(f"[{no_id}] {keys} keys, first after {first * scale:.1f} {unit}, last after {last * scale:.1f} {unit}")
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["priority", "index", "node_operator_id", "keys", "deposited", "deposits_before"])
+            writer.writerows(zip(*(getattr(projection, c).tolist() for c in ("priority", "index", "no_id", "keys", "deposited", "deposits_before"))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# Shared async fetch layer for per-address HTTP APIs
+#
+# All requests of one `fetch_json_many` call share a keep-alive connection pool, time out
+# individually and are retried with exponential backoff on 429/5xx responses and connection
+# errors. Rate limits hold per host across calls: every call, thread and event loop takes
+# its tokens from the same process-wide bucket.
+
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+import aiohttp
+
+DEFAULT_RATE_LIMIT = 10  # requests per second per host
+DEFAULT_CONCURRENCY = 10
+DEFAULT_TIMEOUT = 20  # seconds per request
+DEFAULT_RETRIES = 4
+BACKOFF_BASE = 0.5  # seconds, doubled on every retry
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class Request:
+    url: str
+    params: dict = field(default_factory=dict)
+    headers: dict = field(default_factory=dict)
+
+
+@dataclass
+class Response:
+    status: int
+    data: object = None
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average with bursts of up to `burst` requests.
+    A request reserves its token under a thread lock and sleeps until it is due, so one
+    bucket can be shared by several event loops.
+    """
+
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def configure(self, rate: float, burst: int | None = None):
+        with self._lock:
+            self.rate = rate
+            self.capacity = burst or max(1, int(rate))
+            self._tokens = min(self._tokens, self.capacity)
+
+    def reserve(self) -> float:
+        """Takes a token and returns how many seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+_buckets: dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def bucket_for(host: str, rate: float) -> TokenBucket:
+    """The process-wide bucket of a host, set to the latest requested rate."""
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = _buckets[host] = TokenBucket(rate)
+    if bucket.rate != rate:
+        bucket.configure(rate)
+    return bucket
+
+
+def _retry_delay(attempt: int, retry_after: str | None) -> float:
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return BACKOFF_BASE * 2 ** attempt * (1 + random.random() / 2)
+
+
+async def _fetch(
+    session: aiohttp.ClientSession,
+    bucket: TokenBucket,
+    request: Request,
+    allow_statuses: set[int],
+    retries: int,
+) -> Response:
+    for attempt in range(retries + 1):
+        await bucket.acquire()
+        try:
+            async with session.get(request.url, params=request.params, headers=request.headers) as response:
+                if response.status in RETRY_STATUSES and attempt < retries:
+                    await asyncio.sleep(_retry_delay(attempt, response.headers.get("Retry-After")))
+                    continue
+                if response.status in allow_statuses:
+                    return Response(response.status)
+                response.raise_for_status()
+                return Response(response.status, await response.json(content_type=None))
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt == retries:
+                raise
+            await asyncio.sleep(_retry_delay(attempt, None))
+    raise RuntimeError("unreachable")
+
+
+async def fetch_json_many_async(
+    requests: list[Request],
+    rate_limits: dict[str, float] | None = None,
+    allow_statuses: set[int] | None = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: float = DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+) -> list[Response]:
+    """
+    Issues all `requests` concurrently and returns their responses in the same order.
+    - `rate_limits`: requests per second by host, DEFAULT_RATE_LIMIT for other hosts.
+    - `allow_statuses`: error statuses returned as an empty Response instead of raising.
+    """
+    rate_limits = rate_limits or {}
+    buckets: dict[str, TokenBucket] = {}
+    for request in requests:
+        host = urlparse(request.url).hostname
+        if host not in buckets:
+            buckets[host] = bucket_for(host, rate_limits.get(host, DEFAULT_RATE_LIMIT))
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        return await asyncio.gather(*(
+            _fetch(session, buckets[urlparse(r.url).hostname], r, allow_statuses or set(), retries)
+            for r in requests
+        ))
+
+
+def fetch_json_many(requests: list[Request], **kwargs) -> list[Response]:
+    """
+    Blocking wrapper around `fetch_json_many_async` for the synchronous scoring functions.
+    """
+    if not requests:
+        return []
+    return asyncio.run(fetch_json_many_async(requests, **kwargs))
@@ -0,0 +1,149 @@
+# Audit of CSFeeDistributor distribution logs
+#
+#     python -m common.frame_audit <log file or CID> [...] [--output report.json]
+#
+# Every frame of every log is recomputed from its own data and compared with what the
+# oracle distributed:
+# - v1 frames (frame-level `threshold`): each operator gets `distributable * share // total`
+#   where its share is the assigned duties of its non-slashed validators performing above
+#   the threshold, stuck operators getting nothing.
+# - v2 frames (per-validator thresholds): each operator's `distributed_rewards` is the sum
+#   of its validators', and all operators together match the frame total.
+#
+# Logs are read frame by frame with the streaming parser and checked on NumPy columns with
+# exact integer amounts, so logs of any size and count take one pass each.
+
+import argparse
+import json
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from common import perf_frames, perf_report, store
+
+# Frame fields read besides `operators`
+FRAME_KEYS = ("threshold", "frame", "blockstamp", "distributable", "distributed_rewards", "rebate_to_protocol")
+
+
+@dataclass
+class Mismatch:
+    # "share": v1 operator amount differs from its share of `distributable`
+    # "validators": v2 operator amount differs from the sum of its validators
+    # "total": v2 operators together differ from the frame `distributed_rewards`
+    kind: str
+    operator_id: str | None
+    expected: int
+    actual: int
+
+    @property
+    def diff(self) -> int:
+        return self.actual - self.expected
+
+
+@dataclass
+class FrameResult:
+    log: str
+    frame: tuple[int, int] | None
+    version: str
+    operators: int
+    distributable: int
+    distributed: int
+    mismatches: list[Mismatch] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.mismatches
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["frame"] = list(self.frame) if self.frame else None
+        data["distributable"] = store.amount(self.distributable)
+        data["distributed"] = store.amount(self.distributed)
+        data["mismatches"] = [
+            {**item, "expected": store.amount(m.expected), "actual": store.amount(m.actual), "diff": store.amount(m.diff)}
+            for m, item in zip(self.mismatches, data["mismatches"])
+        ]
+        return data
+
+
+def frame_version(report: dict) -> str:
+    return "v1" if "threshold" in report else "v2"
+
+
+def _differing(expected: np.ndarray, actual: np.ndarray) -> np.ndarray:
+    return np.flatnonzero(expected.astype(object) != actual.astype(object))
+
+
+def check_frame(columns: perf_frames.FrameColumns, version: str, distributed_total: int | None = None) -> list[Mismatch]:
+    """Mismatches between the amounts of one frame and the ones recomputed from it."""
+    actual = columns.operator_distributed
+    if version == "v1":
+        expected = columns.expected_distribution()
+        return [
+            Mismatch("share", columns.operator_ids[i], int(expected[i]), int(actual[i]))
+            for i in _differing(expected, actual)
+        ]
+    if version != "v2":
+        raise ValueError(f"Unknown report version: {version}")
+
+    # Per operator sums as differences of the running total, exact on Python ints
+    cumulative = np.concatenate([[0], np.cumsum(columns.distributed_rewards.astype(object))]).astype(object)
+    sums = cumulative[columns.offsets[1:]] - cumulative[columns.offsets[:-1]]
+    mismatches = [
+        Mismatch("validators", columns.operator_ids[i], int(sums[i]), int(actual[i]))
+        for i in _differing(sums, actual)
+    ]
+    if distributed_total is not None and int(actual.astype(object).sum()) != distributed_total:
+        mismatches.append(Mismatch("total", None, distributed_total, int(actual.astype(object).sum())))
+    return mismatches
+
+
+def audit_frames(log: str, frames: Iterable[dict]) -> Iterator[FrameResult]:
+    for report in frames:
+        columns = perf_frames.from_report(report)
+        version = frame_version(report)
+        total = report.get("distributed_rewards")
+        yield FrameResult(
+            log=log,
+            frame=columns.frame,
+            version=version,
+            operators=len(columns.operator_ids),
+            distributable=columns.distributable,
+            distributed=int(columns.operator_distributed.astype(object).sum()),
+            mismatches=check_frame(columns, version, None if total is None else int(total)),
+        )
+
+
+def audit_logs(sources: Iterable[str]) -> Iterator[FrameResult]:
+    """Results of every frame of every log, `sources` being files or IPFS CIDs."""
+    for source in sources:
+        with perf_report.open_report(source) as f:
+            yield from audit_frames(source, perf_report.iter_frames(f, frame_keys=FRAME_KEYS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check CSFeeDistributor distribution logs")
+    parser.add_argument("logs", nargs="+", help="log files or IPFS CIDs")
+    parser.add_argument("--output", type=Path, help="write all frame results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for result in audit_logs(args.logs):
+        results.append(result)
+        status = "✅" if result.ok else f"🚨 {len(result.mismatches)} mismatches"
+        print(f"{result.log} {result.version} frame {result.frame}: {result.operators} operators {status}")
+        for m in result.mismatches:
+            print(f"    [{m.operator_id}] {m.kind}\t{m.actual} != {m.expected}, diff={m.diff}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump([r.to_dict() for r in results], f, indent=2)
+    if not all(r.ok for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# Content-addressed cache of IPFS documents (CSM performance reports and other logs)
+#
+# Every document is downloaded from the gateway once, checked against its CID and stored
+# under `CACHE_DIR` keyed by the CID. Content behind a CID never changes, so cached files
+# are never refetched or expired.
+#
+# CIDv0 (`Qm...`) hashes are recomputed locally the way `ipfs add` builds them with its
+# defaults (256 KiB chunks, balanced DAG of up to 174 links, dag-pb leaves). Kubo writes
+# the leaves of a multi-chunk file as UnixFS Raw nodes, js-ipfs based uploaders as File
+# nodes, and either CID is accepted. Other CIDs can't be reproduced from the content
+# alone; their documents are only checked to parse.
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable
+
+import requests
+
+ROOT = Path(__file__).parent.parent.resolve()
+CACHE_DIR = Path(os.getenv("ICS_IPFS_CACHE", ROOT / ".ipfs-cache"))
+GATEWAY = os.getenv("ICS_IPFS_GATEWAY", "https://ipfs.io/ipfs/")
+
+DEFAULT_RETRIES = 3
+DEFAULT_DELAY = 2
+DEFAULT_TIMEOUT = 20
+
+CHUNK_SIZE = 256 * 1024
+MAX_LINKS = 174
+
+_BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_UNIXFS_RAW = 0
+_UNIXFS_FILE = 2
+LEAF_TYPES = {"raw": _UNIXFS_RAW, "file": _UNIXFS_FILE}
+
+
+class ContentMismatch(Exception):
+    """The gateway returned content that doesn't hash to the requested CID."""
+
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _field_bytes(tag: int, value: bytes) -> bytes:
+    return bytes([tag]) + _varint(len(value)) + value
+
+
+def _field_varint(tag: int, value: int) -> bytes:
+    return bytes([tag]) + _varint(value)
+
+
+def _base58(data: bytes) -> str:
+    n = int.from_bytes(data, "big")
+    out = ""
+    while n:
+        n, rem = divmod(n, 58)
+        out = _BASE58_ALPHABET[rem] + out
+    pad = len(data) - len(data.lstrip(b"\0"))
+    return _BASE58_ALPHABET[0] * pad + out
+
+
+def _multihash(block: bytes) -> bytes:
+    return b"\x12\x20" + hashlib.sha256(block).digest()
+
+
+def _leaf(chunk: bytes, unixfs_type: int = _UNIXFS_FILE) -> tuple[bytes, int, int]:
+    """Returns (dag-pb block, file size, cumulative size) of a leaf holding `chunk`."""
+    unixfs = _field_varint(0x08, unixfs_type)
+    if chunk:
+        unixfs += _field_bytes(0x12, chunk)
+    unixfs += _field_varint(0x18, len(chunk))
+    block = _field_bytes(0x0A, unixfs)
+    return block, len(chunk), len(block)
+
+
+def _parent(children: list[tuple[bytes, int, int]]) -> tuple[bytes, int, int]:
+    """Returns (dag-pb block, file size, cumulative size) of a node linking `children`."""
+    links = b""
+    for block, _, tsize in children:
+        link = _field_bytes(0x0A, _multihash(block)) + _field_bytes(0x12, b"") + _field_varint(0x18, tsize)
+        links += _field_bytes(0x12, link)
+    filesize = sum(size for _, size, _ in children)
+    unixfs = _field_varint(0x08, _UNIXFS_FILE) + _field_varint(0x18, filesize)
+    unixfs += b"".join(_field_varint(0x20, size) for _, size, _ in children)
+    block = links + _field_bytes(0x0A, unixfs)
+    return block, filesize, len(block) + sum(tsize for _, _, tsize in children)
+
+
+def cid_v0(data: bytes, leaf_type: str = "raw") -> str:
+    """
+    Returns the CIDv0 `ipfs add` assigns to `data` with its default import settings.
+    A file of a single chunk is one File node; the chunks of a larger file are
+    `leaf_type` nodes, "raw" for Kubo and "file" for js-ipfs.
+    """
+    chunks = [data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE)] or [b""]
+    unixfs_type = LEAF_TYPES[leaf_type] if len(chunks) > 1 else _UNIXFS_FILE
+    level = [_leaf(chunk, unixfs_type) for chunk in chunks]
+    while len(level) > 1:
+        level = [_parent(level[i:i + MAX_LINKS]) for i in range(0, len(level), MAX_LINKS)]
+    return _base58(_multihash(level[0][0]))
+
+
+def matches_cid_v0(data: bytes, cid: str) -> bool:
+    """Whether `data` hashes to `cid` with any of the leaf types."""
+    if len(data) <= CHUNK_SIZE:
+        return cid_v0(data) == cid
+    return any(cid_v0(data, leaf_type) == cid for leaf_type in LEAF_TYPES)
+
+
+def is_cid_v0(cid: str) -> bool:
+    return len(cid) == 46 and cid.startswith("Qm")
+
+
+def cached_path(cid: str, cache_dir: Path | None = None) -> Path | None:
+    """
+    Returns the cache file of `cid`, compressed or not, or None if it isn't cached yet.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    for path in (cache_dir / f"{cid}.gz", cache_dir / cid):
+        if path.exists():
+            return path
+    return None
+
+
+def read_cached(path: Path) -> bytes:
+    if path.suffix == ".gz":
+        with gzip.open(path, "rb") as f:
+            return f.read()
+    return path.read_bytes()
+
+
+def open_cached(path: Path):
+    """Opens a cache file for binary reading, decompressing it on the fly if needed."""
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _store(cid: str, data: bytes, compress: bool, cache_dir: Path) -> Path:
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_dir / (f"{cid}.gz" if compress else cid)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    if compress:
+        # Fixed mtime keeps the cache file itself reproducible
+        with gzip.GzipFile(tmp, "wb", mtime=0) as f:
+            f.write(data)
+    else:
+        tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return path
+
+
+def _download(cid: str, timeout: float) -> bytes:
+    response = requests.get(f"{GATEWAY}{cid}", timeout=timeout)
+    response.raise_for_status()
+    return response.content
+
+
+def fetch(
+    cid: str,
+    retries: int = DEFAULT_RETRIES,
+    delay: float = DEFAULT_DELAY,
+    compress: bool = True,
+    validate: Callable[[bytes], object] | None = None,
+    cache_dir: Path | None = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> Path:
+    """
+    Makes sure `cid` is in the cache and returns its cache file.
+
+    Downloads are retried on network errors, on content that doesn't match a CIDv0 and,
+    for CIDs that can't be verified, on content rejected by `validate`.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    if (path := cached_path(cid, cache_dir)) is not None:
+        return path
+
+    for attempt in range(retries):
+        try:
+            data = _download(cid, timeout)
+            if is_cid_v0(cid):
+                if not matches_cid_v0(data, cid):
+                    raise ContentMismatch(f"content hashes to {cid_v0(data)}")
+            elif validate is not None:
+                validate(data)
+            return _store(cid, data, compress, cache_dir)
+        except (requests.RequestException, ContentMismatch, ValueError) as e:
+            print(f"Error fetching {cid}: {e}")
+            if attempt < retries - 1:
+                time.sleep(delay)
+                continue
+            raise e
+    raise Exception(f"Failed to fetch {cid}")
+
+
+def fetch_bytes(cid: str, **kwargs) -> bytes:
+    return read_cached(fetch(cid, **kwargs))
+
+
+def fetch_json(cid: str, **kwargs):
+    """Returns the JSON document behind `cid`, from the cache when possible."""
+    return json.loads(fetch_bytes(cid, validate=json.loads, **kwargs))
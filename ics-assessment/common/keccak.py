@@ -0,0 +1,115 @@
+# Batched Keccak-256 over many same-length messages at once
+#
+# Merkle trees hash millions of 32- and 64-byte messages. Instead of one hash call per
+# message, the Keccak-f[1600] permutation runs on NumPy arrays holding one lane of every
+# message, so a whole tree level is hashed with a few hundred array operations.
+# Node pairs and most leaves fit into a single 136-byte block; longer messages, such as
+# leaves with dynamic ABI types, are absorbed block by block.
+
+import numpy as np
+from Crypto.Hash import keccak as _keccak
+
+RATE = 136
+# Below this many messages the per-message hash is faster than the array setup
+BATCH_MIN = 64
+BATCH_SIZE = 16384
+
+_ROUND_CONSTANTS = [
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+]
+# Rotation offsets indexed [x][y]
+_ROTATIONS = [
+    [0, 36, 3, 41, 18],
+    [1, 44, 10, 45, 2],
+    [62, 6, 43, 15, 61],
+    [28, 55, 25, 21, 56],
+    [27, 20, 39, 8, 14],
+]
+
+
+def keccak256(data: bytes) -> bytes:
+    return _keccak.new(digest_bits=256, data=data).digest()
+
+
+# Where each lane moves in the rho and pi steps, and by how much it is rotated
+_DESTINATION = [y + 5 * ((2 * x + 3 * y) % 5) for y in range(5) for x in range(5)]
+_SHIFTS = [(np.uint64(r), np.uint64(64 - r)) for r in (_ROTATIONS[x][y] for y in range(5) for x in range(5))]
+_ONE, _SIXTY_THREE = np.uint64(1), np.uint64(63)
+
+
+def _permute(a: list[np.ndarray]) -> list[np.ndarray]:
+    """
+    Keccak-f[1600] in place on lanes indexed x + 5 * y, each lane an array holding it for
+    every message. Works on preallocated buffers, NumPy temporaries dominate otherwise.
+    """
+    count = len(a[0])
+    b = [np.empty(count, np.uint64) for _ in range(25)]
+    c = [np.empty(count, np.uint64) for _ in range(5)]
+    d = np.empty(count, np.uint64)
+    t = np.empty(count, np.uint64)
+    for rc in _ROUND_CONSTANTS:
+        # theta
+        for x in range(5):
+            np.bitwise_xor(a[x], a[x + 5], out=c[x])
+            for y in range(10, 25, 5):
+                c[x] ^= a[x + y]
+        for x in range(5):
+            np.left_shift(c[(x + 1) % 5], _ONE, out=d)
+            np.right_shift(c[(x + 1) % 5], _SIXTY_THREE, out=t)
+            d |= t
+            d ^= c[(x - 1) % 5]
+            for y in range(0, 25, 5):
+                a[x + y] ^= d
+        # rho and pi
+        for i in range(25):
+            left, right = _SHIFTS[i]
+            dst = b[_DESTINATION[i]]
+            if left == 0:
+                dst[...] = a[i]
+                continue
+            np.left_shift(a[i], left, out=dst)
+            np.right_shift(a[i], right, out=t)
+            dst |= t
+        # chi
+        for y in range(0, 25, 5):
+            for x in range(5):
+                np.invert(b[(x + 1) % 5 + y], out=a[x + y])
+                a[x + y] &= b[(x + 2) % 5 + y]
+                a[x + y] ^= b[x + y]
+        # iota
+        a[0] ^= np.uint64(rc)
+    return a
+
+
+def keccak256_batch(messages: np.ndarray) -> np.ndarray:
+    """
+    Hashes every row of the (N, L) uint8 array `messages`.
+    Returns the (N, 32) uint8 array of digests.
+    """
+    count, length = messages.shape
+    blocks = length // RATE + 1
+    if count < BATCH_MIN:
+        return np.frombuffer(bytearray(b"".join(keccak256(m.tobytes()) for m in messages)), dtype=np.uint8).reshape(count, 32)
+
+    digests = np.empty((count, 32), dtype=np.uint8)
+    # Slices small enough for the lanes to stay in the CPU cache
+    for start in range(0, count, BATCH_SIZE):
+        chunk = messages[start:start + BATCH_SIZE]
+        padded = np.zeros((len(chunk), blocks * RATE), dtype=np.uint8)
+        padded[:, :length] = chunk
+        # Keccak padding (not SHA-3): 0x01 after the message, 0x80 at the end of the last block
+        padded[:, length] ^= 0x01
+        padded[:, -1] ^= 0x80
+        words = padded.view("<u8").T
+        lanes = [np.zeros(len(chunk), np.uint64) for _ in range(25)]
+        for block in range(blocks):
+            for i in range(RATE // 8):
+                lanes[i] ^= words[block * RATE // 8 + i]
+            lanes = _permute(lanes)
+        digests[start:start + len(chunk)] = np.stack(lanes[:4], axis=1).astype("<u8").view(np.uint8)
+    return digests
@@ -0,0 +1,185 @@
+# Chunked eth_getLogs scanner for long block ranges
+#
+# Most RPC providers reject getLogs over wide ranges or with too many results. The range
+# is split into chunks fetched in parallel; a chunk the provider refuses is bisected until
+# it goes through. Logs are yielded in block order as soon as the chunks before them are
+# done, and every completed chunk is appended to an optional checkpoint file, so an
+# interrupted scan resumes with the missing chunks only.
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator
+
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.datastructures import AttributeDict
+
+DEFAULT_CHUNK_SIZE = 50_000
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RETRIES = 3
+BACKOFF_BASE = 1.0
+
+# Provider errors meaning "ask for less", matched against the lowercased error text
+RANGE_ERRORS = (
+    "more than",
+    "too many",
+    "too large",
+    "too wide",
+    "limit exceeded",
+    "response size",
+    "block range",
+    "range is",
+    "exceed",
+    "timeout",
+    "timed out",
+    "-32005",
+)
+
+
+def topic(event_signature: str) -> str:
+    """topic0 of an event, e.g. topic("Transfer(address,address,uint256)")."""
+    return Web3.to_hex(Web3.keccak(text=event_signature))
+
+
+def _is_range_error(e: Exception) -> bool:
+    text = f"{type(e).__name__} {e}".lower()
+    return any(pattern in text for pattern in RANGE_ERRORS)
+
+
+def _log_to_json(log) -> dict:
+    return {
+        "address": log["address"],
+        "topics": [Web3.to_hex(t) for t in log["topics"]],
+        "data": Web3.to_hex(log["data"]),
+        "blockNumber": log["blockNumber"],
+        "blockHash": Web3.to_hex(log["blockHash"]),
+        "transactionHash": Web3.to_hex(log["transactionHash"]),
+        "transactionIndex": log["transactionIndex"],
+        "logIndex": log["logIndex"],
+        "removed": log.get("removed", False),
+    }
+
+
+def _log_from_json(entry: dict) -> AttributeDict:
+    return AttributeDict({
+        **entry,
+        "topics": [HexBytes(t) for t in entry["topics"]],
+        "data": HexBytes(entry["data"]),
+        "blockHash": HexBytes(entry["blockHash"]),
+        "transactionHash": HexBytes(entry["transactionHash"]),
+    })
+
+
+class _Checkpoint:
+    """
+    JSON lines file: a header with the filter, then one line per completed chunk with
+    its block range and logs.
+    """
+
+    def __init__(self, path: Path, filter_params: dict):
+        self.path = path
+        self.header = {"filter": filter_params}
+        self.chunks: list[tuple[int, int, list[dict]]] = []
+        try:
+            with open(path, "r") as f:
+                lines = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            lines = []
+        if lines and lines[0] != self.header:
+            print(f"    ⚠️ {path} was made for another filter, scanning again")
+            lines = []
+        if not lines:
+            with open(path, "w") as f:
+                f.write(json.dumps(self.header) + "\n")
+        self.chunks = [(c["from"], c["to"], c["logs"]) for c in lines[1:]]
+
+    def append(self, from_block: int, to_block: int, logs: list[dict]):
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"from": from_block, "to": to_block, "logs": logs}) + "\n")
+
+
+def _fetch_range(w3: Web3, filter_params: dict, from_block: int, to_block: int, retries: int) -> list[dict]:
+    """Fetches logs of the range, bisecting it whenever the provider refuses its size."""
+    attempt = 0
+    while True:
+        try:
+            logs = w3.eth.get_logs({**filter_params, "fromBlock": from_block, "toBlock": to_block})
+            return [_log_to_json(log) for log in logs]
+        except Exception as e:
+            if from_block < to_block and _is_range_error(e):
+                middle = (from_block + to_block) // 2
+                return (
+                    _fetch_range(w3, filter_params, from_block, middle, retries)
+                    + _fetch_range(w3, filter_params, middle + 1, to_block, retries)
+                )
+            attempt += 1
+            if attempt >= retries:
+                raise
+            print(f"    getLogs {from_block}-{to_block} failed ({e}), retrying")
+            time.sleep(BACKOFF_BASE * 2 ** (attempt - 1))
+
+
+def _plan(from_block: int, to_block: int, cached, chunk_size: int):
+    """
+    Returns the segments covering the range in block order: cached chunks as
+    (from, to, logs) and the missing ranges split into (from, to, None) chunks.
+    """
+    segments = []
+    cursor = from_block
+    for start, end, logs in sorted(cached):
+        if start < cursor or end > to_block:
+            continue
+        for chunk_start in range(cursor, start, chunk_size):
+            segments.append((chunk_start, min(chunk_start + chunk_size - 1, start - 1), None))
+        segments.append((start, end, logs))
+        cursor = end + 1
+    for chunk_start in range(cursor, to_block + 1, chunk_size):
+        segments.append((chunk_start, min(chunk_start + chunk_size - 1, to_block), None))
+    return segments
+
+
+def scan_logs(
+    w3: Web3,
+    filter_params: dict,
+    from_block: int,
+    to_block: int | str,
+    decode: Callable | None = None,
+    checkpoint: Path | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    retries: int = DEFAULT_RETRIES,
+) -> Iterator:
+    """
+    Yields the logs matching `filter_params` (address, topics) in block order, passed
+    through `decode` if given.
+
+    With a `checkpoint` file, chunks finished by a previous run of the same filter are
+    read back from it instead of being fetched again.
+    """
+    if to_block == "latest":
+        to_block = w3.eth.block_number
+    to_block = int(to_block)
+
+    cached = _Checkpoint(checkpoint, filter_params) if checkpoint is not None else None
+    segments = _plan(from_block, to_block, cached.chunks if cached else [], chunk_size)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = {}
+        next_submit = 0
+        # Keep a bounded window of chunks in flight ahead of the one being yielded
+        for i, (start, end, logs) in enumerate(segments):
+            while next_submit < len(segments) and next_submit < i + concurrency * 2:
+                s, e, cached_logs = segments[next_submit]
+                if cached_logs is None:
+                    pending[next_submit] = executor.submit(_fetch_range, w3, filter_params, s, e, retries)
+                next_submit += 1
+
+            if logs is None:
+                logs = pending.pop(i).result()
+                if cached is not None:
+                    cached.append(start, end, logs)
+            for entry in logs:
+                log = _log_from_json(entry)
+                yield decode(log) if decode else log
@@ -0,0 +1,130 @@
+# Batched contract reads at a pinned block
+#
+# Many view calls (e.g. `getNodeOperator(i)` for every operator) are aggregated into one
+# Multicall3 `aggregate3` eth_call per batch. Where Multicall3 isn't deployed at the block,
+# the calls are sent as plain JSON-RPC batches instead. Results are decoded the same way
+# as `contract.functions.f(...).call()` with `decode_tuples=True`.
+
+from collections import namedtuple
+from functools import cache
+
+import requests
+from eth_utils.abi import collapse_if_tuple
+from web3 import Web3
+
+from common import rpc_cache
+
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+# aggregate3((address target, bool allowFailure, bytes callData)[])
+AGGREGATE3_SELECTOR = "0x82ad56cb"
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_TIMEOUT = 60
+
+
+@cache
+def _tuple_type(name: str, fields: tuple[str, ...]):
+    return namedtuple(name or "Tuple", fields, rename=True)
+
+
+def _normalize(abi: dict, value):
+    """Applies web3 return conventions: checksummed addresses and named tuples."""
+    abi_type = abi["type"]
+    if abi_type.endswith("]"):
+        item = {**abi, "type": abi_type[:abi_type.rindex("[")]}
+        return [_normalize(item, v) for v in value]
+    if abi_type == "tuple":
+        components = abi["components"]
+        values = [_normalize(c, v) for c, v in zip(components, value)]
+        name = abi.get("internalType", "").split(".")[-1].removeprefix("struct ")
+        return _tuple_type(name, tuple(c["name"] for c in components))(*values)
+    if abi_type == "address":
+        return Web3.to_checksum_address(value)
+    return value
+
+
+def decode_result(w3: Web3, function, data: bytes):
+    """Decodes the return data of a contract function call like `.call()` would."""
+    outputs = function.abi.get("outputs", [])
+    decoded = w3.codec.decode([collapse_if_tuple(o) for o in outputs], bytes(data))
+    values = [_normalize(o, v) for o, v in zip(outputs, decoded)]
+    return values[0] if len(values) == 1 else values
+
+
+def _calldata(function) -> str:
+    return function._encode_transaction_data()
+
+
+@cache
+def _multicall_deployed(w3: Web3, block_identifier: int) -> bool:
+    return len(w3.eth.get_code(MULTICALL3_ADDRESS, block_identifier=block_identifier)) > 0
+
+
+def _aggregate(w3: Web3, functions: list, block_identifier: int) -> list[bytes]:
+    calls = [(f.address, False, bytes.fromhex(_calldata(f)[2:])) for f in functions]
+    data = AGGREGATE3_SELECTOR + w3.codec.encode(["(address,bool,bytes)[]"], [calls]).hex()
+    raw = w3.eth.call({"to": MULTICALL3_ADDRESS, "data": data}, block_identifier=block_identifier)
+    (results,) = w3.codec.decode(["(bool,bytes)[]"], bytes(raw))
+    return [return_data for _, return_data in results]
+
+
+def _rpc_batch(w3: Web3, functions: list, block_identifier: int) -> list[bytes]:
+    """Sends one eth_call per function in a single JSON-RPC batch request."""
+    endpoint = getattr(w3.provider, "endpoint_uri", None)
+    if endpoint is None:
+        # Not an HTTP provider: plain sequential calls
+        return [
+            bytes(w3.eth.call({"to": f.address, "data": _calldata(f)}, block_identifier=block_identifier))
+            for f in functions
+        ]
+    params = [[{"to": f.address, "data": _calldata(f)}, hex(block_identifier)] for f in functions]
+
+    # The batch goes around the provider, so responses cached by it are looked up here
+    cached = isinstance(w3.provider, rpc_cache.CachedProvider)
+    keys = [w3.provider.cache_key("eth_call", p) for p in params] if cached else [None] * len(params)
+    results = {}
+    for i, key in enumerate(keys):
+        if key is not None and (result := w3.provider.cache.get(key)) is not None:
+            results[i] = result
+
+    payload = [
+        {"jsonrpc": "2.0", "id": i, "method": "eth_call", "params": p}
+        for i, p in enumerate(params)
+        if i not in results
+    ]
+    if payload:
+        response = requests.post(str(endpoint), json=payload, timeout=DEFAULT_TIMEOUT)
+        response.raise_for_status()
+        for item in response.json():
+            if "error" in item:
+                raise ValueError(f"eth_call {item['id']} failed: {item['error']}")
+            results[item["id"]] = item["result"]
+            if keys[item["id"]] is not None:
+                w3.provider.cache.put(keys[item["id"]], item["result"])
+    return [bytes.fromhex(results[i][2:]) for i in range(len(functions))]
+
+
+def call_many(w3: Web3, functions: list, block_identifier: int, batch_size: int = DEFAULT_BATCH_SIZE) -> list:
+    """
+    Calls every contract function (e.g. `contract.functions.getNodeOperator(i)`) at the
+    pinned `block_identifier` and returns their decoded results in the same order.
+    """
+    if not isinstance(block_identifier, int):
+        raise ValueError(f"Batched reads need a pinned block number, got {block_identifier!r}")
+    read = _aggregate if _multicall_deployed(w3, block_identifier) else _rpc_batch
+    results = []
+    for i in range(0, len(functions), batch_size):
+        batch = functions[i:i + batch_size]
+        results += [decode_result(w3, f, data) for f, data in zip(batch, read(w3, batch, block_identifier))]
+    return results
+
+
+def node_operator_address(node_operator) -> str:
+    """Address that represents a CSM node operator: manager if it has extended permissions."""
+    return node_operator.managerAddress if node_operator.extendedManagerPermissions else node_operator.rewardAddress
+
+
+def get_node_operators(w3: Web3, csm, operator_ids, block_identifier: int, **kwargs) -> dict:
+    """`getNodeOperator` of every ID at the pinned block, keyed by ID."""
+    operator_ids = list(operator_ids)
+    functions = [csm.functions.getNodeOperator(int(no_id)) for no_id in operator_ids]
+    return dict(zip(operator_ids, call_many(w3, functions, block_identifier, **kwargs)))
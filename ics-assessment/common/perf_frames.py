@@ -0,0 +1,180 @@
+# Columnar per-frame validator performance store
+#
+# A performance report frame is turned once into flat NumPy columns, one row per
+# validator, grouped by operator with `offsets` (validators of the i-th operator are rows
+# offsets[i]:offsets[i + 1]). Threshold checks and share computations then run as array
+# operations instead of Python loops over nested dicts.
+
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import numpy as np
+
+# Per-operator frame status codes
+GOOD = 1
+BAD = 0
+EMPTY = -1
+
+
+def _int_column(values: list[int]) -> np.ndarray:
+    """int64 column, or an exact object column if any value doesn't fit into int64."""
+    try:
+        return np.array(values, dtype=np.int64)
+    except OverflowError:
+        return np.array(values, dtype=object)
+
+
+@dataclass(eq=False)
+class FrameColumns:
+    threshold: float
+    frame: tuple[int, int] | None
+    distributable: int
+    operator_ids: list[str]
+    offsets: np.ndarray
+    # Per operator
+    operator_distributed: np.ndarray
+    # Per validator; `validator_index` is -1 for keys that aren't validator indices
+    validator_index: np.ndarray
+    assigned: np.ndarray
+    included: np.ndarray
+    slashed: np.ndarray
+    distributed_rewards: np.ndarray
+    # Per operator, v1 operators stuck in the frame don't take part in the split
+    operator_stuck: np.ndarray | None = None
+    _positions: dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._positions = {no_id: i for i, no_id in enumerate(self.operator_ids)}
+
+    @property
+    def validators_count(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    @cached_property
+    def validator_operator(self) -> np.ndarray:
+        """Operator position of every validator row."""
+        return np.repeat(np.arange(len(self.operator_ids)), self.validators_count)
+
+    def position(self, operator_id: str) -> int | None:
+        return self._positions.get(str(operator_id))
+
+    def validators_of(self, operator_id: str) -> slice:
+        i = self._positions[str(operator_id)]
+        return slice(self.offsets[i], self.offsets[i + 1])
+
+    def performance(self) -> np.ndarray:
+        """included / assigned per validator, NaN where nothing was assigned."""
+        out = np.full(len(self.assigned), np.nan)
+        np.divide(self.included, self.assigned, out=out, where=self.assigned > 0)
+        return out
+
+    def meets_threshold(self) -> np.ndarray:
+        """Validators with nothing assigned or with performance at or above the threshold."""
+        return (self.assigned == 0) | (self.performance() >= self.threshold)
+
+    def failing_count(self, passes: np.ndarray) -> np.ndarray:
+        """Number of validators of each operator for which `passes` is False."""
+        return np.bincount(self.validator_operator, weights=~passes, minlength=len(self.operator_ids)).astype(np.int64)
+
+    def any_failing(self, passes: np.ndarray) -> np.ndarray:
+        return self.failing_count(passes) > 0
+
+    def all_pass(self, passes: np.ndarray) -> np.ndarray:
+        """Operators with at least one validator and every validator passing."""
+        return (self.validators_count > 0) & ~self.any_failing(passes)
+
+    def status_codes(self, passes: np.ndarray) -> np.ndarray:
+        """
+        Per operator: GOOD when all validators pass, BAD when any fails, EMPTY when the
+        operator has no validators in the frame.
+        """
+        codes = np.where(self.any_failing(passes), BAD, GOOD).astype(np.int8)
+        codes[self.validators_count == 0] = EMPTY
+        return codes
+
+    def passes(self, version: str) -> np.ndarray:
+        """
+        Validators passing the rules of the report `version`: v1 reports judge performance
+        against the threshold, v2 reports whether the validator received rewards.
+        """
+        if version == "v1":
+            return self.meets_threshold()
+        if version == "v2":
+            return self.distributed_rewards > 0
+        raise ValueError(f"Unknown report version: {version}")
+
+    def status(self, passes: np.ndarray) -> dict[str, bool | None]:
+        """Status codes as True (GOOD), False (BAD) or None (EMPTY) per operator ID."""
+        codes = self.status_codes(passes)
+        return {
+            no_id: None if codes[i] == EMPTY else bool(codes[i] == GOOD)
+            for i, no_id in enumerate(self.operator_ids)
+        }
+
+    @cached_property
+    def status_v1(self) -> dict[str, bool | None]:
+        return self.status(self.passes("v1"))
+
+    @cached_property
+    def status_v2(self) -> dict[str, bool | None]:
+        return self.status(self.passes("v2"))
+
+    def shares(self) -> np.ndarray:
+        """
+        Per operator sum of assigned duties of non-slashed validators performing strictly
+        above the threshold, as used to split `distributable`. Stuck operators get none.
+        """
+        counted = ~self.slashed & (self.performance() > self.threshold)
+        if self.operator_stuck is not None:
+            counted &= ~self.operator_stuck[self.validator_operator]
+        shares = np.zeros(len(self.operator_ids), dtype=np.int64)
+        np.add.at(shares, self.validator_operator[counted], self.assigned[counted])
+        return shares
+
+    def expected_distribution(self) -> np.ndarray:
+        """Exact integer share of `distributable` of every operator."""
+        shares = self.shares().astype(object)
+        total = shares.sum()
+        if not total:
+            return np.zeros(len(shares), dtype=object)
+        return self.distributable * shares // total
+
+
+def from_report(report: dict) -> FrameColumns:
+    """Builds the columns of one v1 report or of one frame of a v2 report."""
+    operators = report.get("operators") or {}
+    operator_ids = list(operators)
+    offsets = np.zeros(len(operator_ids) + 1, dtype=np.int64)
+    operator_distributed = []
+    operator_stuck = []
+    validator_index, assigned, included, slashed, distributed_rewards = [], [], [], [], []
+
+    for i, no_id in enumerate(operator_ids):
+        no = operators[no_id] or {}
+        operator_distributed.append(int(no.get("distributed", no.get("distributed_rewards", 0)) or 0))
+        operator_stuck.append(bool(no.get("stuck", False)))
+        validators = no.get("validators") or {}
+        offsets[i + 1] = offsets[i] + len(validators)
+        for index, v in validators.items():
+            perf = v.get("perf") or {}
+            validator_index.append(int(index) if index.isdigit() else -1)
+            assigned.append(perf.get("assigned", 0))
+            included.append(perf.get("included", 0))
+            slashed.append(bool(v.get("slashed", False)))
+            distributed_rewards.append(int(v.get("distributed_rewards", 0)))
+
+    frame = report.get("frame")
+    return FrameColumns(
+        threshold=float(report.get("threshold", 0)),
+        frame=(int(frame[0]), int(frame[1])) if frame else None,
+        distributable=int(report.get("distributable", 0)),
+        operator_ids=operator_ids,
+        offsets=offsets,
+        operator_distributed=_int_column(operator_distributed),
+        validator_index=np.array(validator_index, dtype=np.int64),
+        assigned=np.array(assigned, dtype=np.int64),
+        included=np.array(included),
+        slashed=np.array(slashed, dtype=bool),
+        distributed_rewards=_int_column(distributed_rewards),
+        operator_stuck=np.array(operator_stuck, dtype=bool),
+    )
@@ -0,0 +1,151 @@
+# Streaming reader of CSM performance reports (distribution logs)
+#
+# A report covers every operator and validator of the module, while the assessment only
+# looks at a few operators. The report is walked incrementally and only `threshold`,
+# `frame`, `blockstamp` and the `operators` entries of the requested IDs are built, so
+# memory scales with the operators asked about rather than with the module size.
+#
+# v1 reports are a single frame object, v2 reports are a list of frame objects; the
+# result keeps the same shape with the unrequested operators left out.
+#
+# Integers are parsed exactly, so wei amounts like `distributable` keep every digit; other
+# numbers (performance ratios, thresholds) come as floats.
+
+import json
+from decimal import Decimal
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+import ijson
+
+from common import ipfs
+
+FRAME_KEYS = ("threshold", "frame", "blockstamp")
+
+
+def _events(fp: BinaryIO):
+    """ijson parse events of `fp` with non-integer numbers as floats."""
+    for prefix, event, value in ijson.parse(fp):
+        if event == "number" and isinstance(value, Decimal):
+            yield prefix, event, float(value)
+        else:
+            yield prefix, event, value
+
+
+def _frames(events, operator_ids: set[str] | None, frame_keys: Iterable[str] = FRAME_KEYS):
+    """
+    Yields one filtered frame per report frame from ijson `events`.
+    With `operator_ids` None every operator is kept.
+    """
+    frame_prefix = None
+    operators_prefix = None
+    frame: dict = {}
+    pending = None  # (container, key) waiting for its value
+    builder = None
+    depth = 0
+
+    for prefix, event, value in events:
+        if builder is not None:
+            builder.event(event, value)
+            if event == "start_map" or event == "start_array":
+                depth += 1
+            elif event == "end_map" or event == "end_array":
+                depth -= 1
+                if depth == 0:
+                    container, key = pending
+                    container[key] = builder.value
+                    pending = builder = None
+            continue
+
+        if pending is not None:
+            if event == "start_map" or event == "start_array":
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+                depth = 1
+            else:
+                container, key = pending
+                container[key] = value
+                pending = None
+            continue
+
+        if frame_prefix is None:
+            # The root decides the layout: a v1 frame or a v2 list of frames
+            if event == "start_array":
+                frame_prefix = "item"
+                continue
+            if event != "start_map":
+                raise ValueError(f"Unexpected performance report root: {event}")
+            frame_prefix = ""
+            operators_prefix = "operators"
+        elif operators_prefix is None:
+            operators_prefix = f"{frame_prefix}.operators"
+
+        if event == "map_key":
+            if prefix == frame_prefix:
+                if value in frame_keys:
+                    pending = (frame, value)
+                elif value == "operators":
+                    frame["operators"] = {}
+            elif prefix == operators_prefix and (operator_ids is None or value in operator_ids):
+                pending = (frame["operators"], value)
+        elif prefix == frame_prefix:
+            if event == "start_map":
+                frame = {}
+            elif event == "end_map":
+                yield frame
+
+
+def parse(fp: BinaryIO, operator_ids: Iterable[str] | None = None) -> dict | list[dict]:
+    """
+    Reads the report from `fp` keeping only the frame metadata and `operator_ids`.
+    Returns a dict for v1 reports and a list of frame dicts for v2 reports.
+    """
+    operator_ids = None if operator_ids is None else {str(i) for i in operator_ids}
+    events = _events(fp)
+    first = next(events)
+    is_list = first[1] == "start_array"
+
+    def _all_events():
+        yield first
+        yield from events
+
+    frames = list(_frames(_all_events(), operator_ids))
+    if is_list:
+        return frames
+    if len(frames) != 1:
+        raise ValueError("Malformed performance report")
+    return frames[0]
+
+
+def iter_frames(
+    fp: BinaryIO, operator_ids: Iterable[str] | None = None, frame_keys: Iterable[str] = FRAME_KEYS
+) -> Iterator[dict]:
+    """
+    Yields the frames of the report one at a time, a v1 report being a single frame, so
+    only one frame is ever in memory. `frame_keys` are the frame fields kept besides
+    `operators`.
+    """
+    operator_ids = None if operator_ids is None else {str(i) for i in operator_ids}
+    return _frames(_events(fp), operator_ids, set(frame_keys))
+
+
+def load_file(path: Path, operator_ids: Iterable[str] | None = None) -> dict | list[dict]:
+    with ipfs.open_cached(path) as f:
+        return parse(f, operator_ids)
+
+
+def open_report(source: str):
+    """Opens a report given as a file path or an IPFS CID, fetching the CID if needed."""
+    path = Path(source)
+    if not path.exists() and ipfs.is_cid_v0(source):
+        path = ipfs.fetch(source, validate=json.loads)
+    return ipfs.open_cached(path)
+
+
+def load(cid: str, operator_ids: Iterable[str] | None = None, **kwargs) -> dict | list[dict]:
+    """
+    Returns the report behind `cid` restricted to `operator_ids`, downloading it into
+    the IPFS cache first if needed. `kwargs` are passed to `ipfs.fetch`.
+    """
+    kwargs.setdefault("validate", json.loads)
+    return load_file(ipfs.fetch(cid, **kwargs), operator_ids)
@@ -0,0 +1,218 @@
+# Bulk checks of a merkle-proofs.json file
+#
+# Offline: the leaf of every address is recomputed and its proof walked up to the root of
+# merkle-tree.json. Proofs are streamed from the file and verified in chunks spread over
+# a process pool; within a chunk, all proofs are hashed level by level in one batch.
+#
+# On-chain: the gate contract's `verifyProof(address, bytes32[])` is called for every
+# address at one pinned block, many eth_calls per JSON-RPC batch request and several
+# batches in flight over a pool of keep-alive connections.
+
+import json
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+import ijson
+import numpy as np
+import requests
+from eth_abi import encode
+from requests.adapters import HTTPAdapter
+
+from common import merkle
+
+DEFAULT_CHUNK_SIZE = 10_000
+DEFAULT_RPC_BATCH_SIZE = 100
+DEFAULT_CONNECTIONS = 4
+DEFAULT_RETRIES = 3
+DEFAULT_TIMEOUT = 60
+BACKOFF_BASE = 1.0
+# verifyProof(address,bytes32[])
+VERIFY_PROOF_SELECTOR = "0xe3486434"
+
+
+@dataclass
+class Report:
+    checked: int = 0
+    # Addresses whose proof doesn't lead to the root (or is rejected on-chain)
+    failed: list[str] = field(default_factory=list)
+    # Addresses of the tree without a proof
+    missing: list[str] = field(default_factory=list)
+    # Proofs of addresses that aren't in the tree
+    unknown: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not (self.failed or self.missing or self.unknown)
+
+
+def iter_proofs(path: Path) -> Iterator[tuple[str, list[str]]]:
+    """(address, proof) pairs of a merkle-proofs.json file, without loading it whole."""
+    with open(path, "rb") as f:
+        yield from ijson.kvitems(f, "")
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _map_bounded(executor: Executor, fn: Callable, chunks: Iterator, window: int) -> Iterator:
+    """executor.map with at most `window` chunks submitted ahead, results in order."""
+    pending = []
+    for chunk in chunks:
+        pending.append(executor.submit(fn, *chunk))
+        if len(pending) >= window:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
+
+
+def verify_chunk(root: bytes, leaf_encoding: list[str], items: list[tuple[str, list[str]]]) -> tuple[int, list[str]]:
+    """Number of `items` and the addresses among them whose proof doesn't lead to `root`."""
+    if not items:
+        return 0, []
+    nodes = merkle.leaf_hashes(leaf_encoding, [[address] for address, _ in items])
+    lengths = np.array([len(proof) for _, proof in items])
+    siblings = np.zeros((len(items), int(lengths.max(initial=0)), 32), dtype=np.uint8)
+    for i, (_, proof) in enumerate(items):
+        if proof:
+            siblings[i, :len(proof)] = np.frombuffer(bytes.fromhex("".join(p[2:] for p in proof)), np.uint8).reshape(-1, 32)
+    for level in range(siblings.shape[1]):
+        walking = lengths > level
+        nodes[walking] = merkle.hash_pairs(nodes[walking], siblings[walking, level])
+    bad = np.flatnonzero((nodes != np.frombuffer(root, np.uint8)).any(axis=1))
+    return len(items), [items[i][0] for i in bad]
+
+
+def _tree_summary(tree_path: Path) -> tuple[bytes, list[str], set[str]]:
+    """Root, leaf encoding and addresses of a merkle-tree.json dump."""
+    with open(tree_path, "r") as f:
+        dump = json.load(f)
+    if dump["leafEncoding"] != ["address"]:
+        raise ValueError(f"Expected an address tree, got {dump['leafEncoding']}")
+    root = bytes.fromhex(dump["tree"][0][2:])
+    return root, dump["leafEncoding"], {v["value"][0].lower() for v in dump["values"]}
+
+
+def _match(report: Report, addresses: set[str] | None, items: Iterable[tuple[str, list[str]]]) -> Iterator:
+    """Passes proofs through, noting the ones of addresses not in the tree."""
+    for address, proof in items:
+        if addresses is not None:
+            if address.lower() in addresses:
+                addresses.discard(address.lower())
+            else:
+                report.unknown.append(address)
+        yield address, proof
+
+
+def _collect(report: Report, results: Iterator[tuple[int, list[str]]], progress: Callable[[int], None] | None):
+    for checked, failed in results:
+        report.checked += checked
+        report.failed += failed
+        if progress:
+            progress(report.checked)
+
+
+def verify_offline(
+    tree_path: Path,
+    proofs_path: Path,
+    processes: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: Callable[[int], None] | None = None,
+) -> Report:
+    """Checks every proof of `proofs_path` against the root of `tree_path` without RPC."""
+    root, leaf_encoding, addresses = _tree_summary(tree_path)
+    report = Report()
+    items = _match(report, addresses, iter_proofs(proofs_path))
+    chunks = ((root, leaf_encoding, chunk) for chunk in _chunks(items, chunk_size))
+    window = 2 * (processes or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        _collect(report, _map_bounded(executor, verify_chunk, chunks, window), progress)
+    report.missing = sorted(addresses)
+    return report
+
+
+def verify_proof_calldata(address: str, proof: list[str]) -> str:
+    return VERIFY_PROOF_SELECTOR + encode(["address", "bytes32[]"], [address, [bytes.fromhex(p[2:]) for p in proof]]).hex()
+
+
+class _RpcBatcher:
+    """Posts JSON-RPC batches over a pooled session, retrying with backoff."""
+
+    def __init__(self, rpc_url: str, connections: int, retries: int, timeout: float):
+        self.rpc_url = rpc_url
+        self.retries = retries
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def post(self, payload):
+        for attempt in range(self.retries):
+            try:
+                response = self.session.post(self.rpc_url, json=payload, timeout=self.timeout)
+                response.raise_for_status()
+                return response.json()
+            except requests.RequestException as e:
+                if attempt + 1 == self.retries:
+                    raise
+                print(f"    RPC batch failed ({e}), retrying")
+                time.sleep(BACKOFF_BASE * 2 ** attempt)
+
+    def block_number(self) -> int:
+        return int(self.post({"jsonrpc": "2.0", "id": 0, "method": "eth_blockNumber", "params": []})["result"], 16)
+
+    def verify(self, contract: str, block: str, items: list[tuple[str, list[str]]]) -> tuple[int, list[str]]:
+        payload = [
+            {
+                "jsonrpc": "2.0",
+                "id": i,
+                "method": "eth_call",
+                "params": [{"to": contract, "data": verify_proof_calldata(address, proof)}, block],
+            }
+            for i, (address, proof) in enumerate(items)
+        ]
+        responses = {r["id"]: r for r in self.post(payload)}
+        failed = []
+        for i, (address, _) in enumerate(items):
+            response = responses.get(i, {})
+            if "error" in response or int(response.get("result") or "0x0", 16) != 1:
+                failed.append(address)
+        return len(items), failed
+
+
+def verify_onchain(
+    rpc_url: str,
+    contract: str,
+    proofs_path: Path,
+    tree_path: Path | None = None,
+    block_identifier: int | None = None,
+    batch_size: int = DEFAULT_RPC_BATCH_SIZE,
+    connections: int = DEFAULT_CONNECTIONS,
+    retries: int = DEFAULT_RETRIES,
+    timeout: float = DEFAULT_TIMEOUT,
+    progress: Callable[[int], None] | None = None,
+) -> Report:
+    """
+    Calls `verifyProof` of `contract` for every proof of `proofs_path` at
+    `block_identifier` (the current block if not given). With `tree_path`, proofs are also
+    matched against the addresses of the tree.
+    """
+    batcher = _RpcBatcher(rpc_url, connections, retries, timeout)
+    block = hex(block_identifier if block_identifier is not None else batcher.block_number())
+    report = Report()
+    addresses = _tree_summary(tree_path)[2] if tree_path else None
+    items = _match(report, addresses, iter_proofs(proofs_path))
+    chunks = ((contract, block, chunk) for chunk in _chunks(items, batch_size))
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        _collect(report, _map_bounded(executor, batcher.verify, chunks, 2 * connections), progress)
+    if addresses is not None:
+        report.missing = sorted(addresses)
+    return report
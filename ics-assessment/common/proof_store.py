@@ -0,0 +1,187 @@
+# Memory-mapped Merkle proof store with a lookup CLI and HTTP service
+#
+# Build once after publishing a tree:
+#     python -m common.proof_store build merkle-tree.json proofs.bin
+#
+# Then look proofs up without parsing any JSON:
+#     python -m common.proof_store lookup proofs.bin 0x...
+#     python -m common.proof_store serve proofs.bin --port 8080
+#         GET /proof/<address>  ->  {"address": ..., "root": ..., "proof": [...]}
+#         GET /root             ->  {"root": ..., "count": ...}
+#
+# The file holds the sorted 20-byte addresses of the tree, the proof length of each and a
+# fixed-width array of 32-byte siblings per address, so a lookup is a binary search and
+# one slice of the memory map.
+
+import argparse
+import json
+import mmap
+import os
+import struct
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+from common import merkle
+from common.address_index import KEY_SIZE, address_to_key
+
+MAGIC = b"ICSPRF01"
+HEADER = struct.Struct("<8sII32s")  # magic, addresses count, max proof length, root
+NODE_SIZE = 32
+# Rows of sibling arrays gathered at once while building
+BUILD_CHUNK = 65536
+
+
+def build_store(tree: merkle.StandardMerkleTree, out: Path) -> int:
+    """
+    Writes the proofs of an ["address"] tree to `out`. Returns the number of addresses.
+    """
+    if tree.leaf_encoding != ["address"]:
+        raise ValueError(f"Expected an address tree, got {tree.leaf_encoding}")
+    keys = np.frombuffer(
+        b"".join(address_to_key(v["value"][0]) for v in tree.values), dtype=np.uint8
+    ).reshape(-1, KEY_SIZE)
+    padded = np.zeros((len(keys), 24), dtype=np.uint8)
+    padded[:, :KEY_SIZE] = keys
+    words = padded.view(">u8")
+    order = np.lexsort(words.T[::-1])
+    if len(order) > 1 and not (np.diff(words[order], axis=0) != 0).any(axis=1).all():
+        raise ValueError("The tree has duplicate addresses")
+
+    matrix = tree.proof_matrix()[order]
+    lengths = (matrix >= 0).sum(axis=1).astype(np.uint8)
+    depth = matrix.shape[1]
+
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(keys), depth, bytes(tree.tree[0])))
+        f.write(keys[order].tobytes())
+        f.write(lengths.tobytes())
+        f.write(b"\0" * (-(HEADER.size + len(keys) * (KEY_SIZE + 1)) % NODE_SIZE))
+        for start in range(0, len(matrix), BUILD_CHUNK):
+            rows = matrix[start:start + BUILD_CHUNK]
+            siblings = tree.tree[np.maximum(rows, 0)]
+            siblings[rows < 0] = 0
+            f.write(siblings.tobytes())
+    os.replace(tmp, out)
+    return len(keys)
+
+
+class ProofStore:
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, depth, root = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a proof store")
+        self.count = count
+        self.depth = depth
+        self.root = "0x" + root.hex()
+
+        buf = memoryview(self._mm)
+        offset = HEADER.size
+        self._key_bytes = buf[offset:offset + count * KEY_SIZE]
+        # Fixed-size byte strings order like the bytes they hold, searchsorted bisects in C
+        self._keys = np.frombuffer(self._mm, dtype=f"S{KEY_SIZE}", count=count, offset=offset)
+        offset += count * KEY_SIZE
+        self._lengths = buf[offset:offset + count]
+        offset += count
+        offset += -offset % NODE_SIZE
+        self._siblings = buf[offset:offset + count * depth * NODE_SIZE]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _position(self, address: str) -> int | None:
+        key = address_to_key(address)
+        if key is None:
+            return None
+        i = int(self._keys.searchsorted(key))
+        if i < self.count and self._key_bytes[i * KEY_SIZE:(i + 1) * KEY_SIZE] == key:
+            return i
+        return None
+
+    def __contains__(self, address: str) -> bool:
+        return self._position(address) is not None
+
+    def proof(self, address: str) -> list[str] | None:
+        """Proof of `address`, None if it isn't in the tree."""
+        i = self._position(address)
+        if i is None:
+            return None
+        start = i * self.depth * NODE_SIZE
+        raw = self._siblings[start:start + self._lengths[i] * NODE_SIZE].hex()
+        return ["0x" + raw[j:j + 2 * NODE_SIZE] for j in range(0, len(raw), 2 * NODE_SIZE)]
+
+    def close(self):
+        self._keys = self._key_bytes = self._lengths = self._siblings = None
+        self._mm.close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    store: ProofStore
+
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path == "/root":
+            return self._reply(200, {"root": self.store.root, "count": len(self.store)})
+        if path.startswith("/proof/"):
+            address = path.removeprefix("/proof/")
+            if address_to_key(address) is None:
+                return self._reply(400, {"error": f"Not an address: {address}"})
+            proof = self.store.proof(address)
+            if proof is None:
+                return self._reply(404, {"error": f"{address} is not in the tree"})
+            return self._reply(200, {"address": address.lower(), "root": self.store.root, "proof": proof})
+        return self._reply(404, {"error": "Use /proof/<address> or /root"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(store: ProofStore, host: str = "127.0.0.1", port: int = 8080) -> ThreadingHTTPServer:
+    handler = type("Handler", (_Handler,), {"store": store})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory-mapped Merkle proof store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile merkle-tree.json into a proof store")
+    build.add_argument("tree", type=Path)
+    build.add_argument("out", type=Path)
+    lookup = commands.add_parser("lookup", help="print the proof of addresses")
+    lookup.add_argument("store", type=Path)
+    lookup.add_argument("addresses", nargs="+")
+    serve = commands.add_parser("serve", help="serve proofs over HTTP")
+    serve.add_argument("store", type=Path)
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        with open(args.tree, "r") as f:
+            tree = merkle.StandardMerkleTree.load(json.load(f))
+        total = build_store(tree, args.out)
+        print(f"Wrote proofs of {total} addresses to {args.out}, root {tree.root}")
+    elif args.command == "lookup":
+        store = ProofStore(args.store)
+        for address in args.addresses:
+            print(json.dumps({"address": address.lower(), "root": store.root, "proof": store.proof(address)}))
+    else:
+        server = make_server(ProofStore(args.store), args.host, args.port)
+        print(f"Serving proofs on http://{args.host}:{args.port}/proof/<address>")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
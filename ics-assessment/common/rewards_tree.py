@@ -0,0 +1,181 @@
+# CSM rewards tree rebuilt from distribution logs
+#
+# CSFeeDistributor commits to an OpenZeppelin standard Merkle tree of
+# (nodeOperatorId, cumulativeFeeShares) leaves: `hashLeaf` is
+# keccak256(bytes.concat(keccak256(abi.encode(nodeOperatorId, shares)))), the standard leaf
+# of ["uint256", "uint256"]. The shares each operator got in every frame of every log are
+# summed into cumulative totals, the tree is built from them and its root can be compared
+# with `treeRoot()` on-chain.
+#
+# Totals and the content CIDs of the logs already folded in are kept in a state file, so
+# after an oracle report only the new log is read, however it is passed:
+#     python -m common.rewards_tree <log file or CID> [...] --state rewards.state.json \
+#         [--root 0x... | --rpc URL --distributor 0x...] [--tree tree.json] [--proofs proofs.json]
+
+import argparse
+import io
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+from web3 import Web3
+
+from common import ipfs, merkle, perf_frames, perf_report, store
+
+LEAF_ENCODING = ["uint256", "uint256"]
+# Leaf the oracle adds to a tree of a single operator, as CSFeeDistributor rejects empty proofs
+STONE = (2**64 - 1, 0)
+
+TREE_ROOT_ABI = [{
+    "inputs": [],
+    "name": "treeRoot",
+    "outputs": [{"internalType": "bytes32", "name": "", "type": "bytes32"}],
+    "stateMutability": "view",
+    "type": "function",
+}]
+
+
+def hash_leaf(node_operator_id: int, shares: int) -> bytes:
+    """CSFeeDistributor.hashLeaf"""
+    return merkle.leaf_hash(LEAF_ENCODING, [node_operator_id, shares])
+
+
+@dataclass
+class RewardsState:
+    # Cumulative shares indexed by node operator ID, exact Python ints
+    shares: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=object))
+    # Content CIDs of the logs folded in, in order
+    logs: list[str] = field(default_factory=list)
+    frames: int = 0
+
+    def _grow(self, size: int):
+        if size > len(self.shares):
+            grown = np.zeros(size, dtype=object)
+            grown[:len(self.shares)] = self.shares
+            self.shares = grown
+
+    def fold_frame(self, columns: perf_frames.FrameColumns):
+        """Adds the shares distributed to every operator in the frame."""
+        ids = np.array([int(no_id) for no_id in columns.operator_ids], dtype=np.int64)
+        if len(ids):
+            self._grow(int(ids.max()) + 1)
+            np.add.at(self.shares, ids, columns.operator_distributed.astype(object))
+        self.frames += 1
+
+    def fold_log(self, cid: str, frames: Iterable[dict]) -> bool:
+        """Folds every frame of a log in once; False if the log with content CID `cid` was folded already."""
+        if cid in self.logs:
+            return False
+        for report in frames:
+            self.fold_frame(perf_frames.from_report(report))
+        self.logs.append(cid)
+        return True
+
+    def cumulative(self) -> dict[int, int]:
+        """Cumulative shares of operators that got any."""
+        return {int(no_id): int(self.shares[no_id]) for no_id in np.flatnonzero(self.shares != 0)}
+
+    def tree(self, stone: tuple[int, int] | None = STONE) -> merkle.StandardMerkleTree:
+        values = [[no_id, shares] for no_id, shares in self.cumulative().items()]
+        if not values:
+            raise ValueError("No shares distributed yet")
+        if len(values) < 2 and stone is not None:
+            values.append(list(stone))
+        return merkle.StandardMerkleTree.of(values, LEAF_ENCODING)
+
+    def to_dict(self) -> dict:
+        return {
+            "shares": {str(no_id): store.amount(shares) for no_id, shares in self.cumulative().items()},
+            "logs": self.logs,
+            "frames": self.frames,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RewardsState":
+        state = cls(logs=list(data["logs"]), frames=data["frames"])
+        shares = {int(no_id): int(value) for no_id, value in data["shares"].items()}
+        if shares:
+            state._grow(max(shares) + 1)
+            for no_id, value in shares.items():
+                state.shares[no_id] = value
+        return state
+
+
+def load_state(path: Path) -> RewardsState:
+    snapshot = store.load(path)
+    return RewardsState() if snapshot is None else RewardsState.from_dict(snapshot[1])
+
+
+def save_state(path: Path, state: RewardsState):
+    store.save(path, state.to_dict())
+
+
+def fold_logs(state: RewardsState, sources: Iterable[str]) -> list[str]:
+    """
+    Folds the logs (files or IPFS CIDs) not folded yet, in order. Logs are told apart by the
+    CIDv0 of their content, so a file and its CID are the same log. Returns the new CIDs.
+    """
+    folded = []
+    for source in sources:
+        with perf_report.open_report(source) as f:
+            data = f.read()
+        cid = ipfs.cid_v0(data)
+        if state.fold_log(cid, perf_report.iter_frames(io.BytesIO(data), frame_keys=("frame",))):
+            folded.append(cid)
+    return folded
+
+
+def operator_proofs(tree: merkle.StandardMerkleTree) -> dict[str, dict]:
+    """Claim data of every operator: cumulative shares and proof, keyed by operator ID."""
+    return {
+        str(value[0]): {"cumulativeFeeShares": str(value[1]), "proof": proof}
+        for value, proof in tree.proofs()
+        if (value[0], value[1]) != STONE
+    }
+
+
+def onchain_root(w3: Web3, fee_distributor: str, block_identifier="latest") -> str:
+    contract = w3.eth.contract(address=Web3.to_checksum_address(fee_distributor), abi=TREE_ROOT_ABI)
+    return Web3.to_hex(contract.functions.treeRoot().call(block_identifier=block_identifier))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the CSM rewards tree from distribution logs")
+    parser.add_argument("logs", nargs="*", help="log files or IPFS CIDs, oldest first")
+    parser.add_argument("--state", type=Path, help="cumulative state kept between runs")
+    parser.add_argument("--root", help="expected tree root")
+    parser.add_argument("--rpc", help="RPC URL to read treeRoot() from")
+    parser.add_argument("--distributor", help="CSFeeDistributor address, with --rpc")
+    parser.add_argument("--tree", type=Path, help="write the tree dump")
+    parser.add_argument("--proofs", type=Path, help="write per-operator proofs")
+    args = parser.parse_args()
+
+    state = load_state(args.state) if args.state else RewardsState()
+    folded = fold_logs(state, args.logs)
+    if args.state:
+        save_state(args.state, state)
+    print(f"Folded {len(folded)} new logs, {len(state.logs)} logs and {state.frames} frames in total")
+
+    tree = state.tree()
+    print(f"Operators: {len(state.cumulative())}, root: {tree.root}")
+    if args.tree:
+        merkle.write_tree(args.tree, tree)
+    if args.proofs:
+        with open(args.proofs, "w") as f:
+            json.dump(operator_proofs(tree), f)
+
+    expected = args.root
+    if expected is None and args.rpc and args.distributor:
+        expected = onchain_root(Web3(Web3.HTTPProvider(args.rpc)), args.distributor)
+    if expected is not None:
+        if expected.lower() != tree.root:
+            print(f"🚨 Root mismatch: expected {expected}")
+            sys.exit(1)
+        print("Root matches ✅")
+
+
+if __name__ == "__main__":
+    main()
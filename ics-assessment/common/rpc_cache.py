@@ -0,0 +1,151 @@
+# On-disk cache of JSON-RPC responses that can't change
+#
+# Calls pinned to a block number (eth_call, eth_getCode, ... at a reference block) and
+# eth_getLogs over a numeric block range always return the same result once the block is
+# final. Those responses are stored in a SQLite file keyed by (chain id, method, params),
+# so rerunning a collector at the same reference block needs no RPC traffic.
+#
+# Anything that depends on "latest" (or another tag), and blocks still close to the chain
+# head, is passed through without caching.
+#
+#     w3 = Web3(rpc_cache.CachedProvider(Web3.HTTPProvider(RPC_URL)))
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from web3.providers.base import BaseProvider
+
+ROOT = Path(__file__).parent.parent.resolve()
+CACHE_FILE = Path(os.getenv("ICS_RPC_CACHE", ROOT / ".rpc-cache.sqlite"))
+
+# Blocks at least this deep below the head are treated as final
+CONFIRMATIONS = 64
+
+# Index of the block parameter of methods reading state at a block
+BLOCK_PARAM = {
+    "eth_call": 1,
+    "eth_getCode": 1,
+    "eth_getBalance": 1,
+    "eth_getStorageAt": 2,
+    "eth_getTransactionCount": 1,
+    "eth_getBlockByNumber": 0,
+}
+
+
+def _block_number(block) -> int | None:
+    """Numeric value of a pinned block parameter, None for tags like "latest"."""
+    if isinstance(block, int):
+        return block
+    if isinstance(block, str) and block.startswith("0x"):
+        return int(block, 16)
+    return None
+
+
+def pinned_block(method: str, params) -> int | None:
+    """
+    Returns the highest block the request depends on if it only depends on pinned
+    blocks, None if it can't be cached.
+    """
+    params = list(params or [])
+    if method == "eth_getLogs":
+        if not params:
+            return None
+        log_filter = params[0]
+        if "blockHash" in log_filter:
+            return None
+        from_block = _block_number(log_filter.get("fromBlock"))
+        to_block = _block_number(log_filter.get("toBlock"))
+        return to_block if from_block is not None and to_block is not None else None
+    if method in BLOCK_PARAM:
+        index = BLOCK_PARAM[method]
+        return _block_number(params[index]) if len(params) > index else None
+    return None
+
+
+class ResponseCache:
+    """Thread-safe SQLite store of JSON-RPC results."""
+
+    def __init__(self, path: Path = CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, result TEXT NOT NULL)")
+        self._db.commit()
+
+    @staticmethod
+    def key(chain_id: int, method: str, params) -> str:
+        request = json.dumps([chain_id, method, params], sort_keys=True, default=str)
+        return hashlib.sha256(request.encode()).hexdigest()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._db.execute("SELECT result FROM responses WHERE key = ?", (key,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def put(self, key: str, result):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?)", (key, json.dumps(result)))
+            self._db.commit()
+
+
+class CachedProvider(BaseProvider):
+    """
+    Wraps a provider and answers requests pinned to final blocks from `ResponseCache`.
+    """
+
+    def __init__(self, provider: BaseProvider, cache: ResponseCache | None = None, confirmations: int = CONFIRMATIONS):
+        super().__init__()
+        self.provider = provider
+        self.cache = cache or ResponseCache()
+        self.confirmations = confirmations
+        self._chain_id: int | None = None
+        self._head: int | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def endpoint_uri(self):
+        return getattr(self.provider, "endpoint_uri", None)
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        return self.provider.is_connected(show_traceback)
+
+    def _request(self, method: str, params) -> int:
+        response = self.provider.make_request(method, params)
+        if "error" in response:
+            raise ValueError(response["error"])
+        return int(response["result"], 16)
+
+    def chain_id(self) -> int:
+        with self._lock:
+            if self._chain_id is None:
+                self._chain_id = self._request("eth_chainId", [])
+            return self._chain_id
+
+    def is_final(self, block: int) -> bool:
+        """Whether `block` is at least `confirmations` deep; the head is refreshed lazily."""
+        with self._lock:
+            if self._head is None or block > self._head - self.confirmations:
+                self._head = self._request("eth_blockNumber", [])
+            return block <= self._head - self.confirmations
+
+    def cache_key(self, method: str, params) -> str | None:
+        """Cache key of the request, or None if its response may still change."""
+        block = pinned_block(method, params)
+        if block is None or not self.is_final(block):
+            return None
+        return ResponseCache.key(self.chain_id(), method, params)
+
+    def make_request(self, method, params):
+        if method == "eth_chainId":
+            return {"jsonrpc": "2.0", "id": 0, "result": hex(self.chain_id())}
+        key = self.cache_key(method, params)
+        if key is not None and (result := self.cache.get(key)) is not None:
+            return {"jsonrpc": "2.0", "id": 0, "result": result}
+        response = self.provider.make_request(method, params)
+        if key is not None and "error" not in response and response.get("result") is not None:
+            self.cache.put(key, response["result"])
+        return response
@@ -0,0 +1,357 @@
+# Signing key upload checks
+#
+# `addValidatorKeys*` takes the keys the way SigningKeys.saveKeysSigs reads them: 48-byte
+# pubkeys and 96-byte signatures, concatenated. Keys are read into (or memory-mapped as)
+# NumPy arrays of those rows, checked for what makes the upload revert or the keys useless
+# (bad lengths, empty keys, duplicates, pubkeys already in the module, wrong withdrawal
+# credentials), then split into transactions that fit a gas limit.
+#
+# Pubkeys already in the module are kept in a binary index synced from SigningKeyAdded and
+# SigningKeyRemoved events: sorted 48-byte keys plus parallel arrays of uint32 node operator
+# IDs and key indices, memory-mapped on load like common/address_index.py. Key indices are
+# replayed the way SigningKeys stores keys, so they are the `keyIndex` CSVerifier takes.
+#     python -m common.signing_keys sync --rpc URL --module 0x... [--from-block N]
+#     python -m common.signing_keys check deposit_data.json [--calls calls.json] [--withdrawal-credentials 0x...]
+#     python -m common.signing_keys check --pubkeys keys.bin --signatures sigs.bin [--calls calls.json]
+
+import argparse
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+
+import ijson
+import numpy as np
+from web3 import Web3
+
+from common import log_scanner
+
+ROOT = Path(__file__).parent.parent.resolve()
+INDEX_FILE = ROOT / "signing_keys.bin"
+
+PUBKEY_LENGTH = 48
+SIGNATURE_LENGTH = 96
+CREDENTIALS_LENGTH = 32
+DEPOSIT_AMOUNT_GWEI = 32 * 10**9
+
+MAGIC = b"CSMKEYS2"
+HEADER = struct.Struct("<8sIq")  # magic, records count, last synced block
+HEADER_SIZE = HEADER.size + (-HEADER.size % 8)
+
+SIGNING_KEY_ADDED = log_scanner.topic("SigningKeyAdded(uint256,bytes)")
+SIGNING_KEY_REMOVED = log_scanner.topic("SigningKeyRemoved(uint256,bytes)")
+
+# saveKeysSigs writes 5 fresh storage slots per key (22.1k gas each) and emits an event;
+# with calldata and the loop that is ~116k gas per key. A transaction adds ~300k on top
+# for bond accounting, vetting and the queue. 15M stays under the 2^24 transaction cap.
+GAS_PER_KEY = 116_000
+TX_BASE_GAS = 300_000
+DEFAULT_GAS_LIMIT = 15_000_000
+
+
+class PubkeyIndex:
+    def __init__(self, path: Path = INDEX_FILE):
+        self.path = path
+        if not path.exists():
+            self.block = -1
+            self.pubkeys = np.empty(0, dtype=f"S{PUBKEY_LENGTH}")
+            self.operator_ids = np.empty(0, dtype="<u4")
+            self.key_indices = np.empty(0, dtype="<u4")
+            return
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, self.block = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a signing key index of this version, sync it again with --from-block")
+        offset = HEADER_SIZE
+        self.pubkeys = np.frombuffer(self._mm, dtype=f"S{PUBKEY_LENGTH}", count=count, offset=offset)
+        offset += count * PUBKEY_LENGTH
+        self.operator_ids = np.frombuffer(self._mm, dtype="<u4", count=count, offset=offset)
+        offset += count * 4
+        self.key_indices = np.frombuffer(self._mm, dtype="<u4", count=count, offset=offset)
+
+    def __len__(self):
+        return len(self.pubkeys)
+
+    def locate(self, pubkeys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(node operator ID, key index) of each of the (N, 48) pubkeys, -1 for keys not in the module."""
+        keys = _rows(pubkeys, PUBKEY_LENGTH)
+        operators = np.full(len(keys), -1, dtype=np.int64)
+        key_indices = np.full(len(keys), -1, dtype=np.int64)
+        if len(self.pubkeys):
+            at = np.minimum(np.searchsorted(self.pubkeys, keys), len(self.pubkeys) - 1)
+            hit = self.pubkeys[at] == keys
+            operators[hit] = self.operator_ids[at[hit]]
+            key_indices[hit] = self.key_indices[at[hit]]
+        return operators, key_indices
+
+    def operators_of(self, pubkeys: np.ndarray) -> np.ndarray:
+        """Node operator holding each of the (N, 48) pubkeys, -1 for keys not in the module."""
+        return self.locate(pubkeys)[0]
+
+    def merged(self, operator_ids, pubkeys: np.ndarray, signs) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Sorted (pubkeys, operator IDs, key indices) after adding (+1) and removing (-1) the
+        given keys in order. Like SigningKeys, an added key goes after the operator's last
+        one and a removed key's place is taken by the operator's last key. Only operators
+        with events are replayed; removals of unknown keys are ignored.
+        """
+        operator_ids = np.asarray(operator_ids, dtype=np.int64)
+        stored = self.pubkeys.view(np.uint8).reshape(-1, PUBKEY_LENGTH)
+        replayed = np.isin(self.operator_ids, operator_ids)
+        keys: dict[int, list[bytes]] = {no_id: [] for no_id in np.unique(operator_ids).tolist()}
+        rows = np.flatnonzero(replayed)
+        for i in rows[np.lexsort((self.key_indices[rows], self.operator_ids[rows]))].tolist():
+            keys[int(self.operator_ids[i])].append(stored[i].tobytes())
+
+        for no_id, key, sign in zip(operator_ids.tolist(), np.asarray(pubkeys, dtype=np.uint8), signs):
+            operator_keys, key = keys[no_id], key.tobytes()
+            if sign > 0:
+                operator_keys.append(key)
+            elif key in operator_keys:
+                at = len(operator_keys) - 1 - operator_keys[::-1].index(key)
+                operator_keys[at] = operator_keys[-1]
+                operator_keys.pop()
+
+        added = b"".join(key for operator_keys in keys.values() for key in operator_keys)
+        pubkeys = np.concatenate([stored[~replayed], np.frombuffer(added, dtype=np.uint8).reshape(-1, PUBKEY_LENGTH)])
+        owners = np.concatenate([
+            self.operator_ids[~replayed],
+            np.repeat(np.array(list(keys), dtype="<u4"), [len(k) for k in keys.values()]),
+        ])
+        key_indices = np.concatenate([
+            self.key_indices[~replayed],
+            np.array([i for operator_keys in keys.values() for i in range(len(operator_keys))], dtype="<u4"),
+        ])
+        sorted_keys = _rows(pubkeys, PUBKEY_LENGTH)
+        order = np.argsort(sorted_keys, kind="stable")
+        return sorted_keys[order], owners[order].astype("<u4"), key_indices[order].astype("<u4")
+
+
+def save_index(path: Path, pubkeys: np.ndarray, operator_ids: np.ndarray, key_indices: np.ndarray, block: int):
+    header = HEADER.pack(MAGIC, len(pubkeys), block)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(header + b"\0" * (HEADER_SIZE - len(header)))
+        f.write(pubkeys.tobytes())
+        f.write(operator_ids.astype("<u4").tobytes())
+        f.write(key_indices.astype("<u4").tobytes())
+    os.replace(tmp, path)
+
+
+def _rows(array: np.ndarray, width: int) -> np.ndarray:
+    """(N, width) uint8 rows as a 1-D array of S{width}, without copying when contiguous."""
+    return np.ascontiguousarray(array, dtype=np.uint8).view(f"S{width}").ravel()
+
+
+def sync(w3: Web3, module_address: str, path: Path = INDEX_FILE, from_block: int | None = None,
+         to_block: int | None = None, checkpoint: Path | None = None) -> PubkeyIndex:
+    """Adds the module's key events since the last sync (or `from_block`) to the index at `path`."""
+    index = PubkeyIndex(path)
+    if index.block >= 0:
+        from_block = index.block + 1
+    elif from_block is None:
+        raise ValueError("from_block is required to build a new index")
+    if to_block is None:
+        to_block = w3.eth.block_number
+    if from_block > to_block:
+        return index
+
+    operator_ids, signs = [], []
+    pubkeys = bytearray()
+    logs = log_scanner.scan_logs(
+        w3,
+        {"address": Web3.to_checksum_address(module_address), "topics": [[SIGNING_KEY_ADDED, SIGNING_KEY_REMOVED]]},
+        from_block,
+        to_block,
+        checkpoint=checkpoint,
+    )
+    for log in logs:
+        operator_ids.append(int.from_bytes(log["topics"][1], "big"))
+        signs.append(1 if Web3.to_hex(log["topics"][0]) == SIGNING_KEY_ADDED else -1)
+        # bytes argument: offset, length, then the key
+        pubkeys += log["data"][64:64 + PUBKEY_LENGTH]
+
+    merged = index.merged(operator_ids, np.frombuffer(pubkeys, dtype=np.uint8).reshape(-1, PUBKEY_LENGTH), signs)
+    save_index(path, *merged, to_block)
+    return PubkeyIndex(path)
+
+
+class Keys:
+    """Pubkeys (N, 48) and signatures (N, 96) as uint8 arrays, with deposit data fields if read from one."""
+
+    def __init__(self, pubkeys: np.ndarray, signatures: np.ndarray, withdrawal_credentials: np.ndarray | None = None,
+                 amounts: np.ndarray | None = None):
+        if len(pubkeys) != len(signatures):
+            raise ValueError(f"{len(pubkeys)} pubkeys for {len(signatures)} signatures")
+        self.pubkeys = pubkeys
+        self.signatures = signatures
+        self.withdrawal_credentials = withdrawal_credentials
+        self.amounts = amounts
+
+    def __len__(self):
+        return len(self.pubkeys)
+
+    def take(self, indices: np.ndarray) -> "Keys":
+        optional = [a[indices] if a is not None else None for a in (self.withdrawal_credentials, self.amounts)]
+        return Keys(self.pubkeys[indices], self.signatures[indices], *optional)
+
+    @classmethod
+    def from_buffers(cls, pubkeys, signatures) -> "Keys":
+        """`publicKeys` and `signatures` buffers as `addValidatorKeys*` takes them; not copied."""
+        pubkeys, signatures = memoryview(pubkeys), memoryview(signatures)
+        if pubkeys.nbytes % PUBKEY_LENGTH or signatures.nbytes % SIGNATURE_LENGTH:
+            raise ValueError(f"Buffer lengths {pubkeys.nbytes} and {signatures.nbytes} are not whole keys")
+        return cls(
+            np.frombuffer(pubkeys, dtype=np.uint8).reshape(-1, PUBKEY_LENGTH),
+            np.frombuffer(signatures, dtype=np.uint8).reshape(-1, SIGNATURE_LENGTH),
+        )
+
+    @classmethod
+    def from_files(cls, pubkeys_path: Path, signatures_path: Path) -> "Keys":
+        buffers = []
+        for path in (pubkeys_path, signatures_path):
+            with open(path, "rb") as f:
+                buffers.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b"")
+        return cls.from_buffers(*buffers)
+
+    @classmethod
+    def from_deposit_data(cls, path: Path) -> "Keys":
+        """Streams a staking-deposit-cli deposit_data JSON into preallocated arrays."""
+        capacity = 1024
+        pubkeys = np.empty((capacity, PUBKEY_LENGTH), dtype=np.uint8)
+        signatures = np.empty((capacity, SIGNATURE_LENGTH), dtype=np.uint8)
+        credentials = np.empty((capacity, CREDENTIALS_LENGTH), dtype=np.uint8)
+        amounts = np.empty(capacity, dtype=np.int64)
+        count = 0
+        with open(path, "rb") as f:
+            for item in ijson.items(f, "item"):
+                if count == capacity:
+                    capacity *= 2
+                    pubkeys, signatures, credentials = (np.resize(a, (capacity, a.shape[1])) for a in (pubkeys, signatures, credentials))
+                    amounts = np.resize(amounts, capacity)
+                for array, field, length in (
+                    (pubkeys, "pubkey", PUBKEY_LENGTH),
+                    (signatures, "signature", SIGNATURE_LENGTH),
+                    (credentials, "withdrawal_credentials", CREDENTIALS_LENGTH),
+                ):
+                    value = bytes.fromhex(item[field].removeprefix("0x"))
+                    if len(value) != length:
+                        raise ValueError(f"{path}: {field} of key {count} is {len(value)} bytes, expected {length}")
+                    array[count] = np.frombuffer(value, dtype=np.uint8)
+                amounts[count] = int(item["amount"])
+                count += 1
+        return cls(pubkeys[:count], signatures[:count], credentials[:count], amounts[:count])
+
+
+def check_keys(keys: Keys, index: PubkeyIndex | None = None, withdrawal_credentials: bytes | None = None) -> dict[str, np.ndarray]:
+    """Indices of the keys with each problem; only problems some key has are returned."""
+    pubkeys = _rows(keys.pubkeys, PUBKEY_LENGTH)
+    problems = {
+        # saveKeysSigs reverts with EmptyKey
+        "empty": np.flatnonzero(~keys.pubkeys.any(axis=1)),
+    }
+    _, first = np.unique(pubkeys, return_index=True)
+    repeated = np.ones(len(keys), dtype=bool)
+    repeated[first] = False
+    problems["duplicate"] = np.flatnonzero(repeated)
+    if index is not None:
+        problems["registered"] = np.flatnonzero(index.operators_of(keys.pubkeys) >= 0)
+    if keys.amounts is not None:
+        problems["amount"] = np.flatnonzero(keys.amounts != DEPOSIT_AMOUNT_GWEI)
+    if withdrawal_credentials is not None and keys.withdrawal_credentials is not None:
+        expected = np.frombuffer(withdrawal_credentials, dtype=np.uint8)
+        problems["withdrawal_credentials"] = np.flatnonzero((keys.withdrawal_credentials != expected).any(axis=1))
+    return {name: found for name, found in problems.items() if len(found)}
+
+
+def keys_per_transaction(gas_limit: int = DEFAULT_GAS_LIMIT, gas_per_key: int = GAS_PER_KEY, base_gas: int = TX_BASE_GAS) -> int:
+    count = (gas_limit - base_gas) // gas_per_key
+    if count < 1:
+        raise ValueError(f"Gas limit {gas_limit} fits no key")
+    return count
+
+
+def upload_calls(keys: Keys, per_transaction: int):
+    """`(keysCount, publicKeys, signatures)` arguments of each upload transaction, as hex."""
+    pubkeys = memoryview(np.ascontiguousarray(keys.pubkeys)).cast("B")
+    signatures = memoryview(np.ascontiguousarray(keys.signatures)).cast("B")
+    for start in range(0, len(keys), per_transaction):
+        end = min(start + per_transaction, len(keys))
+        yield {
+            "keysCount": end - start,
+            "publicKeys": "0x" + pubkeys[start * PUBKEY_LENGTH:end * PUBKEY_LENGTH].hex(),
+            "signatures": "0x" + signatures[start * SIGNATURE_LENGTH:end * SIGNATURE_LENGTH].hex(),
+        }
+
+
+def write_calls(path: Path, calls) -> int:
+    """Writes the calls as a JSON list one at a time; returns how many were written."""
+    count = 0
+    with open(path, "w") as f:
+        f.write("[")
+        for call in calls:
+            f.write((",\n" if count else "\n") + json.dumps(call))
+            count += 1
+        f.write("\n]\n")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check signing keys before uploading them to CSM")
+    parser.add_argument("--index", type=Path, default=INDEX_FILE, help="pubkey index file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    sync_parser = commands.add_parser("sync", help="add the module's key events to the index")
+    sync_parser.add_argument("--rpc", required=True)
+    sync_parser.add_argument("--module", required=True, help="CSModule address")
+    sync_parser.add_argument("--from-block", type=int, help="module deployment block, for a new index")
+    sync_parser.add_argument("--to-block", type=int, help="current block by default")
+    sync_parser.add_argument("--checkpoint", type=Path, help="log scan checkpoint")
+    check = commands.add_parser("check", help="check keys and split them into upload transactions")
+    check.add_argument("deposit_data", type=Path, nargs="?", help="deposit_data JSON")
+    check.add_argument("--pubkeys", type=Path, help="concatenated 48-byte pubkeys, instead of deposit data")
+    check.add_argument("--signatures", type=Path, help="concatenated 96-byte signatures")
+    check.add_argument("--withdrawal-credentials", help="expected withdrawal credentials, 0x-prefixed")
+    check.add_argument("--gas-limit", type=int, default=DEFAULT_GAS_LIMIT)
+    check.add_argument("--calls", type=Path, help="write the upload transactions' arguments as JSON")
+    check.add_argument("--skip-invalid", action="store_true", help="leave out keys with problems instead of failing")
+    args = parser.parse_args()
+
+    if args.command == "sync":
+        w3 = Web3(Web3.HTTPProvider(args.rpc))
+        index = sync(w3, args.module, args.index, args.from_block, args.to_block, args.checkpoint)
+        print(f"{len(index)} keys in {args.index} up to block {index.block}")
+        return
+
+    if args.deposit_data is not None:
+        keys = Keys.from_deposit_data(args.deposit_data)
+    elif args.pubkeys is not None and args.signatures is not None:
+        keys = Keys.from_files(args.pubkeys, args.signatures)
+    else:
+        parser.error("Pass a deposit data file or --pubkeys and --signatures")
+
+    index = PubkeyIndex(args.index)
+    if index.block < 0:
+        print(f"⚠️ No pubkey index at {args.index}, keys already in the module are not checked")
+        index = None
+    credentials = bytes.fromhex(args.withdrawal_credentials.removeprefix("0x")) if args.withdrawal_credentials else None
+    problems = check_keys(keys, index, credentials)
+    for name, found in problems.items():
+        shown = ", ".join(str(i) for i in found[:10]) + (", ..." if len(found) > 10 else "")
+        print(f"🚨 {len(found)} keys {name}: {shown}")
+    if problems:
+        if not args.skip_invalid:
+            raise SystemExit(1)
+        keys = keys.take(np.setdiff1d(np.arange(len(keys)), np.concatenate(list(problems.values()))))
+
+    per_transaction = keys_per_transaction(args.gas_limit)
+    transactions = -(-len(keys) // per_transaction)
+    print(f"{len(keys)} keys ready, {transactions} transactions of up to {per_transaction} keys")
+    if args.calls:
+        write_calls(args.calls, upload_calls(keys, per_transaction))
+        print(f"Saved upload arguments to {args.calls}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,824 @@
+# SSZ merkleization of beacon states and blocks
+#
+# Types work on serialized SSZ: a value is a memoryview into the file (memory-mapped for
+# states), and fields are found through the SSZ offsets without decoding the rest. Lists
+# and vectors of fixed-size elements are hashed a whole level at a time: every field of
+# every validator is cut out of the buffer with NumPy and the element roots come out of
+# a few passes over one contiguous buffer.
+#
+# `Node` wraps a value and keeps the Merkle tree of every composite it visits, so proving
+# thousands of validators against one state hashes the state once; each proof afterwards
+# is a lookup per level. Generalized indices follow `src/lib/GIndex.sol`.
+#     python -m common.ssz state.ssz --fork electra [--path validators 42 withdrawable_epoch]
+
+import argparse
+import hashlib
+import mmap
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+
+CHUNK_SIZE = 32
+OFFSET_SIZE = 4
+MAX_DEPTH = 64
+
+ZERO_HASHES = [bytes(CHUNK_SIZE)]
+for _ in range(MAX_DEPTH):
+    ZERO_HASHES.append(hashlib.sha256(ZERO_HASHES[-1] * 2).digest())
+
+
+def sha256(data) -> bytes:
+    return hashlib.sha256(data).digest()
+
+
+def hash_pairs(data) -> bytes:
+    """SHA-256 of every consecutive 64-byte pair of `data`."""
+    view = memoryview(data)
+    sha = hashlib.sha256
+    return b"".join([sha(view[i:i + 2 * CHUNK_SIZE]).digest() for i in range(0, len(view), 2 * CHUNK_SIZE)])
+
+
+def _depth(chunk_count: int) -> int:
+    return max(chunk_count - 1, 0).bit_length()
+
+
+def _pad(data, multiple: int = CHUNK_SIZE) -> bytes:
+    data = bytes(data)
+    return data + bytes(-len(data) % multiple)
+
+
+def mix_in_length(root: bytes, length: int) -> bytes:
+    return sha256(root + length.to_bytes(CHUNK_SIZE, "little"))
+
+
+def merkleize_rows(rows: np.ndarray, depth: int) -> np.ndarray:
+    """Roots of `count` trees at once: (count, k * 32) chunk rows padded to 2**depth chunks."""
+    count = len(rows)
+    width = (1 << depth) * CHUNK_SIZE
+    if rows.shape[1] < width:
+        rows = np.hstack([rows, np.zeros((count, width - rows.shape[1]), dtype=np.uint8)])
+    level = np.ascontiguousarray(rows, dtype=np.uint8).tobytes()
+    for _ in range(depth):
+        level = hash_pairs(level)
+    return np.frombuffer(level, dtype=np.uint8).reshape(count, CHUNK_SIZE)
+
+
+class Subtree:
+    """Merkle tree of `chunks` padded with zero chunks to 2**depth leaves; every level is kept."""
+
+    def __init__(self, chunks: bytes, depth: int):
+        if len(chunks) > CHUNK_SIZE << depth:
+            raise ValueError(f"{len(chunks) // CHUNK_SIZE} chunks don't fit a tree of depth {depth}")
+        self.depth = depth
+        self.levels = [bytes(chunks)]
+        level = self.levels[0]
+        for d in range(depth):
+            if len(level) // CHUNK_SIZE % 2:
+                level += ZERO_HASHES[d]
+            level = hash_pairs(level)
+            self.levels.append(level)
+
+    @property
+    def root(self) -> bytes:
+        return self.node(self.depth, 0)
+
+    def node(self, level: int, index: int) -> bytes:
+        """Node `index` of a level counted from the leaves."""
+        stored = self.levels[level]
+        if (index + 1) * CHUNK_SIZE <= len(stored):
+            return stored[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE]
+        return ZERO_HASHES[level]
+
+    def branch(self, index: int, level: int = 0) -> list[bytes]:
+        """Siblings of node `index` of `level`, from that level up to the root."""
+        siblings = []
+        for d in range(level, self.depth):
+            siblings.append(self.node(d, index ^ 1))
+            index >>= 1
+        return siblings
+
+
+class SSZType(ABC):
+    # Serialized size, None for variable-size types
+    size: int | None = None
+    # Depth of the type's own tree of chunks, and whether its root mixes in a length
+    depth = 0
+    mixes_length = False
+
+    @property
+    def is_basic(self) -> bool:
+        return False
+
+    def chunk_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Chunks of `count` fixed-size values given as (count, size) rows: (count, k * 32)."""
+        raise TypeError(f"{self} is variable-size")
+
+    def roots(self, rows: np.ndarray) -> np.ndarray:
+        """Roots of `count` fixed-size values given as (count, size) rows."""
+        return merkleize_rows(self.chunk_rows(rows), self.depth)
+
+    def chunks(self, data) -> bytes:
+        return self.chunk_rows(as_rows(data, self.size, 1)).tobytes()
+
+    def length(self, data) -> int:
+        """Value mixed into the root of list types."""
+        raise TypeError(f"{self} has no length")
+
+    def hash_tree_root(self, data) -> bytes:
+        if self.size is not None and not self.mixes_length:
+            return self.roots(as_rows(data, self.size, 1)).tobytes()
+        root = Subtree(self.chunks(data), self.depth).root
+        return mix_in_length(root, self.length(data)) if self.mixes_length else root
+
+    def child_type(self, index: int) -> "SSZType":
+        raise TypeError(f"{self} has no children")
+
+    def children(self, data) -> list[memoryview]:
+        raise TypeError(f"{self} has no children")
+
+    def chunk_index(self, key) -> int:
+        """Chunk of the tree holding field or element `key`."""
+        raise TypeError(f"{self} has no children")
+
+    def gindex(self, *path) -> int:
+        """Generalized index of a field or element under this type, e.g. ("validators", 0)."""
+        gindex, current = 1, self
+        for key in path:
+            if current.mixes_length:
+                gindex *= 2
+            if key == "__len__":
+                gindex += 1
+                break
+            gindex = (gindex << current.depth) | current.chunk_index(key)
+            current = current.child_type(key if isinstance(key, int) else current.field_index(key))
+        return gindex
+
+    @abstractmethod
+    def decode(self, data):
+        ...
+
+    @abstractmethod
+    def encode(self, value) -> bytes:
+        ...
+
+    @abstractmethod
+    def default(self):
+        ...
+
+
+def as_rows(data, size: int, count: int | None = None) -> np.ndarray:
+    """`data` as a (count, size) uint8 array of fixed-size values, without copying."""
+    array = np.frombuffer(data, dtype=np.uint8)
+    return array.reshape(count if count is not None else len(array) // max(size, 1), size)
+
+
+class Uint(SSZType):
+    def __init__(self, size: int):
+        self.size = size
+
+    def __repr__(self):
+        return f"uint{self.size * 8}"
+
+    @property
+    def is_basic(self) -> bool:
+        return True
+
+    def chunk_rows(self, rows):
+        chunks = np.zeros((len(rows), CHUNK_SIZE), dtype=np.uint8)
+        chunks[:, :self.size] = rows
+        return chunks
+
+    def decode(self, data) -> int:
+        return int.from_bytes(data, "little")
+
+    def encode(self, value) -> bytes:
+        return int(value).to_bytes(self.size, "little")
+
+    def default(self):
+        return 0
+
+
+class Boolean(Uint):
+    def __init__(self):
+        super().__init__(1)
+
+    def __repr__(self):
+        return "boolean"
+
+    def decode(self, data) -> bool:
+        return bool(data[0])
+
+    def default(self):
+        return False
+
+
+class ByteVector(SSZType):
+    def __init__(self, length: int):
+        self.size = length
+        self.depth = _depth(-(-length // CHUNK_SIZE))
+
+    def __repr__(self):
+        return f"Bytes{self.size}"
+
+    def chunk_rows(self, rows):
+        chunks = np.zeros((len(rows), -(-self.size // CHUNK_SIZE) * CHUNK_SIZE), dtype=np.uint8)
+        chunks[:, :self.size] = rows
+        return chunks
+
+    def decode(self, data) -> bytes:
+        return bytes(data)
+
+    def encode(self, value) -> bytes:
+        value = bytes.fromhex(value.removeprefix("0x")) if isinstance(value, str) else bytes(value)
+        if len(value) != self.size:
+            raise ValueError(f"{self} got {len(value)} bytes")
+        return value
+
+    def default(self):
+        return bytes(self.size)
+
+
+class Bitvector(ByteVector):
+    def __init__(self, length: int):
+        super().__init__(-(-length // 8))
+        self.bits = length
+        self.depth = _depth(-(-length // 256))
+
+    def __repr__(self):
+        return f"Bitvector[{self.bits}]"
+
+
+class ByteList(SSZType):
+    mixes_length = True
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.depth = _depth(-(-limit // CHUNK_SIZE))
+
+    def __repr__(self):
+        return f"ByteList[{self.limit}]"
+
+    def chunks(self, data) -> bytes:
+        return _pad(data)
+
+    def length(self, data) -> int:
+        return len(data)
+
+    def decode(self, data) -> bytes:
+        return bytes(data)
+
+    def encode(self, value) -> bytes:
+        value = bytes.fromhex(value.removeprefix("0x")) if isinstance(value, str) else bytes(value)
+        if len(value) > self.limit:
+            raise ValueError(f"{self} got {len(value)} bytes")
+        return value
+
+    def default(self):
+        return b""
+
+
+class Bitlist(ByteList):
+    """Serialized with a delimiting bit after the last one; kept as raw bytes when decoded."""
+
+    def __init__(self, limit: int):
+        super().__init__(limit)
+        self.depth = _depth(-(-limit // 256))
+
+    def __repr__(self):
+        return f"Bitlist[{self.limit}]"
+
+    def length(self, data) -> int:
+        if not len(data) or data[-1] == 0:
+            raise ValueError("Bitlist without a delimiting bit")
+        return (len(data) - 1) * 8 + data[-1].bit_length() - 1
+
+    def chunks(self, data) -> bytes:
+        bits = self.length(data)
+        value = bytearray(data)
+        value[-1] ^= 1 << (bits % 8)
+        return _pad(value[:-(-bits // 8)])
+
+    def default(self):
+        return b"\x01"
+
+
+class _Sequence(SSZType):
+    """Vector and List: `count` elements of one type."""
+
+    def __init__(self, element: SSZType):
+        self.element = element
+
+    def child_type(self, index: int) -> SSZType:
+        return self.element
+
+    def chunk_index(self, key) -> int:
+        if self.element.is_basic:
+            return key * self.element.size // CHUNK_SIZE
+        return key
+
+    def _chunk_depth(self, count: int) -> int:
+        if self.element.is_basic:
+            return _depth(-(-count * self.element.size // CHUNK_SIZE))
+        return _depth(count)
+
+    def elements_chunks(self, data) -> bytes:
+        if self.element.is_basic:
+            return _pad(data)
+        if self.element.size is not None:
+            return self.element.roots(as_rows(data, self.element.size)).tobytes()
+        return b"".join(self.element.hash_tree_root(child) for child in self.children(data))
+
+    def children(self, data) -> list[memoryview]:
+        data = memoryview(data)
+        if self.element.size is not None:
+            size = self.element.size
+            return [data[i:i + size] for i in range(0, len(data), size)]
+        if not len(data):
+            return []
+        count = int.from_bytes(data[:OFFSET_SIZE], "little") // OFFSET_SIZE
+        offsets = [int.from_bytes(data[i * OFFSET_SIZE:(i + 1) * OFFSET_SIZE], "little") for i in range(count)]
+        return [data[start:end] for start, end in zip(offsets, offsets[1:] + [len(data)])]
+
+    def decode(self, data) -> list:
+        return [self.element.decode(child) for child in self.children(data)]
+
+    def encode(self, value) -> bytes:
+        parts = [self.element.encode(v) for v in value]
+        if self.element.size is not None:
+            return b"".join(parts)
+        offset = OFFSET_SIZE * len(parts)
+        offsets = []
+        for part in parts:
+            offsets.append(offset.to_bytes(OFFSET_SIZE, "little"))
+            offset += len(part)
+        return b"".join(offsets + parts)
+
+
+class Vector(_Sequence):
+    def __init__(self, element: SSZType, length: int):
+        super().__init__(element)
+        self.count = length
+        self.size = element.size * length if element.size is not None else None
+        self.depth = self._chunk_depth(length)
+
+    def __repr__(self):
+        return f"Vector[{self.element}, {self.count}]"
+
+    def chunk_rows(self, rows):
+        if self.element.is_basic:
+            return ByteVector(self.size).chunk_rows(rows)
+        roots = self.element.roots(rows.reshape(len(rows) * self.count, self.element.size))
+        return roots.reshape(len(rows), self.count * CHUNK_SIZE)
+
+    def chunks(self, data) -> bytes:
+        return self.elements_chunks(data)
+
+    def default(self):
+        return [self.element.default() for _ in range(self.count)]
+
+
+class List(_Sequence):
+    mixes_length = True
+
+    def __init__(self, element: SSZType, limit: int):
+        super().__init__(element)
+        self.limit = limit
+        self.depth = self._chunk_depth(limit)
+
+    def __repr__(self):
+        return f"List[{self.element}, {self.limit}]"
+
+    def chunks(self, data) -> bytes:
+        return self.elements_chunks(data)
+
+    def length(self, data) -> int:
+        if self.element.size is not None:
+            return len(data) // self.element.size
+        return len(self.children(data))
+
+    def default(self):
+        return []
+
+
+class Container(SSZType):
+    def __init__(self, name: str, fields: list[tuple[str, SSZType]]):
+        self.name = name
+        self.fields = fields
+        self.names = [field for field, _ in fields]
+        self.depth = _depth(len(fields))
+        sizes = [t.size for _, t in fields]
+        self.size = sum(sizes) if None not in sizes else None
+        # Start of each field, or of its offset, in the fixed part
+        self.fixed_offsets = []
+        offset = 0
+        for size in sizes:
+            self.fixed_offsets.append(offset)
+            offset += size if size is not None else OFFSET_SIZE
+
+    def __repr__(self):
+        return self.name
+
+    def field_index(self, name: str) -> int:
+        return self.names.index(name)
+
+    def child_type(self, index: int) -> SSZType:
+        return self.fields[index][1]
+
+    def chunk_index(self, key) -> int:
+        return key if isinstance(key, int) else self.field_index(key)
+
+    def chunk_rows(self, rows):
+        return np.hstack([
+            t.roots(rows[:, start:start + t.size])
+            for start, (_, t) in zip(self.fixed_offsets, self.fields)
+        ])
+
+    def chunks(self, data) -> bytes:
+        if self.size is not None:
+            return super().chunks(data)
+        return b"".join(t.hash_tree_root(child) for (_, t), child in zip(self.fields, self.children(data)))
+
+    def children(self, data) -> list[memoryview]:
+        data = memoryview(data)
+        variable = [
+            (i, int.from_bytes(data[start:start + OFFSET_SIZE], "little"))
+            for i, (start, (_, t)) in enumerate(zip(self.fixed_offsets, self.fields))
+            if t.size is None
+        ]
+        ends = {i: end for (i, _), (_, end) in zip(variable, variable[1:] + [(None, len(data))])}
+        starts = dict(variable)
+        return [
+            data[starts[i]:ends[i]] if t.size is None else data[start:start + t.size]
+            for i, (start, (_, t)) in enumerate(zip(self.fixed_offsets, self.fields))
+        ]
+
+    def decode(self, data) -> dict:
+        return {name: t.decode(child) for (name, t), child in zip(self.fields, self.children(data))}
+
+    def encode(self, value: dict) -> bytes:
+        parts = [t.encode(value[name] if name in value else t.default()) for name, t in self.fields]
+        fixed_length = sum(t.size if t.size is not None else OFFSET_SIZE for _, t in self.fields)
+        fixed, variable = [], []
+        offset = fixed_length
+        for (_, t), part in zip(self.fields, parts):
+            if t.size is None:
+                fixed.append(offset.to_bytes(OFFSET_SIZE, "little"))
+                variable.append(part)
+                offset += len(part)
+            else:
+                fixed.append(part)
+        return b"".join(fixed + variable)
+
+    def default(self):
+        return {name: t.default() for name, t in self.fields}
+
+
+class Node:
+    """
+    A value in serialized SSZ with its Merkle tree, built on first use and kept together
+    with the nodes of the children visited, so later lookups and proofs reuse the hashes.
+    """
+
+    def __init__(self, ssz_type: SSZType, data):
+        self.type = ssz_type
+        self.data = memoryview(data)
+        self._children: dict[int, Node] = {}
+
+    @cached_property
+    def _views(self) -> list[memoryview]:
+        return self.type.children(self.data)
+
+    @cached_property
+    def tree(self) -> Subtree:
+        return Subtree(self.type.chunks(self.data), self.type.depth)
+
+    @cached_property
+    def length_chunk(self) -> bytes:
+        return self.type.length(self.data).to_bytes(CHUNK_SIZE, "little")
+
+    @property
+    def root(self) -> bytes:
+        if self.type.mixes_length:
+            return sha256(self.tree.root + self.length_chunk)
+        return self.tree.root
+
+    def __len__(self):
+        return len(self._views)
+
+    def child(self, key) -> "Node":
+        if isinstance(key, str):
+            key = self.type.field_index(key)
+        if key not in self._children:
+            if key >= len(self._views):
+                raise IndexError(f"{self.type} has no element {key}")
+            self._children[key] = Node(self.type.child_type(key), self._views[key])
+        return self._children[key]
+
+    def get(self, *path) -> "Node":
+        node = self
+        for key in path:
+            node = node.child(key)
+        return node
+
+    def value(self, *path):
+        node = self.get(*path)
+        return node.type.decode(node.data)
+
+    def prove(self, gindex: int) -> tuple[bytes, list[bytes]]:
+        """(leaf, proof) of a generalized index, siblings from the leaf up as `SSZ.verifyProof` reads them."""
+        if gindex < 1:
+            raise ValueError(f"Invalid generalized index {gindex}")
+        if gindex == 1:
+            return self.root, []
+        bits = bin(gindex)[3:]
+        node, segments = self, []
+        while True:
+            # Lists: the data tree on the left, the length on the right
+            length = []
+            if node.type.mixes_length:
+                if bits[0] == "1":
+                    if len(bits) > 1:
+                        raise ValueError(f"Generalized index {gindex} goes below a list length")
+                    segments.append([node.tree.root])
+                    leaf = node.length_chunk
+                    break
+                bits, length = bits[1:], [node.length_chunk]
+                if not bits:
+                    segments.append(length)
+                    leaf = node.tree.root
+                    break
+            taken = min(len(bits), node.type.depth)
+            index = int(bits[:taken], 2) if taken else 0
+            level = node.type.depth - taken
+            segments.append(node.tree.branch(index, level) + length)
+            bits = bits[taken:]
+            if not bits:
+                leaf = node.tree.node(level, index)
+                break
+            composite = isinstance(node.type, Container) or (
+                isinstance(node.type, _Sequence) and not node.type.element.is_basic
+            )
+            if not composite:
+                raise ValueError(f"Generalized index {gindex} goes below a leaf chunk")
+            if index >= len(node._views):
+                raise ValueError(f"Generalized index {gindex} goes below zero padding")
+            node = node.child(index)
+        proof = [sibling for segment in reversed(segments) for sibling in segment]
+        return leaf, proof
+
+
+def verify_proof(proof: list[bytes], root: bytes, leaf: bytes, gindex: int) -> bool:
+    """SSZ.verifyProof: hashes `leaf` up through `proof` along `gindex` and compares with `root`."""
+    if not proof:
+        return False
+    for sibling in proof:
+        if gindex == 1:
+            return False
+        leaf = sha256(sibling + leaf) if gindex & 1 else sha256(leaf + sibling)
+        gindex >>= 1
+    return gindex == 1 and leaf == root
+
+
+# GIndex.sol: a generalized index packed with the log2 width of the level it belongs to
+GINDEX_MAX = 2**248 - 1
+
+
+def pack(gindex: int, power: int) -> int:
+    if gindex > GINDEX_MAX:
+        raise ValueError("IndexOutOfRange")
+    return (gindex << 8) | power
+
+
+def index(packed: int) -> int:
+    return packed >> 8
+
+
+def power(packed: int) -> int:
+    return packed & 0xFF
+
+
+def shr(packed: int, n: int) -> int:
+    """Generalized index of the nth neighbour to the right."""
+    i, width = index(packed), 1 << power(packed)
+    if i % width + n >= width:
+        raise ValueError("IndexOutOfRange")
+    return pack(i + n, power(packed))
+
+
+def concat(lhs: int, rhs: int) -> int:
+    left, right = index(lhs), index(rhs)
+    left_msb, right_msb = left.bit_length() - 1, right.bit_length() - 1
+    if left_msb + 1 + right_msb > 248:
+        raise ValueError("IndexOutOfRange")
+    return pack((left << right_msb) | (right ^ (1 << right_msb)), power(rhs))
+
+
+def load(path: Path) -> memoryview:
+    """Memory-maps an SSZ file."""
+    with open(path, "rb") as f:
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+# Consensus types, mainnet preset
+uint8, uint64, uint256 = Uint(1), Uint(8), Uint(32)
+boolean = Boolean()
+Bytes4, Bytes20, Bytes32, Bytes48, Bytes96 = ByteVector(4), ByteVector(20), ByteVector(32), ByteVector(48), ByteVector(96)
+
+SLOTS_PER_HISTORICAL_ROOT = 8192
+VALIDATOR_REGISTRY_LIMIT = 2**40
+MAX_WITHDRAWALS_PER_PAYLOAD = 16
+
+Fork = Container("Fork", [("previous_version", Bytes4), ("current_version", Bytes4), ("epoch", uint64)])
+Checkpoint = Container("Checkpoint", [("epoch", uint64), ("root", Bytes32)])
+BeaconBlockHeader = Container("BeaconBlockHeader", [
+    ("slot", uint64), ("proposer_index", uint64), ("parent_root", Bytes32), ("state_root", Bytes32), ("body_root", Bytes32),
+])
+SignedBeaconBlockHeader = Container("SignedBeaconBlockHeader", [("message", BeaconBlockHeader), ("signature", Bytes96)])
+Eth1Data = Container("Eth1Data", [("deposit_root", Bytes32), ("deposit_count", uint64), ("block_hash", Bytes32)])
+Validator = Container("Validator", [
+    ("pubkey", Bytes48), ("withdrawal_credentials", Bytes32), ("effective_balance", uint64), ("slashed", boolean),
+    ("activation_eligibility_epoch", uint64), ("activation_epoch", uint64), ("exit_epoch", uint64),
+    ("withdrawable_epoch", uint64),
+])
+SyncCommittee = Container("SyncCommittee", [("pubkeys", Vector(Bytes48, 512)), ("aggregate_pubkey", Bytes48)])
+HistoricalSummary = Container("HistoricalSummary", [("block_summary_root", Bytes32), ("state_summary_root", Bytes32)])
+Withdrawal = Container("Withdrawal", [("index", uint64), ("validator_index", uint64), ("address", Bytes20), ("amount", uint64)])
+ExecutionPayloadHeader = Container("ExecutionPayloadHeader", [
+    ("parent_hash", Bytes32), ("fee_recipient", Bytes20), ("state_root", Bytes32), ("receipts_root", Bytes32),
+    ("logs_bloom", ByteVector(256)), ("prev_randao", Bytes32), ("block_number", uint64), ("gas_limit", uint64),
+    ("gas_used", uint64), ("timestamp", uint64), ("extra_data", ByteList(32)), ("base_fee_per_gas", uint256),
+    ("block_hash", Bytes32), ("transactions_root", Bytes32), ("withdrawals_root", Bytes32), ("blob_gas_used", uint64),
+    ("excess_blob_gas", uint64),
+])
+ExecutionPayload = Container("ExecutionPayload", [
+    *ExecutionPayloadHeader.fields[:13],
+    ("transactions", List(ByteList(2**30), 2**20)),
+    ("withdrawals", List(Withdrawal, MAX_WITHDRAWALS_PER_PAYLOAD)),
+    *ExecutionPayloadHeader.fields[15:],
+])
+AttestationData = Container("AttestationData", [
+    ("slot", uint64), ("index", uint64), ("beacon_block_root", Bytes32), ("source", Checkpoint), ("target", Checkpoint),
+])
+ProposerSlashing = Container("ProposerSlashing", [
+    ("signed_header_1", SignedBeaconBlockHeader), ("signed_header_2", SignedBeaconBlockHeader),
+])
+DepositData = Container("DepositData", [
+    ("pubkey", Bytes48), ("withdrawal_credentials", Bytes32), ("amount", uint64), ("signature", Bytes96),
+])
+Deposit = Container("Deposit", [("proof", Vector(Bytes32, 33)), ("data", DepositData)])
+SignedVoluntaryExit = Container("SignedVoluntaryExit", [
+    ("message", Container("VoluntaryExit", [("epoch", uint64), ("validator_index", uint64)])), ("signature", Bytes96),
+])
+SyncAggregate = Container("SyncAggregate", [("sync_committee_bits", Bitvector(512)), ("sync_committee_signature", Bytes96)])
+SignedBLSToExecutionChange = Container("SignedBLSToExecutionChange", [
+    ("message", Container("BLSToExecutionChange", [
+        ("validator_index", uint64), ("from_bls_pubkey", Bytes48), ("to_execution_address", Bytes20),
+    ])),
+    ("signature", Bytes96),
+])
+
+
+def _indexed_attestation(max_indices: int) -> Container:
+    return Container("IndexedAttestation", [
+        ("attesting_indices", List(uint64, max_indices)), ("data", AttestationData), ("signature", Bytes96),
+    ])
+
+
+def _attester_slashing(max_indices: int) -> Container:
+    attestation = _indexed_attestation(max_indices)
+    return Container("AttesterSlashing", [("attestation_1", attestation), ("attestation_2", attestation)])
+
+
+def _body(attester_slashings: List, attestations: List, execution_requests: Container | None) -> Container:
+    return Container("BeaconBlockBody", [
+        ("randao_reveal", Bytes96), ("eth1_data", Eth1Data), ("graffiti", Bytes32),
+        ("proposer_slashings", List(ProposerSlashing, 16)), ("attester_slashings", attester_slashings),
+        ("attestations", attestations), ("deposits", List(Deposit, 16)),
+        ("voluntary_exits", List(SignedVoluntaryExit, 16)), ("sync_aggregate", SyncAggregate),
+        ("execution_payload", ExecutionPayload), ("bls_to_execution_changes", List(SignedBLSToExecutionChange, 16)),
+        ("blob_kzg_commitments", List(Bytes48, 4096)),
+        *([("execution_requests", execution_requests)] if execution_requests else []),
+    ])
+
+
+def _block(body: Container) -> Container:
+    return Container("BeaconBlock", [*BeaconBlockHeader.fields[:4], ("body", body)])
+
+
+_DENEB_STATE_FIELDS = [
+    ("genesis_time", uint64), ("genesis_validators_root", Bytes32), ("slot", uint64), ("fork", Fork),
+    ("latest_block_header", BeaconBlockHeader),
+    ("block_roots", Vector(Bytes32, SLOTS_PER_HISTORICAL_ROOT)), ("state_roots", Vector(Bytes32, SLOTS_PER_HISTORICAL_ROOT)),
+    ("historical_roots", List(Bytes32, 2**24)), ("eth1_data", Eth1Data), ("eth1_data_votes", List(Eth1Data, 2048)),
+    ("eth1_deposit_index", uint64), ("validators", List(Validator, VALIDATOR_REGISTRY_LIMIT)),
+    ("balances", List(uint64, VALIDATOR_REGISTRY_LIMIT)), ("randao_mixes", Vector(Bytes32, 65536)),
+    ("slashings", Vector(uint64, 8192)), ("previous_epoch_participation", List(uint8, VALIDATOR_REGISTRY_LIMIT)),
+    ("current_epoch_participation", List(uint8, VALIDATOR_REGISTRY_LIMIT)), ("justification_bits", Bitvector(4)),
+    ("previous_justified_checkpoint", Checkpoint), ("current_justified_checkpoint", Checkpoint),
+    ("finalized_checkpoint", Checkpoint), ("inactivity_scores", List(uint64, VALIDATOR_REGISTRY_LIMIT)),
+    ("current_sync_committee", SyncCommittee), ("next_sync_committee", SyncCommittee),
+    ("latest_execution_payload_header", ExecutionPayloadHeader), ("next_withdrawal_index", uint64),
+    ("next_withdrawal_validator_index", uint64), ("historical_summaries", List(HistoricalSummary, 2**24)),
+]
+
+_ELECTRA_STATE_FIELDS = [
+    *_DENEB_STATE_FIELDS,
+    ("deposit_requests_start_index", uint64), ("deposit_balance_to_consume", uint64),
+    ("exit_balance_to_consume", uint64), ("earliest_exit_epoch", uint64),
+    ("consolidation_balance_to_consume", uint64), ("earliest_consolidation_epoch", uint64),
+    ("pending_deposits", List(Container("PendingDeposit", [
+        ("pubkey", Bytes48), ("withdrawal_credentials", Bytes32), ("amount", uint64), ("signature", Bytes96), ("slot", uint64),
+    ]), 2**27)),
+    ("pending_partial_withdrawals", List(Container("PendingPartialWithdrawal", [
+        ("validator_index", uint64), ("amount", uint64), ("withdrawable_epoch", uint64),
+    ]), 2**27)),
+    ("pending_consolidations", List(Container("PendingConsolidation", [
+        ("source_index", uint64), ("target_index", uint64),
+    ]), 2**18)),
+]
+
+_ELECTRA_EXECUTION_REQUESTS = Container("ExecutionRequests", [
+    ("deposits", List(Container("DepositRequest", [
+        ("pubkey", Bytes48), ("withdrawal_credentials", Bytes32), ("amount", uint64), ("signature", Bytes96), ("index", uint64),
+    ]), 8192)),
+    ("withdrawals", List(Container("WithdrawalRequest", [
+        ("source_address", Bytes20), ("validator_pubkey", Bytes48), ("amount", uint64),
+    ]), 16)),
+    ("consolidations", List(Container("ConsolidationRequest", [
+        ("source_address", Bytes20), ("source_pubkey", Bytes48), ("target_pubkey", Bytes48),
+    ]), 2)),
+])
+
+
+@dataclass(frozen=True)
+class ForkTypes:
+    name: str
+    BeaconState: Container
+    BeaconBlock: Container
+
+    @property
+    def SignedBeaconBlock(self) -> Container:
+        return Container("SignedBeaconBlock", [("message", self.BeaconBlock), ("signature", Bytes96)])
+
+
+FORKS = {
+    "deneb": ForkTypes(
+        "deneb",
+        Container("BeaconState", _DENEB_STATE_FIELDS),
+        _block(_body(
+            List(_attester_slashing(2048), 2),
+            List(Container("Attestation", [
+                ("aggregation_bits", Bitlist(2048)), ("data", AttestationData), ("signature", Bytes96),
+            ]), 128),
+            None,
+        )),
+    ),
+    "electra": ForkTypes(
+        "electra",
+        Container("BeaconState", _ELECTRA_STATE_FIELDS),
+        _block(_body(
+            List(_attester_slashing(2048 * 64), 1),
+            List(Container("Attestation", [
+                ("aggregation_bits", Bitlist(2048 * 64)), ("data", AttestationData), ("signature", Bytes96),
+                ("committee_bits", Bitvector(64)),
+            ]), 8),
+            _ELECTRA_EXECUTION_REQUESTS,
+        )),
+    ),
+}
+
+
+def block_message(data, fork: ForkTypes) -> memoryview:
+    """The BeaconBlock of a serialized SignedBeaconBlock, or the data itself if it is a BeaconBlock."""
+    data = memoryview(data)
+    # SignedBeaconBlock starts with the offset of the message, right after the 96-byte signature
+    if len(data) > 100 and int.from_bytes(data[:OFFSET_SIZE], "little") == OFFSET_SIZE + Bytes96.size:
+        return fork.SignedBeaconBlock.children(data)[0]
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hash tree roots and fields of SSZ beacon states and blocks")
+    parser.add_argument("file", type=Path)
+    parser.add_argument("--fork", choices=FORKS, default="electra")
+    parser.add_argument("--type", choices=["state", "block"], default="state")
+    parser.add_argument("--path", nargs="*", default=[], help="field names and list indices")
+    args = parser.parse_args()
+
+    fork = FORKS[args.fork]
+    data = load(args.file)
+    node = Node(fork.BeaconState, data) if args.type == "state" else Node(fork.BeaconBlock, block_message(data, fork))
+    path = [int(key) if key.isdigit() else key for key in args.path]
+    target = node.get(*path)
+    print(f"root: 0x{target.root.hex()}")
+    print(f"gindex: {node.type.gindex(*path)}")
+    if isinstance(target.type, (Uint, ByteVector, ByteList)):
+        value = target.type.decode(target.data)
+        print(f"value: {value if isinstance(value, int) else '0x' + value.hex()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# Timestamped JSON snapshots of network sources, shared between runs
+
+import json
+import os
+import time
+from pathlib import Path
+
+
+def amount(value: int) -> str:
+    """
+    JSON form of a wei amount. Amounts exceed what JSON readers keep exact as numbers
+    (2**53), so they are written as decimal strings and read back with int().
+    """
+    return str(int(value))
+
+
+def save(path: Path, data) -> float:
+    """
+    Atomically writes `data` with the current time as its fetch timestamp.
+    Returns the timestamp.
+    """
+    fetched_at = time.time()
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump({"fetched_at": fetched_at, "data": data}, f)
+    os.replace(tmp, path)
+    return fetched_at
+
+
+def load(path: Path) -> tuple[float, object] | None:
+    """
+    Returns (fetch timestamp, data) of the snapshot at `path`, or None if there is none.
+    """
+    try:
+        with open(path, "r") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    return snapshot["fetched_at"], snapshot["data"]
+
+
+def load_fresh(path: Path, ttl: float):
+    """
+    Returns the data of the snapshot at `path` if it was fetched less than `ttl` seconds ago.
+    """
+    snapshot = load(path)
+    if snapshot is None:
+        return None
+    fetched_at, data = snapshot
+    if time.time() - fetched_at >= ttl:
+        return None
+    return data
@@ -0,0 +1,399 @@
+# CSStrikes tree rebuilt from per-frame strikes
+#
+# CSStrikes commits to an OpenZeppelin standard Merkle tree of
+# (nodeOperatorId, pubkey, strikes) leaves: `hashLeaf` is
+# keccak256(bytes.concat(keccak256(abi.encode(nodeOperatorId, pubkey, data)))), the standard
+# leaf of ["uint256", "bytes", "uint256[]"], where `data` holds the strikes of the key in
+# the last `lifetime` frames, newest first. Keys whose strikes all expired leave the tree.
+#
+# Windows of every struck key are kept in a state file and aged by one frame per strikes
+# file folded in, so each report only reads its own frame. Files are told apart by the CIDv0
+# of their content, so a file passed again under another path doesn't age the windows twice. Leaves are ABI-encoded as NumPy
+# rows and hashed in batches, then `processBadPerformanceProof` calls are built in bulk
+# for every key at or above the threshold, with one multiproof per call:
+#     python -m common.strikes_tree <strikes file> [...] --state strikes.state.json \
+#         [--seed tree.json] [--root 0x... | --rpc URL --strikes 0x...] [--tree tree.json] \
+#         [--calls calls.json [--threshold 3] [--batch-size 50]]
+#
+# A strikes file is the frame's strikes of every validator of the module:
+#     {"strikes": [{"nodeOperatorId": 1, "keyIndex": 0, "pubkey": "0x...", "strikes": 1}, ...]}
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+from eth_abi import encode
+from web3 import Web3
+
+from common import ipfs, merkle, rewards_tree, store
+from common.keccak import keccak256, keccak256_batch
+
+LEAF_ENCODING = ["uint256", "bytes", "uint256[]"]
+PUBKEY_LENGTH = 48
+# Defaults of CSParametersRegistry
+DEFAULT_LIFETIME = 6
+DEFAULT_THRESHOLD = 3
+DEFAULT_BATCH_SIZE = 50
+# Node operator ID as 8 big-endian bytes followed by the pubkey, ordering like (id, pubkey)
+KEY_DTYPE = f"S{8 + PUBKEY_LENGTH}"
+PROCESS_BAD_PERFORMANCE_PROOF_SELECTOR = "0x" + keccak256(
+    b"processBadPerformanceProof((uint256,uint256,uint256[])[],bytes32[],bool[],address)"
+)[:4].hex()
+
+
+def _pubkey(pubkey) -> bytes:
+    raw = bytes.fromhex(pubkey.removeprefix("0x")) if isinstance(pubkey, str) else bytes(pubkey)
+    if len(raw) != PUBKEY_LENGTH:
+        raise ValueError(f"Expected a {PUBKEY_LENGTH}-byte pubkey, got {len(raw)} bytes")
+    return raw
+
+
+def hash_leaf(node_operator_id: int, pubkey, data: list[int]) -> bytes:
+    """CSStrikes.hashLeaf"""
+    return merkle.leaf_hash(LEAF_ENCODING, [node_operator_id, _pubkey(pubkey), list(data)])
+
+
+def leaf_hashes(operator_ids: np.ndarray, pubkeys: np.ndarray, windows: np.ndarray) -> np.ndarray:
+    """
+    (N, 32) leaf hashes of N keys whose windows have the same length. abi.encode of a leaf
+    is fixed-size then, so all of them are encoded as rows of one array and hashed at once.
+    """
+    count, width = windows.shape
+    head = 4 * 32  # id, offsets of pubkey and data, pubkey length
+    encoded = np.zeros((count, head + 64 + 32 + 32 * width), dtype=np.uint8)
+    encoded[:, 24:32] = np.asarray(operator_ids, dtype=">u8").reshape(-1, 1).view(np.uint8)
+    encoded[:, 63] = 0x60
+    encoded[:, 95] = head + 64
+    encoded[:, 127] = PUBKEY_LENGTH
+    encoded[:, head:head + PUBKEY_LENGTH] = pubkeys
+    words = encoded[:, head + 64:].reshape(count, width + 1, 32)
+    words[:, 0, 24:] = np.array([width], dtype=">u8").view(np.uint8)
+    words[:, 1:, 24:] = np.asarray(windows, dtype=">u8").reshape(count, width, 1).view(np.uint8)
+    return keccak256_batch(keccak256_batch(encoded))
+
+
+def _keys(operator_ids: np.ndarray, pubkeys: np.ndarray) -> np.ndarray:
+    raw = np.empty((len(operator_ids), 8 + PUBKEY_LENGTH), dtype=np.uint8)
+    raw[:, :8] = np.asarray(operator_ids, dtype=">u8").reshape(-1, 1).view(np.uint8)
+    raw[:, 8:] = pubkeys
+    return raw.view(KEY_DTYPE).ravel()
+
+
+@dataclass(eq=False)
+class StrikesState:
+    lifetime: int = DEFAULT_LIFETIME
+    # Lifetimes of operators whose bond curve doesn't use the default one
+    lifetimes: dict[int, int] = field(default_factory=dict)
+    # Per struck key, sorted by (operator ID, pubkey); `key_indices` is -1 where unknown
+    operator_ids: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    pubkeys: np.ndarray = field(default_factory=lambda: np.zeros((0, PUBKEY_LENGTH), dtype=np.uint8))
+    key_indices: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    # Strikes of every key in the last frames, newest first, as wide as the longest lifetime
+    windows: np.ndarray = field(default_factory=lambda: np.zeros((0, DEFAULT_LIFETIME), dtype=np.uint32))
+    # Content CIDs of the strikes files folded in, in order
+    frames: list[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.operator_ids)
+
+    @property
+    def width(self) -> int:
+        return max([self.lifetime, *self.lifetimes.values()])
+
+    def row_lifetimes(self) -> np.ndarray:
+        lifetimes = np.full(len(self), self.lifetime, dtype=np.int64)
+        if self.lifetimes:
+            ids = np.array(sorted(self.lifetimes), dtype=np.int64)
+            values = np.array([self.lifetimes[i] for i in ids.tolist()], dtype=np.int64)
+            positions = np.minimum(ids.searchsorted(self.operator_ids), len(ids) - 1)
+            custom = ids[positions] == self.operator_ids
+            lifetimes[custom] = values[positions[custom]]
+        return lifetimes
+
+    def _take(self, rows: np.ndarray):
+        self.operator_ids = self.operator_ids[rows]
+        self.pubkeys = self.pubkeys[rows]
+        self.key_indices = self.key_indices[rows]
+        self.windows = self.windows[rows]
+
+    def _expire(self):
+        """Drops strikes older than the lifetime of each key, then the keys left without any."""
+        if self.windows.shape[1] < self.width:
+            widened = np.zeros((len(self), self.width), dtype=np.uint32)
+            widened[:, :self.windows.shape[1]] = self.windows
+            self.windows = widened
+        self.windows[np.arange(self.windows.shape[1]) >= self.row_lifetimes()[:, None]] = 0
+        self._take(np.flatnonzero(self.windows.any(axis=1)))
+
+    def fold_frame(
+        self,
+        operator_ids: np.ndarray,
+        pubkeys: np.ndarray,
+        strikes: np.ndarray,
+        key_indices: np.ndarray | None = None,
+    ):
+        """
+        Ages every window by one frame and records the strikes the keys got in it. Keys
+        not listed got none; listed keys with no strikes only update known key indices.
+        """
+        operator_ids = np.asarray(operator_ids, dtype=np.int64)
+        strikes = np.asarray(strikes, dtype=np.uint32)
+        key_indices = np.full(len(operator_ids), -1, dtype=np.int64) if key_indices is None else np.asarray(key_indices, dtype=np.int64)
+        keys = _keys(operator_ids, pubkeys)
+        if len(np.unique(keys)) != len(keys):
+            raise ValueError("The frame lists a key more than once")
+
+        self.windows[:, 1:] = self.windows[:, :-1]
+        self.windows[:, 0] = 0
+
+        current = _keys(self.operator_ids, self.pubkeys)
+        positions = np.minimum(current.searchsorted(keys), max(len(current) - 1, 0))
+        found = (current[positions] == keys) if len(current) else np.zeros(len(keys), dtype=bool)
+        rows = positions[found]
+        self.windows[rows, 0] = strikes[found]
+        known = found & (key_indices >= 0)
+        self.key_indices[positions[known]] = key_indices[known]
+
+        new = ~found & (strikes > 0)
+        if new.any():
+            windows = np.zeros((int(new.sum()), self.windows.shape[1]), dtype=np.uint32)
+            windows[:, 0] = strikes[new]
+            self.operator_ids = np.concatenate([self.operator_ids, operator_ids[new]])
+            self.pubkeys = np.concatenate([self.pubkeys, np.asarray(pubkeys, dtype=np.uint8)[new]])
+            self.key_indices = np.concatenate([self.key_indices, key_indices[new]])
+            self.windows = np.concatenate([self.windows, windows])
+            self._take(np.argsort(_keys(self.operator_ids, self.pubkeys), kind="stable"))
+        self._expire()
+
+    def fold_file(self, path: Path) -> bool:
+        """Folds a strikes file in once; False if one with the same content was folded already."""
+        raw = Path(path).read_bytes()
+        cid = ipfs.cid_v0(raw)
+        if cid in self.frames:
+            return False
+        entries = json.loads(raw)["strikes"]
+        self.fold_frame(
+            np.array([int(e["nodeOperatorId"]) for e in entries], dtype=np.int64),
+            np.frombuffer(b"".join(_pubkey(e["pubkey"]) for e in entries), dtype=np.uint8).reshape(-1, PUBKEY_LENGTH),
+            np.array([int(e["strikes"]) for e in entries], dtype=np.uint32),
+            np.array([-1 if e.get("keyIndex") is None else int(e["keyIndex"]) for e in entries], dtype=np.int64),
+        )
+        self.frames.append(cid)
+        return True
+
+    def data(self) -> list[list[int]]:
+        """Leaf data of every key: its window cut to its lifetime."""
+        return [row[:lifetime] for row, lifetime in zip(self.windows.tolist(), self.row_lifetimes().tolist())]
+
+    def leaves(self) -> np.ndarray:
+        """Leaf hashes of every key, hashed in one batch per lifetime."""
+        hashes = np.empty((len(self), 32), dtype=np.uint8)
+        lifetimes = self.row_lifetimes()
+        for lifetime in np.unique(lifetimes).tolist():
+            rows = lifetimes == lifetime
+            hashes[rows] = leaf_hashes(self.operator_ids[rows], self.pubkeys[rows], self.windows[rows, :lifetime])
+        return hashes
+
+    def tree(self) -> merkle.StandardMerkleTree:
+        if not len(self):
+            raise ValueError("No strikes to build a tree of")
+        values = [
+            [no_id, "0x" + pubkey.hex(), data]
+            for no_id, pubkey, data in zip(self.operator_ids.tolist(), map(bytes, self.pubkeys), self.data())
+        ]
+        return merkle.StandardMerkleTree.from_leaves(values, self.leaves(), LEAF_ENCODING)
+
+    def key_index_of(self) -> dict[tuple[int, str], int]:
+        """Known key indices by (operator ID, pubkey hex)."""
+        return {
+            (no_id, "0x" + bytes(pubkey).hex()): key_index
+            for no_id, pubkey, key_index in zip(self.operator_ids.tolist(), self.pubkeys, self.key_indices.tolist())
+            if key_index >= 0
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "lifetime": self.lifetime,
+            "lifetimes": {str(no_id): lifetime for no_id, lifetime in self.lifetimes.items()},
+            "frames": self.frames,
+            "keys": [
+                [no_id, "0x" + bytes(pubkey).hex(), key_index, data]
+                for no_id, pubkey, key_index, data in zip(
+                    self.operator_ids.tolist(), self.pubkeys, self.key_indices.tolist(), self.data()
+                )
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StrikesState":
+        state = cls(
+            lifetime=data["lifetime"],
+            lifetimes={int(no_id): lifetime for no_id, lifetime in data["lifetimes"].items()},
+            frames=list(data["frames"]),
+        )
+        state._load_keys(data["keys"])
+        return state
+
+    @classmethod
+    def from_tree(cls, dump: dict, lifetime: int = DEFAULT_LIFETIME, lifetimes: dict[int, int] | None = None) -> "StrikesState":
+        """State seeded with the leaves of a published strikes tree dump."""
+        if dump["leafEncoding"] != LEAF_ENCODING:
+            raise ValueError(f"Expected a strikes tree, got {dump['leafEncoding']}")
+        state = cls(lifetime=lifetime, lifetimes=dict(lifetimes or {}))
+        state._load_keys([(v["value"][0], v["value"][1], -1, v["value"][2]) for v in dump["values"]])
+        return state
+
+    def _load_keys(self, rows: list[tuple]):
+        self.operator_ids = np.array([int(r[0]) for r in rows], dtype=np.int64)
+        self.pubkeys = np.frombuffer(b"".join(_pubkey(r[1]) for r in rows), dtype=np.uint8).reshape(-1, PUBKEY_LENGTH)
+        self.key_indices = np.array([int(r[2]) for r in rows], dtype=np.int64)
+        self.windows = np.zeros((len(rows), self.width), dtype=np.uint32)
+        for i, r in enumerate(rows):
+            self.windows[i, :len(r[3])] = [int(s) for s in r[3]][:self.width]
+        self._take(np.argsort(_keys(self.operator_ids, self.pubkeys), kind="stable"))
+        self._expire()
+
+
+def load_state(path: Path, lifetime: int = DEFAULT_LIFETIME) -> StrikesState:
+    snapshot = store.load(path)
+    return StrikesState(lifetime=lifetime) if snapshot is None else StrikesState.from_dict(snapshot[1])
+
+
+def save_state(path: Path, state: StrikesState):
+    store.save(path, state.to_dict())
+
+
+def ejectable(tree: merkle.StandardMerkleTree, threshold: int = DEFAULT_THRESHOLD, thresholds: dict[int, int] | None = None) -> list[int]:
+    """Indices of the values of `tree` whose strikes add up to the threshold of their operator."""
+    thresholds = thresholds or {}
+    return [
+        i for i, (no_id, _, data) in tree.entries()
+        if sum(int(s) for s in data) >= thresholds.get(int(no_id), threshold)
+    ]
+
+
+def penalty_calls(
+    tree: merkle.StandardMerkleTree,
+    indices: list[int],
+    key_index_of: dict[tuple[int, str], int] | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> list[dict]:
+    """
+    `processBadPerformanceProof` arguments for the values at `indices`, at most
+    `batch_size` keys per call. Keys are batched in tree order, so the leaves of a call
+    are neighbours and share most of their proof. `keyIndex` is None where unknown.
+    """
+    key_index_of = key_index_of or {}
+    ordered = sorted(indices, key=lambda i: tree.values[i]["treeIndex"])
+    calls = []
+    for start in range(0, len(ordered), batch_size):
+        order, proof, proof_flags = tree.get_multi_proof(ordered[start:start + batch_size])
+        values = [tree.values[i]["value"] for i in order]
+        calls.append({
+            "keyStrikesList": [
+                {
+                    "nodeOperatorId": int(no_id),
+                    "keyIndex": key_index_of.get((int(no_id), pubkey.lower())),
+                    "data": [int(s) for s in data],
+                }
+                for no_id, pubkey, data in values
+            ],
+            "pubkeys": [pubkey.lower() for _, pubkey, _ in values],
+            "proof": proof,
+            "proofFlags": proof_flags,
+        })
+    return calls
+
+
+def verify_call(root: str, call: dict) -> bool:
+    """Checks a call like CSStrikes.verifyProof, given the pubkeys it reads from the module."""
+    key_strikes = call["keyStrikesList"]
+    if len({len(k["data"]) for k in key_strikes}) == 1:
+        leaves = [leaf.tobytes() for leaf in leaf_hashes(
+            np.array([k["nodeOperatorId"] for k in key_strikes], dtype=np.int64),
+            np.frombuffer(b"".join(_pubkey(p) for p in call["pubkeys"]), dtype=np.uint8).reshape(-1, PUBKEY_LENGTH),
+            np.array([k["data"] for k in key_strikes], dtype=np.uint64),
+        )]
+    else:
+        leaves = [hash_leaf(k["nodeOperatorId"], p, k["data"]) for k, p in zip(key_strikes, call["pubkeys"])]
+    try:
+        return "0x" + merkle.process_multi_proof(leaves, call["proof"], call["proofFlags"]).hex() == root.lower()
+    except (ValueError, IndexError):
+        return False
+
+
+def penalty_calldata(call: dict, refund_recipient: str = "0x" + "00" * 20) -> str:
+    """Calldata of `processBadPerformanceProof`; keys must have known indices."""
+    key_strikes = [(k["nodeOperatorId"], k["keyIndex"], k["data"]) for k in call["keyStrikesList"]]
+    if any(key_index is None for _, key_index, _ in key_strikes):
+        raise ValueError("Key index unknown")
+    args = encode(
+        ["(uint256,uint256,uint256[])[]", "bytes32[]", "bool[]", "address"],
+        [key_strikes, [bytes.fromhex(p[2:]) for p in call["proof"]], call["proofFlags"], refund_recipient],
+    )
+    return PROCESS_BAD_PERFORMANCE_PROOF_SELECTOR + args.hex()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the CSStrikes tree from per-frame strikes")
+    parser.add_argument("frames", nargs="*", type=Path, help="strikes files, oldest first")
+    parser.add_argument("--state", type=Path, help="strike windows kept between runs")
+    parser.add_argument("--seed", type=Path, help="start from a published tree dump instead of an empty state")
+    parser.add_argument("--lifetime", type=int, default=DEFAULT_LIFETIME, help="strikes lifetime in frames")
+    parser.add_argument("--params", type=Path, help='per-operator {"<id>": {"lifetime": ..., "threshold": ...}}')
+    parser.add_argument("--root", help="expected tree root")
+    parser.add_argument("--rpc", help="RPC URL to read treeRoot() from")
+    parser.add_argument("--strikes", help="CSStrikes address, with --rpc")
+    parser.add_argument("--tree", type=Path, help="write the tree dump")
+    parser.add_argument("--calls", type=Path, help="write processBadPerformanceProof calls of keys to eject")
+    parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="keys per call")
+    args = parser.parse_args()
+
+    params = {}
+    if args.params:
+        with open(args.params, "r") as f:
+            params = {int(no_id): p for no_id, p in json.load(f).items()}
+    lifetimes = {no_id: p["lifetime"] for no_id, p in params.items() if "lifetime" in p}
+    thresholds = {no_id: p["threshold"] for no_id, p in params.items() if "threshold" in p}
+
+    if args.seed and not (args.state and args.state.exists()):
+        with open(args.seed, "r") as f:
+            state = StrikesState.from_tree(json.load(f), args.lifetime, lifetimes)
+    else:
+        state = load_state(args.state, args.lifetime) if args.state else StrikesState(lifetime=args.lifetime)
+        state.lifetimes.update(lifetimes)
+    folded = [path for path in args.frames if state.fold_file(path)]
+    if args.state:
+        save_state(args.state, state)
+    print(f"Folded {len(folded)} new frames, {len(state.frames)} frames in total, {len(state)} keys with strikes")
+
+    tree = state.tree()
+    print(f"Root: {tree.root}")
+    if args.tree:
+        merkle.write_tree(args.tree, tree)
+    if args.calls:
+        calls = penalty_calls(tree, ejectable(tree, args.threshold, thresholds), state.key_index_of(), args.batch_size)
+        bad = [i for i, call in enumerate(calls) if not verify_call(tree.root, call)]
+        if bad:
+            print(f"🚨 Calls {bad} don't verify against the root")
+            sys.exit(1)
+        with open(args.calls, "w") as f:
+            json.dump(calls, f)
+        print(f"{sum(len(c['keyStrikesList']) for c in calls)} keys to eject in {len(calls)} calls")
+
+    expected = args.root
+    if expected is None and args.rpc and args.strikes:
+        expected = rewards_tree.onchain_root(Web3(Web3.HTTPProvider(args.rpc)), args.strikes)
+    if expected is not None:
+        if expected.lower() != tree.root:
+            print(f"🚨 Root mismatch: expected {expected}")
+            sys.exit(1)
+        print("Root matches ✅")
+
+
+if __name__ == "__main__":
+    main()
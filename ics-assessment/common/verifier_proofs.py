@@ -0,0 +1,312 @@
+# CSVerifier withdrawal proofs from local beacon states and blocks
+#
+# Builds the arguments of `processWithdrawalProof` and `processHistoricalWithdrawalProof`
+# from SSZ files (e.g. /eth/v2/debug/beacon/states/{slot} and /eth/v2/beacon/blocks/{slot}
+# with `Accept: application/octet-stream`). Generalized indices are derived from the
+# common/ssz.py types the way script/gindex.mjs does and packed like src/lib/GIndex.sol;
+# `_getValidatorGI`, `_getWithdrawalGI` and `_getHistoricalBlockRootGI` are ported as is.
+# A state is hashed once per run, so every withdrawal of a block is proven from the same
+# cached tree. Each proof is checked with a port of `SSZ.verifyProof` before it is written.
+# Withdrawals are matched to the module's keys through the common/signing_keys.py index, which
+# gives the `nodeOperatorId` and `keyIndex` arguments, so every proof is a complete call.
+#     python -m common.verifier_proofs gindices
+#     python -m common.verifier_proofs withdrawal --state state.ssz --block block.ssz --roots-timestamp T [--validator 42 ...] --out proofs.json
+#     python -m common.verifier_proofs historical --state state.ssz --block block.ssz --old-state old.ssz --old-block old_block.ssz --summary-state summary.ssz --roots-timestamp T --out proofs.json
+
+import argparse
+import json
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+import numpy as np
+
+from common import signing_keys, ssz
+from common.signing_keys import PubkeyIndex
+from common.ssz import FORKS, ForkTypes
+
+GWEI = 10**9
+# CSVerifier treats smaller unslashed withdrawals as partial ones
+MIN_FULL_WITHDRAWAL_GWEI = 8 * GWEI
+
+
+def fork_gindices(fork: ForkTypes) -> dict[str, int]:
+    """Packed gindices of the CSVerifier constructor for a fork, as script/gindex.mjs prints them."""
+    state = fork.BeaconState
+    withdrawals_type = ssz.List(ssz.Withdrawal, ssz.MAX_WITHDRAWALS_PER_PAYLOAD)
+    block_roots = ssz.Vector(ssz.Bytes32, ssz.SLOTS_PER_HISTORICAL_ROOT)
+    validators = state.child_type(state.field_index("validators"))
+    summaries = state.child_type(state.field_index("historical_summaries"))
+    return {
+        "gIFirstWithdrawal": ssz.concat(
+            ssz.pack(state.gindex("latest_execution_payload_header", "withdrawals_root"), 0),
+            ssz.pack(withdrawals_type.gindex(0), _log2(withdrawals_type.limit)),
+        ),
+        "gIFirstValidator": ssz.pack(state.gindex("validators", 0), _log2(validators.limit)),
+        "gIFirstHistoricalSummary": ssz.pack(state.gindex("historical_summaries", 0), _log2(summaries.limit)),
+        "gIFirstBlockRootInSummary": ssz.concat(
+            ssz.pack(ssz.HistoricalSummary.gindex("block_summary_root"), 0),
+            ssz.pack(block_roots.gindex(0), _log2(block_roots.count)),
+        ),
+    }
+
+
+def _log2(limit: int) -> int:
+    return limit.bit_length() - 1
+
+
+@dataclass(frozen=True)
+class VerifierConfig:
+    # Forks whose gindices the verifier was deployed with, before and from `pivot_slot`
+    prev: ForkTypes
+    curr: ForkTypes
+    first_supported_slot: int
+    pivot_slot: int
+    capella_slot: int
+    slots_per_epoch: int = 32
+    slots_per_historical_root: int = ssz.SLOTS_PER_HISTORICAL_ROOT
+    withdrawal_address: bytes | None = None
+
+    def gindices(self, slot: int) -> dict[str, int]:
+        return fork_gindices(self.prev if slot < self.pivot_slot else self.curr)
+
+    def validator_gindex(self, validator_index: int, state_slot: int) -> int:
+        return ssz.shr(self.gindices(state_slot)["gIFirstValidator"], validator_index)
+
+    def withdrawal_gindex(self, offset: int, state_slot: int) -> int:
+        return ssz.shr(self.gindices(state_slot)["gIFirstWithdrawal"], offset)
+
+    def historical_block_root_gindex(self, recent_slot: int, target_slot: int) -> int:
+        summary_index = (target_slot - self.capella_slot) // self.slots_per_historical_root
+        root_index = target_slot % self.slots_per_historical_root
+        summary_created_at = target_slot - root_index + self.slots_per_historical_root
+        if summary_created_at > recent_slot:
+            raise ValueError("HistoricalSummaryDoesNotExist")
+        gindex = ssz.shr(self.gindices(recent_slot)["gIFirstHistoricalSummary"], summary_index)
+        gindex = ssz.concat(gindex, self.gindices(summary_created_at)["gIFirstBlockRootInSummary"])
+        return ssz.shr(gindex, root_index)
+
+
+# DeployMainnet.s.sol and DeployHoodi.s.sol: Electra gindices, pivot at the first supported slot;
+# withdrawal vaults as in DeployCSVerifierElectra.s.sol
+NETWORKS = {
+    "mainnet": VerifierConfig(
+        FORKS["electra"], FORKS["electra"], 364032 * 32, 364032 * 32, 194048 * 32,
+        withdrawal_address=bytes.fromhex("B9D7934878B5FB9610B3fE8A5e441e8fad7E293f"),
+    ),
+    "hoodi": VerifierConfig(
+        FORKS["electra"], FORKS["electra"], 2048 * 32, 2048 * 32, 0,
+        withdrawal_address=bytes.fromhex("4473dCDDbf77679A643BdB654dbd86D67F8d32f2"),
+    ),
+}
+
+
+def _hex(value: bytes) -> str:
+    return "0x" + bytes(value).hex()
+
+
+def header_root(header: dict) -> bytes:
+    """Root of a BeaconBlockHeader in the ProvableBeaconBlockHeader field names."""
+    return ssz.BeaconBlockHeader.hash_tree_root(ssz.BeaconBlockHeader.encode({
+        "slot": header["slot"],
+        "proposer_index": header["proposerIndex"],
+        "parent_root": header["parentRoot"],
+        "state_root": header["stateRoot"],
+        "body_root": header["bodyRoot"],
+    }))
+
+
+class BlockState:
+    """A block and its post-state, hashed once for any number of proofs against them."""
+
+    def __init__(self, fork: ForkTypes, state_data, block_data):
+        self.fork = fork
+        self.state = ssz.Node(fork.BeaconState, state_data)
+        self.block = ssz.Node(fork.BeaconBlock, ssz.block_message(block_data, fork))
+        self.slot = self.block.value("slot")
+
+    @classmethod
+    def load(cls, fork: ForkTypes, state_path: Path, block_path: Path) -> "BlockState":
+        return cls(fork, ssz.load(state_path), ssz.load(block_path))
+
+    def header(self) -> dict:
+        """The block's BeaconBlockHeader, checked against the state it commits to."""
+        if self.block.value("state_root") != self.state.root:
+            raise ValueError(f"Block {self.slot} does not commit to the given state")
+        return {
+            "slot": self.slot,
+            "proposerIndex": self.block.value("proposer_index"),
+            "parentRoot": _hex(self.block.value("parent_root")),
+            "stateRoot": _hex(self.state.root),
+            "bodyRoot": _hex(self.block.child("body").root),
+        }
+
+    @property
+    def withdrawals(self) -> ssz.Node:
+        return self.block.get("body", "execution_payload", "withdrawals")
+
+    def validator_pubkeys(self, validator_indices) -> np.ndarray:
+        """(N, 48) pubkeys of validators, cut out of the state without decoding it."""
+        validators = self.state.child("validators")
+        rows = ssz.as_rows(validators.data, ssz.Validator.size)
+        return rows[np.asarray(validator_indices, dtype=np.int64), :ssz.Bytes48.size]
+
+    def withdrawal_witness(self, offset: int, config: VerifierConfig) -> dict:
+        """WithdrawalWitness of the `offset`th withdrawal of the block."""
+        withdrawal = self.withdrawals.value(offset)
+        validator_index = withdrawal["validator_index"]
+        validator = self.state.value("validators", validator_index)
+        state_root = self.state.root
+
+        validator_gindex = ssz.index(config.validator_gindex(validator_index, self.slot))
+        validator_leaf, validator_proof = self.state.prove(validator_gindex)
+
+        withdrawals_root = self.fork.BeaconState.gindex("latest_execution_payload_header", "withdrawals_root")
+        committed, outer = self.state.prove(withdrawals_root)
+        if committed != self.withdrawals.root:
+            raise ValueError(f"Withdrawals of block {self.slot} don't match the state's payload header")
+        withdrawal_leaf, inner = self.withdrawals.prove(self.withdrawals.type.gindex(offset))
+        withdrawal_proof = inner + outer
+        withdrawal_gindex = ssz.index(config.withdrawal_gindex(offset, self.slot))
+
+        for leaf, proof, gindex in (
+            (validator_leaf, validator_proof, validator_gindex),
+            (withdrawal_leaf, withdrawal_proof, withdrawal_gindex),
+        ):
+            if not ssz.verify_proof(proof, state_root, leaf, gindex):
+                raise ValueError(f"Proof for gindex {gindex} doesn't verify, check the fork and verifier config")
+
+        return {
+            "withdrawalOffset": offset,
+            "withdrawalIndex": withdrawal["index"],
+            "validatorIndex": validator_index,
+            "amount": withdrawal["amount"],
+            "withdrawalCredentials": _hex(validator["withdrawal_credentials"]),
+            "effectiveBalance": validator["effective_balance"],
+            "slashed": validator["slashed"],
+            "activationEligibilityEpoch": validator["activation_eligibility_epoch"],
+            "activationEpoch": validator["activation_epoch"],
+            "exitEpoch": validator["exit_epoch"],
+            "withdrawableEpoch": validator["withdrawable_epoch"],
+            "withdrawalProof": [_hex(p) for p in withdrawal_proof],
+            "validatorProof": [_hex(p) for p in validator_proof],
+        }
+
+    def historical_witness(self, old_header: dict, summary_state: ssz.Node, config: VerifierConfig) -> dict:
+        """
+        HistoricalHeaderWitness of an older block header against this state. The historical summary holds
+        only the root of the block roots it was made of, so the proof goes through the
+        `block_roots` of `summary_state`, the state at the slot the summary was created.
+        """
+        old_slot = old_header["slot"]
+        summary_index = (old_slot - config.capella_slot) // config.slots_per_historical_root
+        root_index = old_slot % config.slots_per_historical_root
+        block_roots = summary_state.child("block_roots")
+        summary_root, outer = self.state.prove(
+            self.fork.BeaconState.gindex("historical_summaries", summary_index, "block_summary_root")
+        )
+        if block_roots.root != summary_root:
+            raise ValueError(f"Block roots don't match historical summary {summary_index}")
+        leaf, inner = block_roots.prove(block_roots.type.gindex(root_index))
+        if leaf != header_root(old_header):
+            raise ValueError(f"Block {old_slot} is not in historical summary {summary_index}")
+        proof = inner + outer
+        gindex = ssz.index(config.historical_block_root_gindex(self.slot, old_slot))
+        if not ssz.verify_proof(proof, self.state.root, leaf, gindex):
+            raise ValueError(f"Proof for gindex {gindex} doesn't verify, check the fork and verifier config")
+        return {"header": old_header, "proof": [_hex(p) for p in proof]}
+
+
+def reportable(witness: dict, state_slot: int, config: VerifierConfig) -> str | None:
+    """Why CSVerifier would reject the withdrawal, or None."""
+    address = bytes.fromhex(witness["withdrawalCredentials"][2:])[12:]
+    if config.withdrawal_address is not None and address != config.withdrawal_address:
+        return "InvalidWithdrawalAddress"
+    if state_slot // config.slots_per_epoch < witness["withdrawableEpoch"]:
+        return "ValidatorNotWithdrawn"
+    if not witness["slashed"] and witness["amount"] < MIN_FULL_WITHDRAWAL_GWEI:
+        return "PartialWithdrawal"
+    return None
+
+
+def withdrawal_offsets(block_state: BlockState, index: PubkeyIndex, validator_indices=None,
+                       withdrawal_address: bytes | None = None) -> list[tuple[int, int, int]]:
+    """
+    (offset, node operator ID, key index) of the block's withdrawals of the module's keys, or of
+    the given validators among them. With `withdrawal_address`, only withdrawals paid to it.
+    """
+    withdrawals = block_state.withdrawals.value()
+    if not withdrawals:
+        return []
+    validators = [w["validator_index"] for w in withdrawals]
+    operators, key_indices = index.locate(block_state.validator_pubkeys(validators))
+    selected = operators >= 0
+    if withdrawal_address is not None:
+        selected &= np.array([bytes(w["address"]) == withdrawal_address for w in withdrawals])
+    if validator_indices is not None:
+        selected &= np.isin(validators, list(validator_indices))
+    return [(int(offset), int(operators[offset]), int(key_indices[offset])) for offset in np.flatnonzero(selected)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build CSVerifier withdrawal proofs from SSZ states and blocks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("gindices", help="print the packed gindices of every fork")
+    for name in ("withdrawal", "historical"):
+        command = commands.add_parser(name)
+        command.add_argument("--state", type=Path, required=True, help="post-state of --block")
+        command.add_argument("--block", type=Path, required=True, help="(signed) beacon block")
+        command.add_argument("--fork", choices=FORKS, default="electra")
+        command.add_argument("--network", choices=NETWORKS, default="mainnet")
+        command.add_argument("--withdrawal-address", help="withdrawal vault of the network by default")
+        command.add_argument("--roots-timestamp", type=int, required=True,
+                             help="timestamp of the EIP-4788 lookup returning the block's root")
+        command.add_argument("--validator", type=int, nargs="*", help="validator indices, every withdrawal by default")
+        command.add_argument("--signing-keys", type=Path, default=signing_keys.INDEX_FILE,
+                             help="pubkey index of the module, see common.signing_keys sync")
+        command.add_argument("--out", type=Path, required=True)
+        if name == "historical":
+            command.add_argument("--old-state", type=Path, required=True)
+            command.add_argument("--old-block", type=Path, required=True, help="block with the withdrawals")
+            command.add_argument("--old-fork", choices=FORKS, default="electra")
+            command.add_argument("--summary-state", type=Path, required=True,
+                                 help="state at the slot the old block's historical summary was created")
+    args = parser.parse_args()
+
+    if args.command == "gindices":
+        for name, fork in FORKS.items():
+            for key, gindex in fork_gindices(fork).items():
+                print(f"{name}::{key}: 0x{gindex:064x}")
+        return
+
+    config = NETWORKS[args.network]
+    if args.withdrawal_address:
+        config = replace(config, withdrawal_address=bytes.fromhex(args.withdrawal_address.removeprefix("0x")))
+    recent = BlockState.load(FORKS[args.fork], args.state, args.block)
+    beacon_block = {"header": recent.header(), "rootsTimestamp": args.roots_timestamp}
+    proven, old_block = recent, None
+    if args.command == "historical":
+        proven = BlockState.load(FORKS[args.old_fork], args.old_state, args.old_block)
+        summary_state = ssz.Node(FORKS[args.old_fork].BeaconState, ssz.load(args.summary_state))
+        old_block = recent.historical_witness(proven.header(), summary_state, config)
+
+    if not args.signing_keys.exists():
+        parser.error(f"{args.signing_keys} not found, build it with `python -m common.signing_keys sync`")
+    index = PubkeyIndex(args.signing_keys)
+    proofs = []
+    for offset, operator_id, key_index in withdrawal_offsets(proven, index, args.validator, config.withdrawal_address):
+        witness = proven.withdrawal_witness(offset, config)
+        if reason := reportable(witness, proven.slot, config):
+            print(f"    ⚠️ Validator {witness['validatorIndex']} skipped: {reason}")
+            continue
+        proof = {"beaconBlock": beacon_block}
+        if old_block is not None:
+            proof["oldBlock"] = old_block
+        proof.update(witness=witness, nodeOperatorId=operator_id, keyIndex=key_index)
+        proofs.append(proof)
+    with open(args.out, "w") as f:
+        json.dump(proofs, f, indent=2)
+    print(f"Saved {len(proofs)} withdrawal proofs for block {proven.slot} to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+# Refreshes the local Galxe leaderboard used by `galxe_scores`.
+# Run once before a batch of assessments, or whenever the stored copy is older than the TTL.
+from main import refresh_galxe_leaderboard, GALXE_LEADERBOARD_FILE
+
+if __name__ == '__main__':
+    refresh_galxe_leaderboard()
+    print(f"Galxe leaderboard written to {GALXE_LEADERBOARD_FILE}")
@@ -0,0 +1,7 @@
+# Rebuilds the local GitPoap holders index used by `gitpoap`.
+# Run once before a batch of assessments, or after updating gitpoap_events.csv.
+from main import refresh_gitpoap_index, GITPOAP_INDEX_FILE
+
+if __name__ == '__main__':
+    refresh_gitpoap_index()
+    print(f"GitPoap index written to {GITPOAP_INDEX_FILE}")
@@ -1,13 +1,20 @@
+import sys
 from collections import defaultdict
+from pathlib import Path
 
 from web3 import Web3
 
+sys.path.append(str(Path(__file__).parent.parent.resolve()))
+from common import log_scanner, rpc_cache  # noqa: E402
+
 RPC_URL = "http://localhost:8545/"
 ARAGON_BLOCK_CUTOFF = 23281557 # TODO update
 REQUIRED_LDO = 100 * 10 ** 18  # 100 LDO in wei
+# Scanned chunks, so an interrupted run resumes where it stopped
+SCAN_CHECKPOINT = Path(__file__).parent / "aragon_votes.scan.jsonl"
 
 if __name__ == '__main__':
-    w3 = Web3(Web3.HTTPProvider(RPC_URL))
+    w3 = Web3(rpc_cache.CachedProvider(Web3.HTTPProvider(RPC_URL)))
 
     voting_address = Web3.to_checksum_address("0x2e59A20f205bB85a89C53f1936454680651E618e")
     voting_deployment_block = 11473216
@@ -15,9 +22,13 @@ if __name__ == '__main__':
     # event CastVote(uint256 indexed voteId, address indexed voter, bool supports, uint256 stake);
     abi = '[{"anonymous":false,"inputs":[{"indexed":true,"name":"voteId","type":"uint256"},{"indexed":true,"name":"voter","type":"address"},{"indexed":false,"name":"supports","type":"bool"},{"indexed":false,"name":"stake","type":"uint256"}],"name":"CastVote","type":"event"}]'
     contract = w3.eth.contract(address=voting_address, abi=abi, decode_tuples=True)
-    logs = contract.events.CastVote().get_logs(
-            fromBlock=voting_deployment_block,
-            toBlock=ARAGON_BLOCK_CUTOFF
+    logs = log_scanner.scan_logs(
+        w3,
+        {"address": voting_address, "topics": [log_scanner.topic("CastVote(uint256,address,bool,uint256)")]},
+        from_block=voting_deployment_block,
+        to_block=ARAGON_BLOCK_CUTOFF,
+        decode=contract.events.CastVote().process_log,
+        checkpoint=SCAN_CHECKPOINT,
     )
 
     voters = defaultdict(set)
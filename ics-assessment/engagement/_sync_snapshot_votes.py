@@ -0,0 +1,7 @@
+# Mirrors Lido Snapshot votes up to SNAPSHOT_VOTE_TIMESTAMP for offline `snapshot_vote` checks.
+# Safe to rerun: syncing resumes from the last mirrored vote.
+from main import sync_snapshot_votes, SNAPSHOT_VOTES_FILE
+
+if __name__ == '__main__':
+    new_votes = sync_snapshot_votes()
+    print(f"Added {new_votes} votes to {SNAPSHOT_VOTES_FILE}")
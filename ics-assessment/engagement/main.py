@@ -2,12 +2,18 @@
 import csv
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import cache, partial
 from pathlib import Path
+from typing import Callable
 
 import requests
 from web3 import Web3
 
+sys.path.append(str(Path(__file__).parent.parent.resolve()))
+from common import address_index, fetch, store  # noqa: E402
+
 scores = {
     "snapshot-vote": 1,
     "aragon-vote": 2,
@@ -23,6 +29,8 @@ scores = {
 MIN_SCORE = 2
 MAX_SCORE = 7
 
+SNAPSHOT_SPACE = "lido-snapshot.eth"
+SNAPSHOT_GRAPHQL_URL = "https://hub.snapshot.org/graphql"
 SNAPSHOT_VOTE_TIMESTAMP = 1756890119  # TODO update
 REQUIRED_SNAPSHOT_VOTES = 3
 REQUIRED_SNAPSHOT_VP = 100  # 100 LDO
@@ -31,15 +39,29 @@ REQUIRED_ARAGON_VOTES = 2
 # TODO update dates
 HIGH_SIGNAL_START_DATE = datetime(2025, 7, 1)  # YYYY, MM, DD
 HIGH_SIGNAL_END_DATE = datetime(2025, 10, 1)  # YYYY, MM, DD
+HIGH_SIGNAL_RATE_LIMIT = 5  # requests per second
+
+# Local copy of the Galxe leaderboard, see _collect_galxe_leaderboard.py
+GALXE_LEADERBOARD_FILE = "galxe_leaderboard.json"
+GALXE_LEADERBOARD_TTL = 24 * 60 * 60  # seconds
+
+# Local address -> events index of GitPoap holders, see _collect_gitpoap_index.py
+GITPOAP_INDEX_FILE = "gitpoap_index.json"
+GITPOAP_INDEX_TTL = 24 * 60 * 60  # seconds
+GITPOAP_CONCURRENCY = 16
+
+# Local mirror of all Lido space Snapshot votes, see _sync_snapshot_votes.py
+SNAPSHOT_VOTES_FILE = "snapshot_votes.csv"
+SNAPSHOT_SYNC_STATE_FILE = "snapshot_votes.state.json"
+SNAPSHOT_SYNC_PAGE_SIZE = 1000
 
 current_dir = Path(__file__).parent.resolve()
 
 
-def snapshot_vote(addresses: set[str]) -> int:
+def _fetch_snapshot_votes_count(addresses: set[str]) -> int:
     """
-    Check if the address has participated in Snapshot votes.
+    Queries hub.snapshot.org for up to REQUIRED_SNAPSHOT_VOTES qualifying votes of `addresses`.
     """
-    lido_space = "lido-snapshot.eth"
     query = """
     query Votes {
       votes (
@@ -62,17 +84,121 @@ def snapshot_vote(addresses: set[str]) -> int:
     }
     """ % (
         REQUIRED_SNAPSHOT_VOTES,
-        lido_space,
+        SNAPSHOT_SPACE,
         ", ".join(map(lambda x: '"' + x + '"', addresses)),
         REQUIRED_SNAPSHOT_VP,
         SNAPSHOT_VOTE_TIMESTAMP
     )
-    response = requests.post("https://hub.snapshot.org/graphql", json={"query": query})
+    response = requests.post(SNAPSHOT_GRAPHQL_URL, json={"query": query})
     response.raise_for_status()
     result = response.json()
     if "errors" in result:
         raise Exception(f"Error fetching Snapshot votes: {result['errors']}", query)
-    votes_count = len(result["data"]["votes"])
+    return len(result["data"]["votes"])
+
+
+def _read_snapshot_mirror_tail(votes_file: Path) -> tuple[int, set[str]]:
+    """
+    Returns the latest `created` in the mirror and the IDs of votes created at that second.
+    """
+    last_created, last_ids = 0, set()
+    if not votes_file.exists():
+        return last_created, last_ids
+    with open(votes_file, "r") as f:
+        for row in csv.DictReader(f):
+            created = int(row["created"])
+            if created > last_created:
+                last_created, last_ids = created, set()
+            if created == last_created:
+                last_ids.add(row["id"])
+    return last_created, last_ids
+
+
+def sync_snapshot_votes(until: int = SNAPSHOT_VOTE_TIMESTAMP) -> int:
+    """
+    Mirrors all votes of the Lido space created before `until` into the local votes file.
+    Pages by `created` and resumes from the last mirrored vote. Returns the number of new votes.
+    """
+    votes_file = current_dir / SNAPSHOT_VOTES_FILE
+    last_created, seen_ids = _read_snapshot_mirror_tail(votes_file)
+    query = """
+    query Votes($space: String!, $from: Int!, $until: Int!, $first: Int!) {
+      votes(
+        first: $first
+        where: { space: $space, created_gte: $from, created_lt: $until }
+        orderBy: "created"
+        orderDirection: asc
+      ) {
+        id
+        voter
+        created
+        vp
+      }
+    }
+    """
+    new_votes = 0
+    is_new_file = not votes_file.exists()
+    with open(votes_file, "a", newline="") as f:
+        writer = csv.writer(f)
+        if is_new_file:
+            writer.writerow(["id", "voter", "created", "vp"])
+        while True:
+            variables = {"space": SNAPSHOT_SPACE, "from": last_created, "until": until, "first": SNAPSHOT_SYNC_PAGE_SIZE}
+            response = requests.post(SNAPSHOT_GRAPHQL_URL, json={"query": query, "variables": variables})
+            response.raise_for_status()
+            result = response.json()
+            if "errors" in result:
+                raise Exception(f"Error syncing Snapshot votes: {result['errors']}")
+            page = result["data"]["votes"]
+            # Votes created in the same second as the previous page's tail are returned again
+            rows = [v for v in page if v["id"] not in seen_ids]
+            if len(page) == SNAPSHOT_SYNC_PAGE_SIZE and not rows:
+                raise Exception(f"More than {SNAPSHOT_SYNC_PAGE_SIZE} Snapshot votes created at {last_created}")
+            writer.writerows([v["id"], v["voter"].lower(), v["created"], v["vp"]] for v in rows)
+            f.flush()
+            new_votes += len(rows)
+            for v in rows:
+                if v["created"] > last_created:
+                    last_created, seen_ids = v["created"], set()
+                seen_ids.add(v["id"])
+            print(f"    Synced {new_votes} new Snapshot votes, up to {datetime.fromtimestamp(last_created)}")
+            if len(page) < SNAPSHOT_SYNC_PAGE_SIZE:
+                break
+    store.save(current_dir / SNAPSHOT_SYNC_STATE_FILE, {"synced_to": until})
+    return new_votes
+
+
+@cache
+def _snapshot_mirror(votes_file: Path, state_file: Path) -> dict[str, list[tuple[int, float]]] | None:
+    """
+    Loads the local votes mirror as voter -> [(created, vp)], or None if it is missing or was
+    not synced up to SNAPSHOT_VOTE_TIMESTAMP. Memoized, so a batch run reads it once.
+    """
+    state = store.load(state_file)
+    if state is None or state[1]["synced_to"] < SNAPSHOT_VOTE_TIMESTAMP:
+        return None
+    votes: dict[str, list[tuple[int, float]]] = {}
+    with open(votes_file, "r") as f:
+        for row in csv.DictReader(f):
+            votes.setdefault(row["voter"], []).append((int(row["created"]), float(row["vp"])))
+    return votes
+
+
+def snapshot_vote(addresses: set[str]) -> int:
+    """
+    Check if the address has participated in Snapshot votes.
+    Counts votes in the local mirror when it is synced, otherwise queries the Snapshot hub.
+    """
+    mirror = _snapshot_mirror(current_dir / SNAPSHOT_VOTES_FILE, current_dir / SNAPSHOT_SYNC_STATE_FILE)
+    if mirror is not None:
+        votes_count = sum(
+            1
+            for address in addresses
+            for created, vp in mirror.get(address, [])
+            if vp > REQUIRED_SNAPSHOT_VP and created < SNAPSHOT_VOTE_TIMESTAMP
+        )
+    else:
+        votes_count = _fetch_snapshot_votes_count(addresses)
     if votes_count >= REQUIRED_SNAPSHOT_VOTES:
         print(f"    Found {votes_count} Snapshot votes (in sum) for given addresses")
         return scores["snapshot-vote"]
@@ -83,8 +209,13 @@ def aragon_vote(addresses: set[str]) -> int:
     """
     Check if the address has participated in Aragon votes.
     """
+    csv_path = current_dir / "aragon_voters.csv"
+    # The index only knows who voted; vote counts are read from the CSV for actual voters
+    indexed, match = address_index.lookup(addresses, csv_path)
+    if indexed and not match:
+        return 0
 
-    with open(current_dir / "aragon_voters.csv", "r") as f:
+    with open(csv_path, "r") as f:
         reader = csv.DictReader(f)
         total_votes_count = 0
         for row in reader:
@@ -98,58 +229,84 @@ def aragon_vote(addresses: set[str]) -> int:
     return 0
 
 
-def galxe_scores(addresses: set[str]) -> int:
-    api_url = "https://graphigo.prd.galaxy.eco/query"
-    lido_space_id = 22849
-    query = """
-        query($spaceId: Int, $cursor: String) {
-      space(id:$spaceId) {
-        id
-        name
-        loyaltyPointsRanks(first:100,cursorAfter:$cursor)
-        {
-          pageInfo{
-            hasNextPage
-            endCursor
-          }
-          edges {
-            node {
-              points
-              address {
-                username
-                address
-              }
-            }
+GALXE_API_URL = "https://graphigo.prd.galaxy.eco/query"
+GALXE_LIDO_SPACE_ID = 22849
+GALXE_QUERY = """
+    query($spaceId: Int, $cursor: String) {
+  space(id:$spaceId) {
+    id
+    name
+    loyaltyPointsRanks(first:100,cursorAfter:$cursor)
+    {
+      pageInfo{
+        hasNextPage
+        endCursor
+      }
+      edges {
+        node {
+          points
+          address {
+            username
+            address
           }
         }
       }
     }
+  }
+}
+"""
+
+
+def fetch_galxe_leaderboard() -> dict[str, int]:
+    """
+    Crawls the whole Lido space leaderboard and maps address -> points.
     """
+    cursor = None
+    all_items = []
+    while True:
+        variables = {"spaceId": GALXE_LIDO_SPACE_ID, "cursor": cursor}
+        response = requests.post(
+            GALXE_API_URL,
+            json={"query": GALXE_QUERY, "variables": variables},
+            headers={"Content-Type": "application/json"}
+        )
+        response.raise_for_status()
+        data = response.json()['data']['space']['loyaltyPointsRanks']
 
-    def fetch_all_items():
-        cursor = None
-        all_items = []
-        while True:
-            variables = {"spaceId": lido_space_id, "cursor": cursor}
-            response = requests.post(
-                api_url,
-                json={"query": query, "variables": variables},
-                headers={"Content-Type": "application/json"}
-            )
-            response.raise_for_status()
-            data = response.json()['data']['space']['loyaltyPointsRanks']
+        for edge in data['edges']:
+            all_items.append(edge['node'])
 
-            for edge in data['edges']:
-                all_items.append(edge['node'])
+        page_info = data['pageInfo']
+        if not page_info['hasNextPage']:
+            break
+        cursor = page_info['endCursor']
+    return {item["address"]["address"].lower(): item["points"] for item in all_items}
+
+
+def refresh_galxe_leaderboard() -> dict[str, int]:
+    """
+    Crawls the leaderboard and stores it locally for subsequent runs.
+    """
+    points = fetch_galxe_leaderboard()
+    store.save(current_dir / GALXE_LEADERBOARD_FILE, points)
+    print(f"    Stored Galxe leaderboard with {len(points)} addresses")
+    return points
+
+
+@cache
+def _galxe_points(leaderboard_file: Path) -> dict[str, int]:
+    """
+    Returns the locally stored leaderboard, crawling it again only when older than the TTL.
+    Memoized, so a batch run reads it once.
+    """
+    points = store.load_fresh(leaderboard_file, GALXE_LEADERBOARD_TTL)
+    if points is None:
+        points = refresh_galxe_leaderboard()
+    return points
 
-            page_info = data['pageInfo']
-            if not page_info['hasNextPage']:
-                break
-            cursor = page_info['endCursor']
-        return all_items
 
-    all_items = fetch_all_items()
-    addr_to_points = {item["address"]["address"].lower(): item["points"] for item in all_items}
+def galxe_scores(addresses: set[str]) -> int:
+    addr_to_points = _galxe_points(current_dir / GALXE_LEADERBOARD_FILE)
 
     score = 0
     for address in addresses:
@@ -165,29 +322,88 @@ def galxe_scores(addresses: set[str]) -> int:
     return score
 
 
-def gitpoap(addresses: set[str]) -> int:
+def _read_gitpoap_events(events_file: Path) -> dict[str, str]:
+    with open(events_file, "r") as f:
+        reader = csv.DictReader(f)
+        return {row["ID"]: row["Name"] for row in reader}
+
+
+def build_gitpoap_index(event_ids: list[str]) -> dict[str, list[str]]:
+    """
+    Fetches holders of all events concurrently and inverts them into address -> event IDs.
+    """
     url = "https://public-api.gitpoap.io/v1"
 
-    with open(current_dir / "gitpoap_events.csv", "r") as f:
-        reader = csv.DictReader(f)
-        gitpoap_events = {row["ID"]: row["Name"] for row in reader}
     s = requests.Session()
-    a = requests.adapters.HTTPAdapter(max_retries=3)
+    a = requests.adapters.HTTPAdapter(max_retries=3, pool_maxsize=GITPOAP_CONCURRENCY)
     s.mount('https://', a)
 
-    final_score = 0
-    for event_id, event_name in gitpoap_events.items():
+    def fetch_holders(event_id: str) -> list[str]:
         response = s.get(f"{url}/gitpoaps/{event_id}/addresses")
         response.raise_for_status()
+        return response.json().get("addresses", [])
+
+    index: dict[str, list[str]] = {}
+    with ThreadPoolExecutor(max_workers=GITPOAP_CONCURRENCY) as executor:
+        for event_id, holders in zip(event_ids, executor.map(fetch_holders, event_ids)):
+            for address in holders:
+                index.setdefault(address.lower(), []).append(event_id)
+    return index
+
+
+def refresh_gitpoap_index() -> dict[str, list[str]]:
+    """
+    Rebuilds the GitPoap index for the events in gitpoap_events.csv and stores it locally.
+    """
+    event_ids = list(_read_gitpoap_events(current_dir / "gitpoap_events.csv"))
+    index = build_gitpoap_index(event_ids)
+    store.save(current_dir / GITPOAP_INDEX_FILE, {"events": event_ids, "addresses": index})
+    print(f"    Stored GitPoap index of {len(event_ids)} events and {len(index)} holders")
+    return index
+
+
+@cache
+def _gitpoap_index(index_file: Path, events_file: Path) -> dict[str, list[str]]:
+    """
+    Returns the locally stored GitPoap index, rebuilding it when it is older than the TTL
+    or was built for a different events list. Memoized, so a batch run reads it once.
+    """
+    stored = store.load_fresh(index_file, GITPOAP_INDEX_TTL)
+    if stored is None or stored["events"] != list(_read_gitpoap_events(events_file)):
+        return refresh_gitpoap_index()
+    return stored["addresses"]
+
+
+def gitpoap(addresses: set[str]) -> int:
+    events_file = current_dir / "gitpoap_events.csv"
+    gitpoap_events = _read_gitpoap_events(events_file)
+    index = _gitpoap_index(current_dir / GITPOAP_INDEX_FILE, events_file)
+
+    found_events = set()
+    for address in addresses:
+        found_events.update(index.get(address.lower(), []))
 
-        poap_holders = response.json().get("addresses", [])
-        if any(address.lower() in poap_holders for address in addresses):
+    final_score = 0
+    for event_id, event_name in gitpoap_events.items():
+        if event_id in found_events:
             print(f"    Found GitPoap for event '{event_name}'")
             final_score = scores["git-poap"]
 
     return final_score
 
 
+def prompt_high_signal_score() -> float | None:
+    """
+    Asks the operator for the High-signal score. Returns None on invalid input.
+    """
+    print("    ⚠️ For taking into account high-signal score, please visit the https://app.highsignal.xyz/ and enter the given score manually")
+    try:
+        return float(input("    High-signal score (0-100): "))
+    except ValueError:
+        print("    Invalid input for high-signal score. Defaulting to 0.")
+        return None
+
+
 def high_signal(addresses: set[str], score: float | None = None) -> int:
     """
     Determine High-signal points.
@@ -212,31 +428,33 @@ def high_signal(addresses: set[str], score: float | None = None) -> int:
 
         if high_signal_score is None:
             high_signal_score = 0
-        for address in addresses:
-            params["searchValue"] = Web3.to_checksum_address(address)
-            response = requests.get(high_signal_url, params=params)
-            if response.status_code == 404:
+        ordered = sorted(addresses)
+        responses = fetch.fetch_json_many(
+            [
+                fetch.Request(high_signal_url, params={**params, "searchValue": Web3.to_checksum_address(address)})
+                for address in ordered
+            ],
+            rate_limits={"app.highsignal.xyz": HIGH_SIGNAL_RATE_LIMIT},
+            allow_statuses={404},
+        )
+        for address, response in zip(ordered, responses):
+            if response.status == 404:
                 continue
-            response.raise_for_status()
-            response = response.json()
-            total_scores = response.get("totalScores", 0)
+            total_scores = response.data.get("totalScores", 0)
             address_score = 0
             if total_scores:
-                address_score = response.get("totalScores", 0)[0]["totalScore"]
+                address_score = total_scores[0]["totalScore"]
 
             high_signal_score = max(address_score, high_signal_score)
             print(f"    Found High-signal score {address_score} for address {address}")
 
-            if high_signal_score == 0:
-                print("    No High-signal score found for the given addresses.")
-                return 0
+        if high_signal_score == 0:
+            print("    No High-signal score found for the given addresses.")
+            return 0
     else:
         if high_signal_score is None:
-            print("    ⚠️ For taking into account high-signal score, please visit the https://app.highsignal.xyz/ and enter the given score manually")
-            try:
-                high_signal_score = float(input("    High-signal score (0-100): "))
-            except ValueError:
-                print("    Invalid input for high-signal score. Defaulting to 0.")
+            high_signal_score = prompt_high_signal_score()
+            if high_signal_score is None:
                 return 0
     if high_signal_score < 0 or high_signal_score > 100:
         print("    Invalid input for high-signal score. Defaulting to 0.")
@@ -261,6 +479,12 @@ def protocol_guild(addresses: set[str]) -> float:
     Always returns 0, but prints a note if present.
     """
     pg_path = current_dir / "protocol_guild.csv"
+    indexed, match = address_index.lookup(addresses, pg_path)
+    if indexed:
+        if match:
+            print(f"    🤩 Found address {match} in Protocol Guild list")
+        return match is not None
+
     with open(pg_path, "r") as f:
         reader = csv.reader(f)
         for row in reader:
@@ -270,23 +494,27 @@ def protocol_guild(addresses: set[str]) -> float:
     return False
 
 
-def main(addresses: set[str], high_signal_score: float | None = None):
+def sources(addresses: set[str], high_signal_score: float | None = None) -> dict[str, Callable[[], int]]:
     """
-    Run engagement scoring.
-    - `addresses`: set of lowercase addresses.
-    - `high_signal_score`: optional override for High-signal score; if None, use API or prompt.
+    Independent engagement sources for `addresses`, keyed as in the results summary.
+    `protocol-guild` is informational only and awards no points.
     """
-    print(f"Your addresses: {', '.join(addresses)}")
-    print("Checking addresses for Proof of Engagement...")
-
-    results = {
-        "snapshot-vote": snapshot_vote(addresses),
-        "aragon-vote": aragon_vote(addresses),
-        "galxe-score": galxe_scores(addresses),
-        "git-poap": gitpoap(addresses),
-        "high-signal": high_signal(addresses, score=high_signal_score),
+    return {
+        "snapshot-vote": partial(snapshot_vote, addresses),
+        "aragon-vote": partial(aragon_vote, addresses),
+        "galxe-score": partial(galxe_scores, addresses),
+        "git-poap": partial(gitpoap, addresses),
+        "high-signal": partial(high_signal, addresses, score=high_signal_score),
+        "protocol-guild": partial(protocol_guild, addresses),
     }
-    is_pg = protocol_guild(addresses)
+
+
+def summarize(results: dict[str, int]) -> int:
+    """
+    Prints per-source results and applies the category MIN_SCORE/MAX_SCORE rules.
+    """
+    results = dict(results)
+    is_pg = results.pop("protocol-guild", False)
 
     total_score = 0
     print("\nResults:")
@@ -307,6 +535,19 @@ def main(addresses: set[str], high_signal_score: float | None = None):
         print(f"Final Proof of Engagement score: {final_score}")
     return final_score
 
+
+def main(addresses: set[str], high_signal_score: float | None = None):
+    """
+    Run engagement scoring.
+    - `addresses`: set of lowercase addresses.
+    - `high_signal_score`: optional override for High-signal score; if None, use API or prompt.
+    """
+    print(f"Your addresses: {', '.join(addresses)}")
+    print("Checking addresses for Proof of Engagement...")
+
+    results = {key: source() for key, source in sources(addresses, high_signal_score).items()}
+    return summarize(results)
+
 if __name__ == '__main__':
     if len(sys.argv) < 2:
         print("Usage: python main.py <address1> [<address2> ...]")
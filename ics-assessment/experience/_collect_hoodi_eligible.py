@@ -1,11 +1,14 @@
 import json
-import time
-from dataclasses import dataclass
+import sys
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
 from typing import List, Optional, Set, Tuple
 
+import numpy as np
 from web3 import Web3
-import requests
+
+sys.path.append(str(Path(__file__).parent.parent.resolve()))
+from common import ipfs, log_scanner, perf_frames, rpc_cache, store  # noqa: E402
 
 
 # ----------------------------
@@ -18,20 +21,22 @@ FEE_DISTRIBUTOR_ADDRESS: str = "0xaCd9820b0A2229a82dc1A0770307ce5522FF3582"
 FROM_BLOCK: int = 4980
 TO_BLOCK: str | int = "latest"
 OUTPUT_PATH: Path = Path(__file__).parent / "eligible_node_operators_hoodi.json"
+# Progress of previous runs; delete it to recompute from FROM_BLOCK
+CHECKPOINT_PATH: Path = Path(__file__).parent / "eligible_node_operators_hoodi.state.json"
+MIN_DAYS: int = 60
 
 # Event signature for DistributionLogUpdated(string logCid)
 EVENT_SIGNATURE: str = "DistributionLogUpdated(string)"
 
 
 def fetch_cids_via_getlogs(w3: Web3, address: str, from_block: int, to_block: int | str) -> List[Tuple[int, str]]:
-    topic0 = Web3.keccak(text=EVENT_SIGNATURE).hex()
     addr = Web3.to_checksum_address(address)
-    logs = w3.eth.get_logs({
-        "address": addr,
-        "topics": [topic0],
-        "fromBlock": from_block,
-        "toBlock": to_block,
-    })
+    logs = log_scanner.scan_logs(
+        w3,
+        {"address": addr, "topics": [log_scanner.topic(EVENT_SIGNATURE)]},
+        from_block,
+        to_block,
+    )
     out: List[Tuple[int, str]] = []
     for log in logs:
         cid: str = w3.codec.decode(["string"], log.get("data"))[0]
@@ -52,57 +57,34 @@ EPOCH_SECONDS = SLOTS_PER_EPOCH * SECONDS_PER_SLOT  # 384s
 
 
 def request_performance_report(cid: str, retries: int = 3, delay: float = 1.5) -> dict:
-    url = f"https://ipfs.io/ipfs/{cid}"
-    last_exc: Optional[Exception] = None
-    for _ in range(retries):
-        try:
-            r = requests.get(url, timeout=20)
-            r.raise_for_status()
-            return r.json()
-        except Exception as e:
-            last_exc = e
-            time.sleep(delay)
-    if last_exc:
-        raise last_exc
-    raise RuntimeError("unexpected: no exception but no data")
-
-
-def operator_passes_in_report_v1(report: dict, operator_id: str) -> Optional[bool]:
-    def _validator_meets_threshold(v: dict, threshold: float) -> bool:
-        perf = v.get("perf", {})
-        assigned = perf.get("assigned", 0)
-        included = perf.get("included", 0)
-        if assigned == 0:
-            return True
-        return (included / assigned) >= threshold
-
-    ops = report.get("operators", {}) or {}
-    data = ops.get(operator_id)
-    if not data:
-        return None
-    validators = list((data.get("validators") or {}).values())
-    if not validators:
-        return None
-    threshold = float(report.get("threshold", 0))
-    for v in validators:
-        if not _validator_meets_threshold(v, threshold):
-            return False
-    return True
+    return ipfs.fetch_json(cid, retries=retries, delay=delay)
 
 
-def operator_passes_in_report_v2(report: dict, operator_id: str) -> Optional[bool]:
-    ops = report.get("operators", {}) or {}
-    data = ops.get(operator_id)
-    if not data:
-        return None
-    validators = list((data.get("validators") or {}).values())
-    if not validators:
-        return None
-    for v in validators:
-        dr = int(v.get("distributed_rewards", 0))
-        if dr <= 0:
-            return False
-    return True
+def _operator_columns(report: dict | perf_frames.FrameColumns, operator_id: str) -> perf_frames.FrameColumns:
+    if isinstance(report, perf_frames.FrameColumns):
+        return report
+    # Only the asked operator is converted, so single lookups stay proportional to its validators
+    data = (report.get("operators", {}) or {}).get(operator_id)
+    return perf_frames.from_report({
+        "threshold": report.get("threshold", 0),
+        "operators": {operator_id: data} if data else {},
+    })
+
+
+def operator_passes_in_report_v1(report: dict | perf_frames.FrameColumns, operator_id: str) -> Optional[bool]:
+    """
+    True if all validators of the operator are at or above the threshold (validators
+    without assigned duties pass), False if any is below, None if it has no validators.
+    """
+    return _operator_columns(report, operator_id).status_v1.get(operator_id)
+
+
+def operator_passes_in_report_v2(report: dict | perf_frames.FrameColumns, operator_id: str) -> Optional[bool]:
+    """
+    True if every validator of the operator received rewards, False if any didn't,
+    None if it has no validators.
+    """
+    return _operator_columns(report, operator_id).status_v2.get(operator_id)
 
 
 @dataclass
@@ -120,8 +102,64 @@ def extract_frame_epochs(report: dict) -> Tuple[Optional[int], Optional[int]]:
     return start_e, end_e
 
 
+def frame_status(meta: ReportMeta, rep: dict | perf_frames.FrameColumns) -> Tuple[List[str], np.ndarray]:
+    """
+    Returns the operator IDs of a frame with their GOOD/BAD/EMPTY status codes.
+    Columnar frames are judged in one vectorized pass, report dicts through the
+    v1/v2 operator checks.
+    """
+    if meta.version not in ("v1", "v2"):
+        raise ValueError(f"Unknown report version: {meta.version}")
+    if isinstance(rep, perf_frames.FrameColumns):
+        return rep.operator_ids, rep.status_codes(rep.passes(meta.version))
+
+    status = rep.get("status") if isinstance(rep, dict) else None
+    operator_ids = list(status.keys() if isinstance(status, dict) else (rep.get("operators") or {}).keys())
+    check = operator_passes_in_report_v2 if meta.version == "v2" else operator_passes_in_report_v1
+    codes = np.empty(len(operator_ids), dtype=np.int8)
+    for i, op_id in enumerate(operator_ids):
+        passed = check(rep, op_id)
+        codes[i] = perf_frames.GOOD if passed else perf_frames.EMPTY if passed is None else perf_frames.BAD
+    return operator_ids, codes
+
+
+class GoodSecondsAccumulator:
+    """
+    Cumulative GOOD seconds per operator. Frames are added one at a time; BAD and
+    EMPTY frames contribute 0 and never reset the sum.
+    """
+
+    def __init__(self, good_seconds: dict[str, int] | None = None):
+        good_seconds = good_seconds or {}
+        self.operator_ids: List[str] = list(good_seconds)
+        self._positions = {op_id: i for i, op_id in enumerate(self.operator_ids)}
+        self.good_seconds = np.array(list(good_seconds.values()), dtype=np.int64)
+
+    def _positions_of(self, operator_ids: List[str]) -> np.ndarray:
+        new = [op_id for op_id in dict.fromkeys(operator_ids) if op_id not in self._positions]
+        if new:
+            for op_id in new:
+                self._positions[op_id] = len(self.operator_ids)
+                self.operator_ids.append(op_id)
+            self.good_seconds = np.concatenate([self.good_seconds, np.zeros(len(new), dtype=np.int64)])
+        return np.fromiter((self._positions[op_id] for op_id in operator_ids), dtype=np.int64, count=len(operator_ids))
+
+    def add_frame(self, meta: ReportMeta, rep: dict | perf_frames.FrameColumns) -> None:
+        operator_ids, codes = frame_status(meta, rep)
+        positions = self._positions_of(operator_ids)
+        duration = (meta.end_epoch - meta.start_epoch) * EPOCH_SECONDS
+        np.add.at(self.good_seconds, positions[codes == perf_frames.GOOD], duration)
+
+    def eligible(self, min_days: int) -> Set[str]:
+        reached = np.flatnonzero(self.good_seconds >= min_days * SECONDS_PER_DAY)
+        return {self.operator_ids[i] for i in reached}
+
+    def to_dict(self) -> dict[str, int]:
+        return {op_id: int(secs) for op_id, secs in zip(self.operator_ids, self.good_seconds)}
+
+
 def evaluate_eligibility_window(
-    reports: List[Tuple[ReportMeta, dict]],
+    reports: List[Tuple[ReportMeta, dict | perf_frames.FrameColumns]],
     min_days: int = 60,
 ) -> Set[str]:
     """
@@ -139,46 +177,13 @@ def evaluate_eligibility_window(
 
     Eligibility is achieved when the cumulative sum of GOOD frame durations
     reaches at least min_days.
-    """
-    if not reports:
-        return set()
-
-    operator_ids: Set[str] = set()
-    for _, rep in reports:
-        status = rep.get("status") if isinstance(rep, dict) else None
-        if isinstance(status, dict):
-            operator_ids.update(status.keys())
-        else:
-            operator_ids.update((rep.get("operators") or {}).keys())
-
-    min_span_secs = min_days * SECONDS_PER_DAY
-    eligible: Set[str] = set()
-
-    for op_id in operator_ids:
-        good_sum_secs: int = 0
-
-        for meta, rep in reports:
-            if meta.version == "v2":
-                status = operator_passes_in_report_v2(rep, op_id)
-            elif meta.version == "v1":
-                status = operator_passes_in_report_v1(rep, op_id)
-            else:
-                raise ValueError(f"Unknown report version: {meta.version}")
-
-            if status:
-                # GOOD: accumulate this frame's duration
-                good_sum_secs += (meta.end_epoch - meta.start_epoch) * EPOCH_SECONDS
-                if good_sum_secs >= min_span_secs:
-                    eligible.add(op_id)
-                    break
-            # status is False (BAD) or None (EMPTY): contribute 0 and continue
-            continue
-        else:
-            # End of reports; check accumulated sum
-            if good_sum_secs >= min_span_secs:
-                eligible.add(op_id)
 
-    return eligible
+    Each frame is evaluated once for all of its operators.
+    """
+    accumulator = GoodSecondsAccumulator()
+    for meta, rep in reports:
+        accumulator.add_frame(meta, rep)
+    return accumulator.eligible(min_days)
 
 
 def write_eligible_file(eligible: list, out_path: Path) -> None:
@@ -189,32 +194,99 @@ def write_frames_meta(frames: list[dict], out_path: Path) -> None:
     out_path.write_text(json.dumps(frames, indent=2))
 
 
-def main() -> int:
-    w3 = Web3(Web3.HTTPProvider(RPC_URL))
-    pairs = fetch_cids_via_getlogs(w3, FEE_DISTRIBUTOR_ADDRESS, FROM_BLOCK, TO_BLOCK)
-    cids = [cid for _, cid in pairs]
-
-    # Fetch reports and build sorted list by start (epoch preferred)
-    reports_with_meta: List[Tuple[ReportMeta, dict]] = []
-    for cid in cids:
-        rep = request_performance_report(cid)
-        # V2: root is list — flatten into individual items
-        if isinstance(rep, list):
-            for item in rep:
-                start_e, end_e = extract_frame_epochs(item)
-                if start_e is None or end_e is None:
-                    continue
-                reports_with_meta.append((ReportMeta(cid=cid, version="v2", start_epoch=start_e, end_epoch=end_e), item))
-            continue
-        # V1: single dict
-        start_e, end_e = extract_frame_epochs(rep)
+def report_frames(cid: str, rep: dict | list) -> List[Tuple[ReportMeta, perf_frames.FrameColumns]]:
+    """
+    Splits a downloaded report into its frames with their metadata, as columns.
+    """
+    frames: List[Tuple[ReportMeta, perf_frames.FrameColumns]] = []
+    # V2: root is list — flatten into individual items
+    items, version = (rep, "v2") if isinstance(rep, list) else ([rep], "v1")
+    for item in items:
+        start_e, end_e = extract_frame_epochs(item)
         if start_e is None or end_e is None:
             continue
-        reports_with_meta.append((ReportMeta(cid=cid, version="v1", start_epoch=start_e, end_epoch=end_e), rep))
-    # Sort by epoch start
-    reports_with_meta.sort(key=lambda x: x[0].start_epoch)
+        frames.append((
+            ReportMeta(cid=cid, version=version, start_epoch=start_e, end_epoch=end_e),
+            perf_frames.from_report(item),
+        ))
+    return frames
+
+
+@dataclass
+class Checkpoint:
+    last_block: int
+    frames: List[ReportMeta] = field(default_factory=list)
+    good_seconds: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def cids(self) -> Set[str]:
+        return {meta.cid for meta in self.frames}
+
+
+def load_checkpoint(path: Path) -> Optional[Checkpoint]:
+    """
+    Returns the checkpoint of a previous run, or None if there is none or it was made
+    for another contract or starting block.
+    """
+    snapshot = store.load(path)
+    if snapshot is None:
+        return None
+    _, data = snapshot
+    if data["fee_distributor"] != FEE_DISTRIBUTOR_ADDRESS or data["from_block"] != FROM_BLOCK:
+        print(f"Checkpoint {path} was made with other settings, starting over")
+        return None
+    return Checkpoint(
+        last_block=data["last_block"],
+        frames=[ReportMeta(**meta) for meta in data["frames"]],
+        good_seconds=data["good_seconds"],
+    )
+
+
+def save_checkpoint(path: Path, checkpoint: Checkpoint) -> None:
+    store.save(path, {
+        "fee_distributor": FEE_DISTRIBUTOR_ADDRESS,
+        "from_block": FROM_BLOCK,
+        "last_block": checkpoint.last_block,
+        "frames": [asdict(meta) for meta in sorted(checkpoint.frames, key=lambda m: m.start_epoch)],
+        "good_seconds": checkpoint.good_seconds,
+    })
+
+
+def update_eligibility(w3: Web3, checkpoint: Optional[Checkpoint], to_block: int) -> Checkpoint:
+    """
+    Adds the frames of every report logged after the checkpoint up to `to_block` to the
+    per-operator GOOD seconds and returns the new checkpoint.
+    """
+    if checkpoint is None:
+        checkpoint = Checkpoint(last_block=FROM_BLOCK - 1)
+    accumulator = GoodSecondsAccumulator(checkpoint.good_seconds)
+    frames = list(checkpoint.frames)
+    processed = checkpoint.cids
+
+    from_block = checkpoint.last_block + 1
+    pairs = fetch_cids_via_getlogs(w3, FEE_DISTRIBUTOR_ADDRESS, from_block, to_block) if from_block <= to_block else []
+    for _, cid in pairs:
+        if cid in processed:
+            continue
+        for meta, frame in report_frames(cid, request_performance_report(cid)):
+            accumulator.add_frame(meta, frame)
+            frames.append(meta)
+        processed.add(cid)
+    return Checkpoint(last_block=to_block, frames=frames, good_seconds=accumulator.to_dict())
+
+
+def main() -> int:
+    w3 = Web3(rpc_cache.CachedProvider(Web3.HTTPProvider(RPC_URL)))
+    # Pin "latest" so the checkpoint records exactly which blocks were scanned
+    to_block = w3.eth.block_number if TO_BLOCK == "latest" else int(TO_BLOCK)
+
+    checkpoint = load_checkpoint(CHECKPOINT_PATH)
+    if checkpoint is not None:
+        print(f"Resuming from block {checkpoint.last_block + 1} with {len(checkpoint.frames)} frames processed")
+    checkpoint = update_eligibility(w3, checkpoint, to_block)
+    save_checkpoint(CHECKPOINT_PATH, checkpoint)
 
-    eligible = evaluate_eligibility_window(reports_with_meta, min_days=60)
+    eligible = GoodSecondsAccumulator(checkpoint.good_seconds).eligible(MIN_DAYS)
     write_eligible_file(sorted(eligible), OUTPUT_PATH)
     print(f"Wrote {len(eligible)} eligible operators to {OUTPUT_PATH}")
     return 0
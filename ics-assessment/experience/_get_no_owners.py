@@ -1,7 +1,11 @@
 import json
-import asyncio
-from web3 import AsyncWeb3
-from web3.providers.async_rpc import AsyncHTTPProvider
+import sys
+from pathlib import Path
+
+from web3 import Web3
+
+sys.path.append(str(Path(__file__).parent.parent.resolve()))
+from common import multicall, rpc_cache  # noqa: E402
 
 PROVIDER_URL_MAINNET = 'http://localhost:8545/'
 PROVIDER_URL_HOODI = 'http://localhost:8545/'
@@ -18,42 +22,23 @@ OUTPUT_FILE_MAINNET = 'node_operator_owners_mainnet.json'
 OUTPUT_FILE_HOODI = 'node_operator_owners_hoodi.json'
 
 
-async def fetch_node_operator_owners(provider_url, contract_address, reference_block, json_output):
-    w3 = AsyncWeb3(AsyncHTTPProvider(provider_url))
+def fetch_node_operator_owners(provider_url, contract_address, reference_block, json_output):
+    w3 = Web3(rpc_cache.CachedProvider(Web3.HTTPProvider(provider_url)))
     contract = w3.eth.contract(address=contract_address, abi=CSM_ABI, decode_tuples=True)
 
+    count = contract.functions.getNodeOperatorsCount().call(block_identifier=reference_block)
     node_operators = {}
-    count = await contract.functions.getNodeOperatorsCount().call(block_identifier=reference_block)
-
-    queue = asyncio.Queue()
-    for i in range(count):
-        await queue.put(i)
-
-    processed = {"num": 0}
-
-    async def worker():
-        while True:
-            try:
-                i = queue.get_nowait()
-            except asyncio.QueueEmpty:
-                break
-            node_operator = await contract.functions.getNodeOperator(i).call(block_identifier=reference_block)
-            node_operators[i] = node_operator.managerAddress if node_operator.extendedManagerPermissions else node_operator.rewardAddress
-            processed["num"] += 1
-            if processed["num"] % 10 == 0:
-                print(f"Fetched {processed['num']}/{count} node operators.")
-
-            queue.task_done()
-
-    workers = [asyncio.create_task(worker()) for _ in range(4)]  # 4 concurrent workers
-    await queue.join()
-    for w in workers:
-        w.cancel()
+    # Batches of operators are read per round-trip at the pinned block
+    for start in range(0, count, multicall.DEFAULT_BATCH_SIZE):
+        ids = range(start, min(start + multicall.DEFAULT_BATCH_SIZE, count))
+        for i, node_operator in multicall.get_node_operators(w3, contract, ids, reference_block).items():
+            node_operators[i] = multicall.node_operator_address(node_operator)
+        print(f"Fetched {len(node_operators)}/{count} node operators.")
 
     with open(json_output, 'w') as f:
         json.dump(dict(sorted(node_operators.items(), key=lambda item: item[0])), f, indent=2)
 
 
 if __name__ == '__main__':
-    asyncio.run(fetch_node_operator_owners(PROVIDER_URL_MAINNET, CONTRACT_ADDRESS_MAINNET, REFERENCE_BLOCK_MAINNET, OUTPUT_FILE_MAINNET))
-    asyncio.run(fetch_node_operator_owners(PROVIDER_URL_HOODI, CONTRACT_ADDRESS_HOODI, REFERENCE_BLOCK_HOODI, OUTPUT_FILE_HOODI))
\ No newline at end of file
+    fetch_node_operator_owners(PROVIDER_URL_MAINNET, CONTRACT_ADDRESS_MAINNET, REFERENCE_BLOCK_MAINNET, OUTPUT_FILE_MAINNET)
+    fetch_node_operator_owners(PROVIDER_URL_HOODI, CONTRACT_ADDRESS_HOODI, REFERENCE_BLOCK_HOODI, OUTPUT_FILE_HOODI)
@@ -1,14 +1,20 @@
+import sys
+from pathlib import Path
+
 from web3 import Web3
 
+sys.path.append(str(Path(__file__).parent.parent.resolve()))
+from common import log_scanner, rpc_cache  # noqa: E402
+
 ARBITRUM_BLOCK_CUTOFF = 375206162 # TODO Update block from arbitrum
 ETHEREUM_BLOCK_CUTOFF = 23281557 # TODO Update block from ethereum
 
-# Preferably use infura for unlimited block range
+# Logs are fetched in chunks, so providers with a limited block range work too
 ARBITRUM_PROVIDER_URL = 'http://localhost:8545/'
 ETHEREUM_PROVIDER_URL = 'http://localhost:8545/'
 
 def fetch_nft_holders(rpc: str, address: str, from_block: int, to_block: int) -> set:
-    w3 = Web3(Web3.HTTPProvider(rpc))
+    w3 = Web3(rpc_cache.CachedProvider(Web3.HTTPProvider(rpc)))
     contract = w3.eth.contract(address=w3.to_checksum_address(address), abi=[{
         "type": "event",
         "name": "Transfer",
@@ -20,7 +26,15 @@ def fetch_nft_holders(rpc: str, address: str, from_block: int, to_block: int) ->
         "anonymous": False
     }])
 
-    logs = contract.events.Transfer.get_logs(fromBlock=from_block, toBlock=to_block)
+    address = w3.to_checksum_address(address)
+    logs = log_scanner.scan_logs(
+        w3,
+        {"address": address, "topics": [log_scanner.topic("Transfer(address,address,uint256)")]},
+        from_block,
+        to_block,
+        decode=contract.events.Transfer().process_log,
+        checkpoint=Path(__file__).parent / f"obol-techne-{address.lower()}.scan.jsonl",
+    )
     holders = set()
     for log in logs:
         holders.add(log.args.to)
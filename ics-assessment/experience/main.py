@@ -3,11 +3,13 @@
 import sys
 import csv
 import json
-import time
 from pathlib import Path
+from typing import Callable
 from datetime import datetime
+from functools import cache, partial
 
-import requests
+sys.path.append(str(Path(__file__).parent.parent.resolve()))
+from common import address_index, ipfs, perf_frames, perf_report  # noqa: E402
 
 scores = {
     # TODO exclude slashed
@@ -35,11 +37,27 @@ MAX_SCORE = 8
 
 current_dir = Path(__file__).parent.resolve()
 
+@cache
+def _load_json(path: Path):
+    """
+    Reads a local JSON source once per process; batch runs share it across applicants.
+    """
+    with open(path, "r") as f:
+        return json.load(f)
+
+
 def is_addresses_in_csv(addresses: set[str], csv_file: str, base_dir=current_dir) -> bool:
     """
     Returns True if any address in `addresses` is found in the first column of the given CSV file.
     The CSV file should contain a single column with addresses or a header with 'Address'.
+    Uses the compiled address index when it covers the file (see common/address_index.py).
     """
+    indexed, match = address_index.lookup(addresses, base_dir / csv_file)
+    if indexed:
+        if match:
+            print(f"    Found address {match} in {csv_file}")
+        return match is not None
+
     with open(base_dir / csv_file, "r") as f:
         reader = csv.reader(f)
         for row in reader:
@@ -122,14 +140,8 @@ def _csm_testnet_score(addresses: set[str]) -> int:
     an eligible node operator, returns the corresponding testnet score, with an
     extra point for Circles-verified addresses.
     """
-    eligible_file = current_dir / "eligible_node_operators_hoodi.json"
-    with open(eligible_file, "r") as f:
-        data = json.load(f)
-        eligible_ids = set(data)
-
-    owners_file = current_dir / "node_operator_owners_hoodi.json"
-    with open(owners_file, "r") as f:
-        node_operators = json.load(f)  # {no_id: owner}
+    eligible_ids = set(_load_json(current_dir / "eligible_node_operators_hoodi.json"))
+    node_operators = _load_json(current_dir / "node_operator_owners_hoodi.json")  # {no_id: owner}
 
     # Map owner address -> node operator id
     addr_to_id: dict[str, str] = {v.lower(): k for k, v in node_operators.items()}
@@ -161,28 +173,31 @@ def _csm_mainnet_score(addresses: set[str]) -> int:
         return scores["csm-mainnet"]
     return 0
 
-def _request_performance_report(report_file, retries=3, delay=2):
-    url = f"https://ipfs.io/ipfs/{report_file}"
-    for attempt in range(retries):
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            return response.json()
-        except (requests.HTTPError, requests.JSONDecodeError) as e:
-            print(f"Error fetching report {report_file}: {e}")
-            if attempt < retries - 1:
-                time.sleep(delay)
-                continue
-            raise e
-    raise Exception(f"Failed to fetch report {report_file}")
+@cache
+def _performance_summary(report_file, retries=3, delay=2) -> tuple[dict[str, int], dict]:
+    """
+    Returns the failing validators count of every operator in the report, with its blockstamp.
+    Built once per CID from the streamed report; batch runs look every applicant up in it.
+    """
+    failing = {}
+    blockstamp = {}
+    path = ipfs.fetch(report_file, retries=retries, delay=delay, validate=json.loads)
+    with ipfs.open_cached(path) as f:
+        for data in perf_report.iter_frames(f, frame_keys=("threshold", "blockstamp")):
+            frame = perf_frames.from_report(data)
+            counts = frame.failing_count(frame.meets_threshold())
+            for no_id, operator in data.get('operators', {}).items():
+                if operator:
+                    failing[no_id] = failing.get(no_id, 0) + int(counts[frame.position(no_id)])
+            blockstamp = data.get('blockstamp', blockstamp)
+    return failing, blockstamp
 
 
 def _check_csm_performance_logs(addresses: set[str], no_owners_file_name, perf_reports, network_name) -> bool:
     """
     Returns True if any address is a node operator with all validators above the threshold in any logs.
     """
-    with open(current_dir / no_owners_file_name, 'r') as f:
-        node_operators = json.load(f)
+    node_operators = _load_json(current_dir / no_owners_file_name)
 
     address_to_id = {}
     for no_id, addr in node_operators.items():
@@ -196,26 +211,13 @@ def _check_csm_performance_logs(addresses: set[str], no_owners_file_name, perf_r
     # If any operator id for the addresses is eligible, continue
     eligible = False
     for report in perf_reports:
-        data = _request_performance_report(report)
-        threshold = data.get('threshold', 0)
-        operators = data.get('operators', {})
+        failing, blockstamp = _performance_summary(report)
         for no_id in found_ids:
-            no = operators.get(no_id)
-            if not no:
+            if no_id not in failing:
                 continue
-            all_valid = True
-            for v in no.get('validators', {}).values():
-                perf = v.get('perf', {})
-                assigned = perf.get('assigned', 0)
-                included = perf.get('included', 0)
-                if assigned == 0:
-                    continue
-                if included / assigned < threshold:
-                    all_valid = False
-                    break
-            if all_valid:
-                report_data = datetime.fromtimestamp(data['blockstamp']['block_timestamp'])
-                report_block = data['blockstamp']['block_number']
+            if not failing[no_id]:
+                report_data = datetime.fromtimestamp(blockstamp['block_timestamp'])
+                report_block = blockstamp['block_number']
                 print(f"    {network_name} Node Operator {no_id} is eligible in performance report {report} at {report_data} (block {report_block}).")
                 eligible = True
                 break
@@ -224,23 +226,24 @@ def _check_csm_performance_logs(addresses: set[str], no_owners_file_name, perf_r
     return eligible
 
 
-def main(addresses: set[str]):
+def sources(addresses: set[str]) -> dict[str, Callable[[], int]]:
     """
-    Run experience scoring.
-    - `addresses`: set of lowercase addresses.
+    Independent experience sources for `addresses`, keyed as in the results summary.
     """
-    print(f"Your addresses: {', '.join(addresses)}")
-    print("Checking addresses for Proof of Experience...")
-
-    results: dict[str, int] = {
-        "eth-staker": eth_staker_score(addresses),
-        "stake-cat": stake_cat_score(addresses),
-        "obol-techne": obol_techne_score(addresses),
-        "ssv-verified": ssv_verified_score(addresses),
-        "sdvtm-testnet/mainnet": sdvtm_score(addresses),
-        "csm-testnet/mainnet": csm_score(addresses),
+    return {
+        "eth-staker": partial(eth_staker_score, addresses),
+        "stake-cat": partial(stake_cat_score, addresses),
+        "obol-techne": partial(obol_techne_score, addresses),
+        "ssv-verified": partial(ssv_verified_score, addresses),
+        "sdvtm-testnet/mainnet": partial(sdvtm_score, addresses),
+        "csm-testnet/mainnet": partial(csm_score, addresses),
     }
 
+
+def summarize(results: dict[str, int]) -> int:
+    """
+    Prints per-source results and applies the category MIN_SCORE/MAX_SCORE rules.
+    """
     print("\nResults:")
     total_score = 0
     for key, score in results.items():
@@ -258,6 +261,18 @@ def main(addresses: set[str]):
         print(f"Final Proof of Experience score: {final_score}")
     return final_score
 
+
+def main(addresses: set[str]):
+    """
+    Run experience scoring.
+    - `addresses`: set of lowercase addresses.
+    """
+    print(f"Your addresses: {', '.join(addresses)}")
+    print("Checking addresses for Proof of Experience...")
+
+    results: dict[str, int] = {key: source() for key, source in sources(addresses).items()}
+    return summarize(results)
+
 if __name__ == '__main__':
     if len(sys.argv) < 2:
         print("Usage: python main.py <address1> [<address2> ...]")
@@ -1,9 +1,12 @@
 import csv
 import os
 import sys
+from functools import partial
 from pathlib import Path
+from typing import Callable
 
-import requests
+sys.path.append(str(Path(__file__).parent.parent.resolve()))
+from common import address_index, fetch  # noqa: E402
 
 scores = {
     "human-passport-min": 3,
@@ -18,9 +21,22 @@ MAX_SCORE = 8
 
 HUMAN_PASSPORT_SCORER_ID = 11737
 HUMAN_PASSPORT_API_URL = "https://api.passport.xyz/v2/stamps/{scorer_id}/score/{address}"
+HUMAN_PASSPORT_RATE_LIMIT = 2  # requests per second
 
 current_dir = Path(__file__).parent.resolve()
 
+def prompt_human_passport_score() -> float | None:
+    """
+    Asks the operator for the Human Passport score. Returns None on invalid input.
+    """
+    print("    ⚠️ For taking into account Human Passport score, please visit the https://app.passport.xyz/#/lido_csm/ and enter the given score manually")
+    try:
+        return float(input("    Human Passport score (0-20): "))
+    except ValueError:
+        print("    Invalid input for Human Passport score. Defaulting to 0.")
+        return None
+
+
 def human_passport_score(addresses: set[str], score: float | None = None) -> int:
     """
     Determine Human Passport score.
@@ -33,23 +49,24 @@ def human_passport_score(addresses: set[str], score: float | None = None) -> int
     else:
         api_key = os.getenv("HUMAN_PASSPORT_API_KEY", None)
         if not api_key:
-            print("    ⚠️ For taking into account Human Passport score, please visit the https://app.passport.xyz/#/lido_csm/ and enter the given score manually")
-            try:
-                final_score = float(input("    Human Passport score (0-20): "))
-            except ValueError:
-                print("    Invalid input for Human Passport score. Defaulting to 0.")
+            final_score = prompt_human_passport_score()
+            if final_score is None:
                 return 0
         else:
             final_score = 0
-            for address in addresses:
-                url = HUMAN_PASSPORT_API_URL.format(scorer_id=HUMAN_PASSPORT_SCORER_ID, address=address)
-                headers = {
-                    "X-API-Key": api_key,
-                }
-                response = requests.get(url, headers=headers)
-                response.raise_for_status()
-                data = response.json()
-                s_val = float(data.get("score", 0))
+            headers = {
+                "X-API-Key": api_key,
+            }
+            ordered = sorted(addresses)
+            responses = fetch.fetch_json_many(
+                [
+                    fetch.Request(HUMAN_PASSPORT_API_URL.format(scorer_id=HUMAN_PASSPORT_SCORER_ID, address=address), headers=headers)
+                    for address in ordered
+                ],
+                rate_limits={"api.passport.xyz": HUMAN_PASSPORT_RATE_LIMIT},
+            )
+            for address, response in zip(ordered, responses):
+                s_val = float(response.data.get("score", 0))
                 if s_val:
                     print(f"    Found Human Passport score {s_val} for address {address}")
                 if s_val > final_score:
@@ -64,7 +81,15 @@ def human_passport_score(addresses: set[str], score: float | None = None) -> int
 
 
 def circles_verified_score(addresses: set[str]) -> int:
-    with open(current_dir / "circle_group_members.csv", "r") as f:
+    csv_path = current_dir / "circle_group_members.csv"
+    indexed, match = address_index.lookup(addresses, csv_path)
+    if indexed:
+        if match:
+            print(f"    Found address {match} in Circles group members")
+            return scores["circles-verified"]
+        return None
+
+    with open(csv_path, "r") as f:
         reader = csv.reader(f)
         for row in reader:
             if row and row[0].strip().lower() in addresses:
@@ -110,29 +135,27 @@ def x_account_score(provided: bool | None = None) -> int:
     return scores["x-account"] if provided else 0
 
 
-def main(
+def sources(
     addresses: set[str],
     discord: bool | None = None,
     x: bool | None = None,
     human_passport_score_override: float | None = None,
-):
+) -> dict[str, Callable[[], int]]:
     """
-    Run humanity scoring.
-    - `addresses`: set of lowercase addresses.
-    - `discord`: optional bool indicating Discord handle provided.
-    - `x`: optional bool indicating X handle provided.
-    - `human_passport_score_override`: optional float to bypass API/prompt.
+    Independent humanity sources for `addresses`, keyed as in the results summary.
     """
-    print(f"Your addresses: {', '.join(addresses)}")
-    print("Checking addresses for Proof of Humanity...")
-
-    results = {
-        "human-passport": human_passport_score(addresses, score=human_passport_score_override),
-        "circles-verified": circles_verified_score(addresses),
-        "discord-account": discord_account_score(discord),
-        "x-account": x_account_score(x)
+    return {
+        "human-passport": partial(human_passport_score, addresses, score=human_passport_score_override),
+        "circles-verified": partial(circles_verified_score, addresses),
+        "discord-account": partial(discord_account_score, discord),
+        "x-account": partial(x_account_score, x),
     }
 
+
+def summarize(results: dict[str, int]) -> int:
+    """
+    Prints per-source results and applies the category MIN_SCORE/MAX_SCORE rules.
+    """
     total_score = 0
     print("\nResults:")
     for key, score in results.items():
@@ -150,6 +173,27 @@ def main(
         print(f"Final Proof of Humanity score: {final_score}")
     return final_score
 
+
+def main(
+    addresses: set[str],
+    discord: bool | None = None,
+    x: bool | None = None,
+    human_passport_score_override: float | None = None,
+):
+    """
+    Run humanity scoring.
+    - `addresses`: set of lowercase addresses.
+    - `discord`: optional bool indicating Discord handle provided.
+    - `x`: optional bool indicating X handle provided.
+    - `human_passport_score_override`: optional float to bypass API/prompt.
+    """
+    print(f"Your addresses: {', '.join(addresses)}")
+    print("Checking addresses for Proof of Humanity...")
+
+    category_sources = sources(addresses, discord, x, human_passport_score_override)
+    results = {key: source() for key, source in category_sources.items()}
+    return summarize(results)
+
 if __name__ == '__main__':
     if len(sys.argv) < 2:
         print("Usage: python main.py <address1> [<address2> ...]")
@@ -1,35 +1,146 @@
+import argparse
+import asyncio
+import contextlib
+import csv
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
 
 # Import the scoring functions from the engagement and experience modules
 from engagement.main import (
-    main as engagement_main,
+    sources as engagement_sources,
+    summarize as engagement_summarize,
+    prompt_high_signal_score,
     MIN_SCORE as ENG_MIN_SCORE,
     MAX_SCORE as ENG_MAX_SCORE,
 )
 from experience.main import (
-    main as experience_main,
+    sources as experience_sources,
+    summarize as experience_summarize,
     MIN_SCORE as EXP_MIN_SCORE,
     MAX_SCORE as EXP_MAX_SCORE,
 )
 from humanity.main import (
-    main as humanity_main,
+    sources as humanity_sources,
+    summarize as humanity_summarize,
+    prompt_human_passport_score,
+    discord_account_score,
+    x_account_score,
     MIN_SCORE as HUM_MIN_SCORE,
     MAX_SCORE as HUM_MAX_SCORE,
 )
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python main.py <address1> [<address2> ...]")
-        return
+BATCH_RESULT_FIELDS = [
+    "id",
+    "addresses",
+    "experience",
+    "humanity",
+    "engagement",
+    "total",
+    "eligible",
+    "missing",
+    "error",
+]
+
+
+# Max number of sources (network requests, file scans) running at the same time
+DEFAULT_CONCURRENCY = 8
 
-    addrs = set([a.strip().lower() for a in sys.argv[1:]])
+
+def resolve_manual_inputs(
+    discord: bool | None,
+    x: bool | None,
+    human_passport_score: float | None,
+    high_signal_score: float | None,
+) -> tuple[bool, bool, float | None, float | None]:
+    """
+    Asks for every manual input up-front, so sources running concurrently never prompt.
+    Scores stay None when their API key is set and the API should be queried instead.
+    """
+    if human_passport_score is None and not os.getenv("HUMAN_PASSPORT_API_KEY"):
+        human_passport_score = prompt_human_passport_score() or 0
+    if high_signal_score is None and not os.getenv("HIGH_SIGNAL_API_KEY"):
+        high_signal_score = prompt_high_signal_score() or 0
+    if discord is None:
+        discord = bool(discord_account_score())
+    if x is None:
+        x = bool(x_account_score())
+    return discord, x, human_passport_score, high_signal_score
+
+
+async def run_sources(
+    category_sources: dict[str, dict[str, Callable[[], int]]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> dict[str, dict[str, int]]:
+    """
+    Starts all sources of all categories at once, at most `concurrency` at a time,
+    and returns their results grouped back by category.
+    """
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        tasks = {
+            category: {key: loop.run_in_executor(executor, source) for key, source in sources.items()}
+            for category, sources in category_sources.items()
+        }
+        await asyncio.gather(*(task for sources in tasks.values() for task in sources.values()))
+    return {
+        category: {key: task.result() for key, task in sources.items()}
+        for category, sources in tasks.items()
+    }
+
+
+def assess(
+    addresses: set[str],
+    discord: bool | None = None,
+    x: bool | None = None,
+    human_passport_score: float | None = None,
+    high_signal_score: float | None = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> dict[str, int]:
+    """
+    Runs all categories for one applicant and returns the final score of each category.
+    Sources are independent, so they are all queried concurrently; the category
+    MIN_SCORE/MAX_SCORE rules are applied once every source has finished.
+    """
+    discord, x, human_passport_score, high_signal_score = resolve_manual_inputs(
+        discord, x, human_passport_score, high_signal_score
+    )
+    category_sources = {
+        "Experience": experience_sources(addresses),
+        "Humanity": humanity_sources(
+            addresses,
+            discord=discord,
+            x=x,
+            human_passport_score_override=human_passport_score,
+        ),
+        "Engagement": engagement_sources(addresses, high_signal_score=high_signal_score),
+    }
+    print(f"Your addresses: {', '.join(addresses)}")
+    print("Checking addresses for all categories...")
+    results = asyncio.run(run_sources(category_sources, concurrency))
 
     print("\n==== Proof of Experience ====")
-    experience_score = experience_main(addrs)
+    experience_score = experience_summarize(results["Experience"])
     print("\n==== Proof of Humanity ====")
-    humanity_score = humanity_main(addrs)
-    print("==== Proof of Engagement ====")
-    engagement_score = engagement_main(addrs)
+    humanity_score = humanity_summarize(results["Humanity"])
+    print("\n==== Proof of Engagement ====")
+    engagement_score = engagement_summarize(results["Engagement"])
+    return {
+        "Experience": experience_score,
+        "Humanity": humanity_score,
+        "Engagement": engagement_score,
+    }
+
+
+def missing_categories(results: dict[str, int]) -> list[str]:
+    return [category for category, score in results.items() if not score]
+
+
+def print_summary(results: dict[str, int]):
+    experience_score = results["Experience"]
+    humanity_score = results["Humanity"]
+    engagement_score = results["Engagement"]
     print("\n==== Assessment Completed ====")
     print(
         f"Total Experience Score: {experience_score} (limits: min={EXP_MIN_SCORE}, max={EXP_MAX_SCORE}) "
@@ -48,19 +159,111 @@ def main():
 
     # Final resolution summary
     print("\n==== Resolution ====")
-    missing = []
-    if not experience_score:
-        missing.append("Experience")
-    if not humanity_score:
-        missing.append("Humanity")
-    if not engagement_score:
-        missing.append("Engagement")
-
+    missing = missing_categories(results)
     if not missing:
         print("✅ Eligible: minimum criteria met in all categories (Experience, Humanity, Engagement).")
     else:
         why = ", ".join(missing)
         print(f"❌ Not eligible: requirements not met in category(ies): {why}.")
 
+
+def parse_addresses(value: str) -> set[str]:
+    """
+    Splits a batch `addresses` cell; addresses may be separated by spaces, commas or semicolons.
+    """
+    return {a.strip().lower() for a in value.replace(",", " ").replace(";", " ").split() if a.strip()}
+
+
+def _parse_flag(value: str | None) -> bool:
+    return (value or "").strip().lower() in ["yes", "y", "true", "1"]
+
+
+def _parse_score(value: str | None, api_key_env: str) -> float | None:
+    """
+    Manual score override from a batch row. A blank cell falls back to the API when its key
+    is configured, and to 0 otherwise, so batch runs never prompt.
+    """
+    value = (value or "").strip()
+    if value:
+        return float(value)
+    return None if os.getenv(api_key_env) else 0
+
+
+def run_batch(input_path: str, output_path: str | None, concurrency: int = DEFAULT_CONCURRENCY):
+    """
+    Assesses every applicant in the `input_path` CSV and writes one result row per applicant.
+
+    Expected columns: `addresses` (required), `id`, `discord`, `x`, `passport`, `high_signal`.
+    Local sources and network downloads shared between applicants are loaded only once per run.
+    """
+    with open(input_path, "r", newline="") as f:
+        applicants = list(csv.DictReader(f))
+
+    out = open(output_path, "w", newline="") if output_path else sys.stdout
+    try:
+        writer = csv.DictWriter(out, fieldnames=BATCH_RESULT_FIELDS)
+        writer.writeheader()
+        for n, row in enumerate(applicants, start=1):
+            applicant_id = row.get("id") or str(n)
+            addresses = parse_addresses(row.get("addresses", ""))
+            print(f"\n######## Applicant {applicant_id} ({n}/{len(applicants)}) ########", file=sys.stderr)
+            result = {"id": applicant_id, "addresses": " ".join(sorted(addresses))}
+            try:
+                # Per-category prose goes to stderr, structured results to the output
+                with contextlib.redirect_stdout(sys.stderr):
+                    scores = assess(
+                        addresses,
+                        discord=_parse_flag(row.get("discord")),
+                        x=_parse_flag(row.get("x")),
+                        human_passport_score=_parse_score(row.get("passport"), "HUMAN_PASSPORT_API_KEY"),
+                        high_signal_score=_parse_score(row.get("high_signal"), "HIGH_SIGNAL_API_KEY"),
+                        concurrency=concurrency,
+                    )
+            except Exception as e:
+                print(f"❌ Assessment of applicant {applicant_id} failed: {e}", file=sys.stderr)
+                result["error"] = str(e)
+            else:
+                missing = missing_categories(scores)
+                result.update({
+                    "experience": scores["Experience"],
+                    "humanity": scores["Humanity"],
+                    "engagement": scores["Engagement"],
+                    "total": sum(scores.values()),
+                    "eligible": not missing,
+                    "missing": ";".join(missing),
+                })
+            writer.writerow(result)
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ICS eligibility assessment")
+    parser.add_argument("addresses", nargs="*", help="addresses of a single applicant")
+    parser.add_argument("--batch", metavar="APPLICANTS_CSV", help="assess every applicant row of the CSV")
+    parser.add_argument("--output", metavar="RESULTS_CSV", help="batch results file (stdout by default)")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"max sources queried at the same time (default {DEFAULT_CONCURRENCY})",
+    )
+    args = parser.parse_args()
+
+    if args.batch:
+        run_batch(args.batch, args.output, args.concurrency)
+        return
+
+    if not args.addresses:
+        print("Usage: python main.py <address1> [<address2> ...]")
+        print("       python main.py --batch applicants.csv [--output results.csv]")
+        return
+
+    addrs = set([a.strip().lower() for a in args.addresses])
+    print_summary(assess(addrs, concurrency=args.concurrency))
+
+
 if __name__ == "__main__":
     main()
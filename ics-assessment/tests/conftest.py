@@ -0,0 +1,20 @@
+import gzip
+import json
+
+import pytest
+
+
+@pytest.fixture()
+def write_json():
+    """Writes `data` to `path` as JSON, gzipped with `compress`, and returns the path as a string."""
+
+    def write(path, data, compress=False):
+        raw = json.dumps(data).encode()
+        if compress:
+            with gzip.open(path, "wb") as f:
+                f.write(raw)
+        else:
+            path.write_bytes(raw)
+        return str(path)
+
+    return write
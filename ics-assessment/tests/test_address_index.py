@@ -0,0 +1,44 @@
+from common import address_index
+
+
+def build(tmp_path, files: dict[str, str]):
+    for name, content in files.items():
+        (tmp_path / name).write_text(content)
+    out = tmp_path / "index.bin"
+    total = address_index.build_index(sources=list(files), root=tmp_path, out=out)
+    return total, address_index.AddressIndex(out, root=tmp_path)
+
+
+def test_build_merges_sources_into_bitmask(tmp_path):
+    a = "0x" + "aa" * 20
+    b = "0x" + "bb" * 20
+    c = "0x" + "0c" * 20
+    total, index = build(tmp_path, {
+        "one.csv": f"{a}\n{b.upper().replace('0X', '0x')}\n",
+        "two.csv": f"Address,VoteCount\n{b},3\n{c},1\n",
+    })
+    assert total == 3
+    assert index.mask(a) == 0b01
+    assert index.mask(b) == 0b11
+    assert index.mask(c) == 0b10
+    assert index.mask("0x" + "dd" * 20) == 0
+    assert index.mask("Address") == 0
+
+
+def test_find_and_source_bit(tmp_path):
+    a = "0x" + "aa" * 20
+    _, index = build(tmp_path, {"one.csv": f"{a}\n", "two.csv": ""})
+    one = index.source_bit(tmp_path / "one.csv")
+    two = index.source_bit(tmp_path / "two.csv")
+    assert (one, two) == (0, 1)
+    assert index.find({a, "0xabc"}, one) == a
+    assert index.find({a}, two) is None
+    assert index.source_bit(tmp_path / "unknown.csv") is None
+
+
+def test_changed_source_is_not_served(tmp_path):
+    a = "0x" + "aa" * 20
+    _, _ = build(tmp_path, {"one.csv": f"{a}\n"})
+    (tmp_path / "one.csv").write_text(f"{a}\n{a}\n")
+    index = address_index.AddressIndex(tmp_path / "index.bin", root=tmp_path)
+    assert index.source_bit(tmp_path / "one.csv") is None
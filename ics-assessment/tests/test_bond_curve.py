@@ -0,0 +1,87 @@
+import json
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from common import bond_curve
+from common.bond_curve import BondCurve, CurveSet
+
+ETHER = 10**18
+DEPLOY_MAINNET = Path(__file__).parents[2] / "script" / "DeployMainnet.s.sol"
+# Curve of CSBondCurve.t.sol setUp and of its two points case
+DEFAULT = BondCurve.from_intervals([(1, 2 * ETHER), (3, 1 * ETHER)])
+TWO_POINTS = BondCurve.from_intervals([(1, 2 * ETHER), (2, 15 * ETHER // 10)])
+
+
+def test_intervals_like_contract():
+    assert DEFAULT.min_bond == (2 * ETHER, 5 * ETHER)
+    with pytest.raises(ValueError):
+        BondCurve.from_intervals([(2, ETHER)])
+    with pytest.raises(ValueError):
+        BondCurve.from_intervals([(1, ETHER), (1, ETHER)])
+
+
+def test_values_of_contract_tests():
+    curves = CurveSet([DEFAULT, TWO_POINTS])
+    keys = np.array([0, 1, 2, 3, 4])
+    assert curves.bond_for_keys(keys, np.zeros(5)).tolist() == [0, 2 * ETHER, 4 * ETHER, 5 * ETHER, 6 * ETHER]
+
+    amounts = [0, 19 * ETHER // 10, 2 * ETHER, 21 * ETHER // 10, 4 * ETHER, 5 * ETHER, 51 * ETHER // 10, 6 * ETHER]
+    assert curves.keys_for_bond(amounts, np.zeros(len(amounts))).tolist() == [0, 0, 1, 1, 2, 3, 3, 4]
+    amounts = [0, ETHER, 2 * ETHER, 3 * ETHER, 35 * ETHER // 10, 4 * ETHER, 5 * ETHER, 6 * ETHER]
+    assert curves.keys_for_bond(amounts, np.ones(len(amounts))).tolist() == [0, 0, 1, 1, 2, 2, 3, 3]
+
+
+@pytest.mark.parametrize("odd_trend", [0, 7])
+def test_vectorized_matches_contract_math(odd_trend):
+    curves = [
+        DEFAULT,
+        TWO_POINTS,
+        BondCurve.from_intervals([(1, 3 * ETHER + odd_trend), (4, 2 * ETHER), (10, ETHER // 2 + odd_trend), (50, ETHER)]),
+    ]
+    rng = random.Random(odd_trend)
+    curve_ids = np.array([rng.randrange(len(curves)) for _ in range(3000)])
+    keys = np.array([rng.randrange(0, 5000) for _ in curve_ids])
+    bonds = CurveSet(curves).bond_for_keys(keys, curve_ids)
+    assert [int(b) for b in bonds] == [curves[c].bond_for_keys(int(k)) for c, k in zip(curve_ids, keys)]
+
+    # Amounts around interval edges and gaps, and anywhere up to 10k ETH
+    amounts = [
+        rng.randrange(10_000 * ETHER) if rng.random() < 0.3
+        else max(rng.choice(curves[c].min_bond) - rng.choice((0, *curves[c].trend)) + rng.randrange(-2, 3), 0)
+        for c in curve_ids
+    ]
+    counts = CurveSet(curves).keys_for_bond(np.array(amounts, dtype=object), curve_ids)
+    assert counts.tolist() == [curves[c].keys_for_bond(a) for c, a in zip(curve_ids, amounts)]
+
+
+def test_unbonded_keys():
+    curves = CurveSet([DEFAULT])
+    keys = np.array([3, 3, 3, 3])
+    bond = np.array([5 * ETHER, 5 * ETHER - 11, 5 * ETHER, ETHER], dtype=object)
+    locked = np.array([0, 0, ETHER, 2 * ETHER], dtype=object)
+    assert curves.unbonded_keys(keys, np.zeros(4), bond, locked).tolist() == [0, 1, 1, 3]
+    assert curves.unbonded_keys(keys, np.zeros(4), bond).tolist() == [0, 1, 0, 3]
+
+
+def test_deploy_script_curves():
+    curves = bond_curve.curves_from_deploy_script(DEPLOY_MAINNET)
+    assert curves["defaultBondCurve"] == BondCurve.from_intervals([(1, 24 * ETHER // 10), (2, 13 * ETHER // 10)])
+    assert set(curves) == {"defaultBondCurve", "legacyEaBondCurve", "identifiedCommunityStakersGateBondCurve"}
+    assert bond_curve.parse_amount("0.5") == ETHER // 2
+
+
+def test_snapshot_roundtrip():
+    snapshot = bond_curve.Snapshot(
+        block=1,
+        curves=[DEFAULT, TWO_POINTS],
+        curve_ids=np.array([0, 1]),
+        keys=np.array([10, 0]),
+        bond=np.array([30 * ETHER, 0], dtype=object),
+        locked=np.array([0, 0], dtype=object),
+    )
+    restored = bond_curve.Snapshot.from_dict(json.loads(json.dumps(snapshot.to_dict())))
+    assert restored.curves == snapshot.curves
+    assert restored.bond.tolist() == snapshot.bond.tolist()
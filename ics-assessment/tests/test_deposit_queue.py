@@ -0,0 +1,144 @@
+import json
+import random
+
+import pytest
+
+from common import deposit_queue
+from common.deposit_queue import DepositQueue, NotEnoughKeys
+
+
+def _queue(batches, depositable, lowest_priority=1):
+    sim = DepositQueue(lowest_priority)
+    for no_id, count in enumerate(depositable):
+        sim.set_depositable(no_id, count)
+    for priority, no_id, keys in batches:
+        sim.enqueue(priority, no_id, keys)
+    return sim
+
+
+def _batches(sim, priority):
+    queue = sim.queues[priority]
+    return [(int(queue.no_id[i]), int(queue.keys[i])) for i in queue.indices()]
+
+
+def test_batch_packing():
+    value = deposit_queue.encode_batch(7, 30, 12)
+    assert value == (7 << 192) | (30 << 128) | 12
+    assert deposit_queue.decode_batch(value) == (7, 30, 12)
+
+
+def test_obtain_deposit_data_like_contract():
+    sim = _queue([(1, 0, 5), (0, 1, 3), (1, 2, 4), (1, 0, 2)], depositable=[6, 3, 0])
+    # Priority 0 first, then a partial batch stays at the head with the rest of its keys
+    assert sim.obtain_deposit_data(5) == [(1, 3), (0, 2)]
+    assert _batches(sim, 0) == []
+    assert _batches(sim, 1) == [(0, 3), (2, 4), (0, 2)]
+    assert sim.operators.enqueued.tolist()[:3] == [5, 0, 4]
+    # Operator 2 has nothing depositable: its batch is dropped on the way
+    assert sim.obtain_deposit_data(4) == [(0, 3), (0, 1)]
+    assert _batches(sim, 1) == [(0, 1)]
+    assert sim.operators.total_deposited.tolist()[:3] == [6, 3, 0]
+    assert sim.operators.enqueued.tolist()[:3] == [1, 0, 0]
+    with pytest.raises(NotEnoughKeys):
+        sim.obtain_deposit_data(1)
+
+
+def test_clean_like_contract():
+    sim = _queue([(0, 0, 2), (0, 1, 2), (0, 0, 2), (1, 0, 1), (1, 1, 1), (1, 2, 1)], depositable=[2, 0, 1])
+    # Operator 1 has nothing depositable, operator 0's later batches are past its depositable keys
+    assert sim.clean(10) == (4, 5)
+    assert _batches(sim, 0) == [(0, 2)]
+    assert _batches(sim, 1) == [(2, 1)]
+    assert sim.queues[0].head == 0 and sim.queues[0].next[0] == 3
+    assert sim.operators.enqueued.tolist()[:3] == [2, 0, 1]
+    # Removing the head moves it, and a limit stops before the later queues
+    sim = _queue([(0, 1, 2), (0, 0, 2), (1, 1, 1)], depositable=[2, 0])
+    assert sim.clean(1) == (1, 1)
+    assert sim.queues[0].head == 1
+    assert _batches(sim, 1) == [(1, 1)]
+
+
+def test_projection_matches_deposits():
+    rng = random.Random(3)
+    sim = DepositQueue(5)
+    for no_id in range(60):
+        sim.set_depositable(no_id, rng.randrange(0, 40))
+    for _ in range(400):
+        sim.enqueue(rng.randrange(6), rng.randrange(60), rng.randrange(1, 12))
+    projection = sim.project()
+    by_operator = projection.by_operator()
+
+    deposits = []
+    while len(deposits) < projection.total:
+        count = min(rng.randrange(1, 30), projection.total - len(deposits))
+        deposits.extend(no_id for no_id, keys in sim.obtain_deposit_data(count) for _ in range(keys))
+    with pytest.raises(NotEnoughKeys):
+        sim.obtain_deposit_data(1)
+    for no_id, (keys, first, last) in by_operator.items():
+        positions = [i for i, n in enumerate(deposits) if n == no_id]
+        assert (keys, first, last) == (len(positions), positions[0], positions[-1])
+
+
+def test_replay_events_and_state_roundtrip():
+    sim = _queue([], depositable=[0, 0], lowest_priority=0)
+    events = [
+        (10, 0, 0, deposit_queue.DEPOSITABLE_CHANGED, (0, 4)),
+        (10, 0, 1, deposit_queue.BATCH_ENQUEUED, (0, 0, 4)),
+        (10, 1, 0, deposit_queue.DEPOSITABLE_CHANGED, (1, 2)),
+        (10, 1, 1, deposit_queue.BATCH_ENQUEUED, (0, 1, 2)),
+        (11, 0, 0, deposit_queue.DEPOSITED_CHANGED, (0, 4)),
+        (11, 0, 1, deposit_queue.DEPOSITABLE_CHANGED, (0, 0)),
+        (11, 0, 2, deposit_queue.DEPOSITED_CHANGED, (1, 1)),
+        (11, 0, 3, deposit_queue.DEPOSITABLE_CHANGED, (1, 1)),
+        (12, 0, 0, deposit_queue.DEPOSITABLE_CHANGED, (1, 0)),
+    ]
+    sim.replay(deposit_queue.actions_from_events(events, clean_calls=[(13, 0, 5)]))
+    assert sim.operators.total_deposited.tolist()[:2] == [4, 1]
+    assert _batches(sim, 0) == []
+    assert sim.operators.enqueued.tolist()[:2] == [0, 0]
+
+    restored = DepositQueue.from_dict(json.loads(json.dumps(sim.to_dict())))
+    assert deposit_queue.compare(restored, sim) == []
+    restored.enqueue(0, 1, 3)
+    assert deposit_queue.compare(restored, sim) == ["queue 0: pointers (2, 3) != (2, 2)", "operator 1: enqueued 3 != 0"]
+
+    with pytest.raises(ValueError, match="diverged"):
+        sim.replay([("depositable", 1, 1), ("enqueue", 0, 1, 1), ("enqueue", 0, 0, 1), ("deposit", {0: 5})])
+
+
+def test_find_clean_calls_from_traces():
+    module = "0x00000000000000000000000000000000000000aa"
+    other = "0x00000000000000000000000000000000000000bb"
+    clean = deposit_queue.CLEAN_DEPOSIT_QUEUE_SELECTOR + (7).to_bytes(32, "big").hex()
+
+    def trace(block, position, to, data, call_type="call", error=None):
+        result = {"type": "call", "blockNumber": block, "transactionPosition": position,
+                  "action": {"callType": call_type, "to": to, "input": data}}
+        return {**result, "error": error} if error else result
+
+    traces = [
+        trace(5, 1, module, clean),
+        trace(5, 1, other, clean, call_type="delegatecall"),  # the implementation behind the proxy
+        trace(12, 0, module, clean, error="Reverted"),
+        trace(15, 3, module, "0x12345678"),
+        trace(25, 2, module, clean),
+    ]
+    ranges = []
+
+    class Provider:
+        def make_request(self, method, params):
+            assert method == "trace_filter"
+            start, end = int(params[0]["fromBlock"], 16), int(params[0]["toBlock"], 16)
+            ranges.append((start, end))
+            return {"result": [t for t in traces if start <= t["blockNumber"] <= end]}
+
+    class Web3Stub:
+        provider = Provider()
+
+    calls = deposit_queue.find_clean_calls(Web3Stub(), module, 1, 30, chunk_size=10)
+    assert calls == [(5, 1, 7), (25, 2, 7)]
+    assert ranges == [(1, 10), (11, 20), (21, 30)]
+
+    Provider.make_request = lambda self, method, params: {"error": {"code": -32601, "message": "method not found"}}
+    with pytest.raises(ValueError, match="trace_filter"):
+        deposit_queue.find_clean_calls(Web3Stub(), module, 1, 30)
@@ -73,6 +73,40 @@ def test_snapshot_vote_errors_raise(monkeypatch, mod):
         assert "Error fetching Snapshot votes" in str(e)
 
 
+def test_snapshot_sync_then_offline_count(monkeypatch, mod):
+    monkeypatch.setattr(mod, "SNAPSHOT_SYNC_PAGE_SIZE", 3)
+    votes = [
+        {"id": "v1", "voter": "0xABC", "created": 10, "vp": 150},
+        {"id": "v2", "voter": "0xabc", "created": 20, "vp": 50},
+        {"id": "v3", "voter": "0xabc", "created": 20, "vp": 500},
+        {"id": "v4", "voter": "0xdef", "created": 30, "vp": 1000},
+        {"id": "v5", "voter": "0xabc", "created": 40, "vp": 101},
+    ]
+    requests_made = []
+
+    def fake_post(url, json=None):
+        variables = json["variables"]
+        requests_made.append(variables["from"])
+        page = [v for v in votes if variables["from"] <= v["created"] < variables["until"]]
+        return DummyResp(200, {"data": {"votes": page[:variables["first"]]}})
+
+    monkeypatch.setattr(mod.requests, "post", fake_post)
+    assert mod.sync_snapshot_votes(until=35) == 4
+    # pages resume from the last created timestamp, duplicates at the boundary are skipped
+    assert requests_made == [0, 20, 30]
+
+    # extending the cutoff only fetches the new tail
+    assert mod.sync_snapshot_votes(until=mod.SNAPSHOT_VOTE_TIMESTAMP) == 1
+
+    def no_network(*args, **kwargs):
+        raise AssertionError("mirror should be used")
+
+    monkeypatch.setattr(mod.requests, "post", no_network)
+    # v1, v3 and v5 have vp above the requirement
+    assert mod.snapshot_vote({"0xabc"}) == mod.scores["snapshot-vote"]
+    assert mod.snapshot_vote({"0xdef"}) == 0
+
+
 def test_aragon_vote_threshold_awarded(monkeypatch, mod):
     csv_path = Path(mod.current_dir) / "aragon_voters.csv"
     csv_path.write_text("Address,VoteCount\n0xabc,1\n0xdef,2\n")
@@ -169,6 +203,39 @@ def test_galxe_scores_none_zero(monkeypatch, mod):
     assert mod.galxe_scores({"0xabc"}) == 0
 
 
+def test_galxe_scores_uses_stored_leaderboard(monkeypatch, mod):
+    calls = {"count": 0}
+    data = {
+        "data": {
+            "space": {
+                "loyaltyPointsRanks": {
+                    "pageInfo": {"hasNextPage": False, "endCursor": None},
+                    "edges": [{"node": {"points": 7, "address": {"address": "0xABC"}}}],
+                }
+            }
+        }
+    }
+
+    def fake_post(url, json=None, headers=None):
+        calls["count"] += 1
+        return DummyResp(200, data)
+
+    monkeypatch.setattr(mod.requests, "post", fake_post)
+    assert mod.galxe_scores({"0xabc"}) == mod.scores["galxe-score-4-10"]
+    assert (Path(mod.current_dir) / mod.GALXE_LEADERBOARD_FILE).exists()
+
+    # fresh copy on disk: no crawl even for a new process
+    mod._galxe_points.cache_clear()
+    assert mod.galxe_scores({"0xabc"}) == mod.scores["galxe-score-4-10"]
+    assert calls["count"] == 1
+
+    # stale copy: crawled again
+    mod._galxe_points.cache_clear()
+    monkeypatch.setattr(mod, "GALXE_LEADERBOARD_TTL", 0)
+    mod.galxe_scores({"0xabc"})
+    assert calls["count"] == 2
+
+
 def test_gitpoap_any_event_awards_once(monkeypatch, mod):
     # prepare events csv
     (Path(mod.current_dir) / "gitpoap_events.csv").write_text("ID,Name\n1,evt1\n2,evt2\n")
@@ -204,20 +271,60 @@ def test_gitpoap_no_matches_zero(monkeypatch, mod):
     assert mod.gitpoap({"0xabc"}) == 0
 
 
+def test_gitpoap_index_built_once_and_reused(monkeypatch, mod):
+    (Path(mod.current_dir) / "gitpoap_events.csv").write_text("ID,Name\n1,evt1\n2,evt2\n")
+    requested = []
+
+    class FakeSession:
+        def get(self, url):
+            requested.append(url)
+            if url.endswith("/2/addresses"):
+                return DummyResp(200, {"addresses": ["0xabc", "0xdef"]})
+            return DummyResp(200, {"addresses": ["0xdef"]})
+
+        def mount(self, *args, **kwargs):
+            return None
+
+    monkeypatch.setattr(mod.requests, "Session", FakeSession)
+    assert mod.gitpoap({"0xABC"}) == mod.scores["git-poap"]
+    assert len(requested) == 2
+
+    stored = mod.store.load_fresh(Path(mod.current_dir) / mod.GITPOAP_INDEX_FILE, 60)
+    assert stored["addresses"] == {"0xabc": ["2"], "0xdef": ["1", "2"]}
+
+    # stored index is reused without any request
+    mod._gitpoap_index.cache_clear()
+    assert mod.gitpoap({"0xdef"}) == mod.scores["git-poap"]
+    assert mod.gitpoap({"0x123"}) == 0
+    assert len(requested) == 2
+
+    # a changed events list invalidates the stored index
+    mod._gitpoap_index.cache_clear()
+    (Path(mod.current_dir) / "gitpoap_events.csv").write_text("ID,Name\n1,evt1\n")
+    assert mod.gitpoap({"0xabc"}) == 0
+    assert len(requested) == 3
+
+
 def test_high_signal_api_buckets_and_max(monkeypatch, mod):
     monkeypatch.setenv("HIGH_SIGNAL_API_KEY", "key")
+    addr1, addr2, addr3 = "0x" + "11" * 20, "0x" + "22" * 20, "0x" + "33" * 20
 
     # Return 35 for addr1, 85 for addr2, 404 for addr3
-    def fake_get(url, params=None):
-        val = params.get("searchValue")
-        if val == "0xaddr1":
-            return DummyResp(200, {"totalScores": [{"totalScore": 35}]})
-        if val == "0xaddr2":
-            return DummyResp(200, {"totalScores": [{"totalScore": 85}]})
-        return DummyResp(404, {})
-
-    monkeypatch.setattr(mod.requests, "get", fake_get)
-    score = mod.high_signal({"0xaddr1", "0xaddr2", "0xaddr3"})
+    def fake_fetch_json_many(requests, allow_statuses=None, **kwargs):
+        assert allow_statuses == {404}
+        responses = []
+        for request in requests:
+            val = request.params.get("searchValue").lower()
+            if val == addr1:
+                responses.append(mod.fetch.Response(200, {"totalScores": [{"totalScore": 35}]}))
+            elif val == addr2:
+                responses.append(mod.fetch.Response(200, {"totalScores": [{"totalScore": 85}]}))
+            else:
+                responses.append(mod.fetch.Response(404))
+        return responses
+
+    monkeypatch.setattr(mod.fetch, "fetch_json_many", fake_fetch_json_many)
+    score = mod.high_signal({addr1, addr2, addr3})
     assert score == mod.scores["high-signal-80"]
 
 
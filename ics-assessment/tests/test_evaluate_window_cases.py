@@ -128,3 +128,40 @@ def test_exact_boundary_3_days(monkeypatch):
     reports = make_reports(day_epochs, statuses, version="v1")
     eligible = mod.evaluate_eligibility_window(reports, min_days=3)
     assert "7" in eligible
+
+
+def test_columnar_frames_match_report_dicts():
+    from common import perf_frames
+
+    day_epochs = mod.SECONDS_PER_DAY // mod.EPOCH_SECONDS
+    good = {"perf": {"assigned": 10, "included": 10}, "slashed": False, "distributed_rewards": 1}
+    bad = {"perf": {"assigned": 10, "included": 1}, "slashed": False, "distributed_rewards": 0}
+    frames = [
+        {"8": {"validators": {"1": good}}, "9": {"validators": {"2": good}}},
+        {"8": {"validators": {"1": good, "3": bad}}, "9": {"validators": {}}},
+        {"8": {"validators": {"1": good}}, "9": {"validators": {"2": good}}},
+        {"8": {"validators": {"1": good}}},
+    ]
+    for version in ["v1", "v2"]:
+        reports = []
+        for i, operators in enumerate(frames):
+            meta = mod.ReportMeta(f"CID{i}", version=version, start_epoch=i * day_epochs, end_epoch=(i + 1) * day_epochs)
+            reports.append((meta, {"threshold": 0.9, "operators": operators}))
+        columnar = [(meta, perf_frames.from_report(rep)) for meta, rep in reports]
+        assert mod.evaluate_eligibility_window(reports, min_days=3) == {"8"}
+        assert mod.evaluate_eligibility_window(columnar, min_days=3) == {"8"}
+        assert mod.evaluate_eligibility_window(columnar, min_days=2) == {"8", "9"}
+
+
+def test_accumulator_resumes_from_saved_seconds(monkeypatch):
+    patch_status_monkey(monkeypatch)
+    day_epochs = mod.SECONDS_PER_DAY // mod.EPOCH_SECONDS
+    reports = make_reports(day_epochs, [{"1": True, "2": False}, {"1": True, "2": True}, {"1": None, "2": True}])
+
+    accumulator = mod.GoodSecondsAccumulator()
+    for meta, rep in reports[:2]:
+        accumulator.add_frame(meta, rep)
+    resumed = mod.GoodSecondsAccumulator(accumulator.to_dict())
+    resumed.add_frame(*reports[2])
+    assert resumed.to_dict() == {"1": 2 * mod.SECONDS_PER_DAY, "2": 2 * mod.SECONDS_PER_DAY}
+    assert resumed.eligible(2) == mod.evaluate_eligibility_window(reports, min_days=2) == {"1", "2"}
@@ -1,3 +1,4 @@
+import json
 from importlib import util
 from pathlib import Path
 import pytest
@@ -26,23 +27,6 @@ def mod(tmp_path, monkeypatch):
     return mod
 
 
-class DummyResp:
-    def __init__(self, status=200, data=None, json_exc=None):
-        self.status_code = status
-        self._data = data if data is not None else {}
-        self._json_exc = json_exc
-
-    def raise_for_status(self):
-        if not (200 <= self.status_code < 400):
-            import requests
-            raise requests.HTTPError(f"HTTP {self.status_code}")
-
-    def json(self):
-        if self._json_exc:
-            raise self._json_exc
-        return self._data
-
-
 def test_is_addresses_in_csv_true_false(mod):
     (mod.current_dir / "list.csv").write_text("0xabc\n0xdef\n")
     assert mod.is_addresses_in_csv({"0xabc"}, "list.csv", base_dir=mod.current_dir) is True
@@ -92,38 +76,6 @@ def test_sdvtm_mainnet_prioritized(mod):
     assert mod.sdvtm_score({"0xabc"}) == mod.scores["sdvtm-mainnet"]
 
 
-def test_request_performance_report_retry_then_success(monkeypatch, mod):
-    # Ensure JSONDecodeError exists on requests for catch
-    monkeypatch.setattr(mod.requests, "JSONDecodeError", ValueError, raising=False)
-
-    calls = {"n": 0}
-
-    def fake_get(url):
-        calls["n"] += 1
-        if calls["n"] == 1:
-            return DummyResp(status=500)
-        if calls["n"] == 2:
-            return DummyResp(status=200, json_exc=mod.requests.JSONDecodeError("bad", "doc", 0))
-        return DummyResp(status=200, data={"ok": True})
-
-    monkeypatch.setattr(mod.requests, "get", fake_get)
-    data = mod._request_performance_report("Qm...")
-    assert data == {"ok": True}
-
-
-def test_request_performance_report_retry_exhaust(monkeypatch, mod):
-    calls = {"n": 0}
-
-    def fake_get(url):
-        calls["n"] += 1
-        return DummyResp(status=500)
-
-    monkeypatch.setattr(mod.requests, "get", fake_get)
-    with pytest.raises(Exception):
-        mod._request_performance_report("Qm...")
-    assert calls["n"] == 3
-
-
 def make_perf_data(threshold, validators):
     return {
         "threshold": threshold,
@@ -136,6 +88,20 @@ def make_perf_data(threshold, validators):
     }
 
 
+def serve_reports(monkeypatch, mod, reports):
+    """Serves `reports` by CID from files, recording every fetch."""
+    fetched = []
+
+    def fake_fetch(cid, **kwargs):
+        fetched.append(cid)
+        path = mod.current_dir / f"{cid}.json"
+        path.write_text(json.dumps(reports[cid]))
+        return path
+
+    monkeypatch.setattr(mod.ipfs, "fetch", fake_fetch)
+    return fetched
+
+
 def test_check_csm_performance_logs_true(monkeypatch, mod):
     # owners mapping
     (mod.current_dir / "node_operator_owners_hoodi.json").write_text('{"42": "0xabc"}')
@@ -146,7 +112,7 @@ def test_check_csm_performance_logs_true(monkeypatch, mod):
         "v2": {"perf": {"assigned": 0, "included": 0}},  # skipped
     }
     data = make_perf_data(threshold=0.9, validators=validators)
-    monkeypatch.setattr(mod, "_request_performance_report", lambda _: data)
+    serve_reports(monkeypatch, mod, {"Qm...": data})
 
     ok = mod._check_csm_performance_logs({"0xabc"}, "node_operator_owners_hoodi.json", ["Qm..."], "Testnet")
     assert ok is True
@@ -157,11 +123,26 @@ def test_check_csm_performance_logs_false_when_threshold_not_met(monkeypatch, mo
     (mod.current_dir / "node_operator_owners_hoodi.json").write_text('{"42": "0xabc"}')
     validators = {"v1": {"perf": {"assigned": 10, "included": 8}}}
     data = make_perf_data(threshold=0.9, validators=validators)
-    monkeypatch.setattr(mod, "_request_performance_report", lambda _: data)
+    serve_reports(monkeypatch, mod, {"Qm...": data})
     ok = mod._check_csm_performance_logs({"0xabc"}, "node_operator_owners_hoodi.json", ["Qm..."], "Testnet")
     assert ok is False
 
 
+def test_performance_report_parsed_once_for_all_applicants(monkeypatch, mod):
+    (mod.current_dir / "node_operator_owners_mainnet.json").write_text('{"1": "0xaaa", "2": "0xbbb", "3": "0xccc"}')
+    data = make_perf_data(threshold=0.9, validators={"v1": {"perf": {"assigned": 10, "included": 10}}})
+    data["operators"]["1"] = data["operators"].pop("42")
+    data["operators"]["2"] = {"validators": {"v2": {"perf": {"assigned": 10, "included": 5}}}}
+    fetched = serve_reports(monkeypatch, mod, {"QmA": data, "QmB": data})
+    eligible = [
+        mod._check_csm_performance_logs(applicant, "node_operator_owners_mainnet.json", ["QmA", "QmB"], "Mainnet")
+        for applicant in ({"0xaaa"}, {"0xbbb"}, {"0xccc"})
+    ]
+    assert eligible == [True, False, False]
+    assert fetched == ["QmA", "QmB"]
+    assert mod._performance_summary("QmA") == ({"1": 0, "2": 1}, data["blockstamp"])
+
+
 def test_csm_score_prefers_mainnet(monkeypatch, mod):
     # owners files
     (mod.current_dir / "node_operator_owners_hoodi.json").write_text('{"42": "0xabc"}')
@@ -170,7 +151,7 @@ def test_csm_score_prefers_mainnet(monkeypatch, mod):
     # make mainnet report eligible
     validators = {"v1": {"perf": {"assigned": 10, "included": 10}}}
     data_ok = make_perf_data(threshold=0.9, validators=validators)
-    monkeypatch.setattr(mod, "_request_performance_report", lambda _: data_ok)
+    serve_reports(monkeypatch, mod, {cid: data_ok for cid in mod.MAINNET_PERFORMANCE_REPORTS})
 
     # With testnet logic delegated and pending, overall score should use mainnet
     score = mod.csm_score({"0xabc"})
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from aiohttp import web
+
+from common import fetch
+
+
+async def serve_and_fetch(handler, requests_for, **kwargs):
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await fetch.fetch_json_many_async(requests_for(f"http://127.0.0.1:{port}"), **kwargs)
+    finally:
+        await runner.cleanup()
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(fetch, "BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(fetch, "_buckets", {})
+
+
+def test_retries_on_429_and_5xx_keeps_order():
+    attempts = {}
+
+    async def handler(request):
+        key = request.path
+        attempts[key] = attempts.get(key, 0) + 1
+        if key == "/a" and attempts[key] == 1:
+            return web.Response(status=429, headers={"Retry-After": "0"})
+        if key == "/b" and attempts[key] < 3:
+            return web.Response(status=503)
+        if key == "/missing":
+            return web.Response(status=404)
+        return web.json_response({"path": key, "q": request.query.get("q")})
+
+    responses = asyncio.run(serve_and_fetch(
+        handler,
+        lambda base: [
+            fetch.Request(f"{base}/a", params={"q": "1"}),
+            fetch.Request(f"{base}/b"),
+            fetch.Request(f"{base}/missing"),
+        ],
+        allow_statuses={404},
+    ))
+    assert [r.status for r in responses] == [200, 200, 404]
+    assert responses[0].data == {"path": "/a", "q": "1"}
+    assert responses[1].data["path"] == "/b"
+    assert responses[2].data is None
+    assert attempts == {"/a": 2, "/b": 3, "/missing": 1}
+
+
+def test_error_status_raises_after_retries():
+    async def handler(request):
+        return web.Response(status=500)
+
+    with pytest.raises(Exception):
+        asyncio.run(serve_and_fetch(handler, lambda base: [fetch.Request(f"{base}/x")], retries=1))
+
+
+def test_rate_limit_per_host():
+    async def handler(request):
+        return web.json_response({})
+
+    started = time.monotonic()
+    asyncio.run(serve_and_fetch(
+        handler,
+        lambda base: [fetch.Request(f"{base}/{i}") for i in range(6)],
+        rate_limits={"127.0.0.1": 20},
+    ))
+    # burst of 20 tokens covers all requests without waiting
+    assert time.monotonic() - started < 1
+
+    bucket_rate = 5
+    started = time.monotonic()
+    asyncio.run(serve_and_fetch(
+        handler,
+        lambda base: [fetch.Request(f"{base}/{i}") for i in range(bucket_rate + 3)],
+        rate_limits={"127.0.0.1": bucket_rate},
+    ))
+    # 5 requests pass as a burst, the remaining 3 wait for refills at 5/s
+    assert time.monotonic() - started >= 0.5
+
+
+def test_rate_limit_holds_across_calls_and_threads():
+    async def handler(request):
+        return web.json_response({})
+
+    def run(count):
+        asyncio.run(serve_and_fetch(
+            handler,
+            lambda base: [fetch.Request(f"{base}/{i}") for i in range(count)],
+            rate_limits={"127.0.0.1": 5},
+        ))
+
+    run(5)
+    started = time.monotonic()
+    # The burst was spent by the previous call: 4 more requests from two loops wait for refills at 5/s
+    threads = [threading.Thread(target=run, args=(2,)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - started >= 0.6
@@ -0,0 +1,91 @@
+import json
+
+from common import frame_audit
+
+
+def v1_frame(frame, distributed):
+    return {
+        "frame": frame,
+        "threshold": 0.9,
+        "distributable": 10**21 + 7,
+        "blockstamp": {"ref_slot": 1},
+        "operators": {
+            "1": {"distributed": distributed[0], "stuck": False, "validators": {
+                "10": {"perf": {"assigned": 10, "included": 10}, "slashed": False},
+                "11": {"perf": {"assigned": 10, "included": 5}, "slashed": False},
+            }},
+            "2": {"distributed": distributed[1], "stuck": False, "validators": {
+                "20": {"perf": {"assigned": 20, "included": 19}, "slashed": False},
+                "21": {"perf": {"assigned": 30, "included": 30}, "slashed": True},
+            }},
+            "3": {"distributed": distributed[2], "stuck": True, "validators": {
+                "30": {"perf": {"assigned": 30, "included": 30}, "slashed": False},
+            }},
+            "4": {"distributed": 0, "stuck": False, "validators": {}},
+        },
+    }
+
+
+def v2_frame(frame, operator_total):
+    return {
+        "frame": frame,
+        "distributable": 10**20,
+        "distributed_rewards": 3 * 10**19,
+        "rebate_to_protocol": 0,
+        "operators": {
+            "1": {"distributed_rewards": operator_total, "validators": {
+                "10": {"distributed_rewards": 10**19, "slashed": False},
+                "11": {"distributed_rewards": 10**19 + 1, "slashed": False},
+            }},
+            "2": {"distributed_rewards": 10**19 - 1, "validators": {
+                "20": {"distributed_rewards": 10**19 - 1, "slashed": False},
+            }},
+            "3": {"distributed_rewards": 0, "validators": {}},
+        },
+    }
+
+
+# Shares: operator 1 has 10 (validator 11 is below the threshold), 2 has 20 (21 slashed),
+# 3 is stuck
+EXPECTED_1 = (10**21 + 7) * 10 // 30
+EXPECTED_2 = (10**21 + 7) * 20 // 30
+
+
+def test_v1_frame_matches_shares(tmp_path, write_json):
+    log = write_json(tmp_path / "log.json", v1_frame([1, 2], [EXPECTED_1, EXPECTED_2, 0]))
+    (result,) = frame_audit.audit_logs([log])
+    assert result.version == "v1"
+    assert result.frame == (1, 2)
+    assert result.operators == 4
+    assert result.ok
+
+
+def test_v1_mismatches_are_reported_exactly(tmp_path, write_json):
+    log = write_json(tmp_path / "log.json", v1_frame([1, 2], [EXPECTED_1 + 1, EXPECTED_2, 5]))
+    (result,) = frame_audit.audit_logs([log])
+    assert [(m.kind, m.operator_id, m.diff) for m in result.mismatches] == [("share", "1", 1), ("share", "3", 5)]
+    assert result.mismatches[0].expected == EXPECTED_1
+
+
+def test_many_logs_and_v2_frames(tmp_path, write_json):
+    logs = [
+        write_json(tmp_path / "a.json", v1_frame([1, 2], [EXPECTED_1, EXPECTED_2, 0])),
+        write_json(tmp_path / "b.json.gz", [v2_frame([3, 4], 2 * 10**19 + 1), v2_frame([5, 6], 2 * 10**19)], compress=True),
+    ]
+    results = list(frame_audit.audit_logs(logs))
+    assert [(r.log, r.frame, r.version, r.ok) for r in results] == [
+        (logs[0], (1, 2), "v1", True),
+        (logs[1], (3, 4), "v2", True),
+        (logs[1], (5, 6), "v2", False),
+    ]
+    assert [(m.kind, m.operator_id, m.diff) for m in results[2].mismatches] == [
+        ("validators", "1", -1),
+        ("total", None, -1),
+    ]
+
+    report = results[2].to_dict()
+    assert report["frame"] == [5, 6]
+    assert report["mismatches"][0] == {
+        "kind": "validators", "operator_id": "1", "expected": str(2 * 10**19 + 1), "actual": str(2 * 10**19), "diff": "-1",
+    }
+    json.dumps(report)
@@ -0,0 +1,61 @@
+from experience import _collect_hoodi_eligible as mod
+
+
+DAY_EPOCHS = mod.SECONDS_PER_DAY // mod.EPOCH_SECONDS
+GOOD = {"perf": {"assigned": 10, "included": 10}, "slashed": False}
+BAD = {"perf": {"assigned": 10, "included": 1}, "slashed": False}
+
+
+def make_report(day, operators):
+    return {
+        "frame": [day * DAY_EPOCHS, (day + 1) * DAY_EPOCHS],
+        "threshold": 0.9,
+        "operators": {op_id: {"validators": {"1": v}} for op_id, v in operators.items()},
+    }
+
+
+LOGS = [
+    (mod.FROM_BLOCK + 100, "CID1", make_report(0, {"1": GOOD, "2": BAD})),
+    (mod.FROM_BLOCK + 200, "CID2", make_report(1, {"1": GOOD, "2": GOOD})),
+    (mod.FROM_BLOCK + 300, "CID3", make_report(2, {"1": BAD, "2": GOOD})),
+]
+
+
+def test_incremental_runs_match_full_recompute(monkeypatch, tmp_path):
+    scanned = []
+    fetched = []
+
+    def fake_getlogs(w3, address, from_block, to_block):
+        scanned.append((from_block, to_block))
+        return [(block, cid) for block, cid, _ in LOGS if from_block <= block <= to_block]
+
+    def fake_report(cid):
+        fetched.append(cid)
+        return next(rep for _, c, rep in LOGS if c == cid)
+
+    monkeypatch.setattr(mod, "fetch_cids_via_getlogs", fake_getlogs)
+    monkeypatch.setattr(mod, "request_performance_report", fake_report)
+    path = tmp_path / "state.json"
+
+    first = mod.update_eligibility(None, mod.load_checkpoint(path), mod.FROM_BLOCK + 250)
+    mod.save_checkpoint(path, first)
+    second = mod.update_eligibility(None, mod.load_checkpoint(path), mod.FROM_BLOCK + 350)
+
+    assert scanned == [(mod.FROM_BLOCK, mod.FROM_BLOCK + 250), (mod.FROM_BLOCK + 251, mod.FROM_BLOCK + 350)]
+    assert fetched == ["CID1", "CID2", "CID3"]
+    assert second.last_block == mod.FROM_BLOCK + 350
+    assert [meta.cid for meta in second.frames] == ["CID1", "CID2", "CID3"]
+    assert second.good_seconds == {"1": 2 * mod.SECONDS_PER_DAY, "2": 2 * mod.SECONDS_PER_DAY}
+
+    full = mod.update_eligibility(None, None, mod.FROM_BLOCK + 350)
+    assert full.good_seconds == second.good_seconds
+    reports = [frame for _, cid, rep in LOGS for frame in mod.report_frames(cid, rep)]
+    assert mod.GoodSecondsAccumulator(second.good_seconds).eligible(2) == mod.evaluate_eligibility_window(reports, 2)
+
+
+def test_checkpoint_for_other_settings_is_ignored(monkeypatch, tmp_path):
+    path = tmp_path / "state.json"
+    mod.save_checkpoint(path, mod.Checkpoint(last_block=10, good_seconds={"1": 5}))
+    assert mod.load_checkpoint(path).good_seconds == {"1": 5}
+    monkeypatch.setattr(mod, "FROM_BLOCK", mod.FROM_BLOCK + 1)
+    assert mod.load_checkpoint(path) is None
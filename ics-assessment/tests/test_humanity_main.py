@@ -32,31 +32,38 @@ class DummyResp:
         return self._data
 
 
+def fake_fetch(respond):
+    def fetch_json_many(requests, **kwargs):
+        return [respond(request) for request in requests]
+    return fetch_json_many
+
+
 def test_human_passport_api_picks_max(monkeypatch, mod):
     monkeypatch.setenv("HUMAN_PASSPORT_API_KEY", "key")
 
-    def fake_get(url, headers=None):
-        if url.endswith("0xabc"):
-            return DummyResp(200, {"score": 2.5})
-        if url.endswith("0xdef"):
-            return DummyResp(200, {"score": 7.2})
-        return DummyResp(200, {"score": 0})
+    def respond(request):
+        assert request.headers == {"X-API-Key": "key"}
+        if request.url.endswith("0xabc"):
+            return mod.fetch.Response(200, {"score": 2.5})
+        if request.url.endswith("0xdef"):
+            return mod.fetch.Response(200, {"score": 7.2})
+        return mod.fetch.Response(200, {"score": 0})
 
-    monkeypatch.setattr(mod.requests, "get", fake_get)
+    monkeypatch.setattr(mod.fetch, "fetch_json_many", fake_fetch(respond))
     assert mod.human_passport_score({"0xabc", "0xdef"}) == 7.2
 
 
 def test_human_passport_api_min_and_cap(monkeypatch, mod):
     monkeypatch.setenv("HUMAN_PASSPORT_API_KEY", "key")
 
-    def fake_get(url, headers=None):
-        if url.endswith("0xlow"):
-            return DummyResp(200, {"score": mod.scores["human-passport-min"] - 0.1})
-        if url.endswith("0xhigh"):
-            return DummyResp(200, {"score": mod.scores["human-passport-max"] + 5})
-        return DummyResp(200, {"score": 0})
+    def respond(request):
+        if request.url.endswith("0xlow"):
+            return mod.fetch.Response(200, {"score": mod.scores["human-passport-min"] - 0.1})
+        if request.url.endswith("0xhigh"):
+            return mod.fetch.Response(200, {"score": mod.scores["human-passport-max"] + 5})
+        return mod.fetch.Response(200, {"score": 0})
 
-    monkeypatch.setattr(mod.requests, "get", fake_get)
+    monkeypatch.setattr(mod.fetch, "fetch_json_many", fake_fetch(respond))
     # below min -> 0
     assert mod.human_passport_score({"0xlow"}) == 0
     # above max -> cap
@@ -0,0 +1,94 @@
+import json
+from pathlib import Path
+
+import pytest
+import requests
+
+from common import ipfs
+
+
+REPORT = json.dumps({"threshold": 0.9, "operators": {}}).encode()
+REPORT_CID = ipfs.cid_v0(REPORT)
+
+
+class DummyResp:
+    def __init__(self, status=200, content=b""):
+        self.status_code = status
+        self.content = content
+
+    def raise_for_status(self):
+        if not (200 <= self.status_code < 400):
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+
+@pytest.fixture()
+def gateway(monkeypatch, tmp_path):
+    """Serves `responses` in order and counts gateway calls."""
+    monkeypatch.setattr(ipfs, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(ipfs.time, "sleep", lambda _: None)
+    state = {"calls": 0, "responses": []}
+
+    def fake_get(url, timeout=None):
+        state["calls"] += 1
+        return state["responses"].pop(0) if len(state["responses"]) > 1 else state["responses"][0]
+
+    monkeypatch.setattr(ipfs.requests, "get", fake_get)
+    return state
+
+
+def test_cid_v0_matches_ipfs_add():
+    assert ipfs.cid_v0(b"") == "QmbFMke1KXqnYyBBWxB74N4c5SBnJMVAiMNRcGu6x1AwQH"
+    assert ipfs.cid_v0(b"hello world\n") == "QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o"
+
+
+def test_cid_v0_of_multi_chunk_files():
+    # Published early adoption list, see artifacts/mainnet/early-adoption/README.md
+    data = (Path(__file__).resolve().parents[2] / "artifacts/mainnet/early-adoption/addresses.json").read_bytes()
+    assert len(data) > 3 * ipfs.CHUNK_SIZE
+    assert ipfs.cid_v0(data, leaf_type="file") == "QmfYtR3JocHVaeYoyXCikSPN9gTT24o1DXKkRLECHbusCL"
+    assert ipfs.matches_cid_v0(data, "QmfYtR3JocHVaeYoyXCikSPN9gTT24o1DXKkRLECHbusCL")
+    kubo = ipfs.cid_v0(data)
+    assert kubo != "QmfYtR3JocHVaeYoyXCikSPN9gTT24o1DXKkRLECHbusCL" and ipfs.matches_cid_v0(data, kubo)
+    # Leaf types only differ once there is more than one chunk
+    chunk = data[:ipfs.CHUNK_SIZE]
+    assert ipfs.cid_v0(chunk) == ipfs.cid_v0(chunk, leaf_type="file")
+
+
+def test_fetch_accepts_kubo_cid_of_large_report(gateway):
+    report = json.dumps({"operators": {str(i): {"stuck": False} for i in range(30000)}}).encode()
+    assert len(report) > ipfs.CHUNK_SIZE
+    gateway["responses"] = [DummyResp(200, report)]
+    assert ipfs.fetch_json(ipfs.cid_v0(report)) == json.loads(report)
+    assert gateway["calls"] == 1
+
+
+def test_fetch_retries_then_caches(gateway, tmp_path):
+    gateway["responses"] = [DummyResp(500), DummyResp(200, b"{bad"), DummyResp(200, REPORT)]
+    assert ipfs.fetch_json(REPORT_CID) == json.loads(REPORT)
+    assert gateway["calls"] == 3
+    assert (tmp_path / f"{REPORT_CID}.gz").exists()
+
+    # Cached content is never refetched
+    assert ipfs.fetch_json(REPORT_CID) == json.loads(REPORT)
+    assert gateway["calls"] == 3
+
+
+def test_fetch_retry_exhaust(gateway):
+    gateway["responses"] = [DummyResp(500)]
+    with pytest.raises(requests.HTTPError):
+        ipfs.fetch_json(REPORT_CID)
+    assert gateway["calls"] == 3
+
+
+def test_fetch_rejects_content_not_matching_cid(gateway, tmp_path):
+    gateway["responses"] = [DummyResp(200, b'{"forged": true}')]
+    with pytest.raises(ipfs.ContentMismatch):
+        ipfs.fetch_json(REPORT_CID)
+    assert ipfs.cached_path(REPORT_CID, tmp_path) is None
+
+
+def test_fetch_uncompressed_and_unverifiable_cid(gateway, tmp_path):
+    cid = "bafybeigdyrzt5sfp7udm7hu76uh7y26nf3efuylqabf3oclgtqy55fbzdi"
+    gateway["responses"] = [DummyResp(200, b"not json"), DummyResp(200, REPORT)]
+    assert ipfs.fetch_json(cid, compress=False) == json.loads(REPORT)
+    assert (tmp_path / cid).read_bytes() == REPORT
@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+from hexbytes import HexBytes
+
+from common import log_scanner
+
+
+class FakeEth:
+    """One log every 10 blocks; ranges wider than `max_range` blocks are refused."""
+
+    def __init__(self, max_range=100, fail_at=None):
+        self.max_range = max_range
+        self.fail_at = fail_at
+        self.block_number = 1000
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get_logs(self, params):
+        start, end = params["fromBlock"], params["toBlock"]
+        with self.lock:
+            self.calls.append((start, end))
+        if end - start + 1 > self.max_range:
+            raise ValueError({"code": -32005, "message": "query returned more than 10000 results"})
+        if self.fail_at is not None and start <= self.fail_at <= end:
+            raise ConnectionError("node is down")
+        return [
+            {
+                "address": params["address"],
+                "topics": [HexBytes(params["topics"][0])],
+                "data": HexBytes(block.to_bytes(32, "big")),
+                "blockNumber": block,
+                "blockHash": HexBytes(b"\x01" * 32),
+                "transactionHash": HexBytes(b"\x02" * 32),
+                "transactionIndex": 0,
+                "logIndex": 0,
+            }
+            for block in range(start, end + 1)
+            if block % 10 == 0
+        ]
+
+
+class FakeWeb3:
+    def __init__(self, **kwargs):
+        self.eth = FakeEth(**kwargs)
+
+
+FILTER = {"address": "0x0000000000000000000000000000000000000001", "topics": [log_scanner.topic("Ping(uint256)")]}
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(log_scanner, "BACKOFF_BASE", 0)
+
+
+def blocks(logs):
+    return [log["blockNumber"] for log in logs]
+
+
+def test_splits_refused_ranges_and_keeps_order():
+    w3 = FakeWeb3(max_range=100)
+    logs = list(log_scanner.scan_logs(w3, FILTER, 1, "latest", chunk_size=300, concurrency=3))
+    assert blocks(logs) == list(range(10, 1001, 10))
+    assert int.from_bytes(logs[0]["data"], "big") == 10
+    assert all(end - start + 1 <= 300 for start, end in w3.eth.calls)
+
+
+def test_decode_is_applied():
+    w3 = FakeWeb3()
+    decoded = list(log_scanner.scan_logs(w3, FILTER, 1, 50, decode=lambda log: log["blockNumber"] * 2))
+    assert decoded == [20, 40, 60, 80, 100]
+
+
+def test_resumes_from_checkpoint(tmp_path):
+    checkpoint = tmp_path / "scan.jsonl"
+    w3 = FakeWeb3(fail_at=555)
+    scanned = []
+    with pytest.raises(ConnectionError):
+        for log in log_scanner.scan_logs(w3, FILTER, 1, 1000, checkpoint=checkpoint, chunk_size=100, concurrency=1):
+            scanned.append(log["blockNumber"])
+    assert scanned == list(range(10, 501, 10))
+
+    w3 = FakeWeb3()
+    logs = list(log_scanner.scan_logs(w3, FILTER, 1, 1000, checkpoint=checkpoint, chunk_size=100, concurrency=2))
+    assert blocks(logs) == list(range(10, 1001, 10))
+    assert min(start for start, _ in w3.eth.calls) == 501
+
+    # A different filter doesn't reuse the chunks
+    w3 = FakeWeb3()
+    other = {**FILTER, "topics": [log_scanner.topic("Pong(uint256)")]}
+    assert len(list(log_scanner.scan_logs(w3, other, 1, 1000, checkpoint=checkpoint, chunk_size=100))) == 100
+    assert min(start for start, _ in w3.eth.calls) == 1
+
+
+def test_gives_up_on_other_errors():
+    w3 = FakeWeb3(fail_at=5)
+    with pytest.raises(ConnectionError):
+        list(log_scanner.scan_logs(w3, FILTER, 1, 10, retries=2))
+    assert w3.eth.calls == [(1, 10), (1, 10)]
@@ -0,0 +1,80 @@
+import csv
+import time
+from importlib import util
+from pathlib import Path
+import pytest
+
+
+HERE = Path(__file__).resolve()
+MODULE_PATH = HERE.parent.parent / "main.py"
+
+
+@pytest.fixture()
+def mod():
+    spec = util.spec_from_file_location("ics_main", str(MODULE_PATH))
+    mod = util.module_from_spec(spec)
+    assert spec and spec.loader
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_parse_addresses_separators(mod):
+    assert mod.parse_addresses(" 0xAbc;0xdef, 0x123  0xabc ") == {"0xabc", "0xdef", "0x123"}
+
+
+def test_run_batch_writes_row_per_applicant(monkeypatch, mod, tmp_path):
+    monkeypatch.delenv("HUMAN_PASSPORT_API_KEY", raising=False)
+    monkeypatch.delenv("HIGH_SIGNAL_API_KEY", raising=False)
+    calls = []
+
+    def fake_assess(addresses, discord=None, x=None, human_passport_score=None, high_signal_score=None, concurrency=None):
+        calls.append((addresses, discord, x, human_passport_score, high_signal_score))
+        if "0xbad" in addresses:
+            raise RuntimeError("boom")
+        return {"Experience": 6, "Humanity": 0 if not discord else 5, "Engagement": 3}
+
+    monkeypatch.setattr(mod, "assess", fake_assess)
+    applicants = tmp_path / "applicants.csv"
+    applicants.write_text(
+        "id,addresses,discord,x,passport,high_signal\n"
+        "a,0xAAA;0xbbb,yes,no,7.5,42\n"
+        "b,0xccc,,,,\n"
+        "c,0xbad,,,,\n"
+    )
+    results = tmp_path / "results.csv"
+    mod.run_batch(str(applicants), str(results))
+
+    assert calls[0] == ({"0xaaa", "0xbbb"}, True, False, 7.5, 42.0)
+    # blank overrides never prompt without API keys
+    assert calls[1] == ({"0xccc"}, False, False, 0, 0)
+
+    rows = list(csv.DictReader(results.open()))
+    assert [r["id"] for r in rows] == ["a", "b", "c"]
+    assert rows[0]["total"] == "14" and rows[0]["eligible"] == "True" and rows[0]["missing"] == ""
+    assert rows[1]["eligible"] == "False" and rows[1]["missing"] == "Humanity"
+    assert rows[2]["error"] == "boom" and rows[2]["total"] == ""
+
+
+def test_run_sources_concurrently_and_grouped(mod):
+    def slow(value):
+        def source():
+            time.sleep(0.2)
+            return value
+        return source
+
+    started = time.monotonic()
+    results = mod.asyncio.run(mod.run_sources({
+        "A": {"a1": slow(1), "a2": slow(2)},
+        "B": {"b1": slow(3), "b2": slow(4)},
+    }, concurrency=4))
+    assert time.monotonic() - started < 0.6
+    assert results == {"A": {"a1": 1, "a2": 2}, "B": {"b1": 3, "b2": 4}}
+
+
+def test_assess_applies_category_rules(monkeypatch, mod):
+    monkeypatch.setattr(mod, "experience_sources", lambda a: {"eth-staker": lambda: 6, "ssv-verified": lambda: 7})
+    monkeypatch.setattr(mod, "humanity_sources", lambda a, **kw: {"human-passport": lambda: 3})
+    monkeypatch.setattr(mod, "engagement_sources", lambda a, **kw: {"aragon-vote": lambda: 2, "protocol-guild": lambda: True})
+    scores = mod.assess({"0xabc"}, discord=False, x=False, human_passport_score=3, high_signal_score=0)
+    # experience capped at MAX_SCORE, humanity below MIN_SCORE, protocol guild awards nothing
+    assert scores == {"Experience": mod.EXP_MAX_SCORE, "Humanity": 0, "Engagement": 2}
@@ -0,0 +1,61 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from common import merkle
+from common.keccak import BATCH_MIN, keccak256, keccak256_batch
+
+HOODI_ICS = Path(__file__).parents[2] / "artifacts" / "hoodi" / "ics"
+
+
+@pytest.mark.parametrize("length", [0, 20, 32, 64, 135, 136, 271, 272, 416])
+@pytest.mark.parametrize("count", [3, BATCH_MIN * 2 + 1])
+def test_keccak_batch_matches_single(length, count):
+    messages = np.frombuffer(os.urandom(count * length), dtype=np.uint8).reshape(count, length)
+    digests = keccak256_batch(messages)
+    assert [d.tobytes() for d in digests] == [keccak256(m.tobytes()) for m in messages]
+
+
+def test_compose_matches_committed_files(tmp_path):
+    addresses = merkle.read_csv_files([HOODI_ICS / "ics.csv"])
+    merkle.compose(list(addresses), tmp_path)
+    for name in ("addresses.json", "merkle-tree.json", "merkle-proofs.json"):
+        assert (tmp_path / name).read_bytes() == (HOODI_ICS / name).read_bytes(), name
+
+
+def test_proofs_verify_against_root():
+    addresses = ["0x" + os.urandom(20).hex() for _ in range(300)]
+    tree = merkle.StandardMerkleTree.of([[a] for a in addresses], ["address"])
+    proofs = list(tree.proofs())
+    assert [p for _, p in proofs] == [tree.get_proof(i) for i in range(len(tree))]
+    for value, proof in proofs:
+        assert merkle.StandardMerkleTree.verify(tree.root, ["address"], value, proof)
+    assert not merkle.StandardMerkleTree.verify(tree.root, ["address"], [addresses[1]], proofs[0][1])
+
+
+def test_load_round_trip_and_tree_check():
+    values = [[str(i), str(10**20 + i)] for i in range(50)]
+    tree = merkle.StandardMerkleTree.of(values, ["uint256", "uint256"])
+    loaded = merkle.StandardMerkleTree.load(json.loads(json.dumps(tree.dump())))
+    assert loaded.root == tree.root
+    assert loaded.verify_tree()
+    loaded.tree[5] = 0
+    assert not loaded.verify_tree()
+
+
+def test_single_leaf_and_duplicates():
+    tree = merkle.StandardMerkleTree.of([["0x" + "11" * 20]], ["address"])
+    assert tree.root == "0x" + merkle.leaf_hash(["address"], ["0x" + "11" * 20]).hex()
+    assert tree.get_proof(0) == []
+
+    tree = merkle.StandardMerkleTree.of([["0x" + "22" * 20]] * 2, ["address"])
+    assert [v["treeIndex"] for v in tree.values] == [2, 1]
+
+
+def test_legacy_dump_key_order(tmp_path):
+    tree = merkle.StandardMerkleTree.of([["0x" + "33" * 20]], ["address"])
+    merkle.write_tree(tmp_path / "tree.json", tree, merkle.LEGACY_DUMP_KEYS)
+    assert list(json.loads((tmp_path / "tree.json").read_text())) == list(merkle.LEGACY_DUMP_KEYS)
@@ -0,0 +1,114 @@
+import json
+from pathlib import Path
+
+import pytest
+from eth_abi import decode, encode
+from eth_utils.abi import collapse_if_tuple
+from web3 import Web3
+from web3.providers.base import BaseProvider
+
+from common import multicall
+
+CSM_ABI = json.loads((Path(__file__).parent.parent.parent / "artifacts/mainnet/ics/abi/csm_abi.json").read_text())
+CSM_ADDRESS = "0xdA7dE2ECdDfccC6c3AF10108Db212ACBBf9EA83F"
+BLOCK = 1000
+
+
+def node_operator_output():
+    fn = next(item for item in CSM_ABI if item.get("name") == "getNodeOperator")
+    return collapse_if_tuple(fn["outputs"][0])
+
+
+def encoded_node_operator(no_id: int) -> bytes:
+    manager = "0x" + f"{no_id:040x}"
+    reward = "0x" + f"{no_id + 1:040x}"
+    values = (no_id, 0, 0, 0, 0, 0, 0, 0, 0, 0, manager, manager, reward, reward, no_id % 2 == 0)
+    return encode([node_operator_output()], [values])
+
+
+class FakeCSMProvider(BaseProvider):
+    """Answers getNodeOperator(i) directly and through Multicall3 aggregate3."""
+
+    def __init__(self, multicall_deployed=True):
+        super().__init__()
+        self.multicall_deployed = multicall_deployed
+        self.calls = []
+
+    def _call(self, data: bytes) -> bytes:
+        (no_id,) = decode(["uint256"], data[4:])
+        return encoded_node_operator(no_id)
+
+    def make_request(self, method, params):
+        self.calls.append(method)
+        if method == "eth_chainId":
+            return {"jsonrpc": "2.0", "id": 1, "result": "0x1"}
+        if method == "eth_blockNumber":
+            return {"jsonrpc": "2.0", "id": 1, "result": hex(BLOCK + 100)}
+        if method == "eth_getCode":
+            code = "0x6000" if self.multicall_deployed else "0x"
+            return {"jsonrpc": "2.0", "id": 1, "result": code}
+        if method == "eth_call":
+            tx, block = params
+            assert block == hex(BLOCK)
+            data = bytes.fromhex(tx["data"][2:])
+            if tx["to"].lower() == multicall.MULTICALL3_ADDRESS.lower():
+                assert tx["data"].startswith(multicall.AGGREGATE3_SELECTOR)
+                (calls,) = decode(["(address,bool,bytes)[]"], data[4:])
+                result = encode(["(bool,bytes)[]"], [[(True, self._call(call)) for _, _, call in calls]])
+            else:
+                result = self._call(data)
+            return {"jsonrpc": "2.0", "id": 1, "result": "0x" + result.hex()}
+        raise NotImplementedError(method)
+
+
+def make_csm(provider):
+    w3 = Web3(provider)
+    return w3, w3.eth.contract(address=CSM_ADDRESS, abi=CSM_ABI, decode_tuples=True)
+
+
+def test_multicall_batches_match_single_calls():
+    w3, csm = make_csm(FakeCSMProvider())
+    node_operators = multicall.get_node_operators(w3, csm, range(7), BLOCK, batch_size=3)
+
+    assert list(node_operators) == list(range(7))
+    assert w3.provider.calls.count("eth_call") == 3
+    for no_id, node_operator in node_operators.items():
+        assert node_operator == csm.functions.getNodeOperator(no_id).call(block_identifier=BLOCK)
+    assert multicall.node_operator_address(node_operators[2]) == Web3.to_checksum_address("0x" + f"{2:040x}")
+    assert multicall.node_operator_address(node_operators[3]) == Web3.to_checksum_address("0x" + f"{4:040x}")
+
+
+def test_json_rpc_batch_fallback(monkeypatch):
+    provider = FakeCSMProvider(multicall_deployed=False)
+    provider.endpoint_uri = "http://rpc.local"
+    w3, csm = make_csm(provider)
+    posts = []
+
+    class Response:
+        def __init__(self, payload):
+            self._payload = payload
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            # Batch responses may come back in any order
+            return list(reversed(self._payload))
+
+    def fake_post(url, json, timeout):
+        posts.append(len(json))
+        return Response([
+            {"jsonrpc": "2.0", "id": item["id"], "result": provider.make_request("eth_call", item["params"])["result"]}
+            for item in json
+        ])
+
+    monkeypatch.setattr(multicall.requests, "post", fake_post)
+    node_operators = multicall.get_node_operators(w3, csm, [5, 1, 8], BLOCK, batch_size=2)
+    assert posts == [2, 1]
+    assert [no.totalAddedKeys for no in node_operators.values()] == [5, 1, 8]
+
+
+def test_refuses_unpinned_block():
+    w3, csm = make_csm(FakeCSMProvider())
+    with pytest.raises(ValueError):
+        multicall.get_node_operators(w3, csm, [1], "latest")
@@ -0,0 +1,67 @@
+import numpy as np
+
+from common import perf_frames
+from experience import _collect_hoodi_eligible as hoodi
+
+
+def make_report():
+    return {
+        "frame": [10, 20],
+        "threshold": 0.9,
+        "distributable": 10**21,
+        "operators": {
+            "1": {"distributed": 0, "validators": {
+                "100": {"perf": {"assigned": 10, "included": 10}, "slashed": False, "distributed_rewards": 5},
+                "101": {"perf": {"assigned": 10, "included": 8}, "slashed": False, "distributed_rewards": 0},
+            }},
+            "2": {"distributed": 0, "validators": {}},
+            "3": {"distributed": 0, "validators": {
+                "300": {"perf": {"assigned": 0, "included": 0}, "slashed": False, "distributed_rewards": 1},
+                "301": {"perf": {"assigned": 20, "included": 19}, "slashed": True, "distributed_rewards": 2},
+            }},
+            "4": {"distributed": 0, "validators": {
+                "400": {"perf": {"assigned": 30, "included": 30}, "slashed": False, "distributed_rewards": 10**19},
+            }},
+        },
+    }
+
+
+def test_columns_layout():
+    frame = perf_frames.from_report(make_report())
+    assert frame.frame == (10, 20)
+    assert frame.operator_ids == ["1", "2", "3", "4"]
+    assert frame.offsets.tolist() == [0, 2, 2, 4, 5]
+    assert frame.validator_index.tolist() == [100, 101, 300, 301, 400]
+    assert frame.validator_operator.tolist() == [0, 0, 2, 2, 3]
+    # 10**19 doesn't fit into int64 and is kept exact
+    assert frame.distributed_rewards.dtype == object
+    assert frame.validators_of("3") == slice(2, 4)
+
+
+def test_vectorized_statuses():
+    frame = perf_frames.from_report(make_report())
+    assert frame.status_v1 == {"1": False, "2": None, "3": True, "4": True}
+    assert frame.status_v2 == {"1": False, "2": None, "3": True, "4": True}
+    assert frame.failing_count(frame.meets_threshold()).tolist() == [1, 0, 0, 0]
+
+
+def test_shares_and_exact_distribution():
+    frame = perf_frames.from_report(make_report())
+    # 3/301 is slashed, 3/300 has nothing assigned, 1/101 is below the threshold
+    assert frame.shares().tolist() == [10, 0, 0, 30]
+    assert frame.expected_distribution().tolist() == [10**21 // 4, 0, 0, 10**21 * 3 // 4]
+
+
+def test_hoodi_checks_accept_dicts_and_columns():
+    report = make_report()
+    frame = perf_frames.from_report(report)
+    for no_id in ["1", "2", "3", "4", "5"]:
+        assert hoodi.operator_passes_in_report_v1(report, no_id) == hoodi.operator_passes_in_report_v1(frame, no_id)
+        assert hoodi.operator_passes_in_report_v2(report, no_id) == hoodi.operator_passes_in_report_v2(frame, no_id)
+    assert hoodi.operator_passes_in_report_v1(report, "5") is None
+
+
+def test_empty_frame():
+    frame = perf_frames.from_report({"threshold": 0.9, "operators": {}})
+    assert frame.status_v1 == {}
+    assert np.array_equal(frame.shares(), np.zeros(0))
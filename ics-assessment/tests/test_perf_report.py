@@ -0,0 +1,80 @@
+import gzip
+import io
+import json
+
+from common import perf_report
+
+
+def make_frame(frame, operators):
+    return {
+        "frame": frame,
+        "threshold": 0.9,
+        "distributable": 10**18,
+        "blockstamp": {"block_number": 1, "block_timestamp": 1_700_000_000},
+        "operators": {
+            str(no_id): {
+                "distributed": 1,
+                "stuck": False,
+                "validators": {
+                    f"{no_id}{i}": {"perf": {"assigned": 10, "included": 9.5 if i else 10}, "slashed": False}
+                    for i in range(3)
+                },
+            }
+            for no_id in operators
+        },
+    }
+
+
+def expected(frame, operator_ids):
+    out = {k: frame[k] for k in perf_report.FRAME_KEYS}
+    out["operators"] = {k: v for k, v in frame["operators"].items() if k in operator_ids}
+    return out
+
+
+def test_v1_report_keeps_only_requested_operators():
+    report = make_frame([1, 2], range(50))
+    data = perf_report.parse(io.BytesIO(json.dumps(report).encode()), ["7", "42", "999"])
+    assert data == expected(report, {"7", "42"})
+    assert isinstance(data["operators"]["7"]["validators"]["70"]["perf"]["included"], int)
+
+
+def test_v2_report_keeps_frame_list_shape():
+    report = [make_frame([1, 2], range(5)), make_frame([3, 4], range(3, 8))]
+    data = perf_report.parse(io.BytesIO(json.dumps(report).encode()), [4])
+    assert data == [expected(report[0], {"4"}), expected(report[1], {"4"})]
+
+
+def test_all_operators_when_not_restricted():
+    report = make_frame([1, 2], range(5))
+    data = perf_report.parse(io.BytesIO(json.dumps(report).encode()))
+    assert data["operators"] == report["operators"]
+
+
+def test_load_file_reads_compressed_cache(tmp_path):
+    report = make_frame([1, 2], range(5))
+    path = tmp_path / "Qm.gz"
+    with gzip.open(path, "wb") as f:
+        f.write(json.dumps(report).encode())
+    assert perf_report.load_file(path, ["1"]) == expected(report, {"1"})
+
+
+def test_wei_amounts_beyond_int64_stay_exact():
+    report = make_frame([1, 2], range(3))
+    report["distributable"] = 123 * 10**18 + 1
+    report["operators"]["1"]["distributed"] = -(10**30)
+    report["blockstamp"] = {"block_hash": "x, 12345678901234567890123"}
+    raw = json.dumps(report, indent=1).encode()
+
+    class SmallReads(io.BytesIO):
+        def read(self, size=-1):
+            return super().read(5 if size else 0)
+
+    frames = list(perf_report.iter_frames(SmallReads(raw), frame_keys=("distributable", "blockstamp", "threshold")))
+    assert frames == [{
+        "distributable": 123 * 10**18 + 1,
+        "blockstamp": report["blockstamp"],
+        "threshold": report["threshold"],
+        "operators": report["operators"],
+    }]
+    assert type(frames[0]["threshold"]) is float
+    assert perf_report.parse(io.BytesIO(raw), ["1"])["operators"]["1"]["distributed"] == -(10**30)
@@ -0,0 +1,89 @@
+import json
+import os
+
+import pytest
+from eth_abi import decode
+
+from common import merkle, proof_check
+
+CONTRACT = "0x" + "ea" * 20
+
+
+@pytest.fixture
+def files(tmp_path):
+    addresses = ["0x" + os.urandom(20).hex() for _ in range(257)]
+    tree = merkle.compose(addresses, tmp_path)
+    return tree, tmp_path / "merkle-tree.json", tmp_path / "merkle-proofs.json"
+
+
+def rewrite_proofs(path, change):
+    proofs = json.loads(path.read_text())
+    change(proofs)
+    path.write_text(json.dumps(proofs))
+
+
+def test_offline_accepts_valid_proofs(files):
+    tree, tree_path, proofs_path = files
+    seen = []
+    report = proof_check.verify_offline(tree_path, proofs_path, processes=2, chunk_size=50, progress=seen.append)
+    assert report.ok
+    assert report.checked == len(tree)
+    assert seen[-1] == len(tree)
+
+
+def test_offline_reports_bad_missing_and_unknown(files):
+    tree, tree_path, proofs_path = files
+    tampered, dropped = tree.values[3]["value"][0], tree.values[7]["value"][0]
+    stranger = "0x" + "00" * 20
+
+    def change(proofs):
+        proofs[tampered] = proofs[tampered][:-1]
+        del proofs[dropped]
+        proofs[stranger] = proofs[tree.values[0]["value"][0]]
+
+    rewrite_proofs(proofs_path, change)
+    report = proof_check.verify_offline(tree_path, proofs_path, processes=1, chunk_size=64)
+    assert report.failed == [tampered, stranger]
+    assert report.missing == [dropped]
+    assert report.unknown == [stranger]
+    assert not report.ok
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+def test_onchain_batches_calls_at_a_pinned_block(files, monkeypatch):
+    tree, tree_path, proofs_path = files
+    rejected = tree.values[5]["value"][0]
+    batches = []
+
+    def post(session, url, json=None, timeout=None):
+        if isinstance(json, dict):
+            return FakeResponse({"jsonrpc": "2.0", "id": 0, "result": hex(1234)})
+        batches.append(json)
+        results = []
+        for call in json:
+            tx, block = call["params"]
+            assert tx["to"] == CONTRACT and block == hex(1234)
+            assert tx["data"].startswith(proof_check.VERIFY_PROOF_SELECTOR)
+            address, proof = decode(["address", "bytes32[]"], bytes.fromhex(tx["data"][10:]))
+            ok = address != rejected and merkle.StandardMerkleTree.verify(
+                tree.root, ["address"], [address], ["0x" + p.hex() for p in proof]
+            )
+            results.append({"jsonrpc": "2.0", "id": call["id"], "result": "0x" + f"{int(ok):064x}"})
+        return FakeResponse(results[::-1])
+
+    monkeypatch.setattr("requests.Session.post", post)
+    report = proof_check.verify_onchain("http://rpc", CONTRACT, proofs_path, tree_path, batch_size=40, connections=3)
+    assert report.failed == [rejected]
+    assert report.checked == len(tree)
+    assert len(batches) == 7
+    assert not report.missing and not report.unknown
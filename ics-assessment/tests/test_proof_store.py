@@ -0,0 +1,59 @@
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from common import merkle, proof_store
+
+
+@pytest.fixture
+def tree():
+    addresses = ["0x" + os.urandom(20).hex() for _ in range(300)] + ["0x" + "ab" * 19 + "00"]
+    return merkle.StandardMerkleTree.of([[a] for a in addresses], ["address"])
+
+
+@pytest.fixture
+def store(tree, tmp_path):
+    assert proof_store.build_store(tree, tmp_path / "proofs.bin") == len(tree)
+    store = proof_store.ProofStore(tmp_path / "proofs.bin")
+    yield store
+    store.close()
+
+
+def test_lookup_returns_tree_proofs(tree, store):
+    assert store.root == tree.root
+    for i, value in tree.entries():
+        assert store.proof(value[0]) == tree.get_proof(i)
+        assert store.proof(value[0].upper().replace("0X", "0x")) == tree.get_proof(i)
+    assert store.proof("0x" + "ab" * 20) is None
+    assert store.proof("0x" + "ab" * 19 + "01") is None
+    assert store.proof("not an address") is None
+    assert "0x" + "ab" * 19 + "00" in store
+
+
+def test_build_rejects_duplicates(tmp_path):
+    tree = merkle.StandardMerkleTree.of([["0x" + "11" * 20]] * 2, ["address"])
+    with pytest.raises(ValueError):
+        proof_store.build_store(tree, tmp_path / "proofs.bin")
+
+
+def test_http_service(tree, store):
+    server = proof_store.make_server(store, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        address = tree.values[0]["value"][0]
+        with urllib.request.urlopen(f"{base}/proof/{address}") as response:
+            assert json.load(response) == {"address": address, "root": tree.root, "proof": tree.get_proof(0)}
+        with urllib.request.urlopen(f"{base}/root") as response:
+            assert json.load(response) == {"root": tree.root, "count": len(tree)}
+        for path, status in [("/proof/0x" + "cd" * 20, 404), ("/proof/0x12", 400), ("/", 404)]:
+            with pytest.raises(urllib.error.HTTPError) as e:
+                urllib.request.urlopen(base + path)
+            assert e.value.code == status
+    finally:
+        server.shutdown()
+        server.server_close()
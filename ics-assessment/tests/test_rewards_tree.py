@@ -0,0 +1,75 @@
+from pathlib import Path
+
+from eth_abi import encode
+
+from common import ipfs, merkle, rewards_tree
+from common.keccak import keccak256
+
+
+def frame(frame, distributed, key="distributed"):
+    return {
+        "frame": frame,
+        "operators": {str(no_id): {key: amount, "validators": {}} for no_id, amount in distributed.items()},
+    }
+
+
+def test_hash_leaf_matches_contract():
+    expected = keccak256(keccak256(encode(["uint256", "uint256"], [7, 10**30])))
+    assert rewards_tree.hash_leaf(7, 10**30) == expected
+
+
+def test_fold_builds_cumulative_tree_with_proofs(tmp_path, write_json):
+    logs = [
+        write_json(tmp_path / "v1.json", frame([1, 2], {0: 10**20, 1: 5, 3: 0})),
+        write_json(tmp_path / "v2.json", [
+            frame([3, 4], {1: 7, 2000: 10**19}, "distributed_rewards"),
+            frame([5, 6], {0: 1}, "distributed_rewards"),
+        ]),
+    ]
+    state = rewards_tree.RewardsState()
+    assert rewards_tree.fold_logs(state, logs) == [ipfs.cid_v0(Path(log).read_bytes()) for log in logs]
+    assert state.frames == 3
+    assert state.cumulative() == {0: 10**20 + 1, 1: 12, 2000: 10**19}
+
+    tree = state.tree()
+    proofs = rewards_tree.operator_proofs(tree)
+    assert set(proofs) == {"0", "1", "2000"}
+    for no_id, claim in proofs.items():
+        leaf = rewards_tree.hash_leaf(int(no_id), int(claim["cumulativeFeeShares"]))
+        assert "0x" + merkle.process_proof(leaf, claim["proof"]).hex() == tree.root
+
+
+def test_state_resumes_incrementally(tmp_path, write_json):
+    first = write_json(tmp_path / "a.json", frame([1, 2], {4: 3 * 10**20}))
+    second = write_json(tmp_path / "b.json", frame([3, 4], {4: 1, 9: 2}))
+    path = tmp_path / "state.json"
+
+    state = rewards_tree.load_state(path)
+    rewards_tree.fold_logs(state, [first])
+    rewards_tree.save_state(path, state)
+
+    resumed = rewards_tree.load_state(path)
+    assert rewards_tree.fold_logs(resumed, [first, second]) == [ipfs.cid_v0(Path(second).read_bytes())]
+    full = rewards_tree.RewardsState()
+    rewards_tree.fold_logs(full, [first, second])
+    assert resumed.cumulative() == full.cumulative() == {4: 3 * 10**20 + 1, 9: 2}
+    assert resumed.tree().root == full.tree().root
+
+
+def test_single_operator_tree_gets_a_stone(tmp_path, write_json):
+    state = rewards_tree.RewardsState()
+    rewards_tree.fold_logs(state, [write_json(tmp_path / "a.json", frame([1, 2], {5: 100}))])
+    tree = state.tree()
+    assert len(tree) == 2
+    assert [v["value"] for v in tree.values] == [[5, 100], list(rewards_tree.STONE)]
+    assert len(rewards_tree.operator_proofs(tree)["5"]["proof"]) == 1
+
+
+def test_same_log_under_another_name_is_folded_once(tmp_path, write_json):
+    log = frame([1, 2], {4: 10**20})
+    first = write_json(tmp_path / "a.json", log)
+    copy = write_json(tmp_path / "copy.json.gz", log, compress=True)
+    state = rewards_tree.RewardsState()
+    rewards_tree.fold_logs(state, [first])
+    assert rewards_tree.fold_logs(state, [copy, f"{tmp_path}/./a.json"]) == []
+    assert (state.frames, state.cumulative()) == (1, {4: 10**20})
@@ -0,0 +1,62 @@
+from common import rpc_cache
+from tests.test_multicall import BLOCK, FakeCSMProvider, make_csm
+
+
+def cached_csm(tmp_path, inner=None):
+    inner = inner or FakeCSMProvider()
+    provider = rpc_cache.CachedProvider(inner, rpc_cache.ResponseCache(tmp_path / "rpc.sqlite"))
+    return inner, *make_csm(provider)
+
+
+def test_pinned_calls_are_served_from_disk(tmp_path):
+    inner, w3, csm = cached_csm(tmp_path)
+    first = csm.functions.getNodeOperator(3).call(block_identifier=BLOCK)
+    assert inner.calls.count("eth_call") == 1
+
+    # A new provider over the same file needs no RPC call at all
+    inner, w3, csm = cached_csm(tmp_path)
+    assert csm.functions.getNodeOperator(3).call(block_identifier=BLOCK) == first
+    assert "eth_call" not in inner.calls
+
+
+def test_latest_and_unfinalized_blocks_are_not_cached(tmp_path):
+    inner, w3, csm = cached_csm(tmp_path)
+    provider = w3.provider
+    assert provider.cache_key("eth_call", [{}, "latest"]) is None
+    assert provider.cache_key("eth_call", [{}, hex(BLOCK + 100)]) is None
+    assert provider.cache_key("eth_getLogs", [{"fromBlock": "0x1", "toBlock": "latest"}]) is None
+    assert provider.cache_key("eth_getLogs", [{"fromBlock": "0x1", "toBlock": hex(BLOCK)}]) is not None
+    assert provider.cache_key("eth_sendRawTransaction", ["0x00"]) is None
+
+
+def test_multicall_batch_fallback_uses_the_cache(tmp_path, monkeypatch):
+    from common import multicall
+    from tests.test_multicall import encoded_node_operator
+
+    posted = []
+
+    class Response:
+        def __init__(self, payload):
+            self._payload = payload
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return self._payload
+
+    def fake_post(url, json, timeout):
+        posted.extend(item["id"] for item in json)
+        return Response([
+            {"jsonrpc": "2.0", "id": item["id"], "result": "0x" + encoded_node_operator(int(item["params"][0]["data"][-8:], 16)).hex()}
+            for item in json
+        ])
+
+    monkeypatch.setattr(multicall.requests, "post", fake_post)
+    inner = FakeCSMProvider(multicall_deployed=False)
+    inner.endpoint_uri = "http://rpc.local"
+    _, w3, csm = cached_csm(tmp_path, inner)
+    first = multicall.get_node_operators(w3, csm, [1, 2], BLOCK)
+    assert posted == [0, 1]
+    assert multicall.get_node_operators(w3, csm, [1, 2, 4], BLOCK) == {**first, 4: multicall.get_node_operators(w3, csm, [4], BLOCK)[4]}
+    assert posted == [0, 1, 2]
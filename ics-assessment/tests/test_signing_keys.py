@@ -0,0 +1,151 @@
+import json
+import os
+
+import numpy as np
+import pytest
+from eth_abi import encode
+from hexbytes import HexBytes
+
+from common import signing_keys
+from common.signing_keys import Keys, PubkeyIndex
+
+MODULE = "0x0000000000000000000000000000000000000001"
+
+
+def _keys(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return Keys(
+        rng.integers(0, 256, size=(count, 48), dtype=np.uint8),
+        rng.integers(0, 256, size=(count, 96), dtype=np.uint8),
+    )
+
+
+class FakeEth:
+    def __init__(self, events):
+        self.events = events
+        self.block_number = max(block for block, *_ in events)
+
+    def get_logs(self, params):
+        return [
+            {
+                "address": params["address"],
+                "topics": [HexBytes(topic), HexBytes(no_id.to_bytes(32, "big"))],
+                "data": HexBytes(encode(["bytes"], [pubkey])),
+                "blockNumber": block,
+                "blockHash": HexBytes(b"\x01" * 32),
+                "transactionHash": HexBytes(b"\x02" * 32),
+                "transactionIndex": 0,
+                "logIndex": i,
+            }
+            for i, (block, topic, no_id, pubkey) in enumerate(self.events)
+            if params["fromBlock"] <= block <= params["toBlock"]
+        ]
+
+
+class FakeWeb3:
+    def __init__(self, events):
+        self.eth = FakeEth(events)
+
+
+def test_sync_adds_and_removes_keys(tmp_path):
+    path = tmp_path / "keys.bin"
+    keys = _keys(4).pubkeys
+    events = [
+        (10, signing_keys.SIGNING_KEY_ADDED, 3, keys[0].tobytes()),
+        (10, signing_keys.SIGNING_KEY_ADDED, 3, keys[1].tobytes()),
+        (11, signing_keys.SIGNING_KEY_ADDED, 256, keys[2].tobytes()),
+        (12, signing_keys.SIGNING_KEY_REMOVED, 3, keys[1].tobytes()),
+    ]
+    index = signing_keys.sync(FakeWeb3(events), MODULE, path, from_block=1)
+    assert (len(index), index.block) == (2, 12)
+    assert index.operators_of(keys).tolist() == [3, -1, 256, -1]
+
+    events.append((20, signing_keys.SIGNING_KEY_ADDED, 7, keys[1].tobytes()))
+    index = signing_keys.sync(FakeWeb3(events), MODULE, path)
+    assert index.block == 20
+    assert index.operators_of(keys).tolist() == [3, 7, 256, -1]
+    assert index.locate(keys)[1].tolist() == [0, 0, 0, -1]
+    assert list(index.pubkeys) == sorted(index.pubkeys)
+
+
+def test_key_indices_follow_signing_keys_storage(tmp_path):
+    keys = _keys(6).pubkeys
+    merged = PubkeyIndex(tmp_path / "none.bin").merged([1] * 5 + [2], keys, [1] * 6)
+    signing_keys.save_index(tmp_path / "keys.bin", *merged, block=1)
+    index = PubkeyIndex(tmp_path / "keys.bin")
+    assert index.locate(keys)[1].tolist() == [0, 1, 2, 3, 4, 0]
+
+    # removing key 1 moves the operator's last key into its place, then key 3 is the last one
+    merged = index.merged([1, 1, 1], keys[[1, 3, 5]], [-1, -1, -1])
+    signing_keys.save_index(tmp_path / "keys.bin", *merged, block=2)
+    index = PubkeyIndex(tmp_path / "keys.bin")
+    assert index.locate(keys)[0].tolist() == [1, -1, 1, -1, 1, 2]
+    assert index.locate(keys)[1].tolist() == [0, -1, 2, -1, 1, 0]
+
+
+def test_index_keeps_keys_with_trailing_zeros(tmp_path):
+    keys = np.zeros((3, 48), dtype=np.uint8)
+    keys[:, 0] = [1, 1, 2]
+    keys[1, 47] = 5
+    merged = PubkeyIndex(tmp_path / "none.bin").merged([0, 1, 2], keys, [1, 1, 1])
+    signing_keys.save_index(tmp_path / "keys.bin", *merged, block=1)
+    index = PubkeyIndex(tmp_path / "keys.bin")
+    assert index.operators_of(keys).tolist() == [0, 1, 2]
+    missing = keys.copy()
+    missing[:, 47] = 9
+    assert index.operators_of(missing).tolist() == [-1, -1, -1]
+
+
+def test_check_keys(tmp_path):
+    keys = _keys(6)
+    keys.pubkeys[4] = keys.pubkeys[1]
+    keys.pubkeys[5] = 0
+    merged = PubkeyIndex(tmp_path / "none.bin").merged([9], keys.pubkeys[2:3], [1])
+    signing_keys.save_index(tmp_path / "keys.bin", *merged, block=1)
+    problems = signing_keys.check_keys(keys, PubkeyIndex(tmp_path / "keys.bin"))
+    assert {name: found.tolist() for name, found in problems.items()} == {"empty": [5], "duplicate": [4], "registered": [2]}
+    assert signing_keys.check_keys(_keys(100, seed=1)) == {}
+
+
+def test_deposit_data_and_buffers(tmp_path):
+    keys = _keys(1500)
+    credentials = bytes([1] + [0] * 11) + os.urandom(20)
+    entries = [
+        {
+            "pubkey": p.tobytes().hex(),
+            "withdrawal_credentials": credentials.hex(),
+            "amount": 32000000000 if i else 1000000000,
+            "signature": s.tobytes().hex(),
+        }
+        for i, (p, s) in enumerate(zip(keys.pubkeys, keys.signatures))
+    ]
+    (tmp_path / "deposit_data.json").write_text(json.dumps(entries))
+    read = Keys.from_deposit_data(tmp_path / "deposit_data.json")
+    assert np.array_equal(read.pubkeys, keys.pubkeys) and np.array_equal(read.signatures, keys.signatures)
+    problems = signing_keys.check_keys(read, withdrawal_credentials=credentials)
+    assert {name: found.tolist() for name, found in problems.items()} == {"amount": [0]}
+    assert signing_keys.check_keys(read, withdrawal_credentials=bytes(32))["withdrawal_credentials"].tolist() == list(range(1500))
+
+    (tmp_path / "keys.bin").write_bytes(keys.pubkeys.tobytes())
+    (tmp_path / "sigs.bin").write_bytes(keys.signatures.tobytes())
+    mapped = Keys.from_files(tmp_path / "keys.bin", tmp_path / "sigs.bin")
+    assert np.array_equal(mapped.pubkeys, keys.pubkeys)
+    with pytest.raises(ValueError):
+        Keys.from_buffers(keys.pubkeys.tobytes()[:-1], keys.signatures.tobytes())
+    with pytest.raises(ValueError):
+        Keys.from_buffers(keys.pubkeys.tobytes(), keys.signatures.tobytes()[:96])
+
+
+def test_upload_calls_fit_gas_limit(tmp_path):
+    keys = _keys(300)
+    per_transaction = signing_keys.keys_per_transaction()
+    assert signing_keys.TX_BASE_GAS + per_transaction * signing_keys.GAS_PER_KEY <= signing_keys.DEFAULT_GAS_LIMIT
+    with pytest.raises(ValueError):
+        signing_keys.keys_per_transaction(gas_limit=signing_keys.TX_BASE_GAS)
+
+    assert signing_keys.write_calls(tmp_path / "calls.json", signing_keys.upload_calls(keys, 128)) == 3
+    calls = json.loads((tmp_path / "calls.json").read_text())
+    assert [c["keysCount"] for c in calls] == [128, 128, 44]
+    pubkeys = b"".join(bytes.fromhex(c["publicKeys"][2:]) for c in calls)
+    signatures = b"".join(bytes.fromhex(c["signatures"][2:]) for c in calls)
+    assert pubkeys == keys.pubkeys.tobytes() and signatures == keys.signatures.tobytes()
@@ -0,0 +1,136 @@
+import json
+import random
+import re
+from pathlib import Path
+
+import pytest
+
+from common import ssz
+from common.ssz import FORKS
+
+ROOT = Path(__file__).resolve().parents[2]
+FIXTURES = ROOT / "test" / "fixtures" / "CSVerifier"
+
+
+def _fixture(name):
+    return json.loads((FIXTURES / name).read_text())
+
+
+def _header(header):
+    return {
+        "slot": header["00__slot"],
+        "proposer_index": header["01__proposerIndex"],
+        "parent_root": header["02__parentRoot"],
+        "state_root": header["03__stateRoot"],
+        "body_root": header["04__bodyRoot"],
+    }
+
+
+def _body_root(fixture, fork):
+    witness = fixture["witness"]
+    withdrawals = [ssz.Withdrawal.default() for _ in range(ssz.MAX_WITHDRAWALS_PER_PAYLOAD)]
+    withdrawals[witness["00__withdrawalOffset"]] = {
+        "index": witness["01__withdrawalIndex"],
+        "validator_index": witness["02__validatorIndex"],
+        "address": witness["04__withdrawalCredentials"][-40:],
+        "amount": witness["03__amount"],
+    }
+    body = FORKS[fork].BeaconBlock.child_type(FORKS[fork].BeaconBlock.field_index("body"))
+    return body.hash_tree_root(body.encode({"execution_payload": {"withdrawals": withdrawals}}))
+
+
+def test_gindices_match_solidity_constants():
+    source = (ROOT / "script" / "constants" / "GIndices.sol").read_text()
+    packed = {
+        (name, fork.lower()): int(value, 16)
+        for name, fork, value in re.findall(r"(\w+)_(DENEB|ELECTRA)\s*=\s*GIndex\.wrap\(\s*(0x[0-9a-f]+)", source)
+    }
+    assert packed
+    for fork in FORKS.values():
+        state = fork.BeaconState
+        assert packed["FIRST_VALIDATOR", fork.name] == ssz.pack(state.gindex("validators", 0), 40)
+        assert packed["FIRST_HISTORICAL_SUMMARY", fork.name] == ssz.pack(state.gindex("historical_summaries", 0), 24)
+        first_withdrawal = ssz.concat(
+            ssz.pack(state.gindex("latest_execution_payload_header", "withdrawals_root"), 0),
+            ssz.pack(ssz.List(ssz.Withdrawal, 16).gindex(0), 4),
+        )
+        assert packed["FIRST_WITHDRAWAL", fork.name] == first_withdrawal
+
+
+def test_state_and_body_roots_match_fixtures():
+    fixture = _fixture("historicalWithdrawal.json")
+    old = _header(fixture["oldBlock"]["00__header"])
+    block_roots = ssz.Vector(ssz.Bytes32, ssz.SLOTS_PER_HISTORICAL_ROOT)
+    roots = block_roots.default()
+    roots[old["slot"] % ssz.SLOTS_PER_HISTORICAL_ROOT] = ssz.BeaconBlockHeader.hash_tree_root(ssz.BeaconBlockHeader.encode(old))
+    summary = {"block_summary_root": block_roots.hash_tree_root(block_roots.encode(roots))}
+    state = FORKS["electra"].BeaconState
+    state_root = state.hash_tree_root(state.encode({"historical_summaries": [summary]}))
+    assert "0x" + state_root.hex() == fixture["beaconBlock"]["blockHeader"]["03__stateRoot"]
+
+    for name, fork in [("withdrawal.json", "deneb"), ("withdrawal_zero_index.json", "deneb"),
+                       ("historicalWithdrawal.json", "electra"), ("historicalCrossForksWithdrawal.json", "deneb")]:
+        fixture = _fixture(name)
+        header = fixture["oldBlock"]["00__header"] if "oldBlock" in fixture else fixture["beaconBlock"]["blockHeader"]
+        assert "0x" + _body_root(fixture, fork).hex() == header["04__bodyRoot"], name
+
+
+def test_encode_decode_roundtrip():
+    validator = {
+        "pubkey": bytes(range(48)),
+        "withdrawal_credentials": b"\x01" + bytes(31),
+        "effective_balance": 32 * 10**9,
+        "slashed": True,
+        "activation_eligibility_epoch": 1,
+        "activation_epoch": 2,
+        "exit_epoch": 3,
+        "withdrawable_epoch": 4,
+    }
+    encoded = ssz.Validator.encode(validator)
+    assert len(encoded) == ssz.Validator.size == 121
+    assert ssz.Validator.decode(encoded) == validator
+
+    state = FORKS["deneb"].BeaconState
+    data = state.encode({"slot": 7, "validators": [validator] * 3, "balances": [1, 2, 3]})
+    node = ssz.Node(state, memoryview(data))
+    assert (node.value("slot"), len(node.child("validators")), node.value("balances")) == (7, 3, [1, 2, 3])
+    assert node.value("validators", 2, "withdrawable_epoch") == 4
+    assert node.root == state.hash_tree_root(data)
+
+
+def test_batched_roots_match_single_roots():
+    rng = random.Random(1)
+    validators = [
+        ssz.Validator.encode({"pubkey": rng.randbytes(48), "effective_balance": rng.randrange(2**64)})
+        for _ in range(33)
+    ]
+    rows = ssz.as_rows(b"".join(validators), ssz.Validator.size)
+    assert [bytes(root) for root in ssz.Validator.roots(rows)] == [ssz.Validator.hash_tree_root(v) for v in validators]
+    tree = ssz.Subtree(b"".join(ssz.Validator.hash_tree_root(v) for v in validators), 6)
+    assert ssz.List(ssz.Validator, 64).hash_tree_root(b"".join(validators)) == ssz.mix_in_length(tree.root, 33)
+
+
+@pytest.mark.parametrize("count", [0, 1, 5, 16])
+def test_prove_and_verify(count):
+    rng = random.Random(count)
+    withdrawals = ssz.List(ssz.Withdrawal, ssz.MAX_WITHDRAWALS_PER_PAYLOAD)
+    values = [{"index": rng.randrange(2**64), "amount": rng.randrange(2**64)} for _ in range(count)]
+    node = ssz.Node(withdrawals, memoryview(withdrawals.encode(values)))
+    for i in range(count):
+        gindex = withdrawals.gindex(i, "amount")
+        leaf, proof = node.prove(gindex)
+        assert leaf == ssz.uint64.encode(values[i]["amount"]).ljust(32, b"\0")
+        assert ssz.verify_proof(proof, node.root, leaf, gindex)
+        assert not ssz.verify_proof(proof, node.root, leaf, gindex ^ 1)
+    leaf, proof = node.prove(withdrawals.gindex("__len__"))
+    assert leaf == count.to_bytes(32, "little") and ssz.verify_proof(proof, node.root, leaf, 3)
+    assert node.prove(1) == (node.root, [])
+
+
+def test_gindex_helpers_like_solidity():
+    packed = ssz.pack(0x560000000000, 40)
+    assert (ssz.index(packed), ssz.power(packed)) == (0x560000000000, 40)
+    assert ssz.index(ssz.shr(packed, 5)) == 0x560000000005
+    with pytest.raises(ValueError, match="IndexOutOfRange"):
+        ssz.shr(packed, 2**40)
+    assert ssz.concat(ssz.pack(2, 0), ssz.pack(3, 1)) == ssz.pack(5, 1)
@@ -0,0 +1,109 @@
+import json
+import os
+
+import numpy as np
+import pytest
+from eth_abi import encode
+
+from common import ipfs, merkle, strikes_tree
+from common.keccak import keccak256
+
+
+def _pubkeys(count):
+    return np.frombuffer(os.urandom(count * 48), dtype=np.uint8).reshape(count, 48)
+
+
+def test_hash_leaf_matches_contract_encoding():
+    pubkey = os.urandom(48)
+    data = [1, 0, 2, 0, 0, 1]
+    expected = keccak256(keccak256(encode(["uint256", "bytes", "uint256[]"], [7, pubkey, data])))
+    assert strikes_tree.hash_leaf(7, pubkey, data) == expected
+    assert strikes_tree.hash_leaf(7, "0x" + pubkey.hex(), data) == expected
+
+
+@pytest.mark.parametrize("count", [3, 200])
+def test_leaf_hashes_match_single(count):
+    ids = np.arange(count, dtype=np.int64) * 1000
+    pubkeys = _pubkeys(count)
+    windows = np.random.default_rng(1).integers(0, 3, size=(count, 6)).astype(np.uint32)
+    hashes = strikes_tree.leaf_hashes(ids, pubkeys, windows)
+    assert [h.tobytes() for h in hashes] == [
+        strikes_tree.hash_leaf(int(i), bytes(p), w) for i, p, w in zip(ids, pubkeys, windows.tolist())
+    ]
+
+
+def test_windows_age_and_expire():
+    state = strikes_tree.StrikesState(lifetime=3, lifetimes={2: 4})
+    pubkeys = _pubkeys(3)
+    state.fold_frame([1, 2, 5], pubkeys, [1, 1, 0], [10, 20, 50])
+    assert len(state) == 2
+    for _ in range(2):
+        state.fold_frame([], pubkeys[:0], [])
+    assert state.data() == [[0, 0, 1], [0, 0, 1, 0]]
+    state.fold_frame([], pubkeys[:0], [])
+    # Operator 1's strikes expired after 3 frames, operator 2 keeps them for 4
+    assert state.operator_ids.tolist() == [2]
+    assert state.data() == [[0, 0, 0, 1]]
+    state.fold_frame([], pubkeys[:0], [])
+    assert len(state) == 0
+
+
+def test_tree_matches_standard_tree_and_state_roundtrip():
+    state = strikes_tree.StrikesState(lifetimes={3: 8})
+    pubkeys = _pubkeys(40)
+    ids = np.arange(40) % 5
+    rng = np.random.default_rng(2)
+    for _ in range(4):
+        state.fold_frame(ids, pubkeys, rng.integers(0, 2, size=40), np.arange(40))
+    tree = state.tree()
+    reference = merkle.StandardMerkleTree.of([v["value"] for v in tree.values], strikes_tree.LEAF_ENCODING)
+    assert tree.root == reference.root
+    assert tree.verify_tree()
+
+    restored = strikes_tree.StrikesState.from_dict(json.loads(json.dumps(state.to_dict())))
+    assert restored.tree().root == tree.root
+    assert restored.key_index_of() == state.key_index_of()
+    seeded = strikes_tree.StrikesState.from_tree(json.loads(json.dumps(tree.dump())), lifetimes={3: 8})
+    assert seeded.tree().root == tree.root
+
+
+def test_penalty_calls_verify():
+    state = strikes_tree.StrikesState()
+    pubkeys = _pubkeys(300)
+    for strikes in ([1] * 300, [i % 2 for i in range(300)], [1] * 300):
+        state.fold_frame(np.arange(300), pubkeys, strikes, np.arange(300) + 100)
+    tree = state.tree()
+    indices = strikes_tree.ejectable(tree, threshold=3)
+    assert len(indices) == 150
+    calls = strikes_tree.penalty_calls(tree, indices, state.key_index_of(), batch_size=70)
+    assert [len(c["keyStrikesList"]) for c in calls] == [70, 70, 10]
+    assert all(strikes_tree.verify_call(tree.root, call) for call in calls)
+    assert all(k["keyIndex"] == k["nodeOperatorId"] + 100 for c in calls for k in c["keyStrikesList"])
+
+    calls[0]["keyStrikesList"][0]["data"][0] += 1
+    assert not strikes_tree.verify_call(tree.root, calls[0])
+    assert strikes_tree.penalty_calldata(calls[1]).startswith(strikes_tree.PROCESS_BAD_PERFORMANCE_PROOF_SELECTOR)
+
+
+def test_multi_proof_of_whole_and_single_leaf_trees():
+    tree = merkle.StandardMerkleTree.of([[i] for i in range(7)], ["uint256"])
+    for indices in ([], [3], list(range(7)), [0, 6, 2]):
+        order, proof, flags = tree.get_multi_proof(indices)
+        leaves = [merkle.leaf_hash(["uint256"], tree.values[i]["value"]) for i in order]
+        assert merkle._hex(merkle.process_multi_proof(leaves, proof, flags)) == tree.root
+
+
+def test_same_strikes_file_under_another_path_is_folded_once(tmp_path, write_json):
+    pubkeys = _pubkeys(2)
+    strikes = {"strikes": [
+        {"nodeOperatorId": no_id, "keyIndex": 0, "pubkey": "0x" + bytes(p).hex(), "strikes": 1}
+        for no_id, p in enumerate(pubkeys)
+    ]}
+    (tmp_path / "copy").mkdir()
+    first = write_json(tmp_path / "frame.json", strikes)
+    copy = write_json(tmp_path / "copy" / "frame.json", strikes)
+    state = strikes_tree.StrikesState()
+    assert state.fold_file(first)
+    assert not state.fold_file(copy)
+    assert state.frames == [ipfs.cid_v0(json.dumps(strikes).encode())]
+    assert state.data() == [[1] + [0] * (strikes_tree.DEFAULT_LIFETIME - 1)] * 2
@@ -0,0 +1,180 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from common import signing_keys, ssz, verifier_proofs
+from common.signing_keys import PubkeyIndex
+from common.ssz import FORKS
+from common.verifier_proofs import BlockState, VerifierConfig
+
+FIXTURES = Path(__file__).resolve().parents[2] / "test" / "fixtures" / "CSVerifier"
+ELECTRA = FORKS["electra"]
+ADDRESS = bytes.fromhex("b3e29c46ee1745724417c0c51eb2351a1c01cf36")
+SLOT = 100 * 32
+
+
+def _fixture(name):
+    return json.loads((FIXTURES / name).read_text())
+
+
+def _header(header):
+    return {"slot": header["00__slot"], "proposerIndex": header["01__proposerIndex"], "parentRoot": header["02__parentRoot"],
+            "stateRoot": header["03__stateRoot"], "bodyRoot": header["04__bodyRoot"]}
+
+
+def _block_state(state: dict, block: dict | None = None, fork=ELECTRA) -> BlockState:
+    """A block committing to the state, with the state's payload header withdrawals in the block body."""
+    block = block or {}
+    withdrawals = block.get("body", {}).get("execution_payload", {}).get("withdrawals", [])
+    withdrawals_type = ssz.List(ssz.Withdrawal, ssz.MAX_WITHDRAWALS_PER_PAYLOAD)
+    state = {**state, "latest_execution_payload_header": {
+        "withdrawals_root": withdrawals_type.hash_tree_root(withdrawals_type.encode(withdrawals)),
+    }}
+    state_data = fork.BeaconState.encode(state)
+    block = {**block, "slot": state.get("slot", 0), "state_root": fork.BeaconState.hash_tree_root(state_data)}
+    return BlockState(fork, memoryview(state_data), memoryview(fork.BeaconBlock.encode(block)))
+
+
+def _validator(i, withdrawable_epoch=90, slashed=False):
+    return {
+        "pubkey": bytes([i + 1]) * 48,
+        "withdrawal_credentials": b"\x01" + bytes(11) + ADDRESS,
+        "effective_balance": 32 * 10**9,
+        "slashed": slashed,
+        "exit_epoch": withdrawable_epoch - 10,
+        "withdrawable_epoch": withdrawable_epoch,
+    }
+
+
+def test_gindices_follow_the_deploy_config():
+    config = verifier_proofs.NETWORKS["mainnet"]
+    gindices = verifier_proofs.fork_gindices(ELECTRA)
+    assert gindices["gIFirstWithdrawal"] == 0x161C004
+    assert ssz.index(config.validator_gindex(7, config.pivot_slot)) == 0x960000000000 + 7
+    assert ssz.index(config.withdrawal_gindex(3, config.pivot_slot)) == 0x161C0 + 3
+    assert config.withdrawal_address == bytes.fromhex("b9d7934878b5fb9610b3fe8a5e441e8fad7e293f")
+
+    config = VerifierConfig(FORKS["deneb"], ELECTRA, 0, pivot_slot=1000, capella_slot=0)
+    assert ssz.index(config.validator_gindex(0, 999)) == 0x560000000000
+    assert ssz.index(config.validator_gindex(0, 1000)) == 0x960000000000
+    with pytest.raises(ValueError, match="HistoricalSummaryDoesNotExist"):
+        config.historical_block_root_gindex(8192 + 5, 8192 + 1)
+    assert ssz.index(config.historical_block_root_gindex(2 * 8192, 8192 + 1)) == ssz.index(ssz.shr(ssz.concat(
+        ssz.shr(verifier_proofs.fork_gindices(ELECTRA)["gIFirstHistoricalSummary"], 1),
+        verifier_proofs.fork_gindices(ELECTRA)["gIFirstBlockRootInSummary"],
+    ), 1))
+
+
+def test_fixture_withdrawal_proofs_verify():
+    fixture = _fixture("withdrawal.json")
+    witness = fixture["witness"]
+    state_root = bytes.fromhex(fixture["beaconBlock"]["blockHeader"]["03__stateRoot"][2:])
+    # CSVerifier.t.sol deploys the Deneb gindices
+    config = VerifierConfig(FORKS["deneb"], FORKS["deneb"], 0, 0, 0)
+    slot = fixture["beaconBlock"]["blockHeader"]["00__slot"]
+    validator = ssz.Validator.hash_tree_root(ssz.Validator.encode({
+        "pubkey": fixture["_pubkey"],
+        "withdrawal_credentials": witness["04__withdrawalCredentials"],
+        "effective_balance": witness["05__effectiveBalance"],
+        "slashed": witness["06__slashed"],
+        "activation_eligibility_epoch": witness["07__activationEligibilityEpoch"],
+        "activation_epoch": witness["08__activationEpoch"],
+        "exit_epoch": witness["09__exitEpoch"],
+        "withdrawable_epoch": witness["10__withdrawableEpoch"],
+    }))
+    withdrawal = ssz.Withdrawal.hash_tree_root(ssz.Withdrawal.encode({
+        "index": witness["01__withdrawalIndex"],
+        "validator_index": witness["02__validatorIndex"],
+        "address": witness["04__withdrawalCredentials"][-40:],
+        "amount": witness["03__amount"],
+    }))
+    for leaf, proof, gindex in [
+        (validator, witness["12__validatorProof"], config.validator_gindex(witness["02__validatorIndex"], slot)),
+        (withdrawal, witness["11__withdrawalProof"], config.withdrawal_gindex(witness["00__withdrawalOffset"], slot)),
+    ]:
+        proof = [bytes.fromhex(p[2:]) for p in proof]
+        assert ssz.verify_proof(proof, state_root, leaf, ssz.index(gindex))
+
+
+def test_historical_proof_matches_fixture():
+    fixture = _fixture("historicalWithdrawal.json")
+    old = _header(fixture["oldBlock"]["00__header"])
+    # CSVerifierHistorical.t.sol: Electra gindices, capella and pivot at the old block's slot
+    config = VerifierConfig(ELECTRA, ELECTRA, old["slot"], old["slot"], old["slot"])
+    block_roots = ssz.Vector(ssz.Bytes32, ssz.SLOTS_PER_HISTORICAL_ROOT)
+    roots = block_roots.default()
+    roots[old["slot"] % ssz.SLOTS_PER_HISTORICAL_ROOT] = verifier_proofs.header_root(old)
+    summary_state = ssz.Node(ELECTRA.BeaconState, memoryview(ELECTRA.BeaconState.encode({"block_roots": roots})))
+
+    state = ELECTRA.BeaconState.encode({"historical_summaries": [
+        {"block_summary_root": summary_state.child("block_roots").root},
+    ]})
+    recent = BlockState(ELECTRA, memoryview(state), memoryview(ELECTRA.BeaconBlock.encode({
+        "slot": fixture["beaconBlock"]["blockHeader"]["00__slot"],
+        "state_root": ELECTRA.BeaconState.hash_tree_root(state),
+    })))
+    assert "0x" + recent.state.root.hex() == fixture["beaconBlock"]["blockHeader"]["03__stateRoot"]
+    witness = recent.historical_witness(old, summary_state, config)
+    assert witness == {"header": old, "proof": fixture["oldBlock"]["01__proof"]}
+
+    roots[old["slot"] % ssz.SLOTS_PER_HISTORICAL_ROOT] = bytes(32)
+    other = ssz.Node(ELECTRA.BeaconState, memoryview(ELECTRA.BeaconState.encode({"block_roots": roots})))
+    with pytest.raises(ValueError, match="historical summary 0"):
+        recent.historical_witness(old, other, config)
+
+
+def test_withdrawal_witnesses_of_a_block():
+    validators = [_validator(0), _validator(1, slashed=True), _validator(2, withdrawable_epoch=200), _validator(3)]
+    withdrawals = [
+        {"index": 10, "validator_index": 0, "address": ADDRESS, "amount": 32 * 10**9},
+        {"index": 11, "validator_index": 1, "address": ADDRESS, "amount": 10**9},
+        {"index": 12, "validator_index": 2, "address": ADDRESS, "amount": 32 * 10**9},
+        {"index": 13, "validator_index": 3, "address": ADDRESS, "amount": 10**9},
+    ]
+    block_state = _block_state(
+        {"slot": SLOT, "validators": validators, "balances": [0] * 4},
+        {"proposer_index": 5, "body": {"execution_payload": {"withdrawals": withdrawals}}},
+    )
+    config = VerifierConfig(ELECTRA, ELECTRA, 0, 0, 0, withdrawal_address=ADDRESS)
+    assert block_state.header()["stateRoot"] == "0x" + block_state.state.root.hex()
+
+    witnesses = [block_state.withdrawal_witness(offset, config) for offset in range(4)]
+    assert [w["withdrawalIndex"] for w in witnesses] == [10, 11, 12, 13]
+    assert witnesses[1]["slashed"] and witnesses[2]["withdrawableEpoch"] == 200
+    assert [verifier_proofs.reportable(w, SLOT, config) for w in witnesses] == [
+        None, None, "ValidatorNotWithdrawn", "PartialWithdrawal",
+    ]
+    other = VerifierConfig(ELECTRA, ELECTRA, 0, 0, 0, withdrawal_address=bytes(20))
+    assert verifier_proofs.reportable(witnesses[0], SLOT, other) == "InvalidWithdrawalAddress"
+
+    # Deneb gindices don't fit an Electra state
+    with pytest.raises(ValueError):
+        block_state.withdrawal_witness(0, VerifierConfig(FORKS["deneb"], FORKS["deneb"], 0, 0, 0))
+
+
+def test_withdrawal_offsets_of_module_keys(tmp_path):
+    validators = [_validator(i) for i in range(6)]
+    withdrawals = [{"index": i, "validator_index": v, "amount": 32 * 10**9} for i, v in enumerate([5, 1, 4, 2])]
+    withdrawals[1]["address"] = ADDRESS
+    block_state = _block_state(
+        {"slot": SLOT, "validators": validators, "balances": [0] * 6},
+        {"body": {"execution_payload": {"withdrawals": withdrawals}}},
+    )
+    assert block_state.validator_pubkeys([4, 1]).tolist() == [[5] * 48, [2] * 48]
+
+    pubkeys = np.array([[2] * 48, [6] * 48], dtype=np.uint8)
+    merged = PubkeyIndex(tmp_path / "none.bin").merged([7, 9], pubkeys, [1, 1])
+    signing_keys.save_index(tmp_path / "keys.bin", *merged, block=1)
+    index = PubkeyIndex(tmp_path / "keys.bin")
+    assert verifier_proofs.withdrawal_offsets(block_state, index) == [(0, 9, 0), (1, 7, 0)]
+    assert verifier_proofs.withdrawal_offsets(block_state, index, [1]) == [(1, 7, 0)]
+    assert verifier_proofs.withdrawal_offsets(block_state, index, [4, 2]) == []
+    assert verifier_proofs.withdrawal_offsets(_block_state({"slot": SLOT}), index) == []
+    assert verifier_proofs.withdrawal_offsets(block_state, index, withdrawal_address=ADDRESS) == [(1, 7, 0)]
+
+    merged = index.merged([7], np.array([[5] * 48], dtype=np.uint8), [1])
+    signing_keys.save_index(tmp_path / "keys.bin", *merged, block=2)
+    index = PubkeyIndex(tmp_path / "keys.bin")
+    assert verifier_proofs.withdrawal_offsets(block_state, index, [4, 2]) == [(2, 7, 1)]